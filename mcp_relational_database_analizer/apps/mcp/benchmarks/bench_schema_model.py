@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Memory and build-time benchmark: organize_db_structure_by_table (nested dicts)
+versus SchemaModel (struct-of-arrays) on a synthetic catalog.
+
+Usage:
+    python benchmarks/bench_schema_model.py [tables] [columns_per_table]
+
+Defaults to 20,000 tables x 15 columns (300k columns), 2 indexes and 1 FK per table.
+Only the structures built from the rows are measured; the rows themselves are
+allocated before tracing starts.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from analysis.schema_model import SchemaModel
+from analysis.structure import (
+    organize_db_structure_by_table,
+    find_tables_without_indexes,
+    find_tables_without_primary_keys,
+    find_large_tables
+)
+
+DATA_TYPES = ["integer", "bigint", "text", "character varying", "timestamp with time zone", "boolean", "numeric"]
+
+def synthetic_structure(table_count: int, columns_per_table: int) -> dict:
+    """Rows shaped like get_database_structure() for table_count tables"""
+    tables, columns, indexes, foreign_keys = [], [], [], []
+    for t in range(table_count):
+        schema = f"schema_{t % 20}"
+        name = f"table_{t}"
+        tables.append({"table_schema": schema, "table_name": name, "table_size_bytes": 8192 * t,
+                       "total_size_bytes": 16384 * t, "column_count": columns_per_table,
+                       "table_description": "", "estimated_row_count": t * 10})
+        for c in range(columns_per_table):
+            columns.append({"table_schema": schema, "table_name": name, "column_name": f"column_{c}",
+                            "data_type": DATA_TYPES[c % len(DATA_TYPES)], "character_maximum_length": None,
+                            "is_nullable": "YES" if c else "NO", "column_default": None, "column_description": ""})
+        indexes.append({"table_schema": schema, "table_name": name, "index_name": f"{name}_pkey",
+                        "index_definition": f"CREATE UNIQUE INDEX {name}_pkey ON {schema}.{name} USING btree (column_0)",
+                        "is_primary": True, "index_scans": t, "tuples_read": t, "tuples_fetched": t, "index_size_bytes": 8192})
+        indexes.append({"table_schema": schema, "table_name": name, "index_name": f"{name}_column_1_idx",
+                        "index_definition": f"CREATE INDEX {name}_column_1_idx ON {schema}.{name} USING btree (column_1)",
+                        "is_primary": False, "index_scans": 0, "tuples_read": 0, "tuples_fetched": 0, "index_size_bytes": 8192})
+        if t:
+            foreign_keys.append({"table_schema": schema, "table_name": name, "column_name": "column_1",
+                                 "foreign_table_schema": f"schema_{(t - 1) % 20}", "foreign_table_name": f"table_{t - 1}",
+                                 "foreign_column_name": "column_0"})
+    return {"tables": tables, "columns": columns, "indexes": indexes, "foreign_keys": foreign_keys}
+
+def measure(label: str, build) -> object:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {elapsed * 1000:9.1f} ms   retained {current / 1048576:8.1f} MB   peak {peak / 1048576:8.1f} MB")
+    return result
+
+def main():
+    table_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    columns_per_table = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    structure = synthetic_structure(table_count, columns_per_table)
+    print(f"{table_count:,} tables, {len(structure['columns']):,} columns, "
+          f"{len(structure['indexes']):,} indexes, {len(structure['foreign_keys']):,} foreign keys\n")
+
+    measure("nested dicts (organize)", lambda: organize_db_structure_by_table(structure))
+    model = measure("SchemaModel.from_structure", lambda: SchemaModel.from_structure(structure))
+
+    started = time.perf_counter()
+    find_tables_without_indexes(model)
+    find_tables_without_primary_keys(model)
+    find_large_tables(model)
+    print(f"\nanalyzers on SchemaModel         {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
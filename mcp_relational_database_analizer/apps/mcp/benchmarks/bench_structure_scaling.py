@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark of the structure organizer and formatters on synthetic catalogs.
+
+Every step groups rows by table once and then looks tables up, so the time per
+table should stay flat from 1k to 100k tables. The query formatter is called with
+every table of the catalog involved, its worst case.
+
+Usage:
+    python benchmarks/bench_structure_scaling.py [columns_per_table] [sizes...]
+
+Defaults to 5 columns per table and catalogs of 1,000, 10,000 and 100,000 tables.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_schema_model import synthetic_structure
+from analysis.schema_model import SchemaModel
+from analysis.structure import organize_db_structure_by_table, analyze_database_structure_for_response
+from analysis.query import format_query_analysis_response
+
+COMPLEXITY = {"complexity_score": 1, "join_count": 0, "subquery_count": 0, "aggregation_count": 0, "warnings": []}
+
+def timed(build) -> float:
+    started = time.perf_counter()
+    build()
+    return time.perf_counter() - started
+
+def format_all_tables(structure: dict) -> str:
+    """format_query_analysis_response with every table of the catalog involved"""
+    tables = [table["table_name"] for table in structure["tables"]]
+    return format_query_analysis_response("SELECT 1", {"Plan": {}}, tables, [], structure["columns"],
+                                          structure["indexes"], [], [], COMPLEXITY)
+
+STEPS = [
+    ("organize_db_structure_by_table", organize_db_structure_by_table),
+    ("SchemaModel.from_structure", SchemaModel.from_structure),
+    ("analyze_database_structure_for_response", analyze_database_structure_for_response),
+    ("format_query_analysis_response", format_all_tables)
+]
+
+def main():
+    columns_per_table = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sizes = [int(size) for size in sys.argv[2:]] or [1000, 10000, 100000]
+
+    print(f"{'step':<42}" + "".join(f"{size:>12,} t" for size in sizes) + "   (us per table)")
+    results = {name: [] for name, _ in STEPS}
+    for size in sizes:
+        structure = synthetic_structure(size, columns_per_table)
+        for name, step in STEPS:
+            results[name].append(timed(lambda: step(structure)) / size * 1e6)
+        del structure
+
+    for name, _ in STEPS:
+        print(f"{name:<42}" + "".join(f"{value:>14.2f}" for value in results[name]))
+
+if __name__ == "__main__":
+    main()
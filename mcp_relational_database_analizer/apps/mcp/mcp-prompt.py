@@ -10,8 +10,14 @@ import json
 import re
 from typing import Dict, List, Optional
 import requests
+import io
+import contextlib
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from db.connector import PostgresConnector
+from analysis.row_counts import count_rows
+
 # Cores do UOL Compass e Amazon Q
 class AmazonColors:
     ORANGE = '\033[38;5;214m'     # Laranja Amazon Q
@@ -122,6 +128,43 @@ def check_mcp_status():
     except:
         return False, "Offline"
 
+def get_row_counts(tables=None, method='estimate', dbname=None):
+    """
+    Contagem de registros pelo serviço de contagem (analysis.row_counts)
+
+    Por padrão usa estimativas das estatísticas (sem varrer a tabela); method='sample'
+    usa TABLESAMPLE e method='exact' um count(*) paralelo, guardado em cache.
+    """
+    connector = PostgresConnector(
+        host=DB_CONFIG['host'],
+        port=DB_CONFIG['port'],
+        dbname=dbname or DB_CONFIG['dbname'],
+        user=DB_CONFIG['username'],
+        password=DB_CONFIG['password']
+    )
+    # O conector registra conexão/desconexão no stdout; aqui isso só poluiria o prompt
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not connector.connect():
+            return None
+    try:
+        # Sem limite: o EST-003 soma o total de todas as tabelas
+        return count_rows(connector, tables, method, limit=None)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            connector.disconnect()
+
+def describe_count(count):
+    """Texto curto com método e atualidade de uma contagem"""
+    if count['method'] == 'exact':
+        details = "exata" + (" (cache)" if count['cached'] else "")
+    elif count['method'] == 'sample':
+        details = f"amostra {count['sample_percent']:g}%, IC 95% {count['interval'][0]:,}-{count['interval'][1]:,}"
+    else:
+        details = f"estimativa {count['source']}, estatísticas {count['freshness']}"
+    if count['error']:
+        details += f"; {count['error']}"
+    return details
+
 def list_databases():
     """Lista todos os bancos de dados disponíveis"""
     print_header("BANCOS DE DADOS DISPONIVEIS")
@@ -200,8 +243,8 @@ def list_tables(dbname=None):
         print(f"Erro ao conectar com PostgreSQL: {e}")
         print("Verifique se o PostgreSQL está rodando e as base de dados existe.")
 
-def show_table_details(table_name, dbname=None):
-    """Mostra detalhes de uma tabela específica"""
+def show_table_details(table_name, dbname=None, method='estimate'):
+    """Mostra detalhes de uma tabela específica (method: estimate, sample ou exact para a contagem)"""
     if not dbname:
         dbname = DB_CONFIG['dbname']
     
@@ -245,10 +288,11 @@ def show_table_details(table_name, dbname=None):
                 default_info = f" DEFAULT {default}" if default else ""
                 print(f"  - {column_name}: {type_info} {nullable}{default_info}")
             
-            # Contar registros
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            print(f"\nTOTAL DE REGISTROS: {count}")
+            # Contar registros sem varrer a tabela (nome citado: nada é interpolado sem escape)
+            quoted_name = '"public"."' + table_name.replace('"', '""') + '"'
+            counts = get_row_counts([quoted_name], method, dbname)
+            if counts:
+                print(f"\nTOTAL DE REGISTROS: {counts[0]['count']:,} ({describe_count(counts[0])})")
         else:
             print(f"Tabela '{table_name}' não encontrada.")
             
@@ -461,23 +505,16 @@ def execute_prompt(prompt_id):
                 print("[!] Nenhuma estatística encontrada.")
                 
         elif prompt_id == '03':  # EST-003: Contagem de Registros
-            print(">> Contando registros em todas as tabelas...\n")
-            cursor.execute("""
-                SELECT table_name FROM information_schema.tables 
-                WHERE table_schema = 'public' ORDER BY table_name
-            """)
-            tables = cursor.fetchall()
-            if tables:
-                total_records = 0
+            print(">> Estimando registros em todas as tabelas...\n")
+            counts = get_row_counts()
+            if counts:
                 print(">> CONTAGEM POR TABELA:")
                 print("-" * 40)
-                for (table_name,) in tables:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                    count = cursor.fetchone()[0]
-                    total_records += count
-                    print(f"   {table_name:15}: {count:,} registros")
+                for count in counts:
+                    print(f"   {count['table_name']:15}: {count['count']:,} registros ({describe_count(count)})")
                 print("-" * 40)
-                print(f">> TOTAL GERAL: {total_records:,} registros")
+                print(f">> TOTAL GERAL: {sum(count['count'] for count in counts):,} registros")
+                print(">> Contagem exata de uma tabela: mcp count <tabela> exact")
             else:
                 print("[!] Nenhuma tabela encontrada.")
                 
@@ -668,37 +705,23 @@ def execute_prompt(prompt_id):
         print(f"[!] Erro geral: {e}")
         print(">> Verifique se o PostgreSQL está rodando e acessível.")
 
-def execute_all_prompts_sequence():
-    """Executa todos os prompts na sequência recomendada"""
-    print_header("EXECUTANDO SEQUÊNCIA COMPLETA DE ANÁLISE")
-    print(">> Iniciando análise completa do banco de dados...\n")
-    
-    sequence = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10']  # Todos implementados
-    
-    for i, prompt_id in enumerate(sequence, 1):
-        print(f"\n{'='*60}")
-        print(f"📍 ETAPA {i}/{len(sequence)}: Executando prompt {prompt_id}")
-        print(f"{'='*60}")
-        
-        try:
-            execute_prompt(prompt_id)
-            print(f"\n>> Prompt {prompt_id} concluído com sucesso!")
-            
-            if i < len(sequence):
-                input("\n>> Pressione ENTER para continuar para a próxima etapa...")
-                
-        except Exception as e:
-            print(f"\n[!] Erro no prompt {prompt_id}: {e}")
-            choice = input("\n>> Continuar mesmo assim? (s/N): ").strip().lower()
-            if choice != 's':
-                print("🛑 Sequência interrompida pelo usuário.")
-                break
-    
+def execute_all_prompts_sequence(workers=4, refresh=False):
+    """Executa o catálogo completo de prompts em paralelo e exibe o relatório consolidado (refresh ignora o cache)"""
+    from prompts import ALL_PROMPTS
+    from prompts.runner import run_catalog, format_catalog_report
+
+    print_header("EXECUTANDO CATÁLOGO COMPLETO DE ANÁLISE")
+    print(f">> {len(ALL_PROMPTS)} prompts, {workers} em paralelo respeitando as dependências...\n")
+
+    credentials = {key: DB_CONFIG[key] for key in ('host', 'port', 'dbname', 'username', 'password')}
+    # O conector registra cada conexão no stdout; o relatório já resume tudo
+    with contextlib.redirect_stdout(io.StringIO()):
+        run = run_catalog(ALL_PROMPTS, credentials, workers, refresh=refresh)
+    print(format_catalog_report(run))
+
     print(f"\n{'='*60}")
     print("🎉 ANÁLISE COMPLETA FINALIZADA!")
     print(f"{'='*60}")
-    print(">> Resumo: Análise estrutural e de negócio concluída.")
-    print(">> Para análises de performance, execute os prompts 08-09 individualmente.")
 
 def show_mcp_app():
     """Mostra informações da aplicação"""
@@ -731,6 +754,7 @@ def print_help():
     print("  mcp status   - Verificar status dos serviços")
     print("  mcp tables   - Listar tabelas do banco")
     print("  mcp prompts  - Menu de análises organizadas")
+    print("  mcp count <tabela> [sample|exact] - Detalhes e contagem de registros")
     print("  all          - Executar sequência completa de análise")
     print("  help         - Exibir esta ajuda")
     print("  quit         - Sair do sistema")
@@ -752,6 +776,7 @@ def print_help():
     print(f"{AmazonColors.UOL_ORANGE}>> EXEMPLOS DE USO:{AmazonColors.RESET}")
     print("  compass❯ 01          # Executar análise de estrutura")
     print("  compass❯ all         # Executar todos os prompts")
+    print("  compass❯ all refresh # Reexecutar todos, ignorando resultados em cache")
     print("  compass❯ mcp tables  # Listar tabelas")
     print("  compass❯ mcp status  # Ver status dos serviços")
     print()
@@ -870,6 +895,13 @@ def main_loop():
             elif command in ['help', 'mcp help', '?']:
                 print_help()
             
+            elif command.startswith('mcp count ') or command.startswith('count '):
+                args = command.split()[2 if command.startswith('mcp') else 1:]
+                method = args[1] if len(args) > 1 and args[1] in ('sample', 'exact') else 'estimate'
+                if args:
+                    show_table_details(args[0], method=method)
+                    print()
+            
             # Comandos diretos por número (suporta 01-10)
             elif command.isdigit():
                 num = int(command)
@@ -887,8 +919,8 @@ def main_loop():
                 print()
             
             # Comando para executar todos os prompts
-            elif command == 'all':
-                execute_all_prompts_sequence()
+            elif command in ['all', 'all refresh']:
+                execute_all_prompts_sequence(refresh=command == 'all refresh')
                 print()
             
             # Comandos diretos por nome de banco
@@ -901,7 +933,7 @@ def main_loop():
                 print(">> Comandos disponíveis:")
                 print("   • 'mcp prompts' - Ver análises organizadas")
                 print("   • '01' a '10' - Executar prompt específico")
-                print("   • 'all' - Executar sequência completa")
+                print("   • 'all' - Executar sequência completa ('all refresh' ignora o cache)")
                 print("   • 'mcp actions' - Menu completo\n")
                 
         except KeyboardInterrupt:
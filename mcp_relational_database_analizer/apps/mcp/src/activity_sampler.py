@@ -0,0 +1,221 @@
+"""
+Active session history (ASH) sampler.
+
+Polls pg_stat_activity in the background for the configured database presets and
+stores every non-idle session of every sample in the metrics store (metrics_store):
+one typed column per attribute, with strings dictionary-encoded to small integers,
+bounded by retention and by a row cap. Questions like "what were sessions waiting
+on between 14:02 and 14:05" are then answered without touching the monitored database.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from db.queries import ACTIVE_SESSION_SAMPLE_QUERY, ACTIVE_SESSION_SETUP_QUERY
+from metrics_store import MetricsStore, INT, STRING
+
+logger = logging.getLogger("postgres-analyzer")
+
+MAX_QUERY_TEXTS = 10000   # query_id -> statement text entries kept per database
+GROUP_COLUMNS = ("query", "wait_class", "wait_event", "state", "backend_type")
+SESSION_COLUMNS = {
+    "query_id": INT,
+    "wait_class": STRING,
+    "wait_event": STRING,
+    "state": STRING,
+    "backend_type": STRING
+}
+CHUNK_SECONDS = 600
+
+class ActiveSessionSampler:
+    """
+    Background task sampling pg_stat_activity for a set of database presets
+
+    Each preset gets two metric tables: ash_sessions_<preset> (one row per active
+    session per sample, at most `capacity` rows) and ash_ticks_<preset> (one row
+    per sample, so idle samples still count when computing average active sessions).
+    """
+
+    def __init__(self, presets: List[str], interval: float = 1.0, capacity: int = 1000000,
+                 retention_seconds: float = 86400, store: Optional[MetricsStore] = None):
+        self.presets = presets
+        self.interval = interval
+        self.capacity = capacity
+        self.retention_seconds = retention_seconds
+        self.store = store or MetricsStore()
+        self.query_texts = {preset: {} for preset in presets}
+        self.texts_lock = threading.Lock()
+        self.connectors = {}
+        self.errors = {}
+        self.task = None
+
+    def sessions_table(self, preset: str):
+        return self.store.table(f"ash_sessions_{preset}", SESSION_COLUMNS, chunk_seconds=CHUNK_SECONDS,
+                                retention_seconds=self.retention_seconds, max_rows=self.capacity)
+
+    def ticks_table(self, preset: str):
+        return self.store.table(f"ash_ticks_{preset}", {}, chunk_seconds=CHUNK_SECONDS * 6,
+                                retention_seconds=self.retention_seconds)
+
+    async def start(self):
+        """Start sampling in the background (once: a running sampler is left alone)"""
+        if not self.presets or (self.task is not None and not self.task.done()):
+            return
+        for preset in self.presets:
+            # opens (and reloads the persisted history of) both tables before the first sample
+            self.sessions_table(preset)
+            self.ticks_table(preset)
+        self.task = asyncio.create_task(self._sample_loop())
+        logger.info(f"Active session sampler started for {', '.join(self.presets)} every {self.interval}s")
+
+    async def stop(self):
+        """Stop sampling and close the sampling connections"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        for connector in self.connectors.values():
+            connector.disconnect()
+        self.connectors = {}
+        self.store.flush()
+        logger.info("Active session sampler stopped")
+
+    def is_sampling(self, preset: str) -> bool:
+        return self.task is not None and preset in self.query_texts
+
+    def record_sample(self, preset: str, sampled_at: float, sessions: List[Dict[str, Any]]) -> None:
+        """Store one pg_stat_activity sample (rows of ACTIVE_SESSION_SAMPLE_QUERY)"""
+        rows = []
+        texts = self.query_texts[preset]
+        with self.texts_lock:
+            for session in sessions:
+                wait_type = session.get("wait_event_type")
+                rows.append({
+                    "query_id": session.get("query_id"),
+                    "wait_class": wait_type,
+                    "wait_event": f"{wait_type}:{session.get('wait_event')}" if wait_type else None,
+                    "state": session.get("state"),
+                    "backend_type": session.get("backend_type")
+                })
+                query_id = session.get("query_id")
+                if query_id and session.get("query"):
+                    # re-insert so the dict stays ordered by last use and the oldest text is evicted first
+                    texts.pop(query_id, None)
+                    texts[query_id] = session["query"]
+                    if len(texts) > MAX_QUERY_TEXTS:
+                        del texts[next(iter(texts))]
+
+        self.ticks_table(preset).append(sampled_at, [{}])
+        self.sessions_table(preset).append(sampled_at, rows)
+
+    def lookup_query_texts(self, preset: str, query_ids) -> Dict[int, str]:
+        """Statement texts of the given query_ids, where known"""
+        texts = self.query_texts.get(preset, {})
+        with self.texts_lock:
+            return {query_id: texts[query_id] for query_id in query_ids if query_id in texts}
+
+    def aggregate(self, preset: str, start: float, end: float, group_by: Tuple[str, ...]) -> Dict[str, Any]:
+        """
+        Count session samples of a preset in a time window grouped by the given columns
+
+        Args:
+            preset: Sampled preset
+            start: Window start (epoch seconds)
+            end: Window end (epoch seconds)
+            group_by: Columns from GROUP_COLUMNS
+
+        Returns:
+            Dictionary with ticks (samples taken in the window), rows (session samples),
+            groups: list of (key tuple, session samples) largest first, and the window
+            clipped to the history still kept
+        """
+        sessions = self.sessions_table(preset)
+        ticks = self.ticks_table(preset)
+        oldest = max((t for t in (ticks.oldest(), sessions.oldest()) if t is not None), default=None)
+        if oldest is None:
+            return {"ticks": 0, "rows": 0, "groups": [], "start": start, "end": end}
+        start = max(start, oldest)
+
+        columns = ["query_id" if column == "query" else column for column in group_by]
+        rows = sessions.aggregate(start, end, columns, {"samples": ("count", None)})
+        return {
+            "ticks": ticks.count(start, end),
+            "rows": sum(row["samples"] for row in rows),
+            "groups": [(tuple(row[column] for column in columns), row["samples"]) for row in rows],
+            "start": start,
+            "end": end
+        }
+
+    async def _sample_loop(self):
+        """Sample every preset once per interval; slow databases do not delay the others"""
+        while True:
+            started = time.monotonic()
+            await asyncio.gather(*(asyncio.to_thread(self._sample, preset) for preset in self.presets))
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+    def _sample(self, preset: str) -> None:
+        """Take one sample of a database into its history"""
+        try:
+            connector = self.connectors.get(preset) or self._connect(preset)
+            sampled_at = time.time()
+            sessions = self._query(connector, ACTIVE_SESSION_SAMPLE_QUERY)
+            self.record_sample(preset, sampled_at, sessions)
+            self.errors.pop(preset, None)
+        except Exception as e:
+            if preset not in self.errors:
+                logger.error(f"Active session sampling failed for '{preset}': {str(e)}")
+            self.errors[preset] = str(e)
+            connector = self.connectors.pop(preset, None)
+            if connector:
+                connector.disconnect()
+
+    def _connect(self, preset: str):
+        """Open the long-lived sampling connection of a preset"""
+        from database_config import get_database_config
+        from db.connector import PostgresConnector
+
+        config = get_database_config(preset)
+        if "host" in config:
+            connector = PostgresConnector(host=config["host"], port=config.get("port", 5432),
+                                          dbname=config["dbname"], user=config["username"],
+                                          password=config["password"])
+        else:
+            connector = PostgresConnector(secret_name=config["secret_name"], region_name=config.get("region_name"))
+
+        if not connector.connect():
+            raise ConnectionError(f"could not connect using preset '{preset}'")
+        # connect() made only its first transaction read-only; make it the session default
+        connector.conn.rollback()
+        try:
+            with connector.conn.cursor() as cursor:
+                cursor.execute(ACTIVE_SESSION_SETUP_QUERY)
+            connector.conn.commit()
+        except Exception:
+            connector.disconnect()
+            raise
+        self.connectors[preset] = connector
+        return connector
+
+    @staticmethod
+    def _query(connector, query: str) -> List[Dict[str, Any]]:
+        """
+        Run a query in its own transaction, raising on failure
+
+        Unlike execute_query(), which returns [] on errors, a failed sample must not be
+        recorded as an idle tick. The transaction ends right away either way, so no
+        snapshot is held between samples.
+        """
+        try:
+            with connector.conn.cursor() as cursor:
+                cursor.execute(query)
+                if cursor.description is None:
+                    return []
+                columns = [desc[0] for desc in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            connector.conn.rollback()
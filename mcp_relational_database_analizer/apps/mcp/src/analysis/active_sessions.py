@@ -0,0 +1,120 @@
+"""
+Active session history reports.
+
+Turns aggregates of the session history kept in the metrics store (activity_sampler) into
+"what were sessions doing between 14:02 and 14:05" reports: average active
+sessions per query, wait class and wait event over a time window.
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta
+
+def parse_time_bound(value: str, now: datetime) -> datetime:
+    """
+    Parse a window bound given as 'HH:MM[:SS]' (today, server local time) or an ISO datetime
+
+    A time of day later than now refers to yesterday.
+    """
+    value = value.strip()
+    if len(value) <= 8 and ":" in value:
+        parts = [int(part) for part in value.split(":")]
+        moment = now.replace(hour=parts[0], minute=parts[1], second=parts[2] if len(parts) > 2 else 0, microsecond=0)
+        return moment - timedelta(days=1) if moment > now else moment
+    moment = datetime.fromisoformat(value)
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+def resolve_window(start_time: Optional[str], end_time: Optional[str], minutes: float) -> Tuple[datetime, datetime]:
+    """
+    Resolve the report window
+
+    Args:
+        start_time: Window start, or None for end_time - minutes
+        end_time: Window end, or None for now (or start_time + minutes)
+        minutes: Window length used when a bound is missing
+
+    Returns:
+        (start, end) as naive local datetimes
+    """
+    now = datetime.now()
+    start = parse_time_bound(start_time, now) if start_time else None
+    end = parse_time_bound(end_time, now) if end_time else None
+    if start and end and end < start and end_time and len(end_time.strip()) <= 8:
+        end += timedelta(days=1)  # 23:58 -> 00:03 crosses midnight
+    if start is None:
+        end = end or now
+        start = end - timedelta(minutes=minutes)
+    elif end is None:
+        end = min(start + timedelta(minutes=minutes), now)
+    return start, end
+
+def describe_group_value(column: str, value: Any, query_texts: Dict[int, str]) -> str:
+    """Display text of one group-by value"""
+    if column == "query":
+        text = query_texts.get(value)
+        return f"`{value}` {text}" if text else f"`{value}`"
+    if column in ("wait_class", "wait_event") and value is None:
+        return "CPU / not waiting"
+    return value or "-"
+
+def format_active_session_history_response(
+    preset: str,
+    result: Dict[str, Any],
+    wait_classes: Dict[str, Any],
+    group_by: List[str],
+    query_texts: Dict[int, str],
+    limit: int = 20
+) -> str:
+    """
+    Format an active session history breakdown as a markdown response
+
+    Args:
+        preset: Sampled database preset
+        result: ActiveSessionSampler.aggregate() result grouped by group_by
+        wait_classes: ActiveSessionSampler.aggregate() result grouped by wait class
+        group_by: Group-by columns of result
+        query_texts: query_id -> statement text
+        limit: Maximum number of groups to list
+
+    Returns:
+        Formatted markdown string
+    """
+    start = datetime.fromtimestamp(result["start"])
+    end = datetime.fromtimestamp(result["end"])
+    ticks = result["ticks"]
+
+    response = f"## Active Session History: {preset}\n\n"
+    response += f"- **Window**: {start:%Y-%m-%d %H:%M:%S} to {end:%Y-%m-%d %H:%M:%S}\n"
+    response += f"- **Samples**: {ticks:,}\n"
+    response += f"- **Session Samples**: {result['rows']:,}\n"
+    if not ticks:
+        response += "\nNo samples in this window (sampling not running yet, or the window is older than the history kept).\n"
+        return response
+    response += f"- **Average Active Sessions**: {result['rows'] / ticks:.2f}\n\n"
+
+    if wait_classes["groups"]:
+        response += "### By Wait Class\n\n"
+        response += "| Wait Class | Avg Active Sessions | % of Activity |\n|------------|---------------------|---------------|\n"
+        for (wait_class,), samples in wait_classes["groups"]:
+            response += (f"| {describe_group_value('wait_class', wait_class, query_texts)} | {samples / ticks:.2f} "
+                         f"| {samples / result['rows'] * 100:.1f}% |\n")
+        response += "\n"
+
+    if not result["groups"]:
+        response += "No active sessions in this window.\n"
+        return response
+
+    headers = [column.replace("_", " ").title() for column in group_by]
+    response += f"### By {', '.join(headers)}\n\n"
+    response += "| # | " + " | ".join(headers) + " | Avg Active Sessions | % of Activity |\n"
+    response += "|---|" + "|".join("---" for _ in headers) + "|---------------------|---------------|\n"
+    for i, (key, samples) in enumerate(result["groups"][:limit], 1):
+        values = [describe_group_value(column, value, query_texts) for column, value in zip(group_by, key)]
+        response += (f"| {i} | " + " | ".join(values)
+                     + f" | {samples / ticks:.2f} | {samples / result['rows'] * 100:.1f}% |\n")
+    if len(result["groups"]) > limit:
+        response += f"\n... and {len(result['groups']) - limit} more groups\n"
+
+    response += ("\n**Note**: Average Active Sessions = session samples / samples taken. A value of 1.0 means "
+                 "one session was busy during the whole window. Without a wait event a session is on CPU "
+                 "(or waiting for something PostgreSQL does not instrument).\n")
+
+    return response
@@ -0,0 +1,557 @@
+"""
+Approximate execution of aggregate queries.
+
+Aggregates over very large tables (monthly visit counts over billions of rows) are
+answered from a sample instead of a full scan:
+
+- The largest table of the outer FROM clause gets TABLESAMPLE SYSTEM (a block
+  sample: only the sampled pages are read) or BERNOULLI (a row sample, when a block
+  sample would cover too few pages), sized to read about target_rows rows.
+  REPEATABLE makes the same query return the same answer.
+- COUNT and SUM of the outer query are scaled by 100 / percent and counts get a 95%
+  confidence interval. AVG, MIN, MAX and the other statistics are computed on the
+  sample; COUNT(DISTINCT ...) counts the distinct values of the sample, a lower bound.
+- A plain count of a whole table, SELECT COUNT(*) FROM t alone or as a scalar
+  subquery, is replaced by the planner's estimate from pg_class.reltuples.
+
+Queries the rewrite does not understand (set operations, window functions, derived
+tables in the outer FROM clause, no aggregates) run exactly, as do queries whose
+tables are small enough to scan.
+"""
+from typing import Dict, List, Any, Optional, Tuple
+import math
+
+from db.connector import PostgresConnector
+from db.queries import APPROXIMATE_TABLE_ESTIMATES_QUERY, RELTUPLES_COUNT_EXPRESSION
+from analysis.sql_parser import scan_tokens
+from response_builder import ResponseBuilder
+
+DEFAULT_SAMPLE_ROWS = 100000
+MIN_SYSTEM_SAMPLE_PAGES = 200     # smaller block samples are too clustered: sample rows instead
+ROWS_PER_PAGE_GUESS = 100         # partitioned tables have no pages of their own
+Z_95 = 1.959964
+SAMPLEABLE_KINDS = {"r", "m", "p"}   # tables, materialized views, partitioned tables
+
+SCALED_AGGREGATES = {"count", "sum"}
+SAMPLE_AGGREGATES = {"avg", "min", "max", "stddev", "stddev_samp", "stddev_pop", "variance",
+                     "var_samp", "var_pop", "percentile_cont", "percentile_disc", "mode",
+                     "bool_and", "bool_or", "every", "corr", "covar_pop", "covar_samp"}
+LISTING_AGGREGATES = {"array_agg", "string_agg", "json_agg", "jsonb_agg", "json_object_agg",
+                      "jsonb_object_agg", "xmlagg"}
+FROM_END_KEYWORDS = {"where", "group", "having", "order", "limit", "offset", "fetch", "window", "for",
+                     "union", "intersect", "except"}
+
+COLUMN_NOTES = {
+    "sum": "SUM scaled from the sample (no interval)",
+    "scaled_expression": "computed from scaled sample aggregates",
+    "distinct_lower_bound": "COUNT(DISTINCT) over the sample: a lower bound, not scaled",
+    "sample_statistic": "computed on the sample"
+}
+
+def _is(token: Tuple[str, str, int, int], kind: str, *values: str) -> bool:
+    return token[0] == kind and (not values or token[1] in values)
+
+def _nesting(tokens: List[Tuple[str, str, int, int]]) -> Optional[Tuple[Dict[int, int], List[bool], List[int]]]:
+    """
+    Matching parentheses and nesting of every token
+
+    Returns:
+        (closes, outer, depth): closes maps each '(' to its ')', outer tells whether a
+        token belongs to the outer query (not to a subquery), depth is the parenthesis
+        depth; None when the parentheses are unbalanced
+    """
+    closes, outer, depth = {}, [], []
+    stack, subqueries = [], 0
+    for i, token in enumerate(tokens):
+        if _is(token, "op", "("):
+            is_subquery = i + 1 < len(tokens) and _is(tokens[i + 1], "kw", "select", "with", "values")
+            outer.append(subqueries == 0)
+            depth.append(len(stack))
+            stack.append((i, is_subquery))
+            subqueries += is_subquery
+        elif _is(token, "op", ")"):
+            if not stack:
+                return None
+            start, is_subquery = stack.pop()
+            closes[start] = i
+            subqueries -= is_subquery
+            outer.append(subqueries == 0)
+            depth.append(len(stack))
+        else:
+            outer.append(subqueries == 0)
+            depth.append(len(stack))
+    return (closes, outer, depth) if not stack else None
+
+def _qualified_name(tokens: List[Tuple[str, str, int, int]], i: int) -> Tuple[List[str], int]:
+    """Parts of a (schema.)table name starting at i and the index after it"""
+    parts = [tokens[i][1]]
+    i += 1
+    while i + 1 < len(tokens) and _is(tokens[i], "op", ".") and tokens[i + 1][0] == "name":
+        parts.append(tokens[i + 1][1])
+        i += 2
+    return parts, i
+
+def _table_reference(parts: List[str]) -> str:
+    """Quoted name for to_regclass(): scan_tokens() already folded unquoted names to lower case"""
+    return ".".join('"' + part.replace('"', '""') + '"' for part in parts)
+
+def _count_star(tokens: List[Tuple[str, str, int, int]], i: int) -> Optional[Tuple[List[str], int, Optional[str]]]:
+    """
+    Match SELECT COUNT(*) [AS alias] FROM table starting at the SELECT token i
+
+    Returns:
+        (table name parts, index after the table name, alias) or None
+    """
+    pattern = [("kw", "select"), ("name", "count"), ("op", "(")]
+    if len(tokens) < i + 7 or any(not _is(tokens[i + k], kind, value) for k, (kind, value) in enumerate(pattern)):
+        return None
+    argument = tokens[i + 3]
+    if not (_is(argument, "op", "*") or _is(argument, "number", "1")) or not _is(tokens[i + 4], "op", ")"):
+        return None
+    j, alias = i + 5, None
+    if _is(tokens[j], "kw", "as") and j + 1 < len(tokens) and tokens[j + 1][0] == "name":
+        alias, j = tokens[j + 1][1], j + 2
+    elif tokens[j][0] == "name":
+        alias, j = tokens[j][1], j + 1
+    if j + 1 >= len(tokens) or not _is(tokens[j], "kw", "from") or tokens[j + 1][0] != "name":
+        return None
+    parts, j = _qualified_name(tokens, j + 1)
+    return parts, j, alias
+
+def _from_references(tokens, closes, outer, depth, start: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Tables of the outer FROM clause starting after the FROM token at start
+
+    Returns:
+        (references, reason): each reference has parts, insert_at (text offset after the
+        table name and alias) and nullable (on the optional side of an outer join);
+        reason explains why the clause cannot be sampled, None if it can
+    """
+    references = []
+    expect_table, join_type = True, None
+    i = start
+    while i < len(tokens):
+        token = tokens[i]
+        if outer[i] and depth[i] == 0 and (_is(token, "kw", *FROM_END_KEYWORDS) or _is(token, "op", ";")):
+            break
+        if not expect_table:
+            if depth[i] == 0 and _is(token, "op", ","):
+                expect_table, join_type = True, "inner"
+            elif depth[i] == 0 and _is(token, "kw", "left", "right", "full"):
+                join_type = token[1]
+            elif depth[i] == 0 and _is(token, "kw", "join"):
+                expect_table = True
+            elif depth[i] == 0 and _is(token, "kw", "tablesample"):
+                return references, "the query already uses TABLESAMPLE"
+            i += 1
+            continue
+
+        if _is(token, "kw", "only"):
+            i += 1
+            continue
+        if _is(token, "kw", "lateral") or _is(token, "op", "("):
+            return references, "the outer FROM clause has a derived table or LATERAL subquery"
+        if token[0] != "name":
+            return references, "the outer FROM clause could not be parsed"
+        parts, i = _qualified_name(tokens, i)
+        if i < len(tokens) and _is(tokens[i], "op", "("):
+            return references, "the outer FROM clause calls a set-returning function"
+        if i + 1 < len(tokens) and _is(tokens[i], "kw", "as") and tokens[i + 1][0] == "name":
+            i += 2
+        elif i < len(tokens) and tokens[i][0] == "name":
+            i += 1
+        insert_at = tokens[i - 1][3]
+        if i < len(tokens) and _is(tokens[i], "op", "(") and i in closes:    # column aliases
+            insert_at = tokens[closes[i]][3]
+            i = closes[i] + 1
+        if join_type in ("right", "full"):
+            for reference in references:
+                reference["nullable"] = True
+        references.append({"parts": parts, "insert_at": insert_at, "nullable": join_type in ("left", "full")})
+        expect_table, join_type = False, None
+    return references, None
+
+def _aggregate_calls(tokens, closes, outer) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Aggregate calls of the outer query, with their token span (FILTER clause included)
+
+    Returns:
+        (calls, reason): reason explains why the query cannot be sampled, None if it can
+    """
+    calls = []
+    for i, token in enumerate(tokens):
+        if not outer[i]:
+            continue
+        if _is(token, "kw", "over"):
+            return calls, "the query uses window functions"
+        if token[0] != "name" or i + 1 >= len(tokens) or not _is(tokens[i + 1], "op", "("):
+            continue
+        if i and _is(tokens[i - 1], "op", "."):
+            continue
+        name = token[1]
+        if name in LISTING_AGGREGATES:
+            return calls, f"{name}() lists values, which a sample cannot reproduce"
+        if name not in SCALED_AGGREGATES and name not in SAMPLE_AGGREGATES:
+            continue
+        end = closes[i + 1]
+        if end + 2 < len(tokens) and _is(tokens[end + 1], "kw", "filter") and _is(tokens[end + 2], "op", "("):
+            end = closes[end + 2]
+        calls.append({
+            "name": name,
+            "start": i,
+            "end": end,
+            "distinct": _is(tokens[i + 2], "kw", "distinct")
+        })
+    return calls, None
+
+def _select_items(tokens, closes, outer, depth, end_index: int, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Items of the outer select list (tokens before end_index), with the output name Postgres gives them
+
+    Returns:
+        List of dictionaries with start and last (token span of the expression), name,
+        aliased (the name was written in the query) and inside (aggregate calls in the item)
+    """
+    i = 1
+    if i < len(tokens) and _is(tokens[i], "kw", "all", "distinct"):
+        i += 1
+        if _is(tokens[i], "kw", "on") and i + 1 in closes:
+            i = closes[i + 1] + 1
+
+    spans, item_start = [], i
+    for j in range(i, end_index):
+        if outer[j] and depth[j] == 0 and _is(tokens[j], "op", ","):
+            spans.append((item_start, j))
+            item_start = j + 1
+    spans.append((item_start, end_index))
+
+    items = []
+    for start, end in spans:
+        if start >= end:
+            continue
+        last = end - 1
+        name = None
+        if end - start >= 2 and tokens[last][0] == "name":
+            previous = tokens[last - 1]
+            if _is(previous, "kw", "as"):
+                name, last = tokens[last][1], last - 2
+            elif (previous[0] not in ("op", "kw") or _is(previous, "op", ")") or _is(previous, "kw", "end")):
+                name, last = tokens[last][1], last - 1
+        aliased = name is not None
+        inside = [call for call in calls if start <= call["start"] <= last]
+        whole_call = len(inside) == 1 and inside[0]["start"] == start and inside[0]["end"] == last
+        if name is None:
+            first = tokens[start]
+            count = _count_star(tokens, start + 1) if _is(first, "op", "(") and closes.get(start) == last else None
+            if whole_call or (first[0] == "name" and start + 1 <= last and _is(tokens[start + 1], "op", "(")
+                              and closes.get(start + 1) == last):
+                name = first[1]
+            elif first[0] == "name" and _qualified_name(tokens, start)[1] == last + 1:
+                name = _qualified_name(tokens, start)[0][-1]
+            elif _is(first, "kw", "case"):
+                name = "case"
+            elif count is not None and count[1] == last:
+                name = count[2] or "count"      # a scalar subquery is named after its column
+            else:
+                name = "?column?"
+        items.append({"start": start, "last": last, "name": name, "aliased": aliased,
+                      "inside": inside, "whole_call": whole_call})
+    return items
+
+def _select_columns(items: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Output column name -> how the column is estimated (count, sum, group, ... see COLUMN_NOTES)"""
+    columns = {}
+    for item in items:
+        inside = item["inside"]
+        if not inside:
+            kind = "group"
+        elif item["whole_call"]:
+            call = inside[0]
+            if call["distinct"]:
+                kind = "distinct_lower_bound"
+            elif call["name"] == "count":
+                kind = "count"
+            elif call["name"] == "sum":
+                kind = "sum"
+            else:
+                kind = "sample_statistic"
+        elif any(call["distinct"] for call in inside):
+            kind = "distinct_lower_bound"
+        elif any(call["name"] in SCALED_AGGREGATES for call in inside):
+            kind = "scaled_expression"
+        else:
+            kind = "sample_statistic"
+        columns[item["name"]] = kind
+    return columns
+
+def _keep_output_names(tokens, items: List[Dict[str, Any]], edits: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+    """
+    Aliases for the unaliased select items that edits rewrite, so the columns keep their names
+
+    round(count(*) * 10)::bigint would otherwise be named 'round' instead of 'count'.
+    """
+    aliases = []
+    for item in items:
+        if item["aliased"]:
+            continue
+        start, end = tokens[item["start"]][2], tokens[item["last"]][3]
+        if any(start <= edit_start and edit_end <= end for edit_start, edit_end, _ in edits):
+            aliases.append((end, end, ' AS "' + item["name"].replace('"', '""') + '"'))
+    return aliases
+
+def _table_estimates(connector: PostgresConnector, references: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Estimated rows, pages and kind of each table reference, keyed by the reference"""
+    if not references:
+        return {}
+    rows = connector.execute_query(APPROXIMATE_TABLE_ESTIMATES_QUERY, [references])
+    return {row["table_reference"]: row for row in rows}
+
+def _apply_edits(query: str, edits: List[Tuple[int, int, str]]) -> str:
+    for start, end, text in sorted(edits, key=lambda edit: edit[0], reverse=True):
+        query = query[:start] + text + query[end:]
+    return query
+
+def _count_expression(reference: str) -> str:
+    return RELTUPLES_COUNT_EXPRESSION.format(table="'" + reference.replace("'", "''") + "'")
+
+def choose_sample(estimated_rows: float, pages: int, target_rows: int = DEFAULT_SAMPLE_ROWS) -> Tuple[str, float]:
+    """
+    TABLESAMPLE method and percentage that read about target_rows rows of a table
+
+    Returns:
+        ('SYSTEM' or 'BERNOULLI', percent rounded to 4 significant digits)
+    """
+    percent = min(100.0, float(f"{target_rows / max(estimated_rows, 1) * 100:.4g}"))
+    rows_per_page = estimated_rows / pages if pages else ROWS_PER_PAGE_GUESS
+    method = "SYSTEM" if target_rows / max(rows_per_page, 1) >= MIN_SYSTEM_SAMPLE_PAGES else "BERNOULLI"
+    return method, percent
+
+def plan_approximate_query(connector: PostgresConnector, query: str,
+                           target_rows: int = DEFAULT_SAMPLE_ROWS, seed: int = 0) -> Dict[str, Any]:
+    """
+    Rewrite a query for approximate execution
+
+    Args:
+        connector: Connected database connector
+        query: SELECT query, without a trailing semicolon
+        target_rows: Rows to read from the sampled table; tables this small run exactly
+        seed: REPEATABLE seed of the sample
+
+    Returns:
+        Dictionary with query (the query to run), mode ('sampled', 'estimated' or 'exact'),
+        notes, estimated_counts (tables whose COUNT(*) became a reltuples estimate) and,
+        for sampled queries, sampled_table, sample_method, sample_percent, scale,
+        estimated_table_rows and columns (output column -> how it is estimated)
+    """
+    plan = {"query": query, "original_query": query, "mode": "exact", "notes": [], "estimated_counts": [],
+            "sampled_table": None, "sample_method": None, "sample_percent": None, "scale": 1.0,
+            "estimated_table_rows": None, "columns": {}}
+    tokens = scan_tokens(query)
+    nesting = _nesting(tokens)
+    if not tokens or not _is(tokens[0], "kw", "select") or nesting is None:
+        plan["notes"].append("Only plain SELECT queries can be approximated; ran exactly.")
+        return plan
+    closes, outer, depth = nesting
+
+    # Plain table counts, alone or as scalar subqueries
+    counts = []
+    whole = _count_star(tokens, 0)
+    if whole and (whole[1] == len(tokens) or (whole[1] == len(tokens) - 1 and _is(tokens[-1], "op", ";"))):
+        counts.append((None, whole))
+    for i, token in enumerate(tokens):
+        if _is(token, "op", "(") and i + 1 < len(tokens) and _is(tokens[i + 1], "kw", "select"):
+            match = _count_star(tokens, i + 1)
+            if match and match[1] == closes[i]:
+                counts.append((i, match))
+
+    from_index = next((i for i, token in enumerate(tokens)
+                       if outer[i] and depth[i] == 0 and _is(token, "kw", "from")), None)
+    references, reason = ([], "the query has no FROM clause") if from_index is None else \
+        _from_references(tokens, closes, outer, depth, from_index + 1)
+    if reason is None and any(outer[i] and depth[i] == 0 and _is(token, "kw", "union", "intersect", "except")
+                              for i, token in enumerate(tokens)):
+        reason = "the query combines results with UNION, INTERSECT or EXCEPT"
+    calls = []
+    if reason is None:
+        calls, reason = _aggregate_calls(tokens, closes, outer)
+    if reason is None and not calls:
+        reason = "the query has no aggregates, so a sample would only return fewer rows"
+
+    estimates = _table_estimates(connector, sorted(
+        {_table_reference(reference["parts"]) for reference in references} |
+        {_table_reference(match[0]) for _, match in counts}
+    ))
+
+    edits = []
+    for open_index, (parts, _, alias) in counts:
+        reference = _table_reference(parts)
+        estimate = estimates.get(reference)
+        if estimate is None or (estimate["estimated_rows"] or 0) <= target_rows:
+            continue
+        if open_index is None:
+            plan["query"] = f"SELECT {_count_expression(reference)} AS \"{(alias or 'count').replace(chr(34), chr(34) * 2)}\""
+            plan["mode"] = "estimated"
+            plan["estimated_counts"].append(estimate["table_name"])
+            plan["notes"].append(f"COUNT(*) of {estimate['table_name']} is the planner estimate "
+                                 "(pg_class.reltuples scaled to the current table size).")
+            return plan
+        edits.append((tokens[open_index][2], tokens[closes[open_index]][3], _count_expression(reference)))
+        plan["estimated_counts"].append(estimate["table_name"])
+
+    if plan["estimated_counts"]:
+        plan["mode"] = "estimated"
+        plan["notes"].append("COUNT(*) of " + ", ".join(plan["estimated_counts"]) +
+                             " is the planner estimate (pg_class.reltuples scaled to the current table size).")
+
+    candidates = []
+    if reason is None:
+        for reference in references:
+            estimate = estimates.get(_table_reference(reference["parts"]))
+            if estimate and not reference["nullable"] and estimate["relation_kind"] in SAMPLEABLE_KINDS:
+                candidates.append((estimate["estimated_rows"] or 0, reference, estimate))
+        if not candidates:
+            reason = "no table of the outer FROM clause can be sampled (views, or the optional side of outer joins)"
+    if reason is None:
+        rows, reference, estimate = max(candidates, key=lambda candidate: candidate[0])
+        if rows <= target_rows:
+            reason = f"its largest table {estimate['table_name']} has about {int(rows):,} rows, few enough to scan"
+
+    if reason is not None:
+        if edits:
+            end_index = len(tokens) - 1 if _is(tokens[-1], "op", ";") else len(tokens)
+            items = _select_items(tokens, closes, outer, depth, end_index if from_index is None else from_index, [])
+            edits += _keep_output_names(tokens, items, edits)
+        plan["query"] = _apply_edits(query, edits)
+        plan["notes"].append(f"Aggregates ran exactly: {reason}.")
+        return plan
+
+    method, percent = choose_sample(rows, estimate["pages"], target_rows)
+    scale = 100.0 / percent
+    scale_text = f"{scale:.10g}"
+
+    edits.append((reference["insert_at"], reference["insert_at"],
+                  f" TABLESAMPLE {method} ({percent:g}) REPEATABLE ({int(seed)})"))
+    for call in calls:
+        if call["distinct"] or call["name"] not in SCALED_AGGREGATES:
+            continue
+        start, end = tokens[call["start"]][2], tokens[call["end"]][3]
+        text = query[start:end]
+        if call["name"] == "count":
+            edits.append((start, end, f"(round({text} * {scale_text})::bigint)"))
+        else:
+            edits.append((start, end, f"({text} * {scale_text})"))
+    items = _select_items(tokens, closes, outer, depth, from_index, calls)
+    # only the select list: HAVING and ORDER BY expressions take no alias
+    edits += _keep_output_names(tokens, items, edits)
+
+    plan.update({
+        "query": _apply_edits(query, edits),
+        "mode": "sampled",
+        "sampled_table": estimate["table_name"],
+        "sample_method": method,
+        "sample_percent": percent,
+        "scale": scale,
+        "estimated_table_rows": int(rows),
+        "columns": _select_columns(items)
+    })
+    if method == "SYSTEM":
+        plan["notes"].append("SYSTEM samples whole pages: the intervals assume rows are not clustered "
+                             "on disk by the grouped values.")
+    if any(kind == "group" for kind in plan["columns"].values()):
+        plan["notes"].append("Groups with few rows may be missing from the sample.")
+    return plan
+
+def count_interval(value: Any, scale: float) -> Optional[List[int]]:
+    """
+    95% confidence interval of a count scaled from a sample
+
+    A scaled count n * scale over a sample of rate q = 1 / scale has standard error
+    sqrt(n * (1 - q)) / q (binomial, normal approximation).
+    """
+    if value is None or scale <= 1.0:
+        return None
+    sampled = float(value) / scale
+    half = Z_95 * math.sqrt(sampled * (1 - 1 / scale)) * scale
+    return [max(0, round(float(value) - half)), round(float(value) + half)]
+
+def run_approximate_query(connector: PostgresConnector, query: str,
+                          target_rows: int = DEFAULT_SAMPLE_ROWS, seed: int = 0) -> Dict[str, Any]:
+    """
+    Run a query approximately (see plan_approximate_query)
+
+    Returns:
+        The plan plus rows (list of dictionaries) and intervals (per row, count
+        column -> [low, high] 95% confidence interval)
+    """
+    result = plan_approximate_query(connector, query, target_rows, seed)
+    rows = connector.execute_query(result["query"])
+    count_columns = [name for name, kind in result["columns"].items() if kind == "count"]
+    result["rows"] = rows
+    result["intervals"] = [
+        {name: count_interval(row.get(name), result["scale"]) for name in count_columns}
+        for row in rows
+    ] if count_columns and result["mode"] == "sampled" else []
+    return result
+
+def format_approximate_response(result: Dict[str, Any], max_rows: int = 100,
+                                max_bytes: Optional[int] = None) -> str:
+    """
+    Format an approximate result as markdown
+
+    Args:
+        result: run_approximate_query() result
+        max_rows: Maximum number of rows shown
+        max_bytes: Size budget of the response (None for no limit)
+
+    Returns:
+        Formatted markdown string
+    """
+    response = ResponseBuilder(max_bytes, truncation_hint="Lower max_rows or select fewer columns.")
+    rows = result["rows"]
+    if result["mode"] == "sampled":
+        sampled_rows = result["estimated_table_rows"] * result["sample_percent"] / 100
+        response.line(f"**Approximate result**: sampled {result['sample_percent']:g}% of {result['sampled_table']} "
+                      f"({result['sample_method']}), about {round(sampled_rows):,} of ~{result['estimated_table_rows']:,} rows; "
+                      f"counts and sums scaled ×{result['scale']:,.6g}. Counts show a 95% confidence interval.")
+    elif result["mode"] == "estimated":
+        response.line("**Estimated result**: table counts come from planner statistics.")
+    else:
+        response.line("**Exact result**")
+    response.line()
+
+    if not rows:
+        response.line("Query executed successfully but returned no results.")
+    else:
+        shown = rows[:max_rows] if max_rows else rows
+        response.line(f"Query returned {len(rows)} rows" +
+                      (f" (showing first {len(shown)}):" if len(shown) < len(rows) else ":"))
+        response.line()
+        columns = list(rows[0].keys())
+        intervals = result["intervals"]
+
+        def cell(i, column):
+            value = shown[i].get(column)
+            interval = intervals[i].get(column) if intervals else None
+            if interval is None:
+                return "" if value is None else value
+            return f"{value:,} ± {max(interval[1] - value, value - interval[0]):,}"
+
+        response.table(columns, ([cell(i, column) for column in columns] for i in range(len(shown))))
+    response.line()
+
+    notes = [f"`{name}`: {COLUMN_NOTES[kind]}" for name, kind in result["columns"].items() if kind in COLUMN_NOTES]
+    notes.extend(result["notes"])
+    if notes:
+        response.line("### Notes")
+        response.line()
+        for note in notes:
+            response.line(f"- {note}")
+        response.line()
+
+    if result["query"] != result["original_query"]:
+        response.line("### Executed Query")
+        response.line()
+        response.line("```sql")
+        response.line(result["query"].strip())
+        response.line("```")
+    return response.build()
@@ -0,0 +1,250 @@
+"""
+Table and btree index bloat estimation.
+
+Compares the pages a relation actually uses with the pages it would need if it were
+freshly packed, computed from pg_stats average widths, alignment padding, tuple
+header overhead and fillfactor. All relations are estimated from three catalog
+queries in a single pass; pgstattuple can optionally confirm the largest findings.
+"""
+from typing import List, Dict, Any, Optional
+import math
+from db.connector import PostgresConnector
+from db.queries import (
+    BLOAT_TABLES_QUERY,
+    BLOAT_INDEXES_QUERY,
+    BLOAT_COLUMNS_QUERY,
+    CHECK_PGSTATTUPLE_QUERY,
+    PGSTATTUPLE_APPROX_QUERY,
+    PGSTATINDEX_QUERY
+)
+
+PAGE_SIZE = 8192
+PAGE_HEADER = 24             # PageHeaderData
+ITEM_POINTER = 4             # ItemIdData per tuple
+HEAP_TUPLE_HEADER = 23       # HeapTupleHeaderData, before alignment
+INDEX_TUPLE_HEADER = 8       # IndexTupleData
+BTREE_SPECIAL = 16           # BTPageOpaqueData
+MAXALIGN = 8
+DEFAULT_COLUMN_WIDTH = 8     # width assumed for columns without statistics / expression keys
+ALIGNMENT = {"c": 1, "s": 2, "i": 4, "d": 8}
+
+def align(value: float, alignment: int = MAXALIGN) -> float:
+    """Round value up to a multiple of alignment"""
+    return math.ceil(value / alignment) * alignment
+
+def estimate_data_width(columns: List[Dict[str, Any]]) -> float:
+    """
+    Estimate the average width of the data part of a tuple, including alignment padding
+
+    Varlena values shorter than 127 bytes are stored with a 1-byte header and are not
+    aligned, so only fixed-width columns and long varlena values pay padding.
+
+    Args:
+        columns: Column rows (attlen, attalign, avg_width, null_frac) in attnum order
+
+    Returns:
+        Estimated data width in bytes
+    """
+    offset = 0.0
+    for column in columns:
+        width = column.get("avg_width")
+        if width is None:
+            width = column["attlen"] if (column.get("attlen") or 0) > 0 else DEFAULT_COLUMN_WIDTH
+        null_frac = column.get("null_frac") or 0
+        if column.get("attlen", -1) > 0 or width >= 127:
+            offset = align(offset, ALIGNMENT.get(column.get("attalign"), 1))
+        offset += width * (1 - null_frac)
+    return offset
+
+def estimate_heap_pages(table: Dict[str, Any], columns: List[Dict[str, Any]]) -> Optional[int]:
+    """
+    Estimate the pages a table would use when freshly packed
+
+    Args:
+        table: Table row from BLOAT_TABLES_QUERY
+        columns: Column rows of the table
+
+    Returns:
+        Expected number of pages, or None when the table has no statistics
+    """
+    reltuples = table.get("reltuples") or 0
+    if reltuples <= 0 or not columns or all(c.get("avg_width") is None for c in columns):
+        return None
+
+    has_nulls = any(c.get("nullable") and (c.get("null_frac") or 0) > 0 for c in columns)
+    header = HEAP_TUPLE_HEADER + (math.ceil(len(columns) / 8) if has_nulls else 0)
+    tuple_size = align(align(header) + estimate_data_width(columns))
+
+    usable = (PAGE_SIZE - PAGE_HEADER) * (table.get("fillfactor") or 100) / 100
+    tuples_per_page = max(math.floor(usable / (tuple_size + ITEM_POINTER)), 1)
+    return math.ceil(reltuples / tuples_per_page)
+
+def estimate_btree_pages(index: Dict[str, Any], columns_by_attnum: Dict[int, Dict[str, Any]]) -> Optional[int]:
+    """
+    Estimate the pages a btree index would use when freshly built
+
+    Args:
+        index: Index row from BLOAT_INDEXES_QUERY
+        columns_by_attnum: Column rows of the indexed table keyed by attnum
+
+    Returns:
+        Expected number of pages (leaf + internal + meta), or None when it cannot be estimated
+    """
+    reltuples = index.get("reltuples") or 0
+    attnums = list(index.get("attnums") or [])
+    if reltuples <= 0 or not attnums:
+        return None
+
+    columns = []
+    for attnum in attnums:
+        column = columns_by_attnum.get(attnum)
+        if column is None or column.get("avg_width") is None:
+            columns.append({"attlen": DEFAULT_COLUMN_WIDTH, "attalign": "d", "avg_width": DEFAULT_COLUMN_WIDTH})
+        else:
+            columns.append(column)
+
+    tuple_size = align(INDEX_TUPLE_HEADER + estimate_data_width(columns))
+    usable = (PAGE_SIZE - PAGE_HEADER - BTREE_SPECIAL) * (index.get("fillfactor") or 90) / 100
+    tuples_per_page = max(math.floor(usable / (tuple_size + ITEM_POINTER)), 2)
+    leaf_pages = math.ceil(reltuples / tuples_per_page)
+
+    # Upper levels are filled to ~70% and hold one downlink per page below
+    fanout = max(math.floor((PAGE_SIZE - PAGE_HEADER - BTREE_SPECIAL) * 0.7 / (tuple_size + ITEM_POINTER)), 2)
+    pages, level = leaf_pages, leaf_pages
+    while level > 1:
+        level = math.ceil(level / fanout)
+        pages += level
+    return pages + 1  # meta page
+
+def estimate_bloat(connector: PostgresConnector, min_size_bytes: int = 0) -> List[Dict[str, Any]]:
+    """
+    Estimate heap and btree bloat for every relation of the database
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        min_size_bytes: Skip relations smaller than this
+
+    Returns:
+        List of estimates (kind, schema, name, actual/expected pages, bloat bytes and
+        percent), ranked by reclaimable bytes
+    """
+    tables = connector.execute_query(BLOAT_TABLES_QUERY)
+    indexes = connector.execute_query(BLOAT_INDEXES_QUERY)
+
+    columns_by_table = {}
+    for column in connector.execute_query(BLOAT_COLUMNS_QUERY):
+        columns_by_table.setdefault(column["table_oid"], {})[column["attnum"]] = column
+
+    estimates = []
+    for table in tables:
+        if (table.get("size_bytes") or 0) < min_size_bytes:
+            continue
+        columns = [c for _, c in sorted(columns_by_table.get(table["table_oid"], {}).items())]
+        estimates.append(build_estimate("table", table, table["table_name"], estimate_heap_pages(table, columns)))
+
+    for index in indexes:
+        if (index.get("size_bytes") or 0) < min_size_bytes:
+            continue
+        expected = estimate_btree_pages(index, columns_by_table.get(index["table_oid"], {}))
+        estimates.append(build_estimate("index", index, index["index_name"], expected))
+
+    estimates.sort(key=lambda x: x["bloat_bytes"], reverse=True)
+    return estimates
+
+def build_estimate(kind: str, relation: Dict[str, Any], name: str, expected_pages: Optional[int]) -> Dict[str, Any]:
+    """Turn actual and expected page counts into a bloat estimate"""
+    actual_pages = relation.get("relpages") or 0
+    bloat_pages = max(actual_pages - expected_pages, 0) if expected_pages is not None else 0
+    return {
+        "kind": kind,
+        "schema": relation["table_schema"],
+        "table_name": relation["table_name"],
+        "name": name,
+        "size_bytes": relation.get("size_bytes") or 0,
+        "actual_pages": actual_pages,
+        "expected_pages": expected_pages,
+        "bloat_bytes": bloat_pages * PAGE_SIZE,
+        "bloat_percent": (bloat_pages / actual_pages * 100) if actual_pages else 0,
+        "fillfactor": relation.get("fillfactor")
+    }
+
+def confirm_with_pgstattuple(connector: PostgresConnector, estimates: List[Dict[str, Any]], top: int = 5) -> bool:
+    """
+    Measure the top estimates with pgstattuple_approx / pgstatindex when the extension is installed
+
+    Adds a 'measured_bloat_bytes' key to each confirmed estimate. pgstattuple_approx
+    skips all-visible pages using the visibility map, and only the top relations are
+    measured, to keep the I/O on the monitored database low.
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        estimates: Result of estimate_bloat()
+        top: Number of estimates to confirm
+
+    Returns:
+        True if pgstattuple was available
+    """
+    result = connector.execute_query(CHECK_PGSTATTUPLE_QUERY)
+    if not result or not result[0]["has_pgstattuple"]:
+        return False
+
+    for estimate in [e for e in estimates if e["bloat_bytes"] > 0][:top]:
+        relation = '"{}"."{}"'.format(estimate["schema"].replace('"', '""'), estimate["name"].replace('"', '""'))
+        if estimate["kind"] == "table":
+            measured = connector.execute_query(PGSTATTUPLE_APPROX_QUERY, [relation])
+            if measured:
+                row = measured[0]
+                estimate["measured_bloat_bytes"] = int((row["approx_free_space"] or 0) + (row["dead_tuple_len"] or 0))
+        else:
+            measured = connector.execute_query(PGSTATINDEX_QUERY, [relation])
+            if measured and measured[0]["avg_leaf_density"] == measured[0]["avg_leaf_density"]:  # NaN on empty indexes
+                row = measured[0]
+                density = (row["avg_leaf_density"] or 0) / 100
+                target = (estimate["fillfactor"] or 90) / 100
+                estimate["measured_bloat_bytes"] = int(max(row["index_size"] * (1 - density / target), 0))
+    return True
+
+def format_bloat_response(estimates: List[Dict[str, Any]], limit: int = 30, confirmed: Optional[bool] = None) -> str:
+    """
+    Format bloat estimates as a markdown response
+
+    Args:
+        estimates: Result of estimate_bloat()
+        limit: Maximum number of relations to list
+        confirmed: Result of confirm_with_pgstattuple(), or None if confirmation was not requested
+
+    Returns:
+        Formatted markdown string
+    """
+    bloated = [e for e in estimates if e["bloat_bytes"] > 0]
+    no_stats = sum(1 for e in estimates if e["expected_pages"] is None)
+
+    response = "## Bloat Estimation\n\n"
+    response += f"- **Relations Analyzed**: {len(estimates):,} ({no_stats} without statistics, run ANALYZE)\n"
+    response += f"- **Relations With Bloat**: {len(bloated):,}\n"
+    response += f"- **Total Reclaimable (estimated)**: {sum(e['bloat_bytes'] for e in bloated) / (1024 * 1024):.1f} MB\n"
+    if confirmed is False:
+        response += "- **pgstattuple**: not installed, estimates not confirmed\n"
+    response += "\n"
+
+    if not bloated:
+        response += "No significant bloat detected.\n"
+        return response
+
+    response += "| # | Relation | Type | Size | Expected Pages | Actual Pages | Est. Bloat | Bloat % | Measured |\n"
+    response += "|---|----------|------|------|----------------|--------------|------------|---------|----------|\n"
+    for i, estimate in enumerate(bloated[:limit], 1):
+        measured = estimate.get("measured_bloat_bytes")
+        measured_text = f"{measured / (1024 * 1024):.1f} MB" if measured is not None else "-"
+        relation = f"{estimate['schema']}.{estimate['name']}"
+        if estimate["kind"] == "index":
+            relation += f" (on {estimate['table_name']})"
+        response += (f"| {i} | `{relation}` | {estimate['kind']} | {estimate['size_bytes'] / (1024 * 1024):.1f} MB "
+                     f"| {estimate['expected_pages']:,} | {estimate['actual_pages']:,} "
+                     f"| {estimate['bloat_bytes'] / (1024 * 1024):.1f} MB | {estimate['bloat_percent']:.1f}% | {measured_text} |\n")
+
+    response += ("\n**Note**: Estimates come from pg_stats average widths, alignment, tuple headers and fillfactor, "
+                 "and are only as fresh as the last ANALYZE. Reclaim table space with `VACUUM FULL` or pg_repack "
+                 "and index space with `REINDEX INDEX CONCURRENTLY`.\n")
+
+    return response
@@ -0,0 +1,124 @@
+"""
+Detection of foreign keys without a supporting index on the referencing side.
+
+Deleting a parent row (or updating its key) makes PostgreSQL look up the child rows
+that reference it. Without an index whose leading columns are the FK columns, every
+such check is a sequential scan of the child table.
+"""
+from typing import List, Dict, Any, Set, FrozenSet
+
+PAGE_SIZE = 8192
+
+def build_leading_key_sets(snapshot: Dict[str, Any]) -> Dict[int, Set[FrozenSet[int]]]:
+    """
+    Index every leading-column set of every usable btree index, per table
+
+    An index on (a, b, c) yields {a}, {a, b} and {a, b, c}, so a foreign key on
+    (b, a) is recognised as covered with a single set lookup.
+
+    Args:
+        snapshot: Catalog snapshot from get_catalog_snapshot()
+
+    Returns:
+        Dictionary table oid -> set of frozensets of leading attnums
+    """
+    leading = {}
+    for index in snapshot["indexes"]:
+        if index["index_type"] != "btree" or index.get("predicate") or not index.get("is_valid", True):
+            continue
+        keys = index["key_attnums"]
+        table_sets = leading.setdefault(index["table_oid"], set())
+        for length in range(1, len(keys) + 1):
+            if keys[length - 1] == 0:
+                break  # expression column: later keys cannot be used for a plain column lookup
+            table_sets.add(frozenset(keys[:length]))
+    return leading
+
+def find_unindexed_foreign_keys(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Find foreign keys whose columns are not the leading columns of any index on the child table
+
+    The cost of each one is estimated as the child pages read by sequential scans
+    for the referential-integrity checks: child table pages x parent updates/deletes
+    since the statistics reset.
+
+    Args:
+        snapshot: Catalog snapshot from get_catalog_snapshot()
+
+    Returns:
+        List of unindexed foreign keys, most expensive first
+    """
+    leading = build_leading_key_sets(snapshot)
+    tables = snapshot["tables"]
+
+    findings = []
+    for foreign_key in snapshot["foreign_keys"]:
+        if frozenset(foreign_key["attnums"]) in leading.get(foreign_key["table_oid"], ()):
+            continue
+
+        child = tables.get(foreign_key["table_oid"], {})
+        parent = tables.get(foreign_key["referenced_table_oid"], {})
+        parent_writes = (parent.get("n_tup_del") or 0) + (parent.get("n_tup_upd") or 0)
+        child_pages = max(child.get("relpages") or 0, 1)
+        columns = foreign_key["column_names"]
+        index_name = f"idx_{foreign_key['table_name']}_{'_'.join(columns)}"[:63]
+
+        findings.append({
+            "constraint_name": foreign_key["constraint_name"],
+            "table": f"{foreign_key['table_schema']}.{foreign_key['table_name']}",
+            "columns": columns,
+            "referenced_table": f"{foreign_key['referenced_schema']}.{foreign_key['referenced_table']}",
+            "on_delete": foreign_key.get("on_delete"),
+            "child_rows": child.get("reltuples") or 0,
+            "child_size_bytes": child.get("size_bytes") or 0,
+            "parent_writes": parent_writes,
+            "estimated_pages_scanned": child_pages * parent_writes,
+            "ddl": (f"CREATE INDEX CONCURRENTLY {index_name} "
+                    f"ON {foreign_key['table_schema']}.{foreign_key['table_name']} ({', '.join(columns)});")
+        })
+
+    findings.sort(key=lambda x: (x["estimated_pages_scanned"], x["child_size_bytes"]), reverse=True)
+    return findings
+
+def format_unindexed_foreign_keys_response(findings: List[Dict[str, Any]], fk_count: int, limit: int = 50) -> str:
+    """
+    Format unindexed foreign keys as a markdown response
+
+    Args:
+        findings: Result of find_unindexed_foreign_keys()
+        fk_count: Total number of foreign keys analyzed
+        limit: Maximum number of foreign keys to list
+
+    Returns:
+        Formatted markdown string
+    """
+    response = "## Foreign Keys Without Indexes\n\n"
+    response += f"- **Foreign Keys Analyzed**: {fk_count:,}\n"
+    response += f"- **Without Supporting Index**: {len(findings):,}\n\n"
+
+    if not findings:
+        response += "Every foreign key has an index whose leading columns match the FK columns.\n"
+        return response
+
+    delete_actions = {"c": "CASCADE", "n": "SET NULL", "d": "SET DEFAULT", "r": "RESTRICT", "a": "NO ACTION"}
+
+    response += "| # | Table | Columns | References | On Delete | Child Rows | Child Size | Parent Updates/Deletes | Est. Pages Scanned |\n"
+    response += "|---|-------|---------|------------|-----------|------------|------------|------------------------|--------------------|\n"
+    for i, finding in enumerate(findings[:limit], 1):
+        response += (f"| {i} | `{finding['table']}` | {', '.join(finding['columns'])} | `{finding['referenced_table']}` "
+                     f"| {delete_actions.get(finding['on_delete'], finding['on_delete'])} | {finding['child_rows']:,} "
+                     f"| {finding['child_size_bytes'] / (1024 * 1024):.1f} MB | {finding['parent_writes']:,} "
+                     f"| {finding['estimated_pages_scanned']:,} |\n")
+    if len(findings) > limit:
+        response += f"\n... and {len(findings) - limit} more foreign keys\n"
+
+    response += "\n### SQL Commands\n\n```sql\n"
+    for finding in findings[:limit]:
+        response += finding["ddl"] + "\n"
+    response += "```\n"
+
+    response += ("\n**Note**: Each update/delete on the parent table scans the child table sequentially "
+                 "when the FK has no index. Est. Pages Scanned = child pages x parent updates/deletes since "
+                 f"the statistics reset ({PAGE_SIZE // 1024} KB per page).\n")
+
+    return response
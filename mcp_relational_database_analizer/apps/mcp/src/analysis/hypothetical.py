@@ -0,0 +1,110 @@
+"""
+Functions for evaluating index candidates with hypothetical indexes (HypoPG).
+"""
+from typing import List, Dict, Any, Set
+from db.connector import PostgresConnector
+from db.queries import CHECK_HYPOPG_QUERY, HYPOPG_CREATE_INDEX_QUERY, HYPOPG_RESET_QUERY
+from analysis.query import get_execution_plan
+
+def is_hypopg_available(connector: PostgresConnector) -> bool:
+    """
+    Check whether the HypoPG extension is installed in the current database
+
+    Args:
+        connector: PostgresConnector instance with active connection
+
+    Returns:
+        True if hypothetical indexes can be created, False otherwise
+    """
+    result = connector.execute_query(CHECK_HYPOPG_QUERY)
+    return bool(result and result[0]['has_hypopg'])
+
+def collect_plan_index_names(plan: Dict[str, Any]) -> Set[str]:
+    """
+    Collect the names of all indexes referenced anywhere in a plan tree
+
+    Args:
+        plan: A plan node (the value of the 'Plan' key from EXPLAIN JSON)
+
+    Returns:
+        Set of index names used by the plan
+    """
+    index_names = set()
+    nodes = [plan]
+
+    while nodes:
+        node = nodes.pop()
+        if node.get('Index Name'):
+            index_names.add(node['Index Name'])
+        nodes.extend(node.get('Plans', []))
+
+    return index_names
+
+def evaluate_hypothetical_indexes(
+    connector: PostgresConnector,
+    query: str,
+    candidates: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Evaluate index candidates by creating them as hypothetical indexes and re-planning the query
+
+    Each candidate is evaluated in isolation: it is created with hypopg_create_index(),
+    the query is explained again and the hypothetical index is discarded. Hypothetical
+    indexes live only in this backend and the transaction is rolled back at the end,
+    so nothing is ever written to the database.
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        query: SQL query the candidates should speed up
+        candidates: Index candidates, each with at least 'table' and 'ddl' keys
+
+    Returns:
+        Dictionary with the baseline cost, the candidates the planner would use
+        (ranked by estimated cost reduction) and the candidates that were dropped
+    """
+    baseline_plan = get_execution_plan(connector, query)
+    baseline_cost = baseline_plan.get('Plan', {}).get('Total Cost', 0)
+
+    useful = []
+    dropped = []
+
+    try:
+        for candidate in candidates:
+            connector.execute_query(HYPOPG_RESET_QUERY)
+            created = connector.execute_query(HYPOPG_CREATE_INDEX_QUERY, [candidate['ddl']])
+            if not created:
+                dropped.append({**candidate, "reason": "HypoPG could not create the index"})
+                continue
+
+            hypothetical_name = created[0]['indexname']
+            plan_json = get_execution_plan(connector, query)
+            plan = plan_json.get('Plan', {})
+            estimated_cost = plan.get('Total Cost', baseline_cost)
+            cost_reduction = baseline_cost - estimated_cost
+
+            evaluated = {
+                **candidate,
+                "baseline_cost": baseline_cost,
+                "estimated_cost": estimated_cost,
+                "cost_reduction": cost_reduction,
+                "cost_reduction_percent": (cost_reduction / baseline_cost * 100) if baseline_cost else 0,
+                "used_by_planner": hypothetical_name in collect_plan_index_names(plan)
+            }
+
+            if evaluated["used_by_planner"] and cost_reduction > 0:
+                useful.append(evaluated)
+            else:
+                evaluated["reason"] = "Plan unchanged" if not evaluated["used_by_planner"] else "No cost reduction"
+                dropped.append(evaluated)
+    finally:
+        connector.execute_query(HYPOPG_RESET_QUERY)
+        if connector.conn:
+            connector.conn.rollback()
+
+    useful.sort(key=lambda x: x["cost_reduction"], reverse=True)
+
+    return {
+        "baseline_cost": baseline_cost,
+        "recommended": useful,
+        "dropped": dropped
+    }
@@ -0,0 +1,291 @@
+"""
+Index hygiene analysis: duplicate, redundant, unused and FK-only indexes.
+
+Works entirely off a catalog snapshot (db.catalog). Every check is a single pass
+over the indexes with dictionary lookups, so it stays linear in the number of
+indexes even on schemas with tens of thousands of them.
+"""
+from typing import List, Dict, Any, Tuple, Optional
+from datetime import datetime, timezone
+
+DEFAULT_MIN_STATS_AGE_DAYS = 7
+
+def index_write_ops(table: Dict[str, Any]) -> int:
+    """Index entries maintained per index since the stats reset (inserts, deletes and non-HOT updates)"""
+    non_hot_updates = max((table.get("n_tup_upd") or 0) - (table.get("n_tup_hot_upd") or 0), 0)
+    return (table.get("n_tup_ins") or 0) + (table.get("n_tup_del") or 0) + non_hot_updates
+
+def qualified_index_name(index: Dict[str, Any]) -> str:
+    """Schema-qualified index name"""
+    return f"{index['table_schema']}.{index['index_name']}"
+
+def enforces_constraint(index: Dict[str, Any]) -> bool:
+    """Whether dropping the index would change behaviour (primary key, unique, exclusion constraint)"""
+    return bool(index.get("is_primary") or index.get("is_unique") or index.get("constraint_name"))
+
+def index_signature(index: Dict[str, Any]) -> Tuple:
+    """Everything that makes two indexes interchangeable: table, method, keys, opclasses, expressions, predicate"""
+    return (
+        index["table_oid"],
+        index["index_type"],
+        tuple(index["attnums"]),
+        index["key_count"],
+        tuple(index.get("opclasses") or ()),
+        index.get("expressions"),
+        index.get("predicate")
+    )
+
+def stats_age_days(context: Dict[str, Any]) -> Optional[float]:
+    """Days since the statistics of the current database were reset, or None if never reset"""
+    stats_reset = context.get("stats_reset")
+    if not stats_reset:
+        return None
+    captured_at = context.get("captured_at") or datetime.now(timezone.utc)
+    return (captured_at - stats_reset).total_seconds() / 86400
+
+def find_duplicate_indexes(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Find indexes identical to another index on the same table
+
+    Within each group of identical indexes the one backing a constraint, then a
+    primary key, then a unique index, then the oldest one is kept. Indexes that
+    enforce something (see enforces_constraint()) are never reported, and invalid
+    indexes are left out: they serve no scans.
+
+    Args:
+        snapshot: Catalog snapshot from get_catalog_snapshot()
+
+    Returns:
+        List of findings
+    """
+    groups = {}
+    for index in snapshot["indexes"]:
+        if index.get("is_valid", True):
+            groups.setdefault(index_signature(index), []).append(index)
+
+    findings = []
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda x: (not x.get("constraint_name"), not x.get("is_primary"), not x.get("is_unique"),
+                                  x["index_oid"]))
+        keep = group[0]
+        for index in group[1:]:
+            if enforces_constraint(index):
+                continue  # dropping it would lose a constraint or uniqueness, not just an index
+            findings.append({
+                "category": "duplicate",
+                "index": index,
+                "reason": f"identical to `{keep['index_name']}`"
+            })
+    return findings
+
+def find_redundant_indexes(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Find btree indexes whose key columns are a left prefix of another index on the same table
+
+    An index on (a) is redundant with an index on (a, b) as long as both use the same
+    operator classes and predicate, and the shorter one does not enforce uniqueness.
+
+    Args:
+        snapshot: Catalog snapshot from get_catalog_snapshot()
+
+    Returns:
+        List of findings
+    """
+    # Map every strict key prefix of every btree index to the (first) index that extends it
+    prefixes = {}
+    for index in snapshot["indexes"]:
+        if index["index_type"] != "btree" or index.get("expressions") or not index.get("is_valid", True):
+            continue
+        keys = index["key_attnums"]
+        opclasses = list(index.get("opclasses") or ())
+        for length in range(1, len(keys)):
+            prefix_key = (index["table_oid"], index.get("predicate"), tuple(keys[:length]), tuple(opclasses[:length]))
+            prefixes.setdefault(prefix_key, index)
+
+    findings = []
+    for index in snapshot["indexes"]:
+        if (index["index_type"] != "btree" or index.get("expressions") or enforces_constraint(index)
+                or not index.get("is_valid", True)):
+            continue
+        keys = index["key_attnums"]
+        opclasses = list(index.get("opclasses") or ())[:len(keys)]
+        wider = prefixes.get((index["table_oid"], index.get("predicate"), tuple(keys), tuple(opclasses)))
+        if wider is None:
+            continue
+        # INCLUDE columns of the shorter index must be available in the wider one
+        if not set(index["attnums"][len(keys):]) <= set(wider["attnums"]):
+            continue
+        findings.append({
+            "category": "redundant",
+            "index": index,
+            "reason": f"left prefix of `{wider['index_name']}` ({', '.join(c or '?' for c in wider['column_names'][:wider['key_count']])})"
+        })
+    return findings
+
+def find_unused_indexes(
+    snapshot: Dict[str, Any],
+    min_stats_age_days: float = DEFAULT_MIN_STATS_AGE_DAYS
+) -> List[Dict[str, Any]]:
+    """
+    Find indexes never scanned since the statistics were reset, split into unused and FK-only
+
+    Constraint-enforcing indexes are skipped. An unused index whose leading columns
+    match a foreign key only serves the referential-integrity checks made when the
+    parent row is deleted or its key updated; it is reported as 'fk_only' and is only
+    safe to drop if the parent table is never deleted from or updated.
+
+    Args:
+        snapshot: Catalog snapshot from get_catalog_snapshot()
+        min_stats_age_days: Statistics younger than this make the findings low-confidence
+
+    Returns:
+        List of findings
+    """
+    context = snapshot["context"]
+    age = stats_age_days(context)
+    confidence = "high" if age is None or age >= min_stats_age_days else "low"
+
+    fk_columns = {}
+    for foreign_key in snapshot["foreign_keys"]:
+        fk_columns.setdefault(foreign_key["table_oid"], []).append(foreign_key)
+
+    findings = []
+    for index in snapshot["indexes"]:
+        if index["idx_scan"] or enforces_constraint(index) or not index.get("is_valid", True):
+            continue
+
+        backing = None
+        for foreign_key in fk_columns.get(index["table_oid"], []):
+            width = len(foreign_key["attnums"])
+            if set(index["key_attnums"][:width]) == set(foreign_key["attnums"]):
+                backing = foreign_key
+                break
+
+        if backing is None:
+            findings.append({
+                "category": "unused",
+                "index": index,
+                "confidence": confidence,
+                "reason": "never scanned since the statistics were reset"
+            })
+            continue
+
+        parent = snapshot["tables"].get(backing["referenced_table_oid"], {})
+        parent_writes = (parent.get("n_tup_del") or 0) + (parent.get("n_tup_upd") or 0)
+        findings.append({
+            "category": "fk_only",
+            "index": index,
+            "confidence": confidence if parent_writes == 0 else "keep",
+            "reason": (f"only supports FK `{backing['constraint_name']}` -> {backing['referenced_table']}; "
+                       + ("parent is never updated/deleted, safe to drop" if parent_writes == 0
+                          else f"parent had {parent_writes:,} updates/deletes, keep for RI checks"))
+        })
+    return findings
+
+def analyze_index_hygiene(
+    snapshot: Dict[str, Any],
+    min_stats_age_days: float = DEFAULT_MIN_STATS_AGE_DAYS
+) -> Dict[str, Any]:
+    """
+    Run all index hygiene checks and rank the findings
+
+    An index reported by several checks is listed once, under the first of:
+    duplicate, redundant, unused, fk_only. Findings are ranked by bytes reclaimable,
+    then by write overhead saved (index entries maintained since the stats reset).
+
+    Args:
+        snapshot: Catalog snapshot from get_catalog_snapshot()
+        min_stats_age_days: Statistics younger than this make unused findings low-confidence
+
+    Returns:
+        Dictionary with ranked findings, totals and the statistics context
+    """
+    findings = []
+    seen = set()
+    for finding in (find_duplicate_indexes(snapshot)
+                    + find_redundant_indexes(snapshot)
+                    + find_unused_indexes(snapshot, min_stats_age_days)):
+        index = finding["index"]
+        if index["index_oid"] in seen:
+            continue
+        seen.add(index["index_oid"])
+
+        table = snapshot["tables"].get(index["table_oid"], {})
+        finding["size_bytes"] = index.get("size_bytes") or 0
+        finding["write_ops_saved"] = index_write_ops(table)
+        finding.setdefault("confidence", "high")
+        finding["ddl"] = f"DROP INDEX CONCURRENTLY {qualified_index_name(index)};"
+        findings.append(finding)
+
+    findings.sort(key=lambda x: (x["confidence"] == "keep", -x["size_bytes"], -x["write_ops_saved"]))
+    droppable = [f for f in findings if f["confidence"] != "keep"]
+
+    context = snapshot["context"]
+    return {
+        "findings": findings,
+        "index_count": len(snapshot["indexes"]),
+        "reclaimable_bytes": sum(f["size_bytes"] for f in droppable),
+        "write_ops_saved": sum(f["write_ops_saved"] for f in droppable),
+        "stats_age_days": stats_age_days(context),
+        "is_replica": bool(context.get("is_replica")),
+        "replica_count": context.get("replica_count") or 0,
+        "min_stats_age_days": min_stats_age_days
+    }
+
+def format_index_hygiene_response(result: Dict[str, Any], limit: int = 50) -> str:
+    """
+    Format index hygiene findings as a markdown response
+
+    Args:
+        result: Result of analyze_index_hygiene()
+        limit: Maximum number of findings to list
+
+    Returns:
+        Formatted markdown string
+    """
+    response = "## Index Hygiene Analysis\n\n"
+    response += f"- **Indexes Analyzed**: {result['index_count']:,}\n"
+    response += f"- **Findings**: {len(result['findings'])}\n"
+    response += f"- **Reclaimable Space**: {result['reclaimable_bytes'] / (1024 * 1024):.1f} MB\n"
+    response += f"- **Index Writes Saved**: {result['write_ops_saved']:,} entries since stats reset\n"
+
+    age = result["stats_age_days"]
+    response += f"- **Statistics Age**: {'never reset' if age is None else f'{age:.1f} days'}\n\n"
+
+    if age is not None and age < result["min_stats_age_days"]:
+        response += (f"⚠️ Statistics were reset {age:.1f} days ago (< {result['min_stats_age_days']} days). "
+                     "Unused-index findings are low-confidence: rarely used indexes (monthly reports, "
+                     "batch jobs) may simply not have run yet.\n\n")
+    if result["is_replica"] or result["replica_count"]:
+        where = "this server is a replica" if result["is_replica"] else f"{result['replica_count']} replica(s) attached"
+        response += (f"⚠️ {where.capitalize()}: index usage counters are per server. An index unused here may "
+                     "serve queries on another node; check pg_stat_user_indexes on every node before dropping.\n\n")
+
+    if not result["findings"]:
+        response += "No duplicate, redundant or unused indexes found.\n"
+        return response
+
+    response += "### Findings (ranked by reclaimable bytes, then write overhead)\n\n"
+    response += "| # | Index | Table | Category | Size | Writes Saved | Confidence | Reason |\n"
+    response += "|---|-------|-------|----------|------|--------------|------------|--------|\n"
+    for i, finding in enumerate(result["findings"][:limit], 1):
+        index = finding["index"]
+        response += (f"| {i} | `{index['index_name']}` | {index['table_schema']}.{index['table_name']} "
+                     f"| {finding['category']} | {finding['size_bytes'] / (1024 * 1024):.1f} MB "
+                     f"| {finding['write_ops_saved']:,} | {finding['confidence']} | {finding['reason']} |\n")
+    if len(result["findings"]) > limit:
+        response += f"\n... and {len(result['findings']) - limit} more findings\n"
+
+    droppable = [f for f in result["findings"][:limit] if f["confidence"] != "keep"]
+    if droppable:
+        response += "\n### SQL Commands\n\n```sql\n"
+        for finding in droppable:
+            response += finding["ddl"] + "\n"
+        response += "```\n"
+
+    response += ("\n**Note**: `DROP INDEX CONCURRENTLY` cannot run inside a transaction block. "
+                 "Keep the DDL of each index (pg_get_indexdef) so it can be recreated if needed.\n")
+
+    return response
@@ -1,80 +1,222 @@
 """
 Functions for analyzing and recommending indexes.
 """
-from typing import List, Dict, Any, Tuple
-import re
+from typing import List, Dict, Any, Tuple, Optional
+import csv
 from db.connector import PostgresConnector
-from db.queries import TABLE_STATS_FOR_INDEX_QUERY, COLUMNS_FOR_INDEX_QUERY, INDEXES_FOR_TABLE_QUERY
+from db.queries import (
+    TABLE_STATS_FOR_INDEX_QUERY,
+    COLUMNS_FOR_INDEX_QUERY,
+    INDEXES_FOR_TABLE_QUERY,
+    COLUMN_STATS_FOR_INDEX_QUERY
+)
+from analysis.sql_parser import parse_query, resolve_column_usage
 
-def extract_potential_indexes(query: str) -> List[Tuple[str, str]]:
+MAX_KEY_COLUMNS = 4
+MAX_INCLUDE_COLUMNS = 3
+PARTIAL_INDEX_MAX_FRACTION = 0.2   # constant predicates matching at most this share of rows
+PARTIAL_INDEX_MAX_DISTINCT = 20    # ... on low-cardinality columns become partial index predicates
+
+def parse_array_text(value: Optional[str]) -> List[str]:
+    """Split the text form of a PostgreSQL array ('{a,"b c"}') into its elements"""
+    if not value or len(value) < 2:
+        return []
+    return next(csv.reader([value[1:-1]], quotechar='"', escapechar='\\'), [])
+
+def estimate_constant_fraction(column_stats: Dict[str, Any], operator: str, literal: Optional[str]) -> Optional[float]:
     """
-    Extract potential index candidates from a query
-    
+    Estimate the fraction of rows matching `column = literal` (or `column IS NULL`) from pg_stats
+
+    Args:
+        column_stats: pg_stats row for the column
+        operator: '=' or 'is null'
+        literal: Constant as written in the query (quoted for strings)
+
+    Returns:
+        Estimated fraction of matching rows, or None when it cannot be estimated
+    """
+    if not column_stats or literal is None:
+        return None
+    null_frac = column_stats.get("null_frac") or 0
+    if operator == "is null":
+        return null_frac
+
+    value = literal[1:-1].replace("''", "'") if literal.startswith("'") else literal
+    value = {"true": "t", "false": "f"}.get(value, value)
+    common_values = parse_array_text(column_stats.get("most_common_vals"))
+    common_freqs = column_stats.get("most_common_freqs") or []
+    if value in common_values:
+        return common_freqs[common_values.index(value)]
+
+    distinct = column_distinct_values(column_stats)
+    if not distinct:
+        return None
+    remaining = max(1.0 - sum(common_freqs) - null_frac, 0.0)
+    return remaining / max(distinct - len(common_values), 1)
+
+def column_distinct_values(column_stats: Dict[str, Any], row_count: int = 0) -> Optional[float]:
+    """Number of distinct values of a column (pg_stats stores negative n_distinct as a fraction of rows)"""
+    n_distinct = (column_stats or {}).get("n_distinct")
+    if not n_distinct:
+        return None
+    return n_distinct if n_distinct > 0 else -n_distinct * max(row_count, 1)
+
+def usable_index_prefix(
+    key_columns: List[str],
+    equality: List[str],
+    range_column: Optional[str] = None,
+    sort: List[str] = ()
+) -> List[str]:
+    """
+    Leading key columns of a btree index that a predicate can use
+
+    Equality columns can be used in any order; after them the index can serve one
+    range column or the ORDER BY columns. A column that appears anywhere else in the
+    index (e.g. as the third key of an unrelated composite index) is not usable.
+
+    Args:
+        key_columns: Ordered key columns of the index
+        equality: Columns compared by equality (=, IN, IS NULL)
+        range_column: Column compared by a range operator, if any
+        sort: ORDER BY columns, if any
+
+    Returns:
+        The usable leading key columns, in index order
+    """
+    equality = set(equality)
+    prefix = []
+    for column in key_columns:
+        if column not in equality:
+            break
+        prefix.append(column)
+
+    rest = list(key_columns[len(prefix):])
+    if range_column:
+        if rest and rest[0] == range_column:
+            prefix.append(range_column)
+    elif sort and rest[:len(sort)] == list(sort):
+        prefix.extend(sort)
+
+    return prefix
+
+def predicate_constants(predicate: str) -> Optional[Dict[str, Tuple[str, str]]]:
+    """Equality constants of a partial index predicate, or None if it is not a simple conjunction"""
+    try:
+        parsed = parse_query(f"SELECT 1 FROM t WHERE {predicate}")
+    except Exception:
+        return None
+    constants = {}
+    for _qualifier, column, kind, operator, literal in parsed["filters"]:
+        if kind != "equality" or literal is None:
+            return None
+        constants[column] = (operator, literal)
+    return constants or None
+
+def synthesize_index_candidates(query: str, db_structure: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Synthesize index candidates for a query
+
+    For every table, key columns are ordered equality first (most selective first),
+    then one range column, or else the ORDER BY/GROUP BY columns. Equality filters on
+    selective constants of low-cardinality columns (status flags, booleans, IS NULL)
+    become partial index predicates instead of key columns, and the remaining columns
+    the query reads are added as INCLUDE columns so an index-only scan is possible.
+    Tables with equi-join columns also get a join candidate for nested-loop lookups.
+
     Args:
         query: SQL query to analyze
-        
+        db_structure: Database structure information from get_table_structure_for_index()
+
     Returns:
-        List of tuples (table_name, column_name) that could benefit from indexes
+        List of candidates with table, columns, include, predicate, the equality/range/sort
+        columns they serve, the constants used by the query and a short reason
     """
-    query_lower = query.lower()
-    potential_indexes = []
-    
-    # Extract columns from WHERE clause
-    if "where " in query_lower:
-        where_clause = query_lower.split("where ")[1].split("group by")[0].split("order by")[0].split("limit")[0]
-        conditions = where_clause.replace("and", ",").replace("or", ",").split(",")
-        
-        for condition in conditions:
-            for operator in ["=", ">", "<", ">=", "<=", "like"]:
-                if operator in condition:
-                    parts = condition.split(operator)
-                    if len(parts) >= 2:
-                        column = parts[0].strip()
-                        if "." in column:
-                            table, col = column.split(".")
-                            potential_indexes.append((table.strip(), col.strip()))
-    
-    # Extract columns from JOIN conditions
-    join_parts = query_lower.split(" join ")
-    for i in range(1, len(join_parts)):
-        join_clause = join_parts[i]
-        if " on " in join_clause:
-            on_clause = join_clause.split(" on ")[1].split(" where ")[0].split(" group ")[0].split(" order ")[0]
-            conditions = on_clause.replace("and", ",").replace("or", ",").split(",")
-            
-            for condition in conditions:
-                if "=" in condition:
-                    parts = condition.split("=")
-                    if len(parts) >= 2:
-                        for part in parts:
-                            column = part.strip()
-                            if "." in column:
-                                table, col = column.split(".")
-                                potential_indexes.append((table.strip(), col.strip()))
-    
-    # Extract columns from ORDER BY
-    if "order by " in query_lower:
-        order_clause = query_lower.split("order by ")[1].split("limit")[0]
-        order_columns = order_clause.split(",")
-        
-        for column in order_columns:
-            column = column.strip().split(" ")[0]  # Remove ASC/DESC
-            if "." in column:
-                table, col = column.split(".")
-                potential_indexes.append((table.strip(), col.strip()))
-    
-    # Extract columns from GROUP BY
-    if "group by " in query_lower:
-        group_clause = query_lower.split("group by ")[1].split("having")[0].split("order")[0]
-        group_columns = group_clause.split(",")
-        
-        for column in group_columns:
-            column = column.strip()
-            if "." in column:
-                table, col = column.split(".")
-                potential_indexes.append((table.strip(), col.strip()))
-    
-    return list(set(potential_indexes))  # Remove duplicates
+    parsed = parse_query(query)
+    table_columns = {
+        table: {col['column_name'] for col in info.get("columns", [])}
+        for table, info in db_structure.items()
+    }
+    usage = resolve_column_usage(parsed, table_columns)
+    covering = parsed["statement"] in ("select", "with")
+
+    candidates = []
+    for table, info in usage.items():
+        structure = db_structure.get(table, {})
+        known_columns = table_columns.get(table) or None
+        column_stats = structure.get("column_stats", {})
+        row_count = structure.get("statistics", {}).get("row_count") or 0
+
+        def known(columns: List[str]) -> List[str]:
+            return [c for c in columns if known_columns is None or c in known_columns]
+
+        def selectivity(column: str) -> float:
+            distinct = column_distinct_values(column_stats.get(column), row_count)
+            return 1.0 / distinct if distinct else 0.5
+
+        equality = known(info["equality"])
+        predicate_parts = []
+        key_equality = []
+        for column in equality:
+            operator, literal = info["constants"].get(column, (None, None))
+            stats = column_stats.get(column)
+            fraction = estimate_constant_fraction(stats, operator, literal) if operator in ("=", "is null") else None
+            distinct = column_distinct_values(stats, row_count)
+            low_cardinality = operator == "is null" or (distinct is not None and distinct <= PARTIAL_INDEX_MAX_DISTINCT)
+            if fraction is not None and fraction <= PARTIAL_INDEX_MAX_FRACTION and low_cardinality:
+                predicate_parts.append(f"{column} IS NULL" if operator == "is null" else f"{column} = {literal}")
+            else:
+                key_equality.append(column)
+        key_equality.sort(key=selectivity)
+
+        range_columns = known(info["range"])
+        range_column = range_columns[0] if range_columns else None
+        single_table = len(usage) == 1
+        sort = known(info["sort"] or info["group"]) if single_table and not range_column else []
+
+        shapes = []
+        if key_equality or range_column or sort:
+            shapes.append((key_equality, range_column, sort, predicate_parts))
+        join_columns = [c for c in known(info["join"]) if c not in key_equality]
+        if join_columns:
+            shapes.append((join_columns + key_equality, None, [], predicate_parts))
+
+        for shape_equality, shape_range, shape_sort, predicate in shapes:
+            columns = (shape_equality + ([shape_range] if shape_range else list(shape_sort)))[:MAX_KEY_COLUMNS]
+            if not columns:
+                continue
+
+            include = []
+            if covering and not info["select_star"]:
+                predicate_columns = {p.split(" ")[0] for p in predicate}
+                include = [c for c in known(info["referenced"]) if c not in columns and c not in predicate_columns]
+                if len(include) > MAX_INCLUDE_COLUMNS:
+                    include = []
+
+            reason = []
+            if shape_equality:
+                reason.append(f"equality on {', '.join(shape_equality)}")
+            if shape_range:
+                reason.append(f"range on {shape_range}")
+            elif shape_sort:
+                reason.append(f"sort on {', '.join(shape_sort)}")
+            if include:
+                reason.append("covering for an index-only scan")
+            if predicate:
+                reason.append("partial on a selective constant")
+
+            candidates.append({
+                "table": table,
+                "columns": columns,
+                "include": include,
+                "predicate": " AND ".join(predicate) if predicate else None,
+                "equality": shape_equality,
+                "range": shape_range,
+                "sort": list(shape_sort),
+                "constants": info["constants"],
+                "reason": "; ".join(reason)
+            })
+
+    return candidates
 
 def get_table_structure_for_index(connector: PostgresConnector, tables: List[str]) -> Dict[str, Dict[str, Any]]:
     """
@@ -99,23 +241,59 @@ def get_table_structure_for_index(connector: PostgresConnector, tables: List[str
         # Get existing indexes
         indexes = connector.execute_query(INDEXES_FOR_TABLE_QUERY, [table])
         
+        # Get planner statistics (distinct values, most common values) per column
+        column_stats = connector.execute_query(COLUMN_STATS_FOR_INDEX_QUERY, [table])
+        
         db_structure[table] = {
             "statistics": table_stats[0] if table_stats else {},
             "columns": columns,
-            "indexes": indexes
+            "indexes": indexes,
+            "column_stats": {row['column_name']: row for row in column_stats}
         }
     
     return db_structure
 
+def find_serving_index(candidate: Dict[str, Any], indexes: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Find an existing index that already serves a candidate
+
+    An index serves the candidate when it is a btree whose usable leading key columns
+    (see usable_index_prefix) include every key column of the candidate, and, for a
+    partial index, when the query's constants imply the index predicate.
+
+    Args:
+        candidate: Candidate from synthesize_index_candidates()
+        indexes: Existing indexes of the candidate's table
+
+    Returns:
+        The serving index, or None
+    """
+    predicate_columns = [p.split(" ")[0] for p in (candidate.get("predicate") or "").split(" AND ") if p]
+    equality = list(candidate["equality"]) + predicate_columns
+
+    for idx_info in indexes:
+        if idx_info.get("index_type") != "btree":
+            continue
+        prefix = usable_index_prefix(idx_info.get("column_names", []), equality, candidate["range"], candidate["sort"])
+        if not set(candidate["columns"]) <= set(prefix):
+            continue
+        if idx_info.get("predicate"):
+            constants = predicate_constants(idx_info["predicate"])
+            if not constants or any(candidate["constants"].get(c) != v for c, v in constants.items()):
+                continue
+        return idx_info
+
+    return None
+
 def check_existing_indexes(
-    potential_indexes: List[Tuple[str, str]], 
+    candidates: List[Dict[str, Any]], 
     db_structure: Dict[str, Dict[str, Any]]
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    Check which potential indexes already exist
+    Check which index candidates are already served by existing indexes
     
     Args:
-        potential_indexes: List of potential index candidates (table, column)
+        candidates: Index candidates from synthesize_index_candidates()
         db_structure: Database structure information
         
     Returns:
@@ -124,35 +302,120 @@ def check_existing_indexes(
     existing_indexes = []
     missing_indexes = []
     
-    for table, column in potential_indexes:
-        exists = False
-        for idx_info in db_structure.get(table, {}).get("indexes", []):
-            if column in idx_info.get("column_names", []):
-                exists = True
-                existing_indexes.append({
-                    "table": table,
-                    "column": column,
-                    "index_name": idx_info.get("index_name"),
-                    "is_unique": idx_info.get("is_unique"),
-                    "is_primary": idx_info.get("is_primary"),
-                    "index_type": idx_info.get("index_type")
-                })
-                break
+    for candidate in candidates:
+        idx_info = find_serving_index(candidate, db_structure.get(candidate["table"], {}).get("indexes", []))
         
-        if not exists:
-            missing_indexes.append({
-                "table": table,
-                "column": column
+        if idx_info:
+            existing_indexes.append({
+                **candidate,
+                "index_name": idx_info.get("index_name"),
+                "is_unique": idx_info.get("is_unique"),
+                "is_primary": idx_info.get("is_primary"),
+                "index_type": idx_info.get("index_type")
             })
+        else:
+            missing_indexes.append(candidate)
     
     return existing_indexes, missing_indexes
 
+def build_index_ddl(
+    table: str,
+    columns: List[str],
+    index_name: str = None,
+    include: List[str] = None,
+    predicate: str = None
+) -> str:
+    """
+    Build a CREATE INDEX statement for the given table and columns
+
+    Args:
+        table: Table name
+        columns: Ordered list of key columns
+        index_name: Optional index name (HypoPG generates its own when omitted)
+        include: Optional non-key columns for index-only scans (INCLUDE)
+        predicate: Optional partial index predicate (WHERE)
+
+    Returns:
+        CREATE INDEX statement
+    """
+    name = f"{index_name} " if index_name else ""
+    ddl = f"CREATE INDEX {name}ON {table}({', '.join(columns)})"
+    if include:
+        ddl += f" INCLUDE ({', '.join(include)})"
+    if predicate:
+        ddl += f" WHERE {predicate}"
+    return ddl
+
+def describe_index(idx: Dict[str, Any]) -> str:
+    """Short one-line description of an index candidate, e.g. orders(customer_id, created_at) INCLUDE (total)"""
+    description = f"{idx['table']}({', '.join(idx['columns'])})"
+    if idx.get("include"):
+        description += f" INCLUDE ({', '.join(idx['include'])})"
+    if idx.get("predicate"):
+        description += f" WHERE {idx['predicate']}"
+    return description
+
+def candidate_index_name(idx: Dict[str, Any]) -> str:
+    """Index name for a candidate, e.g. idx_orders_customer_id_created_at"""
+    name = f"idx_{idx['table']}_{'_'.join(idx['columns'])}"
+    if idx.get("predicate"):
+        name += "_partial"
+    return name[:63]
+
+def index_recommendations_result(
+    query: str,
+    plan_json: Dict[str, Any],
+    db_structure: Dict[str, Dict[str, Any]],
+    existing_indexes: List[Dict[str, Any]],
+    missing_indexes: List[Dict[str, Any]],
+    hypothetical_results: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """
+    Typed form of the index recommendations, for the json and compact output formats
+
+    Each recommendation carries its DDL and a score: the plan cost reduction in
+    percent from the what-if analysis, or None when HypoPG was not used.
+    Takes the arguments of format_index_recommendations_response().
+    """
+    if hypothetical_results is not None:
+        missing_indexes = hypothetical_results["recommended"]
+    recommendations = [
+        {
+            "table": idx["table"],
+            "columns": idx["columns"],
+            "include": idx.get("include") or [],
+            "predicate": idx.get("predicate"),
+            "reason": idx["reason"],
+            "score": idx.get("cost_reduction_percent"),
+            "estimated_cost": idx.get("estimated_cost"),
+            "ddl": build_index_ddl(idx["table"], idx["columns"], candidate_index_name(idx),
+                                   idx.get("include"), idx.get("predicate"))
+        }
+        for idx in missing_indexes
+    ]
+    return {
+        "query": query,
+        "plan_total_cost": plan_json.get("Plan", {}).get("Total Cost"),
+        "plan_rows": plan_json.get("Plan", {}).get("Plan Rows"),
+        "baseline_cost": hypothetical_results["baseline_cost"] if hypothetical_results is not None else None,
+        "recommendations": recommendations,
+        "dropped_candidates": [
+            {"index": describe_index(idx), "reason": idx["reason"]}
+            for idx in (hypothetical_results or {}).get("dropped", [])
+        ],
+        "already_served": [
+            {"index": describe_index(idx), "served_by": idx["index_name"]} for idx in existing_indexes
+        ],
+        "tables": db_structure
+    }
+
 def format_index_recommendations_response(
     query: str,
     plan_json: Dict[str, Any],
     db_structure: Dict[str, Dict[str, Any]],
     existing_indexes: List[Dict[str, Any]],
-    missing_indexes: List[Dict[str, Any]]
+    missing_indexes: List[Dict[str, Any]],
+    hypothetical_results: Dict[str, Any] = None
 ) -> str:
     """
     Format index recommendations as a markdown response
@@ -163,6 +426,7 @@ def format_index_recommendations_response(
         db_structure: Database structure information
         existing_indexes: List of existing indexes
         missing_indexes: List of missing indexes
+        hypothetical_results: Optional HypoPG what-if results from evaluate_hypothetical_indexes()
         
     Returns:
         Formatted markdown string with recommendations
@@ -182,7 +446,12 @@ def format_index_recommendations_response(
         response += "- **Existing Indexes**:\n"
         for idx in info.get("indexes", []):
             idx_type = "PRIMARY KEY" if idx.get("is_primary") else ("UNIQUE" if idx.get("is_unique") else "INDEX")
-            response += f"  - `{idx.get('index_name')}` ({idx_type}) on columns: {', '.join(idx.get('column_names', []))}\n"
+            response += f"  - `{idx.get('index_name')}` ({idx_type}) on columns: {', '.join(idx.get('column_names', []))}"
+            if idx.get("include_columns"):
+                response += f" INCLUDE ({', '.join(idx['include_columns'])})"
+            if idx.get("predicate"):
+                response += f" WHERE {idx['predicate']}"
+            response += "\n"
         
         response += "\n"
     
@@ -192,22 +461,38 @@ def format_index_recommendations_response(
     response += f"- **Estimated Cost**: {plan_json.get('Plan', {}).get('Total Cost', 0)}\n"
     response += f"- **Estimated Rows**: {plan_json.get('Plan', {}).get('Plan Rows', 0)}\n\n"
     
+    # Keep only the candidates the planner would actually use when what-if results are available
+    if hypothetical_results is not None:
+        missing_indexes = hypothetical_results["recommended"]
+        response += "### What-If Analysis (HypoPG)\n\n"
+        response += f"- **Baseline Cost**: {hypothetical_results['baseline_cost']}\n"
+        for idx in hypothetical_results["recommended"]:
+            response += (f"- `{describe_index(idx)}`: cost {idx['estimated_cost']} "
+                         f"(-{idx['cost_reduction']:.2f}, {idx['cost_reduction_percent']:.1f}%)\n")
+        for idx in hypothetical_results["dropped"]:
+            response += f"- `{describe_index(idx)}`: dropped ({idx['reason']})\n"
+        response += "\n"
+    
     # Add index recommendations
     response += "### Recommended Indexes\n\n"
     
-    if not missing_indexes:
+    if not missing_indexes and hypothetical_results is not None:
+        response += "None of the candidate indexes changed the query plan. No new indexes recommended.\n\n"
+    elif not missing_indexes:
         response += "All potential index candidates are already indexed. No new indexes recommended.\n\n"
     else:
         response += "Based on the query analysis and database structure, the following new indexes are recommended:\n\n"
         
         for idx in missing_indexes:
-            response += f"- Add index on `{idx['table']}({idx['column']})`\n"
+            response += f"- Add index on `{describe_index(idx)}` ({idx['reason']})\n"
         
         response += "\n### SQL Commands for Recommended Indexes\n\n"
         response += "```sql\n"
         
         for idx in missing_indexes:
-            response += f"CREATE INDEX idx_{idx['table']}_{idx['column']} ON {idx['table']}({idx['column']});\n"
+            response += build_index_ddl(
+                idx['table'], idx['columns'], candidate_index_name(idx), idx.get('include'), idx.get('predicate')
+            ) + ";\n"
         
         response += "```\n"
     
@@ -216,7 +501,7 @@ def format_index_recommendations_response(
         response += "\n### Existing Indexes Used by This Query\n\n"
         for idx in existing_indexes:
             idx_type = "PRIMARY KEY" if idx.get("is_primary") else ("UNIQUE" if idx.get("is_unique") else "INDEX")
-            response += f"- Column `{idx['column']}` on table `{idx['table']}` is already indexed by `{idx['index_name']}` ({idx_type})\n"
+            response += f"- `{describe_index(idx)}` is already served by `{idx['index_name']}` ({idx_type})\n"
     
     # Add note about testing
     response += "\n**Note**: Before creating indexes, test them in a staging environment and monitor their impact on both read and write performance.\n"
@@ -0,0 +1,214 @@
+"""
+Lock and blocking-chain analysis.
+
+Builds the blocking graph of a pg_stat_activity snapshot (pg_blocking_pids is only
+evaluated for sessions waiting on a lock), finds the root blockers and the depth of
+each chain, and groups waiting sessions by wait event. Several snapshots can be
+combined to tell transient blocking from persistent blocking.
+"""
+from typing import List, Dict, Any, Set, Tuple
+from db.connector import PostgresConnector
+from db.queries import LOCK_SNAPSHOT_QUERY, CLEAR_STATS_SNAPSHOT_QUERY
+
+PERSISTENT_FRACTION = 0.5   # a root blocker seen in at least this share of samples is persistent
+
+def take_lock_snapshot(connector: PostgresConnector) -> List[Dict[str, Any]]:
+    """
+    Take one snapshot of client sessions, their wait events and blockers
+
+    Args:
+        connector: PostgresConnector instance with active connection
+
+    Returns:
+        List of session rows from LOCK_SNAPSHOT_QUERY
+    """
+    # pg_stat_activity is cached per transaction; drop the cache so every sample is fresh
+    connector.execute_query(CLEAR_STATS_SNAPSHOT_QUERY)
+    return connector.execute_query(LOCK_SNAPSHOT_QUERY)
+
+def analyze_blocking(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the blocking graph of one snapshot
+
+    Args:
+        sessions: Result of take_lock_snapshot()
+
+    Returns:
+        Dictionary with:
+            roots: root blockers (blocking others, not blocked themselves), each with
+                   the number of sessions blocked directly/transitively and the chain depth
+            waiters: number of sessions blocked by another session
+            max_depth: longest blocking chain
+            wait_events: wait_event_type:wait_event -> number of sessions waiting on it
+            deadlock_pids: sessions in a blocking cycle (normally resolved by deadlock_timeout)
+    """
+    by_pid = {session["pid"]: session for session in sessions}
+    blocks = {}  # blocker pid -> pids it blocks directly
+    blocked = set()
+    for session in sessions:
+        for blocker in session.get("blocked_by") or []:
+            blocks.setdefault(blocker, []).append(session["pid"])
+            blocked.add(session["pid"])
+
+    wait_events = {}
+    for session in sessions:
+        if session.get("wait_event_type") and session.get("state") != "idle":
+            event = f"{session['wait_event_type']}:{session['wait_event']}"
+            wait_events[event] = wait_events.get(event, 0) + 1
+
+    roots = []
+    reached: Set[int] = set()
+    for pid in blocks:
+        if pid in blocked:
+            continue
+        depth, members = chain_members(pid, blocks)
+        reached |= members
+        session = by_pid.get(pid, {"pid": pid})
+        roots.append({
+            "pid": pid,
+            "session": session,
+            "direct": len(blocks[pid]),
+            "total": len(members) - 1,
+            "depth": depth
+        })
+
+    roots.sort(key=lambda x: (x["total"], x["depth"]), reverse=True)
+
+    return {
+        "roots": roots,
+        "waiters": len(blocked),
+        "max_depth": max((root["depth"] for root in roots), default=0),
+        "wait_events": dict(sorted(wait_events.items(), key=lambda x: x[1], reverse=True)),
+        "deadlock_pids": sorted(blocked - reached),
+        "sessions": len(sessions)
+    }
+
+def chain_members(root: int, blocks: Dict[int, List[int]]) -> Tuple[int, Set[int]]:
+    """Breadth-first walk from a root blocker: (chain depth, set of pids in the chain including the root)"""
+    members = {root}
+    frontier = [root]
+    depth = 0
+    while frontier:
+        next_frontier = []
+        for pid in frontier:
+            for waiter in blocks.get(pid, ()):
+                if waiter not in members:
+                    members.add(waiter)
+                    next_frontier.append(waiter)
+        if next_frontier:
+            depth += 1
+        frontier = next_frontier
+    return depth, members
+
+def summarize_samples(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine several analyze_blocking() results into a transient/persistent view
+
+    Root blockers are matched across samples by pid. A root seen in at least
+    PERSISTENT_FRACTION of the samples, including the last one, is persistent.
+
+    Args:
+        samples: analyze_blocking() results in sampling order
+
+    Returns:
+        Dictionary with per-root occurrence counts and persistence, wait event totals
+        and the peak number of waiters/chain depth
+    """
+    count = len(samples)
+    roots = {}
+    wait_events = {}
+    for position, sample in enumerate(samples):
+        for root in sample["roots"]:
+            entry = roots.setdefault(root["pid"], {"pid": root["pid"], "samples": 0, "max_total": 0, "max_depth": 0,
+                                                   "session": root["session"], "in_last": False})
+            entry["samples"] += 1
+            entry["max_total"] = max(entry["max_total"], root["total"])
+            entry["max_depth"] = max(entry["max_depth"], root["depth"])
+            entry["session"] = root["session"]
+            entry["in_last"] = position == count - 1
+        for event, waiting in sample["wait_events"].items():
+            wait_events[event] = wait_events.get(event, 0) + waiting
+
+    for entry in roots.values():
+        entry["persistent"] = entry["in_last"] and entry["samples"] >= PERSISTENT_FRACTION * count
+
+    return {
+        "samples": count,
+        "roots": sorted(roots.values(), key=lambda x: (x["persistent"], x["samples"], x["max_total"]), reverse=True),
+        "peak_waiters": max((s["waiters"] for s in samples), default=0),
+        "peak_depth": max((s["max_depth"] for s in samples), default=0),
+        "wait_events": {event: total / count for event, total in sorted(wait_events.items(), key=lambda x: x[1], reverse=True)}
+    }
+
+def describe_session(session: Dict[str, Any]) -> str:
+    """One-line description of a session for the blocking report"""
+    parts = [f"pid {session['pid']}"]
+    if session.get("usename"):
+        parts.append(f"user {session['usename']}")
+    if session.get("application_name"):
+        parts.append(f"app {session['application_name']}")
+    if session.get("state"):
+        parts.append(session["state"])
+    if session.get("xact_seconds") is not None:
+        parts.append(f"xact {float(session['xact_seconds']):.1f}s")
+    return ", ".join(parts)
+
+def format_blocking_response(snapshot: Dict[str, Any], sessions: List[Dict[str, Any]], summary: Dict[str, Any] = None) -> str:
+    """
+    Format a blocking analysis as a markdown response
+
+    Args:
+        snapshot: analyze_blocking() result of the last sample
+        sessions: Session rows of the last sample
+        summary: summarize_samples() result when several samples were taken
+
+    Returns:
+        Formatted markdown string
+    """
+    response = "## Lock and Blocking Analysis\n\n"
+    response += f"- **Sessions**: {snapshot['sessions']}\n"
+    response += f"- **Blocked Sessions**: {snapshot['waiters']}\n"
+    response += f"- **Root Blockers**: {len(snapshot['roots'])}\n"
+    response += f"- **Longest Chain**: {snapshot['max_depth']}\n"
+    if summary:
+        response += (f"- **Sampling**: {summary['samples']} samples, peak {summary['peak_waiters']} blocked sessions, "
+                     f"peak chain depth {summary['peak_depth']}\n")
+    response += "\n"
+
+    if snapshot["deadlock_pids"]:
+        response += (f"⚠️ Sessions {', '.join(map(str, snapshot['deadlock_pids']))} block each other in a cycle "
+                     "(deadlock pending detection after deadlock_timeout).\n\n")
+
+    if summary and summary["roots"]:
+        response += "### Root Blockers Across Samples\n\n"
+        response += "| PID | Seen In | Max Blocked | Max Depth | Classification | Session |\n"
+        response += "|-----|---------|-------------|-----------|----------------|---------|\n"
+        for root in summary["roots"]:
+            response += (f"| {root['pid']} | {root['samples']}/{summary['samples']} | {root['max_total']} | {root['max_depth']} "
+                         f"| {'persistent' if root['persistent'] else 'transient'} | {describe_session(root['session'])} |\n")
+        response += "\n"
+
+    if snapshot["roots"]:
+        response += "### Current Blocking Chains\n\n"
+        for root in snapshot["roots"]:
+            session = root["session"]
+            response += f"**Root blocker**: {describe_session(session)} — blocks {root['direct']} directly, {root['total']} in total (depth {root['depth']})\n"
+            if session.get("query"):
+                response += f"```sql\n{session['query']}\n```\n"
+            for session_row in sessions:
+                if root["pid"] in (session_row.get("blocked_by") or []):
+                    response += f"- waiting: {describe_session(session_row)} on {session_row.get('waiting_for') or 'lock'}\n"
+            response += f"\nTo end it: `SELECT pg_cancel_backend({root['pid']});` (or `pg_terminate_backend` if idle in transaction)\n\n"
+    elif not summary or not summary["roots"]:
+        response += "No blocked sessions.\n\n"
+
+    events = summary["wait_events"] if summary else snapshot["wait_events"]
+    if events:
+        response += "### Sessions by Wait Event\n\n"
+        response += "| Wait Event | Sessions |\n|------------|----------|\n"
+        for event, waiting in events.items():
+            response += f"| {event} | {waiting:.1f} |\n" if summary else f"| {event} | {waiting} |\n"
+        if summary:
+            response += "\n(average sessions per sample)\n"
+
+    return response
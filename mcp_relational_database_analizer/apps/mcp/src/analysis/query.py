@@ -1,10 +1,13 @@
 """
 Functions for analyzing SQL queries and extracting information from them.
 """
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+import json
 import re
 from db.connector import PostgresConnector
 from db.queries import TABLE_STATS_QUERY, INDEX_INFO_QUERY, SCHEMA_INFO_QUERY
+from analysis.schema_model import group_rows
+from response_builder import ResponseBuilder
 
 def extract_tables_from_query(query: str) -> List[str]:
     """
@@ -59,6 +62,31 @@ def extract_tables_from_query(query: str) -> List[str]:
     
     return tables
 
+def get_execution_plan(connector: PostgresConnector, query: str, analyze: bool = False) -> Dict[str, Any]:
+    """
+    Run EXPLAIN (FORMAT JSON) for a query and return the top-level plan object
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        query: SQL query to explain
+        analyze: Whether to actually execute the query (EXPLAIN ANALYZE)
+
+    Returns:
+        Plan dictionary (with 'Plan' key), or an empty dictionary on failure
+    """
+    options = "FORMAT JSON, ANALYZE" if analyze else "FORMAT JSON"
+    result = connector.execute_query(f"EXPLAIN ({options}) {query}")
+    if not result:
+        return {}
+
+    plan_json = result[0]['QUERY PLAN']
+    if isinstance(plan_json, str):
+        plan_json = json.loads(plan_json)
+    if isinstance(plan_json, list):
+        plan_json = plan_json[0] if plan_json else {}
+
+    return plan_json
+
 def get_table_statistics(connector: PostgresConnector, tables: List[str]) -> List[Dict[str, Any]]:
     """
     Get statistics for the specified tables
@@ -125,7 +153,8 @@ def format_query_analysis_response(
     index_info: List[Dict[str, Any]],
     patterns: List[Dict[str, Any]],
     anti_patterns: List[Dict[str, Any]],
-    complexity: Dict[str, Any]
+    complexity: Dict[str, Any],
+    max_bytes: Optional[int] = None
 ) -> str:
     """
     Format query analysis results as a markdown response
@@ -140,6 +169,7 @@ def format_query_analysis_response(
         patterns: Detected query patterns
         anti_patterns: Detected query anti-patterns
         complexity: Query complexity metrics
+        max_bytes: Response byte budget; the execution plan is cut first (None for no limit)
         
     Returns:
         Formatted markdown string with analysis
@@ -150,83 +180,93 @@ def format_query_analysis_response(
     total_time = planning_time + execution_time
     
     # Format the response
-    response = "## Query Analysis\n\n"
+    response = ResponseBuilder(max_bytes, truncation_hint="The execution plan is the last section.")
+    response.line("## Query Analysis")
+    response.line()
     
     # Add query complexity analysis
-    response += "### Query Complexity Analysis\n"
-    response += f"- **Complexity Score**: {complexity['complexity_score']}\n"
-    response += f"- **Join Count**: {complexity['join_count']}\n"
-    response += f"- **Subquery Count**: {complexity['subquery_count']}\n"
-    response += f"- **Aggregation Count**: {complexity['aggregation_count']}\n"
+    response.line("### Query Complexity Analysis")
+    response.line(f"- **Complexity Score**: {complexity['complexity_score']}")
+    response.line(f"- **Join Count**: {complexity['join_count']}")
+    response.line(f"- **Subquery Count**: {complexity['subquery_count']}")
+    response.line(f"- **Aggregation Count**: {complexity['aggregation_count']}")
     
     if complexity['warnings']:
-        response += "- **Warnings**:\n"
+        response.line("- **Warnings**:")
         for warning in complexity['warnings']:
-            response += f"  - {warning}\n"
-    response += "\n"
+            response.line(f"  - {warning}")
+    response.line()
     
     # Add execution metrics
-    response += "### Execution Metrics\n"
-    response += f"- **Total Time**: {total_time:.2f}ms\n"
-    response += f"- **Planning Time**: {planning_time:.2f}ms\n"
-    response += f"- **Execution Time**: {execution_time:.2f}ms\n\n"
+    response.line("### Execution Metrics")
+    response.line(f"- **Total Time**: {total_time:.2f}ms")
+    response.line(f"- **Planning Time**: {planning_time:.2f}ms")
+    response.line(f"- **Execution Time**: {execution_time:.2f}ms")
+    response.line()
     
     # Add plan analysis
-    response += "### Plan Analysis\n"
-    response += f"- **Plan Type**: {plan_json.get('Plan', {}).get('Node Type', 'Unknown')}\n"
-    response += f"- **Estimated Cost**: {plan_json.get('Plan', {}).get('Total Cost', 0)}\n"
-    response += f"- **Estimated Rows**: {plan_json.get('Plan', {}).get('Plan Rows', 0)}\n"
-    response += f"- **Actual Rows**: {plan_json.get('Plan', {}).get('Actual Rows', 'N/A')}\n\n"
+    response.line("### Plan Analysis")
+    response.line(f"- **Plan Type**: {plan_json.get('Plan', {}).get('Node Type', 'Unknown')}")
+    response.line(f"- **Estimated Cost**: {plan_json.get('Plan', {}).get('Total Cost', 0)}")
+    response.line(f"- **Estimated Rows**: {plan_json.get('Plan', {}).get('Plan Rows', 0)}")
+    response.line(f"- **Actual Rows**: {plan_json.get('Plan', {}).get('Actual Rows', 'N/A')}")
+    response.line()
+    
+    # Group columns and indexes by table once instead of rescanning them for every table
+    columns_by_table = group_rows(schema_info, 'table_name')
+    indexes_by_table = group_rows(index_info, 'table_name')
     
     # Add schema information
-    response += "### Tables and Columns\n\n"
+    response.line("### Tables and Columns")
+    response.line()
     for table in tables_involved:
-        table_columns = [col for col in schema_info if col.get('table_name') == table]
+        table_columns = columns_by_table.get(table)
         if table_columns:
-            response += f"**{table}**:\n"
+            response.line(f"**{table}**:")
             for col in table_columns:
                 nullable = "NULL" if col.get('is_nullable') == 'YES' else "NOT NULL"
-                response += f"- {col.get('column_name')} ({col.get('data_type')}, {nullable})\n"
-            response += "\n"
+                response.line(f"- {col.get('column_name')} ({col.get('data_type')}, {nullable})")
+            response.line()
     
     # Add index information
-    response += "### Index Information\n\n"
+    response.line("### Index Information")
+    response.line()
     for table in tables_involved:
-        table_indexes = [idx for idx in index_info if idx.get('table_name') == table]
+        table_indexes = indexes_by_table.get(table)
         if table_indexes:
-            response += f"**{table}**:\n"
+            response.line(f"**{table}**:")
             for idx in table_indexes:
-                response += f"- {idx.get('index_name')}: {idx.get('index_definition')}\n"
-                response += f"  - Scans: {idx.get('index_scans', 0)}\n"
-            response += "\n"
+                response.line(f"- {idx.get('index_name')}: {idx.get('index_definition')}")
+                response.line(f"  - Scans: {idx.get('index_scans', 0)}")
+            response.line()
         else:
-            response += f"**{table}**: No indexes found\n\n"
+            response.line(f"**{table}**: No indexes found")
+            response.line()
     
     # Add identified issues
-    response += "### Identified Issues\n\n"
+    response.line("### Identified Issues")
+    response.line()
     if patterns:
         for pattern in patterns:
-            response += f"- {pattern['description']} (Severity: {pattern['severity']})\n"
+            response.line(f"- {pattern['description']} (Severity: {pattern['severity']})")
     
     if anti_patterns:
         for issue in anti_patterns:
-            response += f"- {issue['issue']}\n"
-            response += f"  - Suggestion: {issue['suggestion']}\n"
+            response.line(f"- {issue['issue']}")
+            response.line(f"  - Suggestion: {issue['suggestion']}")
     
     if not patterns and not anti_patterns:
-        response += "- No significant issues detected in the execution plan\n"
+        response.line("- No significant issues detected in the execution plan")
     
-    response += "\n"
+    response.line()
     
     # Add recommendations section for the model to fill
-    response += "### Recommendations\n\n"
+    response.line("### Recommendations")
+    response.line()
     # This section will be filled by the model based on the analysis data
     
-    # Add execution plan for reference
-    response += "### Execution Plan\n"
-    response += "```json\n"
-    import json
-    response += json.dumps(plan_json, indent=2)
-    response += "\n```\n"
+    # Add execution plan for reference (encoded incrementally, stops at the byte budget)
+    response.line("### Execution Plan")
+    response.json_block(plan_json)
     
-    return response
\ No newline at end of file
+    return response.build()
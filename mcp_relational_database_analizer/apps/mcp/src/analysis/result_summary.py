@@ -0,0 +1,310 @@
+"""
+Streaming summaries of query results.
+
+Summarizes a result of any size in one pass and constant memory: per column the
+null ratio, a HyperLogLog distinct estimate, min/max, the most frequent values
+(count-min sketch plus a small candidate set) and numeric quantiles from a
+reservoir sample, together with a reservoir sample of rows. The summary is then
+formatted within a token budget instead of dumping the rows.
+"""
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from array import array
+from decimal import Decimal
+import math
+import random
+
+from response_builder import ResponseBuilder, markdown_cell
+
+MASK64 = (1 << 64) - 1
+HLL_PRECISION = 12              # 4096 registers: about 1.6% standard error
+SKETCH_WIDTH = 2048
+SKETCH_DEPTH = 4
+TOP_K = 10
+QUANTILE_SAMPLE = 2048
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+MAX_CELL_CHARS = 80             # sampled and top-k values are kept (and shown) cut to this length
+CHARS_PER_TOKEN = 4
+
+def value_hash(value: Any) -> int:
+    """
+    64-bit hash of a value, with every input bit affecting every output bit
+
+    hash() is the identity on integers, so it goes through the splitmix64
+    finalizer before HyperLogLog and the sketches read its high and low bits.
+    Python's hash() is salted per process, which is fine here: hashes are only
+    compared within one summary.
+    """
+    try:
+        h = hash(value)
+    except TypeError:   # json/array columns
+        h = hash(str(value))
+    h = (h + 0x9E3779B97F4A7C15) & MASK64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK64
+    return h ^ (h >> 31)
+
+class HyperLogLog:
+    """Distinct count estimator over 64-bit hashes"""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self.rest_bits = 64 - precision
+
+    def add(self, h: int) -> None:
+        index = h >> self.rest_bits
+        rank = self.rest_bits - (h & ((1 << self.rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))    # linear counting for small cardinalities
+        return round(raw)
+
+class CountMinSketch:
+    """Approximate frequencies over 64-bit hashes; never underestimates"""
+
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH):
+        self.width = width
+        self.rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+
+    def add(self, h: int) -> int:
+        """Count one occurrence and return the estimated count of the value"""
+        width = self.width
+        position, step = h & 0xFFFFFFFF, (h >> 32) | 1
+        estimate = MASK64
+        for row in self.rows:
+            position = (position + step) % width
+            count = row[position] + 1
+            row[position] = count
+            if count < estimate:
+                estimate = count
+        return estimate
+
+    def error(self, total: int) -> float:
+        """Overestimate bound e * total / width, exceeded with probability about e^-depth"""
+        return math.e * total / self.width
+
+class TopK:
+    """Heavy hitters: a count-min sketch plus the k values with the highest estimates seen so far"""
+
+    def __init__(self, k: int = TOP_K):
+        self.k = k
+        self.sketch = CountMinSketch()
+        self.candidates: Dict[int, List[Any]] = {}    # hash -> [estimate, value]
+        self.floor = 0
+
+    def add(self, h: int, value: Any) -> None:
+        estimate = self.sketch.add(h)
+        candidates = self.candidates
+        candidate = candidates.get(h)
+        if candidate is not None:
+            candidate[0] = estimate
+            return
+        if estimate <= self.floor and len(candidates) >= self.k:
+            return
+        if len(candidates) >= self.k:
+            weakest, lowest = None, MASK64
+            for key, (count, _) in candidates.items():
+                if count < lowest:
+                    weakest, lowest = key, count
+            del candidates[weakest]
+        candidates[h] = [estimate, display_value(value)]
+        self.floor = min(count for count, _ in candidates.values())
+
+    def items(self, total: int) -> List[Tuple[str, int]]:
+        """(value, estimated count) of the candidates whose count is above the sketch error, largest first"""
+        error = self.sketch.error(total)
+        return sorted(((value, estimate) for estimate, value in self.candidates.values()
+                       if estimate > 1 and estimate > error), key=lambda x: -x[1])
+
+class Reservoir:
+    """
+    Uniform sample of at most `size` items from a stream
+
+    Algorithm L: once the reservoir is full, the position of the next item to keep
+    is drawn directly, so skipped items cost a counter increment and no random draw.
+    """
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.items: List[Any] = []
+        self.seen = 0
+        self.rng = rng
+        self.weight = 1.0
+        self.next = size
+
+    def add(self, item: Any) -> None:
+        self.seen += 1
+        if self.seen <= self.size:
+            self.items.append(item)
+            if self.seen == self.size:
+                self._skip()
+        elif self.seen == self.next:
+            self.items[self.rng.randrange(self.size)] = item
+            self._skip()
+
+    def _skip(self) -> None:
+        rng = self.rng
+        self.weight *= math.exp(math.log(1.0 - rng.random()) / self.size)
+        self.next += int(math.log(1.0 - rng.random()) / math.log(1.0 - self.weight)) + 1 if self.weight < 1.0 else 1
+
+def display_value(value: Any) -> str:
+    """Value as shown in a summary, cut to MAX_CELL_CHARS"""
+    text = str(value)
+    return text if len(text) <= MAX_CELL_CHARS else text[:MAX_CELL_CHARS - 1] + "…"
+
+class ColumnSummary:
+    """Constant-memory statistics of one result column"""
+
+    def __init__(self, name: str, rng: random.Random):
+        self.name = name
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.top = TopK()
+        self.minimum = None
+        self.maximum = None
+        self.comparable = True
+        self.numbers = Reservoir(QUANTILE_SAMPLE, rng)
+        self.text_length = 0
+        self.texts = 0
+        self.max_text_length = 0
+
+    def add(self, value: Any) -> None:
+        if value is None:
+            self.nulls += 1
+            return
+        h = value_hash(value)
+        self.distinct.add(h)
+        self.top.add(h, value)
+
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            self.numbers.add(float(value))
+        elif isinstance(value, str):
+            self.texts += 1
+            self.text_length += len(value)
+            if len(value) > self.max_text_length:
+                self.max_text_length = len(value)
+
+        if self.comparable:
+            try:
+                if self.minimum is None or value < self.minimum:
+                    self.minimum = value
+                if self.maximum is None or value > self.maximum:
+                    self.maximum = value
+            except TypeError:
+                self.comparable = False
+                self.minimum = self.maximum = None
+
+    def result(self, rows: int) -> Dict[str, Any]:
+        non_null = rows - self.nulls
+        summary = {
+            "column": self.name,
+            "null_percent": round(self.nulls / rows * 100, 2) if rows else 0.0,
+            "distinct_estimate": min(self.distinct.estimate(), non_null),
+            "min": display_value(self.minimum) if self.minimum is not None else None,
+            "max": display_value(self.maximum) if self.maximum is not None else None,
+            "avg_text_length": round(self.text_length / self.texts, 1) if self.texts else None,
+            "max_text_length": self.max_text_length if self.texts else None,
+            "quantiles": None,
+            "top_values": []
+        }
+        if self.numbers.items:
+            ordered = sorted(self.numbers.items)
+            summary["quantiles"] = {
+                f"p{round(q * 100)}": ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in QUANTILES
+            }
+        # top values only say something when they repeat more than the sketch error
+        summary["top_values"] = self.top.items(non_null)
+        return summary
+
+def summarize_rows(stream: Iterator[Any], sample_rows: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """
+    Summarize a streamed result in one pass
+
+    Args:
+        stream: PostgresConnector.stream_query() output: column names, then row tuples
+        sample_rows: Size of the uniform row sample
+        seed: Seed of the sampling, for repeatable summaries
+
+    Returns:
+        Dictionary with rows (row count), columns (per-column statistics) and sample
+        (column names and sampled rows, cells cut to MAX_CELL_CHARS)
+    """
+    rng = random.Random(seed)
+    names = next(stream)
+    columns = [ColumnSummary(name, rng) for name in names]
+    sample = Reservoir(sample_rows, rng)
+    adders = [column.add for column in columns]
+    rows = 0
+    for row in stream:
+        rows += 1
+        for add, value in zip(adders, row):
+            add(value)
+        sample.add(row)
+
+    return {
+        "rows": rows,
+        "columns": [column.result(rows) for column in columns],
+        "sample": {
+            "columns": names,
+            "rows": [[None if value is None else display_value(value) for value in row] for row in sample.items]
+        }
+    }
+
+def format_result_summary_response(summary: Dict[str, Any], token_budget: int = 2000) -> str:
+    """
+    Format a result summary as markdown within about token_budget tokens
+
+    Column statistics come first; sample rows and top values fill what the budget leaves.
+
+    Args:
+        summary: summarize_rows() result
+        token_budget: Approximate size limit of the response in tokens
+
+    Returns:
+        Formatted markdown string
+    """
+    response = ResponseBuilder(token_budget * CHARS_PER_TOKEN,
+                               truncation_hint="Raise token_budget or select fewer columns.")
+    response.line(f"Query returned {summary['rows']:,} rows (summarized server-side; values cut to {MAX_CELL_CHARS} characters).")
+    response.line()
+    response.line("### Columns")
+    response.line()
+
+    def quantile_text(column):
+        quantiles = column["quantiles"]
+        return " / ".join(f"{value:.6g}" for value in quantiles.values()) if quantiles else ""
+
+    response.table(
+        ["Column", "Null %", "Distinct ~", "Min", "Max", "p1 / p25 / p50 / p75 / p99", "Avg Len"],
+        ([column["column"], f"{column['null_percent']:.1f}", f"{column['distinct_estimate']:,}",
+          column["min"] if column["min"] is not None else "", column["max"] if column["max"] is not None else "",
+          quantile_text(column), column["avg_text_length"] if column["avg_text_length"] is not None else ""]
+         for column in summary["columns"])
+    )
+    response.line()
+
+    if summary["sample"]["rows"]:
+        response.line(f"### Sample ({len(summary['sample']['rows'])} random rows)")
+        response.line()
+        response.table(summary["sample"]["columns"],
+                       ([value if value is not None else "NULL" for value in row] for row in summary["sample"]["rows"]))
+        response.line()
+
+    frequent = [column for column in summary["columns"] if column["top_values"]]
+    if frequent:
+        response.line("### Most Frequent Values (approximate counts)")
+        response.line()
+        for column in frequent:
+            values = ", ".join(f"`{markdown_cell(value)}` ×{count:,}" for value, count in column["top_values"][:5])
+            if not response.line(f"- **{column['column']}**: {values}"):
+                break
+
+    return response.build()
@@ -0,0 +1,218 @@
+"""
+Table row counts without full scans.
+
+Counts are answered from statistics by default: pg_class.reltuples scaled to the
+current table size (what the planner uses), or the statistics collector's
+n_live_tup when many rows changed since the last ANALYZE. Every count carries its
+freshness (last ANALYZE, rows modified since). On request a count escalates to a
+TABLESAMPLE estimate with a confidence interval or to an exact count(*), run with
+parallel workers; exact counts are cached for a while per database and table.
+"""
+from typing import Dict, List, Any, Optional, Tuple
+import threading
+import time
+
+from db.connector import PostgresConnector
+from db.catalog import catalog_cache_key
+from db.queries import ROW_COUNT_ESTIMATES_QUERY, PARALLEL_WORKERS_SETTING_QUERY, SET_PARALLEL_WORKERS_QUERY
+from analysis.approximate import DEFAULT_SAMPLE_ROWS, choose_sample, count_interval
+from instrumentation import record_cache, register_gauge
+
+COUNT_METHODS = ("estimate", "sample", "exact")
+EXACT_COUNT_TTL_SECONDS = 600
+PARALLEL_WORKERS = 4
+STALE_PERCENT = 10.0     # autovacuum_analyze_scale_factor default: past this, reltuples lags behind
+
+_exact_counts: Dict[Tuple[str, int, str, str], Tuple[int, float]] = {}
+_exact_counts_lock = threading.Lock()
+
+register_gauge("mcp_exact_row_counts", "Exact table row counts held in memory",
+               lambda: [({}, len(_exact_counts))])
+
+def estimate_row_count(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Statistics-based count of one ROW_COUNT_ESTIMATES_QUERY row
+
+    Returns:
+        Dictionary with table, estimate, source ('reltuples', 'n_live_tup' or 'none'),
+        freshness ('fresh', 'stale' or 'never analyzed'), stale_percent, last_analyzed,
+        modified_since_analyze and dead_tuples
+    """
+    modified = row.get("modified_since_analyze")
+    live = row.get("live_tuples")
+    if row.get("analyzed"):
+        estimate, source = row["reltuples_estimate"], "reltuples"
+    elif live is not None:
+        estimate, source = live, "n_live_tup"
+    else:
+        estimate, source = 0, "none"
+
+    stale_percent = round(modified / max(estimate, 1) * 100, 1) if modified is not None else None
+    if not row.get("analyzed") and row.get("last_analyzed") is None:
+        freshness = "never analyzed"
+    elif stale_percent is not None and stale_percent >= STALE_PERCENT:
+        freshness = "stale"
+        # the collector follows inserts and deletes between ANALYZE runs
+        if live is not None and source == "reltuples":
+            estimate, source = live, "n_live_tup"
+    else:
+        freshness = "fresh"
+
+    return {
+        "table": row["qualified_name"],
+        "table_schema": row["table_schema"],
+        "table_name": row["table_name"],
+        "estimate": int(estimate),
+        "source": source,
+        "freshness": freshness,
+        "stale_percent": stale_percent,
+        "last_analyzed": row.get("last_analyzed"),
+        "modified_since_analyze": modified,
+        "dead_tuples": row.get("dead_tuples"),
+        "pages": row.get("pages") or 0
+    }
+
+def cached_exact_count(connector: PostgresConnector, table: str, max_age: float) -> Optional[Tuple[int, float]]:
+    """(count, counted_at) of a cached exact count younger than max_age, else None"""
+    with _exact_counts_lock:
+        cached = _exact_counts.get(catalog_cache_key(connector) + (table,))
+    if cached is not None and time.time() - cached[1] <= max_age:
+        record_cache("exact_row_count", True)
+        return cached
+    record_cache("exact_row_count", False)
+    return None
+
+def exact_row_count(connector: PostgresConnector, table: str, parallel_workers: int = PARALLEL_WORKERS) -> Optional[int]:
+    """
+    count(*) of a table, allowing parallel_workers workers per gather
+
+    Args:
+        table: Table name as returned by regclass (already quoted where needed)
+
+    Returns:
+        The count (cached for later calls), or None when the query failed, e.g. on statement_timeout
+    """
+    previous = connector.execute_query(PARALLEL_WORKERS_SETTING_QUERY)
+    if parallel_workers and previous and int(previous[0]["workers"]) < parallel_workers:
+        connector.execute_query(SET_PARALLEL_WORKERS_QUERY, [str(parallel_workers)])
+    rows = connector.execute_query(f"SELECT count(*) as count FROM {table}")
+    if rows and previous:
+        connector.execute_query(SET_PARALLEL_WORKERS_QUERY, [previous[0]["workers"]])
+    if not rows:
+        return None
+    count = rows[0]["count"]
+    with _exact_counts_lock:
+        _exact_counts[catalog_cache_key(connector) + (table,)] = (count, time.time())
+    return count
+
+def sampled_row_count(connector: PostgresConnector, table: str, estimate: int, pages: int,
+                      target_rows: int = DEFAULT_SAMPLE_ROWS) -> Optional[Dict[str, Any]]:
+    """
+    Count a table from a TABLESAMPLE sample of about target_rows rows
+
+    Returns:
+        Dictionary with count, interval (95%), sample_method and sample_percent, or None on failure
+    """
+    method, percent = choose_sample(estimate, pages, target_rows)
+    rows = connector.execute_query(
+        f"SELECT count(*) as sampled FROM {table} TABLESAMPLE {method} (%s) REPEATABLE (0)", [percent]
+    )
+    if not rows:
+        return None
+    scale = 100.0 / percent
+    count = round(rows[0]["sampled"] * scale)
+    return {"count": count, "interval": count_interval(count, scale), "sample_method": method, "sample_percent": percent}
+
+def count_rows(
+    connector: PostgresConnector,
+    tables: Optional[List[str]] = None,
+    method: str = "estimate",
+    limit: Optional[int] = 50,
+    max_age: float = EXACT_COUNT_TTL_SECONDS,
+    target_rows: int = DEFAULT_SAMPLE_ROWS,
+    parallel_workers: int = PARALLEL_WORKERS
+) -> List[Dict[str, Any]]:
+    """
+    Row counts of tables, from statistics unless a slower method is requested
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        tables: Table names ('orders', 'sales.orders'), None for all user tables
+        method: 'estimate' (statistics only), 'sample' (TABLESAMPLE) or 'exact' (count(*))
+        limit: Maximum number of tables, largest first (None for all)
+        max_age: Age in seconds up to which a cached exact count is reused
+        target_rows: Rows read per table by the sample method; smaller tables are counted exactly
+        parallel_workers: max_parallel_workers_per_gather for exact counts
+
+    Returns:
+        One dictionary per table: the estimate_row_count() fields plus count, method
+        ('estimate', 'sample' or 'exact'), interval (sample only), cached and counted_at
+        (exact only), and error when the requested count failed
+    """
+    rows = connector.execute_query(ROW_COUNT_ESTIMATES_QUERY, {"tables": tables or None})
+    results = []
+    for row in rows[:limit] if limit else rows:
+        result = estimate_row_count(row)
+        result.update({"count": result["estimate"], "method": "estimate", "interval": None,
+                       "cached": False, "counted_at": None, "error": None})
+        results.append(result)
+
+        cached = cached_exact_count(connector, result["table"], max_age)
+        if cached is not None:
+            result.update({"count": cached[0], "method": "exact", "cached": True, "counted_at": cached[1]})
+            continue
+        if method == "estimate":
+            continue
+
+        if method == "sample" and result["estimate"] > target_rows:
+            sampled = sampled_row_count(connector, result["table"], result["estimate"], result["pages"], target_rows)
+            if sampled is None:
+                result["error"] = "sampled count failed"
+            else:
+                result.update(sampled)
+                result["method"] = "sample"
+            continue
+
+        count = exact_row_count(connector, result["table"], parallel_workers)
+        if count is None:
+            result["error"] = "exact count failed (statement_timeout?)"
+        else:
+            result.update({"count": count, "method": "exact", "counted_at": time.time()})
+    return results
+
+def format_row_counts_response(counts: List[Dict[str, Any]]) -> str:
+    """
+    Format row counts as a markdown response
+
+    Args:
+        counts: Result of count_rows()
+
+    Returns:
+        Formatted markdown string
+    """
+    if not counts:
+        return "No matching tables found."
+
+    response = "## Table Row Counts\n\n"
+    response += f"- **Tables**: {len(counts):,}\n"
+    response += f"- **Total Rows**: {sum(c['count'] for c in counts):,}\n\n"
+    response += "| Table | Rows | Method | 95% Interval | Freshness | Last ANALYZE | Modified Since |\n"
+    response += "|-------|------|--------|--------------|-----------|--------------|----------------|\n"
+    now = time.time()
+    for c in counts:
+        method = c["method"] if c["method"] != "estimate" else f"estimate ({c['source']})"
+        if c["cached"]:
+            method += f", cached {int(now - c['counted_at'])}s ago"
+        if c["error"]:
+            method += f" — {c['error']}"
+        interval = f"{c['interval'][0]:,} – {c['interval'][1]:,}" if c.get("interval") else "-"
+        analyzed = c["last_analyzed"].strftime("%Y-%m-%d %H:%M") if c["last_analyzed"] else "never"
+        modified = f"{c['modified_since_analyze']:,} ({c['stale_percent']}%)" if c["modified_since_analyze"] is not None else "-"
+        response += (f"| `{c['table']}` | {c['count']:,} | {method} | {interval} | {c['freshness']} "
+                     f"| {analyzed} | {modified} |\n")
+
+    response += ("\n**Note**: Estimates come from planner statistics (reltuples, or n_live_tup when more than "
+                 f"{STALE_PERCENT:g}% of the rows changed since the last ANALYZE) and cost no scan. "
+                 "Use method='sample' for a TABLESAMPLE count with a confidence interval or "
+                 "method='exact' for count(*).\n")
+    return response
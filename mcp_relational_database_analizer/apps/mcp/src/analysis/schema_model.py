@@ -0,0 +1,264 @@
+"""
+Compact schema model.
+
+Holds the database structure as struct-of-arrays: one list or typed array per
+attribute, numbers in array('q'/'i'/'b'), repeated strings (schemas, data types,
+defaults) stored once through a string pool, and columns/indexes/foreign keys linked to
+their table by an integer table id. Rows of each kind are grouped per table with a
+counting sort, so "the columns of table t" is a slice of a positions array instead
+of a dict lookup.
+"""
+from typing import Dict, List, Any, Tuple, Iterator, Optional
+from array import array
+from collections import Counter
+
+def group_by_table(table_ids: array, table_count: int) -> Tuple[array, array]:
+    """
+    Counting sort of row positions by table id
+
+    Catalog queries return rows ordered by schema and table, so the ids are usually
+    already sorted and the positions are just 0..n-1.
+
+    Returns:
+        (offsets, positions): the rows of table t are positions[offsets[t]:offsets[t + 1]],
+        in their original order
+    """
+    counts = Counter(table_ids)
+    offsets = array("i", bytes(4 * (table_count + 1)))
+    for t in range(table_count):
+        offsets[t + 1] = offsets[t] + counts.get(t, 0)
+
+    if table_ids == array(table_ids.typecode, sorted(table_ids)):
+        return offsets, array("i", range(len(table_ids)))
+
+    positions = array("i", bytes(4 * len(table_ids)))
+    cursor = array("i", offsets[:table_count])
+    for position, table_id in enumerate(table_ids):
+        positions[cursor[table_id]] = position
+        cursor[table_id] += 1
+    return offsets, positions
+
+def group_rows(rows: List[Dict[str, Any]], *fields: str) -> Dict[Any, List[Dict[str, Any]]]:
+    """
+    Group catalog rows once by the given fields, for per-table lookups
+
+    With one field the keys are its values, with several they are tuples,
+    e.g. group_rows(columns, "table_schema", "table_name")[("public", "orders")].
+    Rows keep their order within each group.
+    """
+    groups = {}
+    if len(fields) == 1:
+        field = fields[0]
+        for row in rows:
+            key = row.get(field)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = group = []
+            group.append(row)
+        return groups
+
+    for row in rows:
+        key = tuple(row.get(field) for field in fields)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = []
+        group.append(row)
+    return groups
+
+class SchemaModel:
+    """
+    Struct-of-arrays view of tables, columns, indexes and foreign keys
+
+    Build it with SchemaModel.from_structure(); table ids are positions in the
+    table_* attributes, row ids of the other kinds are positions in theirs.
+    """
+
+    __slots__ = (
+        "table_schema", "table_name", "table_size", "table_total_size", "table_rows",
+        "table_description", "table_ids",
+        "column_table", "column_name", "column_type", "column_max_length", "column_nullable",
+        "column_default", "column_description",
+        "index_table", "index_name", "index_definition", "index_primary", "index_scans",
+        "index_tuples_read", "index_tuples_fetched", "index_size",
+        "fk_table", "fk_column", "fk_ref_schema", "fk_ref_table", "fk_ref_column",
+        "column_groups", "index_groups", "fk_groups"
+    )
+
+    def __init__(self):
+        self.table_schema: List[str] = []
+        self.table_name: List[str] = []
+        self.table_size = array("q")
+        self.table_total_size = array("q")
+        self.table_rows = array("q")
+        self.table_description: List[str] = []
+        self.table_ids: Dict[Tuple[str, str], int] = {}
+
+        self.column_table = array("i")
+        self.column_name: List[str] = []
+        self.column_type: List[str] = []
+        self.column_max_length = array("i")    # -1: no maximum
+        self.column_nullable = array("b")
+        self.column_default: List[Optional[str]] = []
+        self.column_description: List[str] = []
+
+        self.index_table = array("i")
+        self.index_name: List[str] = []
+        self.index_definition: List[str] = []
+        self.index_primary = array("b")
+        self.index_scans = array("q")
+        self.index_tuples_read = array("q")
+        self.index_tuples_fetched = array("q")
+        self.index_size = array("q")
+
+        self.fk_table = array("i")
+        self.fk_column: List[str] = []
+        self.fk_ref_schema: List[str] = []
+        self.fk_ref_table: List[str] = []
+        self.fk_ref_column: List[str] = []
+
+        self.column_groups = self.index_groups = self.fk_groups = None
+
+    @classmethod
+    def from_structure(cls, db_structure: Dict[str, List[Dict[str, Any]]]) -> "SchemaModel":
+        """
+        Build the model from get_database_structure() rows in one pass per kind
+
+        Columns, indexes and foreign keys of tables missing from the tables list are dropped.
+        """
+        model = cls()
+        table_ids = model.table_ids
+        # one object per distinct repeated string: share(value, value) returns the first copy seen
+        share = {}.setdefault
+
+        for table in db_structure["tables"]:
+            schema = share(table["table_schema"], table["table_schema"])
+            table_ids[(schema, table["table_name"])] = len(model.table_name)
+            model.table_schema.append(schema)
+            model.table_name.append(table["table_name"])
+            model.table_size.append(table.get("table_size_bytes") or 0)
+            model.table_total_size.append(table.get("total_size_bytes") or 0)
+            model.table_rows.append(table.get("estimated_row_count") or 0)
+            description = table.get("table_description") or ""
+            model.table_description.append(share(description, description))
+
+        # bound methods hoisted out of the loops: these run once per column of the database
+        add_table, add_name, add_type = model.column_table.append, model.column_name.append, model.column_type.append
+        add_length, add_nullable = model.column_max_length.append, model.column_nullable.append
+        add_default, add_description = model.column_default.append, model.column_description.append
+        for column in db_structure["columns"]:
+            table_id = table_ids.get((column["table_schema"], column["table_name"]))
+            if table_id is None:
+                continue
+            add_table(table_id)
+            add_name(column["column_name"])
+            value = column["data_type"]
+            add_type(share(value, value))
+            add_length(column.get("character_maximum_length") or -1)
+            add_nullable(column.get("is_nullable") == "YES")
+            value = column.get("column_default")
+            add_default(share(value, value))
+            value = column.get("column_description") or ""
+            add_description(share(value, value))
+
+        for index in db_structure["indexes"]:
+            table_id = table_ids.get((index["table_schema"], index["table_name"]))
+            if table_id is None:
+                continue
+            model.index_table.append(table_id)
+            model.index_name.append(index["index_name"])
+            model.index_definition.append(index["index_definition"])
+            model.index_primary.append(bool(index.get("is_primary")))
+            model.index_scans.append(index.get("index_scans") or 0)
+            model.index_tuples_read.append(index.get("tuples_read") or 0)
+            model.index_tuples_fetched.append(index.get("tuples_fetched") or 0)
+            model.index_size.append(index.get("index_size_bytes") or 0)
+
+        for fk in db_structure["foreign_keys"]:
+            table_id = table_ids.get((fk["table_schema"], fk["table_name"]))
+            if table_id is None:
+                continue
+            model.fk_table.append(table_id)
+            model.fk_column.append(fk["column_name"])
+            model.fk_ref_schema.append(share(fk["foreign_table_schema"], fk["foreign_table_schema"]))
+            model.fk_ref_table.append(share(fk["foreign_table_name"], fk["foreign_table_name"]))
+            model.fk_ref_column.append(fk["foreign_column_name"])
+
+        table_count = len(model.table_name)
+        model.column_groups = group_by_table(model.column_table, table_count)
+        model.index_groups = group_by_table(model.index_table, table_count)
+        model.fk_groups = group_by_table(model.fk_table, table_count)
+        return model
+
+    def with_statistics(self, statistics: Dict[Tuple[str, str], Dict[str, Any]]) -> "SchemaModel":
+        """
+        Copy of the model with sizes, row counts and index usage replaced
+
+        The DDL attributes are shared with this model, which is left unchanged.
+
+        Args:
+            statistics: CATALOG_STATISTICS_QUERY rows keyed by (schema, relation name)
+
+        Returns:
+            New SchemaModel; relations missing from statistics get 0
+        """
+        model = SchemaModel.__new__(SchemaModel)
+        for name in SchemaModel.__slots__:
+            setattr(model, name, getattr(self, name))
+
+        empty = {}
+        tables = [statistics.get(key, empty) for key in zip(self.table_schema, self.table_name)]
+        model.table_size = array("q", (row.get("size_bytes") or 0 for row in tables))
+        model.table_total_size = array("q", (row.get("total_size_bytes") or 0 for row in tables))
+        model.table_rows = array("q", (row.get("live_rows") or 0 for row in tables))
+
+        indexes = [statistics.get((self.table_schema[table_id], name), empty)
+                   for table_id, name in zip(self.index_table, self.index_name)]
+        model.index_scans = array("q", (row.get("index_scans") or 0 for row in indexes))
+        model.index_tuples_read = array("q", (row.get("tuples_read") or 0 for row in indexes))
+        model.index_tuples_fetched = array("q", (row.get("tuples_fetched") or 0 for row in indexes))
+        model.index_size = array("q", (row.get("size_bytes") or 0 for row in indexes))
+        return model
+
+    @property
+    def table_count(self) -> int:
+        return len(self.table_name)
+
+    def table_key(self, table_id: int) -> str:
+        """'schema.table' display name"""
+        return f"{self.table_schema[table_id]}.{self.table_name[table_id]}"
+
+    def columns_of(self, table_id: int) -> array:
+        """Column row ids of a table, in ordinal order"""
+        offsets, positions = self.column_groups
+        return positions[offsets[table_id]:offsets[table_id + 1]]
+
+    def indexes_of(self, table_id: int) -> array:
+        """Index row ids of a table"""
+        offsets, positions = self.index_groups
+        return positions[offsets[table_id]:offsets[table_id + 1]]
+
+    def foreign_keys_of(self, table_id: int) -> array:
+        """Foreign key row ids of a table"""
+        offsets, positions = self.fk_groups
+        return positions[offsets[table_id]:offsets[table_id + 1]]
+
+    def index_count(self, table_id: int) -> int:
+        offsets = self.index_groups[0]
+        return offsets[table_id + 1] - offsets[table_id]
+
+    def tables(self) -> Iterator[int]:
+        return iter(range(len(self.table_name)))
+
+def build_schema_model(db_structure: Any) -> SchemaModel:
+    """
+    Build the schema model of a structure, reusing the one cached on a catalog snapshot
+
+    Structures served by the catalog cache (db.catalog_store) keep their model, so
+    repeated calls against an unchanged schema build it once.
+    """
+    model = getattr(db_structure, "schema_model", None)
+    if model is None:
+        model = SchemaModel.from_structure(db_structure)
+        if not isinstance(db_structure, dict):
+            db_structure.schema_model = model
+    return model
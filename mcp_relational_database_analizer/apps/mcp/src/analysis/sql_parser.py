@@ -0,0 +1,461 @@
+"""
+Lightweight SQL tokenizer and parser used to extract index candidates from queries.
+
+This is not a full SQL grammar. It understands enough of SELECT/UPDATE/DELETE
+statements (including the normalized form stored by pg_stat_statements, with
+$1-style parameters) to find table aliases and the columns used in filters,
+joins, ORDER BY and GROUP BY clauses.
+"""
+from typing import List, Dict, Any, Tuple, Optional, Set
+import re
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>[eE]'(?:[^'\\]|\\.|'')*'|(?:[uU]&)?'(?:[^']|'')*'|\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$)
+  | (?P<qident>"(?:[^"]|"")+")
+  | (?P<param>\$\d+|%s|%\(\w+\)s|\?)
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+  | (?P<ident>[A-Za-z_][\w$]*)
+  | (?P<op><=|>=|<>|!=|::|!~~\*|!~~|~~\*|~~|\|\||[=<>(),;*+\-/%.\[\]:])
+""", re.S | re.X)
+
+KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "is", "null", "between",
+    "like", "ilike", "as", "on", "join", "inner", "left", "right", "full", "outer",
+    "cross", "natural", "lateral", "using", "group", "by", "order", "having",
+    "limit", "offset", "asc", "desc", "nulls", "first", "last", "distinct", "all",
+    "case", "when", "then", "else", "end", "true", "false", "exists", "any", "some",
+    "union", "intersect", "except", "with", "recursive", "values", "update", "set",
+    "delete", "insert", "into", "returning", "fetch", "only", "for", "window",
+    "partition", "over", "filter", "interval", "current_date", "current_timestamp",
+    "current_time", "localtimestamp", "default", "similar", "escape", "row", "rows",
+    "next", "tablesample", "system", "bernoulli", "repeatable", "do", "nothing",
+    "conflict", "cast", "collate", "array", "unknown"
+}
+
+CONSTANT_KEYWORDS = {"true", "false", "null", "current_date", "current_timestamp",
+                     "current_time", "localtimestamp", "interval"}
+
+EQUALITY_OPERATORS = {"="}
+# tokens after which a select list item starts
+SELECT_ITEM_START = {("kw", "select"), ("kw", "distinct"), ("kw", "all"), ("op", ",")}
+CLAUSE_KEYWORDS = {"select", "from", "where", "group", "having", "order", "limit",
+                   "offset", "on", "using", "set", "values", "returning", "window",
+                   "fetch", "union", "intersect", "except", "into", "update", "delete"}
+
+def tokenize(query: str) -> List[Tuple[str, str]]:
+    """
+    Split a SQL statement into (kind, value) tokens
+
+    Identifiers are lowercased and qualified names ("schema"."table".col) are merged
+    into a single 'name' token. Keywords get the kind 'kw'. Casts (::type) are dropped
+    so that `col::date = $1` is treated like `col = $1`.
+
+    Args:
+        query: SQL text
+
+    Returns:
+        List of (kind, value) tuples; kinds are name, kw, string, number, param, op
+    """
+    raw = []
+    for match in _TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        value = match.group(kind)
+        if kind == "ident":
+            value = value.lower()
+            kind = "kw" if value in KEYWORDS else "name"
+        elif kind == "qident":
+            value = value[1:-1].replace('""', '"')
+            kind = "name"
+        raw.append((kind, value))
+
+    tokens = []
+    i = 0
+    while i < len(raw):
+        kind, value = raw[i]
+        # Drop type casts: expr::type or expr::type(n) or expr::type[]
+        if kind == "op" and value == "::":
+            i += 2
+            while i < len(raw) and raw[i][0] in ("name", "kw") and raw[i - 1][0] in ("name", "kw"):
+                i += 1
+            if i < len(raw) and raw[i] == ("op", "("):
+                while i < len(raw) and raw[i] != ("op", ")"):
+                    i += 1
+                i += 1
+            while i + 1 < len(raw) and raw[i] == ("op", "[") and raw[i + 1] == ("op", "]"):
+                i += 2
+            continue
+        # Merge qualified names
+        if kind == "name":
+            parts = [value]
+            while (i + 2 < len(raw) and raw[i + 1] == ("op", ".")
+                   and (raw[i + 2][0] in ("name", "kw") or raw[i + 2] == ("op", "*"))):
+                parts.append(raw[i + 2][1])
+                i += 2
+            tokens.append(("name", ".".join(parts)))
+            i += 1
+            continue
+        tokens.append((kind, value))
+        i += 1
+
+    return tokens
+
+def scan_tokens(query: str) -> List[Tuple[str, str, int, int]]:
+    """
+    Split a SQL statement into (kind, value, start, end) tokens, keeping their positions
+
+    Unlike tokenize(), names are not merged and casts are kept, so the spans can be
+    used to rewrite the original text.
+
+    Args:
+        query: SQL text
+
+    Returns:
+        List of (kind, value, start, end); kinds as in tokenize(), with quoted
+        identifiers unquoted and other identifiers lowercased
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(query):
+        kind = match.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        value = match.group(kind)
+        if kind == "ident":
+            value = value.lower()
+            kind = "kw" if value in KEYWORDS else "name"
+        elif kind == "qident":
+            value = value[1:-1].replace('""', '"')
+            kind = "name"
+        tokens.append((kind, value, match.start(), match.end()))
+    return tokens
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a statement so that queries differing only in literal values compare equal
+
+    Args:
+        query: SQL text
+
+    Returns:
+        Normalized statement with literals replaced by '?' and whitespace collapsed
+    """
+    parts = []
+    for kind, value in tokenize(query):
+        if kind in ("string", "number", "param"):
+            parts.append("?")
+        else:
+            parts.append(value)
+    return " ".join(parts).rstrip(" ;")
+
+def _split_name(name: str) -> Tuple[Optional[str], str]:
+    """Split a (possibly qualified) column reference into (qualifier, column)"""
+    if "." in name:
+        qualifier, column = name.rsplit(".", 1)
+        return qualifier.split(".")[-1], column
+    return None, name
+
+def _is_value(tokens: List[Tuple[str, str]], i: int) -> bool:
+    """Whether the token at position i starts a non-column operand (literal, param or expression)"""
+    if i >= len(tokens):
+        return False
+    kind, value = tokens[i]
+    if kind in ("string", "number", "param"):
+        return True
+    if kind == "kw" and value in CONSTANT_KEYWORDS:
+        return True
+    if kind == "op" and value in ("(", "-", "+"):
+        return True
+    if kind == "name" and i + 1 < len(tokens) and tokens[i + 1] == ("op", "("):
+        return True  # function call, e.g. now()
+    return False
+
+def _literal(tokens: List[Tuple[str, str]], i: int) -> Optional[str]:
+    """Return the literal text at position i if it is a simple constant"""
+    if i < len(tokens):
+        kind, value = tokens[i]
+        if kind in ("string", "number") or (kind == "kw" and value in ("true", "false", "null")):
+            return value
+    return None
+
+def _is_column(tokens: List[Tuple[str, str]], i: int) -> bool:
+    """Whether the token at position i is a plain column reference"""
+    if i < 0 or i >= len(tokens) or tokens[i][0] != "name":
+        return False
+    if i + 1 < len(tokens) and tokens[i + 1] == ("op", "("):
+        return False
+    return not tokens[i][1].endswith("*")
+
+def parse_query(query: str) -> Dict[str, Any]:
+    """
+    Parse a statement and extract the information needed for index candidate synthesis
+
+    Args:
+        query: SQL text (literal values or $n parameters)
+
+    Returns:
+        Dictionary with:
+            tables: alias -> table name (table names also map to themselves)
+            filters: list of (qualifier, column, kind, operator, literal) where kind is
+                     'equality' or 'range' and literal is the constant compared against (or None)
+            joins: list of ((qualifier, column), (qualifier, column)) equi-join pairs
+            order_by: list of (qualifier, column, direction)
+            group_by: list of (qualifier, column)
+            columns: list of (qualifier, column) for every column referenced
+            select_star: whether the select list contains '*'
+            statement: leading statement keyword (select, update, delete, insert, ...)
+    """
+    tokens = tokenize(query)
+    result = {
+        "tables": {},
+        "filters": [],
+        "joins": [],
+        "order_by": [],
+        "group_by": [],
+        "columns": [],
+        "select_star": False,
+        "statement": tokens[0][1] if tokens else ""
+    }
+
+    # Clause tracking: one entry per parenthesis depth, and whether that depth is a (sub)query
+    clause_stack = [None]
+    query_scope = [True]
+    expect_table = False
+    i = 0
+    n = len(tokens)
+
+    while i < n:
+        kind, value = tokens[i]
+        clause = clause_stack[-1]
+
+        if kind == "op" and value == "(":
+            # A subquery starts a new clause scope; other parentheses inherit the current clause
+            clause_stack.append(clause)
+            query_scope.append(i + 1 < n and tokens[i + 1] in (("kw", "select"), ("kw", "with"), ("kw", "values")))
+            expect_table = False
+            i += 1
+            continue
+        if kind == "op" and value == ")":
+            if len(clause_stack) > 1:
+                clause_stack.pop()
+                query_scope.pop()
+            i += 1
+            continue
+
+        if kind == "kw":
+            if value in ("group", "order", "partition") and i + 1 < n and tokens[i + 1] == ("kw", "by"):
+                if value != "partition":
+                    clause_stack[-1] = "group_by" if value == "group" else "order_by"
+                i += 2
+                continue
+            if value == "from" and not query_scope[-1]:
+                # EXTRACT(... FROM x), SUBSTRING(x FROM n), TRIM(... FROM x)
+                i += 1
+                continue
+            if value in ("from", "join", "update", "into"):
+                clause_stack[-1] = "from"
+                expect_table = True
+                i += 1
+                continue
+            if value in CLAUSE_KEYWORDS:
+                clause_stack[-1] = value
+                expect_table = False
+                i += 1
+                continue
+            if value == "only" and expect_table:
+                i += 1
+                continue
+
+        if clause == "from":
+            if expect_table and kind == "name" and not (i + 1 < n and tokens[i + 1] == ("op", "(")):
+                table = value.split(".")[-1]
+                result["tables"][table] = table
+                j = i + 1
+                if j < n and tokens[j] == ("kw", "as"):
+                    j += 1
+                if j < n and tokens[j][0] == "name":
+                    result["tables"][tokens[j][1]] = table
+                    j += 1
+                expect_table = False
+                i = j
+                continue
+            if kind == "op" and value == ",":
+                expect_table = True
+            elif kind == "kw" and value in ("lateral",):
+                expect_table = False
+            i += 1
+            continue
+
+        # only a whole select item: '*' in count(*) or a * b does not return every column
+        if clause == "select" and ((kind == "op" and value == "*") or (kind == "name" and value.endswith(".*"))) \
+                and (i == 0 or tokens[i - 1] in SELECT_ITEM_START):
+            result["select_star"] = True
+
+        if _is_column(tokens, i) and (i == 0 or tokens[i - 1] != ("kw", "as")):
+            column_ref = _split_name(value)
+            result["columns"].append(column_ref)
+
+            if clause in ("where", "on", "having"):
+                _parse_predicate(tokens, i, column_ref, result)
+            elif clause in ("order_by", "group_by"):
+                # Only plain column expressions (followed by , ASC/DESC, NULLS or end of clause)
+                prev = tokens[i - 1] if i > 0 else None
+                nxt = tokens[i + 1] if i + 1 < n else None
+                starts_item = prev is None or prev == ("op", ",") or prev == ("kw", "by")
+                ends_item = (nxt is None or nxt in (("op", ","), ("op", ")"), ("op", ";"))
+                             or (nxt[0] == "kw" and nxt[1] in ("asc", "desc", "nulls", "limit", "offset",
+                                                               "having", "order", "fetch", "for", "union",
+                                                               "window")))
+                if starts_item and ends_item:
+                    if clause == "order_by":
+                        direction = "desc" if nxt == ("kw", "desc") else "asc"
+                        result["order_by"].append((column_ref[0], column_ref[1], direction))
+                    else:
+                        result["group_by"].append(column_ref)
+
+        i += 1
+
+    return result
+
+def _parse_predicate(tokens: List[Tuple[str, str]], i: int, column_ref: Tuple[Optional[str], str],
+                     result: Dict[str, Any]) -> None:
+    """Classify the predicate (if any) in which the column at position i participates"""
+    n = len(tokens)
+    prev = tokens[i - 1] if i > 0 else None
+
+    # Skip the right-hand side of comparisons; they are handled from the left operand
+    # unless the left operand is a value (e.g. `$1 = col`)
+    if prev is not None and prev[0] == "op" and prev[1] in ("=", "<", ">", "<=", ">="):
+        left = i - 2
+        if left >= 0 and _is_column(tokens, left):
+            return
+        if left >= 0 and tokens[left][0] in ("string", "number", "param"):
+            operator = {"<": ">", ">": "<", "<=": ">=", ">=": "<="}.get(prev[1], prev[1])
+            kind = "equality" if operator in EQUALITY_OPERATORS else "range"
+            result["filters"].append((column_ref[0], column_ref[1], kind, operator, _literal(tokens, left)))
+        return
+
+    if i + 1 >= n:
+        return
+    op_kind, operator = tokens[i + 1]
+    negated = False
+    j = i + 1
+    if (op_kind, operator) == ("kw", "not"):
+        negated = True
+        j += 1
+        if j >= n:
+            return
+        op_kind, operator = tokens[j]
+
+    if op_kind == "op" and operator in ("=", "<", ">", "<=", ">=", "~~", "!~~", "~~*", "!~~*"):
+        if _is_column(tokens, j + 1) and operator == "=":
+            result["joins"].append((column_ref, _split_name(tokens[j + 1][1])))
+        elif operator == "=" and j + 1 < n and tokens[j + 1] == ("kw", "any"):
+            result["filters"].append((column_ref[0], column_ref[1], "equality", "in", None))
+        elif _is_value(tokens, j + 1) and operator == "=":
+            result["filters"].append((column_ref[0], column_ref[1], "equality", "=", _literal(tokens, j + 1)))
+        elif _is_value(tokens, j + 1) and operator in ("<", ">", "<=", ">="):
+            result["filters"].append((column_ref[0], column_ref[1], "range", operator, _literal(tokens, j + 1)))
+        elif operator == "~~" and _is_prefix_pattern(tokens, j + 1):
+            result["filters"].append((column_ref[0], column_ref[1], "range", "like", _literal(tokens, j + 1)))
+    elif op_kind == "kw" and not negated:
+        if operator == "in":
+            result["filters"].append((column_ref[0], column_ref[1], "equality", "in", None))
+        elif operator == "between":
+            result["filters"].append((column_ref[0], column_ref[1], "range", "between", None))
+        elif operator == "like" and _is_prefix_pattern(tokens, j + 1):
+            result["filters"].append((column_ref[0], column_ref[1], "range", "like", _literal(tokens, j + 1)))
+        elif operator == "is":
+            if j + 1 < n and tokens[j + 1] == ("kw", "null"):
+                result["filters"].append((column_ref[0], column_ref[1], "equality", "is null", "NULL"))
+
+def _is_prefix_pattern(tokens: List[Tuple[str, str]], i: int) -> bool:
+    """Whether a LIKE operand can use a btree index (parameter or literal without a leading wildcard)"""
+    if i >= len(tokens):
+        return False
+    kind, value = tokens[i]
+    if kind == "param":
+        return True
+    if kind == "string":
+        pattern = _string_body(value)
+        return bool(pattern) and pattern[0] not in ("%", "_")
+    return False
+
+def _string_body(literal: str) -> str:
+    """Text between the quotes of a string literal ('...', E'...', U&'...' or $tag$...$tag$)"""
+    if literal.startswith("$"):
+        delimiter = literal[:literal.index("$", 1) + 1]
+        return literal[len(delimiter):-len(delimiter)]
+    return literal[literal.index("'") + 1:-1]
+
+def resolve_column_usage(
+    parsed: Dict[str, Any],
+    table_columns: Dict[str, Set[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Attribute the columns of a parsed query to the tables they belong to
+
+    Qualified columns are resolved through the alias map. Unqualified columns are
+    attributed to the only table in the query, or to the single table whose column
+    set (from table_columns) contains them.
+
+    Args:
+        parsed: Result of parse_query()
+        table_columns: Optional mapping of table name -> set of column names
+
+    Returns:
+        Dictionary keyed by table name with lists of equality, range, sort, group,
+        join and referenced columns, plus the constants used in equality filters
+    """
+    aliases = parsed["tables"]
+    tables = sorted(set(aliases.values()))
+    table_columns = table_columns or {}
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[str]:
+        if qualifier:
+            return aliases.get(qualifier)
+        if len(tables) == 1:
+            return tables[0]
+        owners = [t for t in tables if column in table_columns.get(t, ())]
+        return owners[0] if len(owners) == 1 else None
+
+    usage = {
+        table: {"equality": [], "range": [], "sort": [], "group": [], "join": [],
+                "referenced": [], "constants": {}, "select_star": parsed["select_star"]}
+        for table in tables
+    }
+
+    def add(table: Optional[str], key: str, column: str) -> None:
+        if table in usage and column not in usage[table][key]:
+            usage[table][key].append(column)
+
+    for qualifier, column, kind, operator, literal in parsed["filters"]:
+        table = resolve(qualifier, column)
+        add(table, kind, column)
+        if table in usage and kind == "equality" and literal is not None:
+            usage[table]["constants"][column] = (operator, literal)
+
+    for left, right in parsed["joins"]:
+        add(resolve(*left), "join", left[1])
+        add(resolve(*right), "join", right[1])
+
+    for qualifier, column, _direction in parsed["order_by"]:
+        add(resolve(qualifier, column), "sort", column)
+
+    for qualifier, column in parsed["group_by"]:
+        add(resolve(qualifier, column), "group", column)
+
+    for qualifier, column in parsed["columns"]:
+        table = resolve(qualifier, column)
+        if table in table_columns and column not in table_columns[table]:
+            continue  # output alias or keyword-like token, not a real column
+        add(table, "referenced", column)
+
+    # A column filtered by equality does not need to appear again as a range/sort key
+    for info in usage.values():
+        info["range"] = [c for c in info["range"] if c not in info["equality"]]
+        info["sort"] = [c for c in info["sort"] if c not in info["equality"]]
+
+    return usage
@@ -1,9 +1,17 @@
 """
 Functions for analyzing database structure.
 """
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+import base64
+import json
 from db.connector import PostgresConnector
-from db.queries import TABLES_QUERY, COLUMNS_QUERY, INDEXES_QUERY, FOREIGN_KEYS_QUERY
+from db.queries import (
+    TABLES_QUERY, COLUMNS_QUERY, INDEXES_QUERY, FOREIGN_KEYS_QUERY, CATALOG_SETTINGS_QUERY,
+    CATALOG_STATISTICS_QUERY, STRUCTURE_PAGE_TABLES_QUERY, STRUCTURE_PAGE_COUNT_QUERY,
+    STRUCTURE_PAGE_COLUMNS_QUERY, STRUCTURE_PAGE_INDEXES_QUERY, STRUCTURE_PAGE_FOREIGN_KEYS_QUERY
+)
+from db.catalog_store import get_persisted_snapshot
+from analysis.schema_model import SchemaModel, build_schema_model
 
 def get_database_structure(connector: PostgresConnector) -> Dict[str, List[Dict[str, Any]]]:
     """
@@ -37,10 +45,207 @@ def get_database_structure(connector: PostgresConnector) -> Dict[str, List[Dict[
     
     return db_structure
 
+# Fields of TABLES_QUERY / INDEXES_QUERY rows that change without DDL: left out of the
+# catalog snapshot and filled in from CATALOG_STATISTICS_QUERY on every call
+TABLE_STATISTICS = {"table_size_bytes": "size_bytes", "total_size_bytes": "total_size_bytes",
+                    "estimated_row_count": "live_rows"}
+INDEX_STATISTICS = {"index_scans": "index_scans", "tuples_read": "tuples_read",
+                    "tuples_fetched": "tuples_fetched", "index_size_bytes": "size_bytes"}
+
+class LiveStructure:
+    """
+    Catalog snapshot with the sizes and statistics read for the current call
+
+    Supports structure["tables"] like the dictionaries returned by get_database_structure();
+    its schema_model shares the DDL part of the model cached on the snapshot.
+    """
+
+    def __init__(self, snapshot: Any, statistics: List[Dict[str, Any]]):
+        self.snapshot = snapshot
+        self.captured_at = getattr(snapshot, "captured_at", None)
+        self.statistics = {(row["schema_name"], row["relation_name"]): row for row in statistics}
+        self.sections = {}
+        self._schema_model = None
+
+    def __getitem__(self, name: str) -> List[Dict[str, Any]]:
+        rows = self.sections.get(name)
+        if rows is None:
+            rows = self.snapshot[name]
+            if name in ("tables", "indexes"):
+                fields, name_key = ((TABLE_STATISTICS, "table_name") if name == "tables"
+                                    else (INDEX_STATISTICS, "index_name"))
+                empty = {}
+                rows = [dict(row, **{field: self.statistics.get((row["table_schema"], row[name_key]), empty).get(column)
+                                     for field, column in fields.items()})
+                        for row in rows]
+            self.sections[name] = rows
+        return rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.snapshot
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self[name] if name in self else default
+
+    @property
+    def schema_model(self) -> SchemaModel:
+        if self._schema_model is None:
+            self._schema_model = build_schema_model(self.snapshot).with_statistics(self.statistics)
+        return self._schema_model
+
+def get_cached_database_structure(
+    connector: PostgresConnector,
+    cache_dir: Optional[str] = None,
+    refresh: bool = False
+) -> Tuple[LiveStructure, str]:
+    """
+    Get the database structure from the catalog cache, rescanning only after DDL changes
+
+    Only the DDL-derived part is cached: sizes, row counts and index usage are read
+    with one catalog statistics query on every call.
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        cache_dir: Directory of the persistent catalog cache, or None for memory only
+        refresh: Rescan even if the cached structure is still valid
+
+    Returns:
+        (structure, source): structure has the keys of get_database_structure() plus
+        settings; source is 'memory', 'disk' or 'database' (where the DDL part came from)
+    """
+    def build():
+        structure = get_database_structure(connector)
+        structure["settings"] = connector.execute_query(CATALOG_SETTINGS_QUERY)
+        for section, fields in (("tables", TABLE_STATISTICS), ("indexes", INDEX_STATISTICS)):
+            structure[section] = [{key: value for key, value in row.items() if key not in fields}
+                                  for row in structure[section]]
+        return structure
+
+    snapshot, source = get_persisted_snapshot(connector, build, cache_dir, refresh)
+    return LiveStructure(snapshot, connector.execute_query(CATALOG_STATISTICS_QUERY)), source
+
+# Sort keys of the paginated structure analysis: sort value computed from pg_class alone
+# (largest first), None for schema/table name order. Size and rows sort by the planner's
+# relpages and reltuples, so no table outside the page is measured.
+STRUCTURE_SORT_KEYS = {
+    "name": None,
+    "size": "c.relpages::bigint",
+    "rows": "GREATEST(c.reltuples, 0)::bigint",
+    "seq_scan": "pg_stat_get_numscans(c.oid)",
+    "index_count": "(SELECT count(*) FROM pg_index i WHERE i.indrelid = c.oid)"
+}
+MAX_STRUCTURE_PAGE_SIZE = 500
+
+def glob_to_like(pattern: Optional[str]) -> str:
+    """Convert a glob ('*' any text, '?' one character) to a LIKE pattern; None matches everything"""
+    if not pattern:
+        return "%"
+    escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%").replace("?", "_")
+
+def encode_structure_cursor(sort_by: str, row: Dict[str, Any], position: int, matching_tables: int) -> str:
+    """Opaque cursor pointing after row (the last table of a page)"""
+    payload = [sort_by, row["sort_value"], row["table_schema"], row["table_name"], position, matching_tables]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_structure_cursor(cursor: str) -> Tuple[str, Any, str, str, int, int]:
+    """(sort_by, sort value, schema, table, tables before the page, matching tables) of a cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        sort_by, value, schema, table, position, matching_tables = payload
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if sort_by not in STRUCTURE_SORT_KEYS:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return sort_by, value, schema, table, int(position), int(matching_tables)
+
+def get_database_structure_page(
+    connector: PostgresConnector,
+    schema_pattern: Optional[str] = None,
+    table_pattern: Optional[str] = None,
+    sort_by: str = "size",
+    page_size: int = 50,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Get one page of the database structure, filtered and sorted in the database
+
+    The page is selected from pg_class alone; only its tables are then measured and read
+    from the catalog, with their columns, indexes and foreign keys, so the cost depends
+    on the page size rather than on the size of the schema. Pages use keyset pagination:
+    the cursor holds the sort value and name of the last table returned, and the number
+    of matching tables, counted once for the first page.
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        schema_pattern: Glob on schema names ('*' and '?'), None for all schemas
+        table_pattern: Glob on table names, None for all tables
+        sort_by: One of STRUCTURE_SORT_KEYS
+        page_size: Tables per page (at most MAX_STRUCTURE_PAGE_SIZE)
+        cursor: next_cursor of the previous page, None for the first page
+
+    Returns:
+        Dictionary with the keys of get_database_structure() restricted to the page, plus
+        matching_tables, position (tables before the page), next_cursor and sort_by
+    """
+    if sort_by not in STRUCTURE_SORT_KEYS:
+        raise ValueError(f"Unknown sort_by '{sort_by}'. Use one of: {', '.join(STRUCTURE_SORT_KEYS)}")
+    page_size = max(1, min(int(page_size), MAX_STRUCTURE_PAGE_SIZE))
+    params = {
+        "schema_pattern": glob_to_like(schema_pattern),
+        "table_pattern": glob_to_like(table_pattern),
+        "limit": page_size + 1    # one extra row tells whether there is a next page
+    }
+    if cursor:
+        cursor_sort_by, value, schema, table, position, matching_tables = decode_structure_cursor(cursor)
+        if cursor_sort_by != sort_by:
+            raise ValueError(f"Cursor was created with sort_by='{cursor_sort_by}', not '{sort_by}'")
+        params.update({"cursor_value": value, "cursor_schema": schema, "cursor_table": table})
+    else:
+        position = 0
+        counted = connector.execute_query(STRUCTURE_PAGE_COUNT_QUERY, params)
+        matching_tables = counted[0]["matching_tables"] if counted else 0
+
+    sort_value = STRUCTURE_SORT_KEYS[sort_by]
+    after_name = "(n.nspname, c.relname) > (%(cursor_schema)s, %(cursor_table)s)"
+    if sort_value is None:
+        sort_value = "NULL::bigint"
+        order_by = "table_schema, table_name"
+        cursor_condition = after_name if cursor else "TRUE"
+    else:
+        order_by = "sort_value DESC, table_schema, table_name"
+        cursor_condition = (f"({sort_value} < %(cursor_value)s OR ({sort_value} = %(cursor_value)s AND {after_name}))"
+                            if cursor else "TRUE")
+
+    query = STRUCTURE_PAGE_TABLES_QUERY.format(sort_value=sort_value, cursor_condition=cursor_condition,
+                                               order_by=order_by)
+    tables = connector.execute_query(query, params)
+
+    next_cursor = None
+    if len(tables) > page_size:
+        tables = tables[:page_size]
+        next_cursor = encode_structure_cursor(sort_by, tables[-1], position + page_size, matching_tables)
+
+    oids = [table["table_oid"] for table in tables]
+    page = {
+        "tables": tables,
+        "columns": connector.execute_query(STRUCTURE_PAGE_COLUMNS_QUERY, [oids]) if oids else [],
+        "indexes": connector.execute_query(STRUCTURE_PAGE_INDEXES_QUERY, [oids]) if oids else [],
+        "foreign_keys": connector.execute_query(STRUCTURE_PAGE_FOREIGN_KEYS_QUERY, [oids]) if oids else [],
+        "matching_tables": matching_tables,
+        "position": position,
+        "next_cursor": next_cursor,
+        "sort_by": sort_by
+    }
+    return page
+
 def organize_db_structure_by_table(db_structure: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
     """
     Organize database structure by table for easier analysis
     
+    Rows are matched to their table through a (schema, table) tuple lookup; the
+    'schema.table' key is only built once per table.
+    
     Args:
         db_structure: Database structure from get_database_structure()
         
@@ -48,11 +253,11 @@ def organize_db_structure_by_table(db_structure: Dict[str, List[Dict[str, Any]]]
         Dictionary with tables as keys and their details as values
     """
     tables_dict = {}
+    by_name = {}
     
     # Process tables
     for table in db_structure["tables"]:
-        table_key = f"{table['table_schema']}.{table['table_name']}"
-        tables_dict[table_key] = {
+        entry = {
             "schema": table["table_schema"],
             "name": table["table_name"],
             "size_bytes": table["table_size_bytes"],
@@ -63,12 +268,14 @@ def organize_db_structure_by_table(db_structure: Dict[str, List[Dict[str, Any]]]
             "indexes": [],
             "foreign_keys": []
         }
+        by_name[(table["table_schema"], table["table_name"])] = entry
+        tables_dict[f"{table['table_schema']}.{table['table_name']}"] = entry
     
     # Add columns to their tables
     for column in db_structure["columns"]:
-        table_key = f"{column['table_schema']}.{column['table_name']}"
-        if table_key in tables_dict:
-            tables_dict[table_key]["columns"].append({
+        entry = by_name.get((column["table_schema"], column["table_name"]))
+        if entry is not None:
+            entry["columns"].append({
                 "name": column["column_name"],
                 "data_type": column["data_type"],
                 "max_length": column["character_maximum_length"],
@@ -79,9 +286,9 @@ def organize_db_structure_by_table(db_structure: Dict[str, List[Dict[str, Any]]]
     
     # Add indexes to their tables
     for index in db_structure["indexes"]:
-        table_key = f"{index['table_schema']}.{index['table_name']}"
-        if table_key in tables_dict:
-            tables_dict[table_key]["indexes"].append({
+        entry = by_name.get((index["table_schema"], index["table_name"]))
+        if entry is not None:
+            entry["indexes"].append({
                 "name": index["index_name"],
                 "definition": index["index_definition"],
                 "scans": index["index_scans"],
@@ -92,9 +299,9 @@ def organize_db_structure_by_table(db_structure: Dict[str, List[Dict[str, Any]]]
     
     # Add foreign keys to their tables
     for fk in db_structure["foreign_keys"]:
-        table_key = f"{fk['table_schema']}.{fk['table_name']}"
-        if table_key in tables_dict:
-            tables_dict[table_key]["foreign_keys"].append({
+        entry = by_name.get((fk["table_schema"], fk["table_name"]))
+        if entry is not None:
+            entry["foreign_keys"].append({
                 "column": fk["column_name"],
                 "references_table": f"{fk['foreign_table_schema']}.{fk['foreign_table_name']}",
                 "references_column": fk["foreign_column_name"]
@@ -102,40 +309,57 @@ def organize_db_structure_by_table(db_structure: Dict[str, List[Dict[str, Any]]]
     
     return tables_dict
 
-def find_tables_without_indexes(tables_dict: Dict[str, Dict[str, Any]]) -> List[str]:
+def find_tables_without_indexes(model: SchemaModel) -> List[str]:
     """Find tables that have no indexes defined"""
-    return [table_key for table_key, table_info in tables_dict.items() if not table_info["indexes"]]
+    return [model.table_key(t) for t in model.tables() if model.index_count(t) == 0]
 
-def find_tables_without_primary_keys(tables_dict: Dict[str, Dict[str, Any]]) -> List[str]:
+def find_tables_without_primary_keys(model: SchemaModel) -> List[str]:
     """Find tables that have no primary key defined"""
-    tables_without_pk = []
-    
-    for table_key, table_info in tables_dict.items():
-        has_pk = False
-        for idx in table_info["indexes"]:
-            if "PRIMARY KEY" in idx["definition"]:
-                has_pk = True
-                break
-        
-        if not has_pk:
-            tables_without_pk.append(table_key)
-    
-    return tables_without_pk
+    has_pk = bytearray(model.table_count)
+    for table_id, is_primary in zip(model.index_table, model.index_primary):
+        if is_primary:
+            has_pk[table_id] = 1
+    return [model.table_key(t) for t in model.tables() if not has_pk[t]]
 
-def find_large_tables(tables_dict: Dict[str, Dict[str, Any]], min_rows: int = 10000) -> List[Dict[str, Any]]:
+def find_large_tables(model: SchemaModel, min_rows: int = 10000) -> List[Dict[str, Any]]:
     """Find tables with more than min_rows rows"""
-    large_tables = []
-    
-    for table_key, table_info in tables_dict.items():
-        if table_info["estimated_row_count"] > min_rows:
-            large_tables.append({
-                "name": table_key,
-                "rows": table_info["estimated_row_count"],
-                "size": table_info["total_size_bytes"]
-            })
-    
+    large_tables = [
+        {"name": model.table_key(t), "rows": rows, "size": model.table_total_size[t]}
+        for t, rows in enumerate(model.table_rows)
+        if rows > min_rows
+    ]
     return sorted(large_tables, key=lambda x: x["rows"], reverse=True)
 
+def summarize_database_structure(db_structure: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Typed form of the structure analysis, for the json and compact output formats
+
+    Args:
+        db_structure: Database structure from get_database_structure()
+
+    Returns:
+        Dictionary with the overview counts, the issue lists and one row per table
+    """
+    schema_model = build_schema_model(db_structure)
+    column_offsets = schema_model.column_groups[0]
+    return {
+        "total_tables": schema_model.table_count,
+        "total_indexes": len(schema_model.index_name),
+        "total_foreign_keys": len(schema_model.fk_column),
+        "tables_without_indexes": find_tables_without_indexes(schema_model),
+        "tables_without_primary_keys": find_tables_without_primary_keys(schema_model),
+        "large_tables": find_large_tables(schema_model),
+        "tables": {
+            "columns": ["schema", "table", "estimated_rows", "total_size_bytes", "column_count", "index_count"],
+            "rows": [
+                [schema_model.table_schema[t], schema_model.table_name[t], schema_model.table_rows[t],
+                 schema_model.table_total_size[t], column_offsets[t + 1] - column_offsets[t],
+                 schema_model.index_count(t)]
+                for t in schema_model.tables()
+            ]
+        }
+    }
+
 def analyze_database_structure_for_response(db_structure: Dict[str, List[Dict[str, Any]]]) -> str:
     """
     Analyze database structure and format as a markdown response
@@ -146,22 +370,22 @@ def analyze_database_structure_for_response(db_structure: Dict[str, List[Dict[st
     Returns:
         Formatted markdown string with analysis
     """
-    # Organize by table for easier analysis
-    tables_dict = organize_db_structure_by_table(db_structure)
+    # Build the compact schema model (cached on catalog snapshots)
+    schema_model = build_schema_model(db_structure)
     
     # Calculate some statistics for the model to use
-    total_tables = len(db_structure["tables"])
-    total_indexes = len(db_structure["indexes"])
-    total_foreign_keys = len(db_structure["foreign_keys"])
+    total_tables = schema_model.table_count
+    total_indexes = len(schema_model.index_name)
+    total_foreign_keys = len(schema_model.fk_column)
     
     # Find tables without indexes
-    tables_without_indexes = find_tables_without_indexes(tables_dict)
+    tables_without_indexes = find_tables_without_indexes(schema_model)
     
     # Find tables without primary keys
-    tables_without_pk = find_tables_without_primary_keys(tables_dict)
+    tables_without_pk = find_tables_without_primary_keys(schema_model)
     
     # Find large tables
-    large_tables = find_large_tables(tables_dict)
+    large_tables = find_large_tables(schema_model)
     
     # Format the response
     response = "# Database Structure Analysis\n\n"
@@ -197,40 +421,114 @@ def analyze_database_structure_for_response(db_structure: Dict[str, List[Dict[st
     response += "## Detailed Table Information\n\n"
     
     # Include only the first few tables to avoid overwhelming the response
-    sample_tables = list(tables_dict.keys())[:5]
-    for table_key in sample_tables:
-        table_info = tables_dict[table_key]
-        response += f"### {table_key}\n\n"
-        response += f"- **Estimated Rows**: {table_info['estimated_row_count']:,}\n"
-        response += f"- **Size**: {table_info['total_size_bytes'] / (1024 * 1024):.2f} MB\n"
+    for table_id in range(min(schema_model.table_count, 5)):
+        response += f"### {schema_model.table_key(table_id)}\n\n"
+        response += f"- **Estimated Rows**: {schema_model.table_rows[table_id]:,}\n"
+        response += f"- **Size**: {schema_model.table_total_size[table_id] / (1024 * 1024):.2f} MB\n"
         
         response += "\n**Columns**:\n\n"
-        for column in table_info["columns"]:
-            response += f"- `{column['name']}` ({column['data_type']})\n"
+        for column in schema_model.columns_of(table_id):
+            response += f"- `{schema_model.column_name[column]}` ({schema_model.column_type[column]})\n"
         
         response += "\n**Indexes**:\n\n"
-        if table_info["indexes"]:
-            for index in table_info["indexes"]:
-                response += f"- `{index['name']}`: {index['definition']}\n"
-                response += f"  - Scans: {index['scans']}\n"
+        indexes = schema_model.indexes_of(table_id)
+        if indexes:
+            for index in indexes:
+                response += f"- `{schema_model.index_name[index]}`: {schema_model.index_definition[index]}\n"
+                response += f"  - Scans: {schema_model.index_scans[index]}\n"
         else:
             response += "- No indexes\n"
         
         response += "\n**Foreign Keys**:\n\n"
-        if table_info["foreign_keys"]:
-            for fk in table_info["foreign_keys"]:
-                response += f"- `{fk['column']}` → `{fk['references_table']}`.`{fk['references_column']}`\n"
+        foreign_keys = schema_model.foreign_keys_of(table_id)
+        if foreign_keys:
+            for fk in foreign_keys:
+                response += (f"- `{schema_model.fk_column[fk]}` → `{schema_model.fk_ref_schema[fk]}.{schema_model.fk_ref_table[fk]}`"
+                             f".`{schema_model.fk_ref_column[fk]}`\n")
         else:
             response += "- No foreign keys\n"
         
         response += "\n"
     
     # Add note if there are more tables
-    if len(tables_dict) > 5:
-        response += f"*Note: Showing 5 out of {len(tables_dict)} tables. Use more specific tools to analyze individual tables.*\n\n"
+    if schema_model.table_count > 5:
+        response += f"*Note: Showing 5 out of {schema_model.table_count} tables. Use schema_pattern/table_pattern, sort_by and page_size to page through them.*\n\n"
     
     # The model will use the provided data to generate insights
     response += "## Analysis and Recommendations\n\n"
     # This section will be filled by the model based on the data provided
     
-    return response
\ No newline at end of file
+    return response
+
+def format_structure_page_response(
+    page: Dict[str, Any],
+    schema_pattern: Optional[str] = None,
+    table_pattern: Optional[str] = None
+) -> str:
+    """
+    Format one page of the structure analysis as a markdown response
+
+    Args:
+        page: Result of get_database_structure_page()
+        schema_pattern: Schema glob the page was filtered with
+        table_pattern: Table glob the page was filtered with
+
+    Returns:
+        Formatted markdown string
+    """
+    schema_model = SchemaModel.from_structure(page)
+    tables = page["tables"]
+    first = page["position"] + 1
+
+    response = "# Database Structure Analysis\n\n"
+    response += f"- **Schema Filter**: `{schema_pattern or '*'}`\n"
+    response += f"- **Table Filter**: `{table_pattern or '*'}`\n"
+    response += f"- **Sorted By**: {page['sort_by']}\n"
+    response += f"- **Matching Tables**: {page['matching_tables']:,}\n"
+    if not tables:
+        response += "\nNo tables on this page.\n"
+        return response
+    response += f"- **This Page**: tables {first:,} to {first + len(tables) - 1:,}\n\n"
+
+    response += "| # | Table | Estimated Rows | Size | Seq Scans | Indexes | Primary Key |\n"
+    response += "|---|-------|----------------|------|-----------|---------|-------------|\n"
+    for i, table in enumerate(tables, first):
+        response += (f"| {i} | `{table['table_schema']}.{table['table_name']}` | {table['estimated_row_count']:,} "
+                     f"| {table['total_size_bytes'] / (1024 * 1024):.2f} MB | {table['seq_scan']:,} "
+                     f"| {table['index_count']} | {'yes' if table['has_primary_key'] else '**no**'} |\n")
+    response += "\n## Table Details\n\n"
+
+    for table_id in schema_model.tables():
+        response += f"### {schema_model.table_key(table_id)}\n\n"
+        if schema_model.table_description[table_id]:
+            response += f"{schema_model.table_description[table_id]}\n\n"
+
+        columns = [
+            f"`{schema_model.column_name[column]}` {schema_model.column_type[column]}"
+            + ("" if schema_model.column_nullable[column] else " not null")
+            for column in schema_model.columns_of(table_id)
+        ]
+        response += f"- **Columns**: {', '.join(columns) or 'none'}\n"
+
+        indexes = schema_model.indexes_of(table_id)
+        if indexes:
+            response += "- **Indexes**:\n"
+            for index in indexes:
+                response += (f"  - `{schema_model.index_name[index]}`: {schema_model.index_definition[index]} "
+                             f"(scans: {schema_model.index_scans[index]:,})\n")
+        else:
+            response += "- **Indexes**: none\n"
+
+        foreign_keys = [
+            f"`{schema_model.fk_column[fk]}` → `{schema_model.fk_ref_schema[fk]}.{schema_model.fk_ref_table[fk]}`"
+            f".`{schema_model.fk_ref_column[fk]}`"
+            for fk in schema_model.foreign_keys_of(table_id)
+        ]
+        response += f"- **Foreign Keys**: {', '.join(foreign_keys) or 'none'}\n\n"
+
+    if page["next_cursor"]:
+        response += f"**Next page**: call again with the same filters, sort_by and cursor=\"{page['next_cursor']}\"\n"
+    else:
+        response += "*Last page.*\n"
+
+    return response
@@ -0,0 +1,315 @@
+"""
+Autovacuum / autoanalyze forecasting.
+
+Combines the effective autovacuum thresholds of every table (global settings plus
+reloptions overrides) with its current dead/modified/inserted tuple counters and
+their rate of change between snapshots, to predict when autovacuum and autoanalyze
+will trigger, which tables autovacuum cannot keep up with, and which tables are
+approaching transaction ID wraparound.
+"""
+from typing import List, Dict, Any, Tuple, Optional
+import threading
+from db.connector import PostgresConnector
+from db.queries import VACUUM_SETTINGS_QUERY, VACUUM_TABLES_QUERY
+
+MAX_SNAPSHOTS = 60            # snapshots kept per database
+FALLING_BEHIND_FACTOR = 2.0   # dead tuples above this multiple of the threshold = vacuum not keeping up
+WRAPAROUND_WARNING = 0.75     # fraction of autovacuum_freeze_max_age that raises a warning
+WRAPAROUND_CRITICAL_AGE = 1_500_000_000
+
+SETTING_DEFAULTS = {
+    "autovacuum": "on",
+    "autovacuum_vacuum_threshold": 50,
+    "autovacuum_vacuum_scale_factor": 0.2,
+    "autovacuum_analyze_threshold": 50,
+    "autovacuum_analyze_scale_factor": 0.1,
+    "autovacuum_vacuum_insert_threshold": 1000,
+    "autovacuum_vacuum_insert_scale_factor": 0.2,
+    "autovacuum_freeze_max_age": 200_000_000,
+    "vacuum_failsafe_age": 1_600_000_000
+}
+
+# Snapshot history per database: key -> list of (sampled_at, {table_oid: counters})
+_history: Dict[Tuple[str, int, str], List[Tuple[float, Dict[int, Tuple]]]] = {}
+_history_lock = threading.Lock()
+
+def get_vacuum_settings(connector: PostgresConnector) -> Dict[str, Any]:
+    """
+    Get the global autovacuum settings, falling back to PostgreSQL defaults
+
+    Args:
+        connector: PostgresConnector instance with active connection
+
+    Returns:
+        Dictionary of setting name -> value (numbers converted to float/int)
+    """
+    settings = dict(SETTING_DEFAULTS)
+    for row in connector.execute_query(VACUUM_SETTINGS_QUERY):
+        value = row["setting"]
+        try:
+            value = float(value) if "." in value else int(value)
+        except (TypeError, ValueError):
+            pass
+        settings[row["name"]] = value
+    return settings
+
+def parse_reloptions(reloptions: Optional[List[str]]) -> Dict[str, str]:
+    """Turn a pg_class.reloptions array ('key=value' strings) into a dictionary"""
+    options = {}
+    for option in reloptions or []:
+        key, _, value = option.partition("=")
+        options[key] = value
+    return options
+
+def effective_settings(settings: Dict[str, Any], reloptions: Optional[List[str]]) -> Dict[str, Any]:
+    """Apply a table's reloptions overrides (autovacuum_*, autovacuum_enabled) to the global settings"""
+    effective = dict(settings)
+    options = parse_reloptions(reloptions)
+    for key, value in options.items():
+        if key == "autovacuum_enabled":
+            effective["autovacuum"] = "on" if value.lower() in ("true", "on", "1", "yes") else "off"
+        elif key in effective:
+            try:
+                effective[key] = float(value) if "." in value else int(value)
+            except ValueError:
+                pass
+    return effective
+
+def record_snapshot(key: Tuple[str, int, str], rows: List[Dict[str, Any]]) -> List[Tuple[float, Dict[int, Tuple]]]:
+    """
+    Store the counters of a table snapshot in the per-database history
+
+    Only the counters needed for rates are kept (as tuples), so the history stays
+    small even with thousands of tables.
+
+    Args:
+        key: Database key (host, port, dbname)
+        rows: Rows from VACUUM_TABLES_QUERY
+
+    Returns:
+        The history for the database, oldest first, including the new snapshot
+    """
+    if not rows:
+        with _history_lock:
+            return list(_history.get(key, []))
+
+    sampled_at = float(rows[0]["sampled_at"])
+    counters = {
+        row["table_oid"]: (
+            row["n_dead_tup"] or 0,
+            row["n_mod_since_analyze"] or 0,
+            row["n_ins_since_vacuum"] or 0,
+            row["xid_age"] or 0,
+            row["vacuum_count"] or 0,
+            row["analyze_count"] or 0
+        )
+        for row in rows
+    }
+    with _history_lock:
+        history = _history.setdefault(key, [])
+        history.append((sampled_at, counters))
+        del history[:-MAX_SNAPSHOTS]
+        return list(history)
+
+def counter_rate(
+    history: List[Tuple[float, Dict[int, Tuple]]],
+    table_oid: int,
+    value_index: int,
+    reset_index: int
+) -> Optional[float]:
+    """
+    Rate of change per second of one counter of a table
+
+    The rate is measured from the oldest snapshot taken after the last reset of the
+    counter (a vacuum resets dead/inserted tuples, an analyze resets modifications).
+
+    Args:
+        history: Snapshot history, oldest first
+        table_oid: Table to compute the rate for
+        value_index: Position of the counter in the stored tuple
+        reset_index: Position of the vacuum/analyze count that resets the counter
+
+    Returns:
+        Rate per second, or None with fewer than two usable snapshots
+    """
+    sampled_at, counters = history[-1]
+    current = counters.get(table_oid)
+    if current is None:
+        return None
+
+    for previous_at, previous_counters in history[:-1]:
+        previous = previous_counters.get(table_oid)
+        if previous is None or previous[reset_index] != current[reset_index]:
+            continue
+        elapsed = sampled_at - previous_at
+        if elapsed > 0:
+            return (current[value_index] - previous[value_index]) / elapsed
+    return None
+
+def forecast_table(row: Dict[str, Any], settings: Dict[str, Any], history: List[Tuple[float, Dict[int, Tuple]]]) -> Dict[str, Any]:
+    """
+    Forecast autovacuum, autoanalyze and wraparound for one table
+
+    Args:
+        row: Row from VACUUM_TABLES_QUERY
+        settings: Global settings from get_vacuum_settings()
+        history: Snapshot history from record_snapshot()
+
+    Returns:
+        Dictionary with thresholds, counters, rates, ETAs (seconds, 0 = due now) and flags
+    """
+    effective = effective_settings(settings, row["reloptions"])
+    reltuples = max(row["reltuples"] or 0, 0)
+    table_oid = row["table_oid"]
+
+    vacuum_threshold = effective["autovacuum_vacuum_threshold"] + effective["autovacuum_vacuum_scale_factor"] * reltuples
+    analyze_threshold = effective["autovacuum_analyze_threshold"] + effective["autovacuum_analyze_scale_factor"] * reltuples
+    insert_threshold = effective["autovacuum_vacuum_insert_threshold"] + effective["autovacuum_vacuum_insert_scale_factor"] * reltuples
+
+    dead = row["n_dead_tup"] or 0
+    modified = row["n_mod_since_analyze"] or 0
+    inserted = row["n_ins_since_vacuum"]
+
+    dead_rate = counter_rate(history, table_oid, 0, 4)
+    modified_rate = counter_rate(history, table_oid, 1, 5)
+    inserted_rate = counter_rate(history, table_oid, 2, 4)
+    xid_rate = counter_rate(history, table_oid, 3, 4)
+
+    def eta(value: float, threshold: float, rate: Optional[float]) -> Optional[float]:
+        if value >= threshold:
+            return 0
+        if rate and rate > 0:
+            return (threshold - value) / rate
+        return None
+
+    vacuum_eta = eta(dead, vacuum_threshold, dead_rate)
+    if inserted is not None and effective["autovacuum_vacuum_insert_threshold"] >= 0:
+        insert_eta = eta(inserted, insert_threshold, inserted_rate)
+        if insert_eta is not None and (vacuum_eta is None or insert_eta < vacuum_eta):
+            vacuum_eta = insert_eta
+
+    freeze_max_age = effective["autovacuum_freeze_max_age"]
+    xid_age = row["xid_age"] or 0
+    flags = []
+    if effective["autovacuum"] != "on":
+        flags.append("autovacuum disabled")
+    if dead > FALLING_BEHIND_FACTOR * vacuum_threshold and not row["vacuum_running"]:
+        flags.append("vacuum not keeping up")
+    elif vacuum_eta == 0 and dead_rate and dead_rate > 0 and row["vacuum_running"]:
+        flags.append("dead tuples growing during vacuum")
+    if xid_age >= min(WRAPAROUND_CRITICAL_AGE, effective.get("vacuum_failsafe_age") or WRAPAROUND_CRITICAL_AGE):
+        flags.append("WRAPAROUND CRITICAL")
+    elif xid_age >= freeze_max_age:
+        flags.append("anti-wraparound vacuum due")
+    elif xid_age >= WRAPAROUND_WARNING * freeze_max_age:
+        flags.append("approaching freeze_max_age")
+
+    return {
+        "table": f"{row['table_schema']}.{row['table_name']}",
+        "reltuples": reltuples,
+        "dead_tuples": dead,
+        "vacuum_threshold": vacuum_threshold,
+        "dead_rate": dead_rate,
+        "vacuum_eta": vacuum_eta,
+        "modified_tuples": modified,
+        "analyze_threshold": analyze_threshold,
+        "analyze_eta": eta(modified, analyze_threshold, modified_rate),
+        "xid_age": xid_age,
+        "freeze_max_age": freeze_max_age,
+        "wraparound_eta": eta(xid_age, freeze_max_age, xid_rate),
+        "vacuum_running": row["vacuum_running"],
+        "last_autovacuum": row["last_autovacuum"],
+        "flags": flags
+    }
+
+def forecast_autovacuum(connector: PostgresConnector) -> Dict[str, Any]:
+    """
+    Take a snapshot and forecast autovacuum/autoanalyze/wraparound for every table
+
+    Args:
+        connector: PostgresConnector instance with active connection
+
+    Returns:
+        Dictionary with per-table forecasts (most urgent first) and snapshot info
+    """
+    settings = get_vacuum_settings(connector)
+    rows = connector.execute_query(VACUUM_TABLES_QUERY)
+    key = (connector.host, int(connector.port or 5432), connector.dbname)
+    history = record_snapshot(key, rows)
+
+    forecasts = [forecast_table(row, settings, history) for row in rows]
+
+    def urgency(forecast: Dict[str, Any]) -> Tuple:
+        critical = any(f.startswith("WRAPAROUND") or f == "anti-wraparound vacuum due" for f in forecast["flags"])
+        eta = forecast["vacuum_eta"]
+        return (not critical, not forecast["flags"], eta is None, eta or 0, -forecast["dead_tuples"])
+
+    forecasts.sort(key=urgency)
+
+    return {
+        "forecasts": forecasts,
+        "snapshots": len(history),
+        "history_seconds": history[-1][0] - history[0][0] if len(history) > 1 else 0,
+        "settings": settings
+    }
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Human readable ETA"""
+    if seconds is None:
+        return "-"
+    if seconds == 0:
+        return "due now"
+    for unit, size in (("d", 86400), ("h", 3600), ("min", 60)):
+        if seconds >= size:
+            return f"in {seconds / size:.1f}{unit}"
+    return f"in {seconds:.0f}s"
+
+def format_autovacuum_forecast_response(result: Dict[str, Any], limit: int = 30) -> str:
+    """
+    Format autovacuum forecasts as a markdown response
+
+    Args:
+        result: Result of forecast_autovacuum()
+        limit: Maximum number of tables to list
+
+    Returns:
+        Formatted markdown string
+    """
+    forecasts = result["forecasts"]
+    settings = result["settings"]
+
+    response = "## Autovacuum Forecast\n\n"
+    response += f"- **Tables Analyzed**: {len(forecasts):,}\n"
+    response += f"- **Autovacuum**: {settings.get('autovacuum')}"
+    response += (f" (vacuum {settings['autovacuum_vacuum_threshold']} + {settings['autovacuum_vacuum_scale_factor']} x rows, "
+                 f"analyze {settings['autovacuum_analyze_threshold']} + {settings['autovacuum_analyze_scale_factor']} x rows, "
+                 f"freeze_max_age {settings['autovacuum_freeze_max_age']:,})\n")
+    response += f"- **Snapshots**: {result['snapshots']} over {result['history_seconds']:.0f}s\n"
+    response += f"- **Flagged Tables**: {sum(1 for f in forecasts if f['flags'])}\n\n"
+
+    if result["snapshots"] < 2:
+        response += ("ℹ️ Only one snapshot so far: rates and ETAs need at least two. Call this tool again later "
+                     "(or use sample_seconds) to measure how fast dead tuples and XID age grow.\n\n")
+
+    if not forecasts:
+        response += "No tables found.\n"
+        return response
+
+    response += "| # | Table | Dead / Threshold | Dead Rate | Autovacuum | Mod / Threshold | Autoanalyze | XID Age | Wraparound | Flags |\n"
+    response += "|---|-------|------------------|-----------|------------|-----------------|-------------|---------|------------|-------|\n"
+    for i, forecast in enumerate(forecasts[:limit], 1):
+        rate = f"{forecast['dead_rate']:.1f}/s" if forecast["dead_rate"] is not None else "-"
+        vacuum = "running" if forecast["vacuum_running"] else format_duration(forecast["vacuum_eta"])
+        response += (f"| {i} | `{forecast['table']}` | {forecast['dead_tuples']:,} / {forecast['vacuum_threshold']:,.0f} "
+                     f"| {rate} | {vacuum} | {forecast['modified_tuples']:,} / {forecast['analyze_threshold']:,.0f} "
+                     f"| {format_duration(forecast['analyze_eta'])} "
+                     f"| {forecast['xid_age']:,} ({forecast['xid_age'] / forecast['freeze_max_age'] * 100:.0f}%) "
+                     f"| {format_duration(forecast['wraparound_eta'])} | {', '.join(forecast['flags']) or '-'} |\n")
+    if len(forecasts) > limit:
+        response += f"\n... and {len(forecasts) - limit} more tables\n"
+
+    response += ("\n**Note**: Thresholds include per-table reloptions overrides. Tables where vacuum is not keeping up "
+                 "usually need a lower autovacuum_vacuum_scale_factor, a higher autovacuum_vacuum_cost_limit or more "
+                 "autovacuum_max_workers.\n")
+
+    return response
@@ -0,0 +1,523 @@
+"""
+Workload-level index advisor.
+
+Takes the heaviest statements of a workload (pg_stat_statements or a PostgreSQL
+log file), extracts index candidates from each statement with the SQL parser,
+merges them into composite indexes and greedily picks the set with the best
+net benefit (read time saved minus write amplification) under a storage budget.
+"""
+from typing import List, Dict, Any, Tuple, Optional
+import os
+import re
+import time
+from db.connector import PostgresConnector
+from db.queries import (
+    WORKLOAD_STATEMENTS_QUERY,
+    WORKLOAD_TABLE_STATS_QUERY,
+    WORKLOAD_COLUMN_STATS_QUERY,
+    INDEX_KEYS_QUERY
+)
+from analysis.sql_parser import parse_query, resolve_column_usage, normalize_query
+from analysis.indexes import build_index_ddl, usable_index_prefix
+
+DEFAULT_MAX_INDEX_COLUMNS = 3
+DEFAULT_EQUALITY_SELECTIVITY = 0.005  # PostgreSQL's default for equality without statistics
+RANGE_SELECTIVITY = 1.0 / 3.0          # PostgreSQL's default for inequalities
+INDEX_TUPLE_OVERHEAD_BYTES = 16        # IndexTupleData header + line pointer, 8-byte aligned
+INDEX_FILLFACTOR = 0.9
+INDEX_WRITE_COST_MS = 0.01             # estimated maintenance cost of one index entry per modified row
+PAGE_SIZE = 8192
+
+LOG_STATEMENT_RE = re.compile(r"duration: ([\d.]+) ms\s+(?:statement|execute [^:]*):\s*(.*)$")
+LOG_LINE_PREFIX_RE = re.compile(r"^\S.*?(LOG|ERROR|WARNING|DETAIL|STATEMENT|HINT|CONTEXT|FATAL):")
+
+def get_workload_statements(connector: PostgresConnector, top_n: int = 500, min_calls: int = 1) -> List[Dict[str, Any]]:
+    """
+    Get the top-N statements by total execution time from pg_stat_statements
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        top_n: Maximum number of statements to return
+        min_calls: Ignore statements called fewer times than this
+
+    Returns:
+        List of dictionaries with query, calls, total_time_ms and mean_time_ms
+    """
+    return connector.execute_query(WORKLOAD_STATEMENTS_QUERY, [min_calls, top_n])
+
+def resolve_workload_file(name: str, directory: str) -> Optional[str]:
+    """
+    Path of a workload file requested by name, confined to the configured directory
+
+    Args:
+        name: File name (or relative path) sent by the client
+        directory: Directory workload files may be read from (WORKLOAD_LOG_DIR)
+
+    Returns:
+        Absolute path of the file, or None if it is outside directory or is not a file
+    """
+    if not directory:
+        return None
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+def load_statements_from_log(path: str, top_n: int = 500) -> List[Dict[str, Any]]:
+    """
+    Load a workload from a PostgreSQL log file or a plain SQL file
+
+    PostgreSQL logs must contain `duration: ... ms  statement: ...` lines
+    (log_min_duration_statement). Files without such lines are treated as plain
+    SQL separated by semicolons, each statement counting as one call.
+
+    Args:
+        path: Path to the log or SQL file on the server
+        top_n: Maximum number of (normalized) statements to return
+
+    Returns:
+        List of dictionaries with query, calls, total_time_ms and mean_time_ms
+    """
+    entries = []
+    current = None
+
+    with open(path, "r", encoding="utf-8", errors="replace") as log_file:
+        for line in log_file:
+            match = LOG_STATEMENT_RE.search(line)
+            if match:
+                current = [float(match.group(1)), [match.group(2)]]
+                entries.append(current)
+            elif current is not None and line[:1] in (" ", "\t") and not LOG_LINE_PREFIX_RE.match(line):
+                current[1].append(line.strip())
+            else:
+                current = None
+
+    if not entries:
+        with open(path, "r", encoding="utf-8", errors="replace") as sql_file:
+            entries = [[0.0, [statement]] for statement in sql_file.read().split(";") if statement.strip()]
+
+    statements = aggregate_statements(
+        {"query": " ".join(lines), "calls": 1, "total_time_ms": duration}
+        for duration, lines in entries
+    )
+    return statements[:top_n]
+
+def aggregate_statements(statements) -> List[Dict[str, Any]]:
+    """
+    Merge statements that differ only in literal values
+
+    Args:
+        statements: Iterable of dictionaries with query, calls and total_time_ms
+
+    Returns:
+        Aggregated statements sorted by total time (then calls), descending
+    """
+    aggregated = {}
+    for statement in statements:
+        key = normalize_query(statement["query"])
+        entry = aggregated.get(key)
+        if entry is None:
+            aggregated[key] = {
+                "query": statement["query"],
+                "calls": statement.get("calls") or 1,
+                "total_time_ms": float(statement.get("total_time_ms") or 0)
+            }
+        else:
+            entry["calls"] += statement.get("calls") or 1
+            entry["total_time_ms"] += float(statement.get("total_time_ms") or 0)
+
+    result = sorted(aggregated.values(), key=lambda x: (x["total_time_ms"], x["calls"]), reverse=True)
+    for entry in result:
+        entry["mean_time_ms"] = entry["total_time_ms"] / entry["calls"] if entry["calls"] else 0
+    return result
+
+def get_workload_catalog(connector: PostgresConnector, tables: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch table statistics, column statistics and existing indexes for the given tables
+
+    All three catalog queries are issued once for the whole table list.
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        tables: Table names referenced by the workload
+
+    Returns:
+        Dictionary keyed by table name with 'stats', 'columns' and 'indexes'
+    """
+    if not tables:
+        return {}
+
+    catalog = {}
+    for row in connector.execute_query(WORKLOAD_TABLE_STATS_QUERY, [tables]):
+        current = catalog.get(row["table_name"])
+        # Same table name in several schemas: keep the largest one
+        if current is None or (row["reltuples"] or 0) > (current["stats"]["reltuples"] or 0):
+            catalog[row["table_name"]] = {"schema": row["table_schema"], "stats": row, "columns": {}, "indexes": []}
+
+    for row in connector.execute_query(WORKLOAD_COLUMN_STATS_QUERY, [tables]):
+        info = catalog.get(row["table_name"])
+        if info and info["schema"] == row["table_schema"]:
+            info["columns"][row["column_name"]] = row
+
+    for row in connector.execute_query(INDEX_KEYS_QUERY, [tables]):
+        info = catalog.get(row["table_name"])
+        if info and info["schema"] == row["table_schema"]:
+            info["indexes"].append(row)
+
+    return catalog
+
+def column_selectivity(table_info: Dict[str, Any], column: str) -> float:
+    """Estimate the selectivity of an equality predicate on a column from pg_stats"""
+    column_stats = table_info["columns"].get(column, {})
+    n_distinct = column_stats.get("n_distinct")
+    if not n_distinct:
+        return DEFAULT_EQUALITY_SELECTIVITY
+    reltuples = max(table_info["stats"].get("reltuples") or 0, 1)
+    distinct_values = n_distinct if n_distinct > 0 else -n_distinct * reltuples
+    return 1.0 / max(distinct_values, 1.0)
+
+def build_query_needs(
+    statements: List[Dict[str, Any]],
+    catalog: Dict[str, Dict[str, Any]],
+    max_columns: int = DEFAULT_MAX_INDEX_COLUMNS
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Turn each statement into per-table index "needs" with an estimated benefit
+
+    A need is the ordered set of key columns that would let one table access of one
+    statement use an index: equality columns (most selective first), then one range
+    column or the ORDER BY columns. Needs with the same shape are merged and their
+    benefits summed, so the advisor scales with the number of distinct shapes rather
+    than the number of statements.
+
+    Args:
+        statements: Workload statements (query, calls, total_time_ms)
+        catalog: Result of get_workload_catalog()
+        max_columns: Maximum number of key columns per need
+
+    Returns:
+        Tuple of (needs, number of statements that could be parsed)
+    """
+    table_columns = {table: set(info["columns"]) for table, info in catalog.items()}
+    needs = {}
+    parsed_count = 0
+
+    for statement in statements:
+        try:
+            parsed = parse_query(statement["query"])
+        except Exception:
+            continue
+        if parsed["statement"] not in ("select", "with", "update", "delete"):
+            continue
+        parsed_count += 1
+
+        usage = resolve_column_usage(parsed, table_columns)
+        usage = {table: info for table, info in usage.items() if table in catalog}
+        if not usage:
+            continue
+
+        # Spread the statement's time over its tables proportionally to their size
+        weight_ms = statement.get("total_time_ms") or statement.get("calls") or 1
+        pages = {table: max(catalog[table]["stats"].get("relpages") or 0, 1) for table in usage}
+        total_pages = sum(pages.values())
+
+        for table, info in usage.items():
+            table_info = catalog[table]
+            equality = sorted(info["equality"], key=lambda c: column_selectivity(table_info, c))
+            shapes = []
+            if equality or info["range"] or (info["sort"] and len(usage) == 1):
+                range_column = info["range"][0] if info["range"] else None
+                sort = tuple(info["sort"]) if not range_column and len(usage) == 1 else ()
+                shapes.append((tuple(equality), range_column, sort))
+            if info["join"]:
+                join_equality = sorted(set(info["join"]) | set(equality), key=lambda c: column_selectivity(table_info, c))
+                shapes.append((tuple(join_equality), None, ()))
+
+            for equality_columns, range_column, sort in shapes:
+                key_columns = list(equality_columns) + ([range_column] if range_column else list(sort))
+                if not key_columns:
+                    continue
+                selectivity = 1.0
+                for column in equality_columns:
+                    selectivity *= column_selectivity(table_info, column)
+                if range_column:
+                    selectivity *= RANGE_SELECTIVITY
+                benefit_ms = weight_ms * pages[table] / total_pages * (1.0 - selectivity) / len(shapes)
+
+                key = (table, equality_columns, range_column, sort)
+                need = needs.get(key)
+                if need is None:
+                    needs[key] = {
+                        "table": table,
+                        "equality": equality_columns,
+                        "range": range_column,
+                        "sort": sort,
+                        "key_columns": tuple(key_columns[:max_columns]),
+                        "benefit_ms": benefit_ms,
+                        "calls": statement.get("calls") or 1,
+                        "queries": [statement["query"]]
+                    }
+                else:
+                    need["benefit_ms"] += benefit_ms
+                    need["calls"] += statement.get("calls") or 1
+                    if len(need["queries"]) < 3:
+                        need["queries"].append(statement["query"])
+
+    return list(needs.values()), parsed_count
+
+def index_coverage(columns: Tuple[str, ...], need: Dict[str, Any]) -> float:
+    """
+    Fraction of a need's key columns a btree index with the given key columns can use
+
+    Uses the same prefix rules as recommend_indexes (analysis.indexes.usable_index_prefix).
+
+    Args:
+        columns: Ordered key columns of the index
+        need: A need from build_query_needs()
+
+    Returns:
+        Coverage between 0 (index unusable) and 1 (fully usable)
+    """
+    prefix = usable_index_prefix(list(columns), need["equality"], need["range"], need["sort"])
+    total = len(need["equality"]) + (1 if need["range"] else len(need["sort"]))
+    return len(prefix) / total if total else 0.0
+
+def estimate_index_size(table_info: Dict[str, Any], columns: Tuple[str, ...]) -> int:
+    """Estimate the size in bytes of a btree index on the given columns"""
+    width = sum(table_info["columns"].get(column, {}).get("avg_width") or 8 for column in columns)
+    tuple_size = INDEX_TUPLE_OVERHEAD_BYTES + ((width + 7) // 8) * 8
+    reltuples = max(table_info["stats"].get("reltuples") or 0, 0)
+    leaf_bytes = reltuples * tuple_size / INDEX_FILLFACTOR
+    return int(max(leaf_bytes * 1.01, PAGE_SIZE))
+
+def estimate_write_cost(table_info: Dict[str, Any]) -> float:
+    """Estimate the write amplification (ms) one more index adds, from the table's modification counters"""
+    stats = table_info["stats"]
+    non_hot_updates = max((stats.get("n_tup_upd") or 0) - (stats.get("n_tup_hot_upd") or 0), 0)
+    writes = (stats.get("n_tup_ins") or 0) + (stats.get("n_tup_del") or 0) + non_hot_updates
+    return writes * INDEX_WRITE_COST_MS
+
+def generate_candidates(needs: List[Dict[str, Any]], catalog: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Generate merged index candidates from the needs and score them against every need of their table
+
+    Candidates whose key columns are a left prefix of another candidate on the same
+    table are merged into the longer one, which can serve both needs.
+
+    Args:
+        needs: Result of build_query_needs()
+        catalog: Result of get_workload_catalog()
+
+    Returns:
+        List of candidates with size, write cost and the needs they serve
+    """
+    needs_by_table = {}
+    for position, need in enumerate(needs):
+        needs_by_table.setdefault(need["table"], []).append(position)
+
+    candidates = []
+    for table, positions in needs_by_table.items():
+        table_info = catalog[table]
+        keys = {needs[p]["key_columns"] for p in positions}
+        merged = [k for k in keys if not any(len(o) > len(k) and o[:len(k)] == k for o in keys)]
+
+        write_cost = estimate_write_cost(table_info)
+        for columns in merged:
+            served = []
+            for p in positions:
+                coverage = index_coverage(columns, needs[p])
+                if coverage > 0:
+                    served.append((p, coverage))
+            candidates.append({
+                "table": table,
+                "schema": table_info["schema"],
+                "columns": columns,
+                "size_bytes": estimate_index_size(table_info, columns),
+                "write_cost_ms": write_cost,
+                "serves": served
+            })
+
+    return candidates
+
+def apply_existing_indexes(needs: List[Dict[str, Any]], catalog: Dict[str, Dict[str, Any]]) -> List[float]:
+    """
+    Compute how well each need is already served by existing (non-partial btree) indexes
+
+    Args:
+        needs: Result of build_query_needs()
+        catalog: Result of get_workload_catalog()
+
+    Returns:
+        List with the best existing coverage per need
+    """
+    existing = []
+    for need in needs:
+        best = 0.0
+        for index in catalog[need["table"]]["indexes"]:
+            if index.get("predicate") or index.get("index_type") != "btree":
+                continue
+            best = max(best, index_coverage(tuple(index["key_columns"]), need))
+            if best >= 1.0:
+                break
+        existing.append(best)
+    return existing
+
+def select_indexes(
+    candidates: List[Dict[str, Any]],
+    needs: List[Dict[str, Any]],
+    baseline_coverage: List[float],
+    max_indexes: int,
+    storage_budget_bytes: int
+) -> List[Dict[str, Any]]:
+    """
+    Greedily pick the candidates with the best marginal net benefit per byte
+
+    After each pick, the coverage of the needs it serves is raised so that the
+    remaining candidates are only credited for improvements over what is already
+    selected (or already exists).
+
+    Args:
+        candidates: Result of generate_candidates()
+        needs: Result of build_query_needs()
+        baseline_coverage: Result of apply_existing_indexes()
+        max_indexes: Maximum number of indexes to recommend
+        storage_budget_bytes: Maximum total size of the recommended indexes
+
+    Returns:
+        Selected candidates with their marginal benefit and net benefit
+    """
+    coverage = list(baseline_coverage)
+    remaining = list(candidates)
+    selected = []
+    budget_left = storage_budget_bytes
+
+    while remaining and len(selected) < max_indexes:
+        best = None
+        best_score = 0.0
+        for candidate in remaining:
+            if candidate["size_bytes"] > budget_left:
+                continue
+            benefit = sum(needs[p]["benefit_ms"] * (c - coverage[p]) for p, c in candidate["serves"] if c > coverage[p])
+            net = benefit - candidate["write_cost_ms"]
+            score = net / candidate["size_bytes"]
+            if net > 0 and score > best_score:
+                best, best_score = candidate, score
+                best["benefit_ms"], best["net_benefit_ms"] = benefit, net
+        if best is None:
+            break
+
+        selected.append(best)
+        remaining.remove(best)
+        budget_left -= best["size_bytes"]
+        for p, c in best["serves"]:
+            coverage[p] = max(coverage[p], c)
+
+    return selected
+
+def advise_workload_indexes(
+    connector: PostgresConnector,
+    statements: List[Dict[str, Any]],
+    max_indexes: int = 5,
+    storage_budget_bytes: int = 1024 * 1024 * 1024,
+    max_columns: int = DEFAULT_MAX_INDEX_COLUMNS
+) -> Dict[str, Any]:
+    """
+    Recommend the set of indexes that helps the whole workload most
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        statements: Workload statements (from pg_stat_statements or a log file)
+        max_indexes: Maximum number of indexes to recommend
+        storage_budget_bytes: Maximum total size of the recommended indexes
+        max_columns: Maximum number of key columns per index
+
+    Returns:
+        Dictionary with the selected indexes and workload statistics
+    """
+    started = time.perf_counter()
+
+    tables = set()
+    for statement in statements:
+        try:
+            tables.update(parse_query(statement["query"])["tables"].values())
+        except Exception:
+            continue
+    catalog = get_workload_catalog(connector, sorted(tables))
+
+    needs, parsed_count = build_query_needs(statements, catalog, max_columns)
+    baseline_coverage = apply_existing_indexes(needs, catalog)
+    candidates = generate_candidates(needs, catalog)
+    selected = select_indexes(candidates, needs, baseline_coverage, max_indexes, storage_budget_bytes)
+
+    for index in selected:
+        index["ddl"] = build_index_ddl(f"{index['schema']}.{index['table']}", list(index["columns"]),
+                                       f"idx_{index['table']}_{'_'.join(index['columns'])}")
+        index["queries"] = [q for p, _ in index["serves"] for q in needs[p]["queries"]][:3]
+        index["calls"] = sum(needs[p]["calls"] for p, _ in index["serves"])
+
+    return {
+        "statements": len(statements),
+        "parsed_statements": parsed_count,
+        "tables": len(catalog),
+        "needs": len(needs),
+        "already_served": sum(1 for c in baseline_coverage if c >= 1.0),
+        "candidates": len(candidates),
+        "selected": selected,
+        "storage_budget_bytes": storage_budget_bytes,
+        "elapsed_ms": (time.perf_counter() - started) * 1000
+    }
+
+def format_workload_advice_response(advice: Dict[str, Any], source: str) -> str:
+    """
+    Format workload index advice as a markdown response
+
+    Args:
+        advice: Result of advise_workload_indexes()
+        source: Description of where the workload came from
+
+    Returns:
+        Formatted markdown string with recommendations
+    """
+    response = "## Workload Index Advisor\n\n"
+    response += f"- **Workload Source**: {source}\n"
+    response += f"- **Statements Analyzed**: {advice['statements']} ({advice['parsed_statements']} parsed)\n"
+    response += f"- **Tables Involved**: {advice['tables']}\n"
+    response += f"- **Distinct Access Patterns**: {advice['needs']} ({advice['already_served']} already served by existing indexes)\n"
+    response += f"- **Candidates Evaluated**: {advice['candidates']}\n"
+    response += f"- **Storage Budget**: {advice['storage_budget_bytes'] / (1024 * 1024):.0f} MB\n"
+    response += f"- **Analysis Time**: {advice['elapsed_ms']:.0f}ms\n\n"
+
+    if not advice["selected"]:
+        response += "No index has an estimated benefit larger than its write cost within the storage budget.\n"
+        return response
+
+    response += "### Recommended Indexes\n\n"
+    response += "| # | Index | Est. Benefit | Write Cost | Net Benefit | Est. Size | Calls Served |\n"
+    response += "|---|-------|--------------|------------|-------------|-----------|--------------|\n"
+    total_size = 0
+    for i, index in enumerate(advice["selected"], 1):
+        total_size += index["size_bytes"]
+        response += (f"| {i} | `{index['table']}({', '.join(index['columns'])})` | {index['benefit_ms']:.0f}ms "
+                     f"| {index['write_cost_ms']:.0f}ms | {index['net_benefit_ms']:.0f}ms "
+                     f"| {index['size_bytes'] / (1024 * 1024):.1f} MB | {index['calls']:,} |\n")
+    response += f"\n**Total Estimated Size**: {total_size / (1024 * 1024):.1f} MB\n"
+
+    response += "\n### SQL Commands\n\n```sql\n"
+    for index in advice["selected"]:
+        response += index["ddl"].replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1) + ";\n"
+    response += "```\n"
+
+    response += "\n### Example Statements Served\n\n"
+    for index in advice["selected"]:
+        response += f"**{index['table']}({', '.join(index['columns'])})**:\n"
+        for query in index["queries"]:
+            preview = " ".join(query.split())
+            response += f"- `{preview[:150]}{'...' if len(preview) > 150 else ''}`\n"
+        response += "\n"
+
+    response += ("**Note**: Benefits are estimated from statement time, table size and column selectivity; "
+                 "write cost from the table's insert/update/delete counters. Validate with `recommend_indexes` "
+                 "(HypoPG) before creating indexes in production.\n")
+
+    return response
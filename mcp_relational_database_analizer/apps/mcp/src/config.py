@@ -4,6 +4,9 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 from session_handler import SessionHandler
+from activity_sampler import ActiveSessionSampler
+from metrics_store import MetricsStore
+import tracing
 
 # Load environment variables from .env file
 load_dotenv()
@@ -50,9 +53,64 @@ class Config:
     ENABLE_SESSION_STATUS = os.getenv('ENABLE_SESSION_STATUS', 'true').lower() == 'true'
     ENABLE_QUERY_LOGGING = os.getenv('ENABLE_QUERY_LOGGING', 'false').lower() == 'true'
 
+    # Active Session History sampling (comma-separated database presets, empty = disabled)
+    ASH_PRESETS = [p.strip() for p in os.getenv('ASH_PRESETS', '').split(',') if p.strip()]
+    ASH_INTERVAL_SECONDS = float(os.getenv('ASH_INTERVAL_SECONDS', '1'))
+    ASH_CAPACITY = int(os.getenv('ASH_CAPACITY', '1000000'))
+    ASH_RETENTION_HOURS = float(os.getenv('ASH_RETENTION_HOURS', '24'))
+
+    # Metrics store persistence (empty = keep collected metrics in memory only)
+    METRICS_DIR = os.getenv('METRICS_DIR', '')
+
+    # Directory advise_workload_indexes may read log_file from (empty = log_file disabled)
+    WORKLOAD_LOG_DIR = os.getenv('WORKLOAD_LOG_DIR', '')
+
+    # Persistent catalog cache, reused across restarts while the DDL is unchanged (empty = memory only)
+    CATALOG_CACHE_DIR = os.getenv('CATALOG_CACHE_DIR', '')
+
+    # Tool responses: byte budget (0 = unlimited) and chunked emission as log notifications
+    MAX_RESPONSE_BYTES = int(os.getenv('MAX_RESPONSE_BYTES', '1048576'))
+    STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'false').lower() == 'true'
+    RESPONSE_CHUNK_BYTES = int(os.getenv('RESPONSE_CHUNK_BYTES', '65536'))
+
+    # Approximate aggregates: sample large tables instead of scanning them (exact=True still forces a full scan)
+    APPROXIMATE_QUERIES = os.getenv('APPROXIMATE_QUERIES', 'false').lower() == 'true'
+    APPROXIMATE_SAMPLE_ROWS = int(os.getenv('APPROXIMATE_SAMPLE_ROWS', '100000'))
+
+    # Table row counts: how long exact counts are reused, and parallel workers for counting
+    ROW_COUNT_CACHE_SECONDS = int(os.getenv('ROW_COUNT_CACHE_SECONDS', '600'))
+    ROW_COUNT_PARALLEL_WORKERS = int(os.getenv('ROW_COUNT_PARALLEL_WORKERS', '4'))
+
+    # Catalog prompt results reused while fresh, kept on disk across runs (empty = memory only)
+    PROMPT_CACHE_DIR = os.getenv('PROMPT_CACHE_DIR', '')
+
+    # HTTP: compress responses (gzip, or brotli when installed) for clients that accept it
+    HTTP_COMPRESSION = os.getenv('HTTP_COMPRESSION', 'true').lower() == 'true'
+    HTTP_COMPRESSION_MIN_BYTES = int(os.getenv('HTTP_COMPRESSION_MIN_BYTES', '512'))
+
+    # Tracing: span exporter (none, console, file, otlp) and its settings
+    TRACE_EXPORTER = os.getenv('TRACE_EXPORTER', 'none')
+    TRACE_FILE = os.getenv('TRACE_FILE', 'traces.jsonl')
+    TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+    TRACE_OTLP_HEADERS = os.getenv('TRACE_OTLP_HEADERS', '')
+    TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'postgres-analyzer')
+    TRACE_SAMPLE_RATIO = float(os.getenv('TRACE_SAMPLE_RATIO', '1.0'))
+
 # Create a global session handler
 session_handler = SessionHandler(session_timeout=1800)
 
+# Create the global metrics store for collected time series
+metrics_store = MetricsStore(directory=Config.METRICS_DIR)
+
+# Create the global active session history sampler (idle unless ASH_PRESETS is set)
+activity_sampler = ActiveSessionSampler(
+    presets=Config.ASH_PRESETS,
+    interval=Config.ASH_INTERVAL_SECONDS,
+    capacity=Config.ASH_CAPACITY,
+    retention_seconds=Config.ASH_RETENTION_HOURS * 3600,
+    store=metrics_store
+)
+
 def configure_logging():
     """Configure logging for the application"""
     logging.basicConfig(
@@ -61,6 +119,18 @@ def configure_logging():
     )
     return logging.getLogger("postgres-analyzer")
 
+def configure_tracing():
+    """Install the span exporter selected by TRACE_EXPORTER (nothing is traced with 'none')"""
+    headers = dict(item.split("=", 1) for item in Config.TRACE_OTLP_HEADERS.split(",") if "=" in item)
+    return tracing.install_exporter(
+        Config.TRACE_EXPORTER,
+        sample_ratio=Config.TRACE_SAMPLE_RATIO,
+        file_path=Config.TRACE_FILE,
+        endpoint=Config.TRACE_OTLP_ENDPOINT,
+        headers={key.strip(): value.strip() for key, value in headers.items()},
+        service_name=Config.TRACE_SERVICE_NAME
+    )
+
 @asynccontextmanager
 async def server_lifespan(server: FastMCP):
     """Manage application lifecycle for the MCP server"""
@@ -72,4 +142,18 @@ async def server_lifespan(server: FastMCP):
     finally:
         # Stop the session handler
         await session_handler.stop()
-        print("Shutting down PostgreSQL Performance Analyzer MCP Server")
\ No newline at end of file
+        print("Shutting down PostgreSQL Performance Analyzer MCP Server")
+
+@asynccontextmanager
+async def process_lifespan(app):
+    """
+    Background work that lives as long as the server process
+
+    With stateless HTTP, FastMCP enters server_lifespan once per request, so the
+    active session sampler is started here, from the HTTP app's own lifespan.
+    """
+    await activity_sampler.start()
+    try:
+        yield
+    finally:
+        await activity_sampler.stop()
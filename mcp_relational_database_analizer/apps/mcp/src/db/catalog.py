@@ -0,0 +1,108 @@
+"""
+Cached catalog snapshot.
+
+Loads all tables, indexes and foreign keys of a database with one set-based query
+each and keeps the result in memory for a short time, keyed by (host, port, dbname).
+Analyzers that cross-reference the catalog (index hygiene, missing FK indexes, ...)
+work entirely off the snapshot, so they cost four queries regardless of schema size.
+"""
+from typing import Dict, Any, Tuple, Optional
+import threading
+import time
+from db.connector import PostgresConnector
+from instrumentation import record_cache, register_gauge
+from db.queries import (
+    CATALOG_TABLES_QUERY,
+    CATALOG_INDEXES_QUERY,
+    CATALOG_FOREIGN_KEYS_QUERY,
+    CATALOG_CONTEXT_QUERY
+)
+
+CATALOG_TTL_SECONDS = 300
+
+_snapshots: Dict[Tuple[str, int, str], Dict[str, Any]] = {}
+_snapshots_lock = threading.Lock()
+
+def catalog_cache_key(connector: PostgresConnector) -> Tuple[str, int, str]:
+    """Cache key identifying the database a connector points to"""
+    return (connector.host, int(connector.port or 5432), connector.dbname)
+
+def load_catalog_snapshot(connector: PostgresConnector) -> Dict[str, Any]:
+    """
+    Load a catalog snapshot from the database
+
+    Args:
+        connector: PostgresConnector instance with active connection
+
+    Returns:
+        Dictionary with:
+            tables: table oid -> table row (size, tuple counts, write counters)
+            indexes: list of index rows (ordered key attnums/names, size, idx_scan)
+            indexes_by_table: table oid -> list of index rows
+            foreign_keys: list of foreign key rows
+            context: captured_at, stats_reset, is_replica, replica_count
+            loaded_at: time.time() when the snapshot was taken
+    """
+    tables = {row["table_oid"]: row for row in connector.execute_query(CATALOG_TABLES_QUERY)}
+    indexes = connector.execute_query(CATALOG_INDEXES_QUERY)
+    foreign_keys = connector.execute_query(CATALOG_FOREIGN_KEYS_QUERY)
+    context = connector.execute_query(CATALOG_CONTEXT_QUERY)
+
+    indexes_by_table = {}
+    for index in indexes:
+        index["attnums"] = list(index["attnums"] or [])
+        index["key_attnums"] = index["attnums"][:index["key_count"]]
+        indexes_by_table.setdefault(index["table_oid"], []).append(index)
+
+    for foreign_key in foreign_keys:
+        foreign_key["attnums"] = list(foreign_key["attnums"] or [])
+
+    return {
+        "tables": tables,
+        "indexes": indexes,
+        "indexes_by_table": indexes_by_table,
+        "foreign_keys": foreign_keys,
+        "context": context[0] if context else {},
+        "loaded_at": time.time()
+    }
+
+def get_catalog_snapshot(
+    connector: PostgresConnector,
+    max_age: float = CATALOG_TTL_SECONDS,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Get the catalog snapshot for the connector's database, loading it if missing or stale
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        max_age: Maximum age in seconds of a cached snapshot
+        refresh: Force a reload even if a fresh snapshot is cached
+
+    Returns:
+        Catalog snapshot (see load_catalog_snapshot())
+    """
+    key = catalog_cache_key(connector)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+    if snapshot is not None and not refresh and time.time() - snapshot["loaded_at"] <= max_age:
+        record_cache("catalog_snapshot", True)
+        return snapshot
+    record_cache("catalog_snapshot", False)
+
+    snapshot = load_catalog_snapshot(connector)
+    if snapshot["tables"]:
+        with _snapshots_lock:
+            _snapshots[key] = snapshot
+    return snapshot
+
+register_gauge("mcp_catalog_snapshots", "Catalog snapshots held in memory",
+               lambda: [({}, len(_snapshots))])
+
+def invalidate_catalog_snapshot(connector: Optional[PostgresConnector] = None) -> None:
+    """Drop the cached snapshot of one database, or of all databases when no connector is given"""
+    with _snapshots_lock:
+        if connector is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(catalog_cache_key(connector), None)
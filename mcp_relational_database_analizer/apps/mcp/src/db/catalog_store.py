@@ -0,0 +1,214 @@
+"""
+Persistent catalog cache.
+
+Structure snapshots (tables, columns, indexes, foreign keys, settings) are written to
+one compact binary file per database and validated against a DDL fingerprint of the
+catalog before use, so a restarted server answers structure questions without
+rescanning information_schema. Snapshots hold only what the fingerprint covers: sizes,
+row counts and usage statistics change without DDL and are read by the caller on every
+use (analysis.structure).
+
+File layout:
+    magic (8 bytes) | header length (uint32, little endian) | JSON header | sections
+The header holds the fingerprint, the capture time and the offset (from the end of
+the header) and length of every section. A section is marshal-encoded as
+(column names, list of row tuples) and is only decoded when first accessed,
+straight from an mmap of the file.
+"""
+from typing import Dict, Any, List, Tuple, Optional, Callable
+from datetime import date, datetime, time as time_of_day
+from decimal import Decimal
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import threading
+import time
+from db.connector import PostgresConnector
+from db.queries import CATALOG_FINGERPRINT_QUERY
+from instrumentation import record_cache, register_gauge
+
+SNAPSHOT_MAGIC = b"PGCAT\x00\x00\x03"   # last byte: format version, bumped when a section changes shape
+HEADER_LENGTH = struct.Struct("<I")
+
+_persisted: Dict[Tuple[str, int, str, str], "PersistedSnapshot"] = {}
+_persisted_lock = threading.Lock()
+
+class PersistedSnapshot:
+    """
+    Catalog snapshot whose sections are row lists, decoded lazily from an mmap
+
+    Supports snapshot["tables"] like the dictionaries returned by get_database_structure().
+    """
+
+    def __init__(self, fingerprint: str, captured_at: float, sections: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.fingerprint = fingerprint
+        self.captured_at = captured_at
+        self.sections = dict(sections or {})
+        self.layout = {}
+        self.mapped = None
+        self.schema_model = None   # analysis.schema_model.SchemaModel, built on first use
+
+    @classmethod
+    def open(cls, path: str) -> Optional["PersistedSnapshot"]:
+        """Map a snapshot file and read its header; None if missing or unreadable"""
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError("bad magic")
+            start = len(SNAPSHOT_MAGIC)
+            (length,) = HEADER_LENGTH.unpack_from(mapped, start)
+            start += HEADER_LENGTH.size
+            header = json.loads(mapped[start:start + length])
+            data_start = start + length
+        except (ValueError, struct.error):
+            mapped.close()
+            return None
+
+        snapshot = cls(header["fingerprint"], header["captured_at"])
+        snapshot.layout = {name: (data_start + offset, size) for name, offset, size in header["sections"]}
+        snapshot.mapped = mapped
+        return snapshot
+
+    def __getitem__(self, name: str) -> List[Dict[str, Any]]:
+        rows = self.sections.get(name)
+        if rows is None:
+            if name not in self.layout:
+                raise KeyError(name)
+            offset, size = self.layout[name]
+            columns, values = marshal.loads(self.mapped[offset:offset + size])
+            rows = [dict(zip(columns, row)) for row in values]
+            self.sections[name] = rows
+        return rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections or name in self.layout
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self[name] if name in self else default
+
+    def write(self, path: str) -> None:
+        """Write every section to path (atomically, through a temporary file)"""
+        blobs = [(name, encode_rows(rows)) for name, rows in self.sections.items()]
+        sections, offset = [], 0
+        for name, blob in blobs:
+            sections.append([name, offset, len(blob)])
+            offset += len(blob)
+
+        header = json.dumps({"fingerprint": self.fingerprint, "captured_at": self.captured_at,
+                             "sections": sections}).encode()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for _, blob in blobs:
+                f.write(blob)
+        os.replace(temporary, path)
+
+    def close(self) -> None:
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+def to_marshal_value(value: Any) -> Any:
+    """Convert driver values marshal cannot encode (Decimal, datetime, ...)"""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date, time_of_day)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(to_marshal_value(item) for item in value)
+    return str(value)
+
+def encode_rows(rows: List[Dict[str, Any]]) -> bytes:
+    """Encode rows as (column names, row tuples): column names are stored once per section"""
+    columns = tuple(rows[0].keys()) if rows else ()
+    values = [tuple(to_marshal_value(row.get(column)) for column in columns) for row in rows]
+    return marshal.dumps((columns, values))
+
+def catalog_fingerprint(connector: PostgresConnector) -> Optional[str]:
+    """Fingerprint of the database's DDL and configuration; None if it cannot be computed"""
+    result = connector.execute_query(CATALOG_FINGERPRINT_QUERY)
+    return result[0]["fingerprint"] if result else None
+
+def snapshot_cache_key(connector: PostgresConnector) -> Tuple[str, int, str, str]:
+    """Cache key: what information_schema shows depends on the user as well as the database"""
+    return (connector.host, int(connector.port or 5432), connector.dbname, connector.user)
+
+def snapshot_path(directory: str, key: Tuple[str, int, str, str]) -> str:
+    """File holding the persisted snapshot of a database"""
+    digest = hashlib.md5("|".join(str(part) for part in key).encode()).hexdigest()
+    return os.path.join(directory, f"{digest}.catalog")
+
+def get_persisted_snapshot(
+    connector: PostgresConnector,
+    build: Callable[[], Dict[str, List[Dict[str, Any]]]],
+    directory: Optional[str] = None,
+    refresh: bool = False
+) -> Tuple[Any, str]:
+    """
+    Get a structure snapshot valid for the current DDL, from memory, disk or the database
+
+    The fingerprint query is always run; a cached snapshot is only used when its
+    fingerprint matches. Otherwise build() is called and its result is cached in memory
+    and, when a directory is given, written to disk for the next restart.
+
+    Args:
+        connector: PostgresConnector instance with active connection
+        build: Loads the sections from the database
+        directory: Directory of the persistent cache, or None for memory only
+        refresh: Ignore cached snapshots
+
+    Returns:
+        (snapshot, source) where source is 'memory', 'disk' or 'database'
+    """
+    fingerprint = catalog_fingerprint(connector)
+    if fingerprint is None:
+        return build(), "database"
+
+    key = snapshot_cache_key(connector)
+    if not refresh:
+        with _persisted_lock:
+            snapshot = _persisted.get(key)
+        if snapshot is not None and snapshot.fingerprint == fingerprint:
+            record_cache("structure_snapshot", True)
+            return snapshot, "memory"
+
+        if directory:
+            snapshot = PersistedSnapshot.open(snapshot_path(directory, key))
+            if snapshot is not None and snapshot.fingerprint == fingerprint:
+                remember_snapshot(key, snapshot)
+                record_cache("structure_snapshot", True)
+                return snapshot, "disk"
+            if snapshot is not None:
+                snapshot.close()
+
+    record_cache("structure_snapshot", False)
+    snapshot = PersistedSnapshot(fingerprint, time.time(), build())
+    if directory:
+        try:
+            snapshot.write(snapshot_path(directory, key))
+        except OSError as e:
+            print(f"Error writing catalog cache: {str(e)}")
+    remember_snapshot(key, snapshot)
+    return snapshot, "database"
+
+register_gauge("mcp_structure_snapshots", "Structure snapshots held in memory",
+               lambda: [({}, len(_persisted))])
+
+def remember_snapshot(key: Tuple[str, int, str, str], snapshot: PersistedSnapshot) -> None:
+    """Keep a snapshot in memory; a replaced one is unmapped once no request still reads it"""
+    with _persisted_lock:
+        _persisted[key] = snapshot
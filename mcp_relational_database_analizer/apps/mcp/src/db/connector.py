@@ -2,7 +2,17 @@ import json
 import psycopg2
 import boto3
 import base64
+import hashlib
+import hmac
+import os
 from typing import List, Dict, Any, Optional
+from db.pool import get_pool
+from instrumentation import phase, record_phase, set_target
+from tracing import span, start_span, statement_attributes, SPAN_KIND_CLIENT
+import time
+
+# Per-process key of the credential digests in pool keys: passwords are never kept as plain hashes
+POOL_KEY_SECRET = os.urandom(32)
 
 class PostgresConnector:
     def __init__(self, secret_name=None, region_name=None, host=None, port=None, 
@@ -15,6 +25,7 @@ class PostgresConnector:
         self.user = user
         self.password = password
         self.conn = None
+        self.pool = None       # db.pool.ConnectionPool the connection was borrowed from
         self.read_only = True  # Default to read-only mode
         
     def connect(self):
@@ -22,15 +33,18 @@ class PostgresConnector:
         try:
             if self.secret_name and self.region_name:
                 # Get credentials from AWS Secrets Manager
-                session = boto3.session.Session()
-                client = session.client(
-                    service_name='secretsmanager',
-                    region_name=self.region_name
-                )
-                
-                get_secret_value_response = client.get_secret_value(
-                    SecretId=self.secret_name
-                )
+                secret_attributes = {"rpc.system": "aws-api", "rpc.service": "SecretsManager",
+                                     "rpc.method": "GetSecretValue", "cloud.region": self.region_name}
+                with phase("credentials"), span("secretsmanager.GetSecretValue", secret_attributes, SPAN_KIND_CLIENT):
+                    session = boto3.session.Session()
+                    client = session.client(
+                        service_name='secretsmanager',
+                        region_name=self.region_name
+                    )
+                    
+                    get_secret_value_response = client.get_secret_value(
+                        SecretId=self.secret_name
+                    )
                 
                 if 'SecretString' in get_secret_value_response:
                     secret = json.loads(get_secret_value_response['SecretString'])
@@ -52,30 +66,47 @@ class PostgresConnector:
                 print("Error: Either AWS Secrets Manager details or direct database credentials must be provided")
                 return False
             
-            # Connect to the database
-            self.conn = psycopg2.connect(
+            # Connect to the database, borrowing from the installed pool if any
+            open_connection = lambda: psycopg2.connect(
                 host=self.host,
                 port=self.port or 5432,
                 dbname=self.dbname,
                 user=self.user,
                 password=self.password
             )
-            
-            # Set session to read-only mode for safety
-            if self.read_only:
-                with self.conn.cursor() as cursor:
-                    cursor.execute("SET TRANSACTION READ ONLY")
-                    cursor.execute("SET statement_timeout = '30s'")  # 30-second timeout
+            set_target(f"{self.dbname}@{self.host}")
+            connect_attributes = {"db.system": "postgresql", "db.name": self.dbname,
+                                  "net.peer.name": self.host, "net.peer.port": int(self.port or 5432)}
+            with phase("connect"), span("db.connect", connect_attributes, SPAN_KIND_CLIENT) as connect_span:
+                self.pool = get_pool()
+                if connect_span is not None:
+                    connect_span.set_attribute("db.connection.pooled", self.pool is not None)
+                if self.pool is not None:
+                    self.conn = self.pool.acquire(self.pool_key(), open_connection)
+                else:
+                    self.conn = open_connection()
+                
+                # Set session to read-only mode for safety
+                if self.read_only:
+                    with self.conn.cursor() as cursor:
+                        cursor.execute("SET TRANSACTION READ ONLY")
+                        cursor.execute("SET statement_timeout = '30s'")  # 30-second timeout
             
             print(f"Connected to PostgreSQL database: {self.dbname} at {self.host}")
             return True
         except Exception as e:
             print(f"Error connecting to database: {str(e)}")
+            if self.conn and self.pool is not None:
+                self.disconnect()
             return False
     
     def disconnect(self):
         """Close the database connection"""
-        if self.conn:
+        if self.conn and self.pool is not None:
+            self.pool.release(self.pool_key(), self.conn)
+            self.conn = None
+            self.pool = None
+        elif self.conn:
             try:
                 self.conn.close()
                 self.conn = None
@@ -83,6 +114,25 @@ class PostgresConnector:
             except Exception as e:
                 print(f"Error closing database connection: {str(e)}")
     
+    def new_transaction(self):
+        """End the current transaction so the next statements see a fresh snapshot, now() and statistics"""
+        if not self.conn:
+            return
+        self.conn.rollback()
+        if self.read_only:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SET TRANSACTION READ ONLY")
+    
+    def pool_key(self):
+        """
+        Identity of the database, role and password, for pooling
+
+        A connector with wrong credentials must not borrow a connection that another
+        caller authenticated.
+        """
+        credentials = hmac.new(POOL_KEY_SECRET, (self.password or "").encode(), hashlib.sha256).hexdigest()
+        return (self.host, int(self.port or 5432), self.dbname, self.user, credentials)
+    
     def execute_query(self, query, params=None):
         """Execute a query and return results as a list of dictionaries"""
         if not self.conn:
@@ -106,13 +156,17 @@ class PostgresConnector:
                             print(f"Error: Write operation '{op}' attempted in read-only mode")
                             return []
                 
-                cursor.execute(query, params)
+                with phase("sql"), span("db.query", lambda: statement_attributes(query), SPAN_KIND_CLIENT) as query_span:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall() if cursor.description else None
+                    if query_span is not None and rows is not None:
+                        query_span.set_attribute("db.rows", len(rows))
                 
                 # For SELECT queries, return results
-                if cursor.description:
+                if rows is not None:
                     columns = [desc[0] for desc in cursor.description]
                     results = []
-                    for row in cursor.fetchall():
+                    for row in rows:
                         results.append(dict(zip(columns, row)))
                     return results
                 
@@ -123,6 +177,49 @@ class PostgresConnector:
             self.conn.rollback()
             print(f"Error executing query: {str(e)}")
             return []
+    
+    def stream_query(self, query, params=None, batch_size=2000):
+        """
+        Execute a SELECT through a server-side (named) cursor and yield its rows as tuples
+        
+        The first item yielded is the list of column names. Rows are fetched from the
+        server batch_size at a time, so memory does not grow with the size of the result.
+        Errors are raised to the caller (the transaction is rolled back first).
+        """
+        if not self.conn:
+            raise ConnectionError("No database connection. Call connect() first.")
+        
+        self._stream_count = getattr(self, "_stream_count", 0) + 1
+        waited = 0.0    # time spent in the database, without the consumer's processing
+        rows = 0
+        # not made current: the generator is suspended between batches
+        query_span = start_span("db.query", lambda: statement_attributes(query), SPAN_KIND_CLIENT)
+        try:
+            with self.conn.cursor(name=f"mcp_stream_{self._stream_count}") as cursor:
+                cursor.itersize = batch_size
+                started = time.perf_counter()
+                cursor.execute(query, params)
+                batch = cursor.fetchmany(batch_size)
+                waited += time.perf_counter() - started
+                # a named cursor only has a description once the first rows were fetched
+                yield [desc[0] for desc in cursor.description]
+                while batch:
+                    rows += len(batch)
+                    yield from batch
+                    started = time.perf_counter()
+                    batch = cursor.fetchmany(batch_size)
+                    waited += time.perf_counter() - started
+        except Exception as e:
+            self.conn.rollback()
+            if query_span is not None:
+                query_span.set_error(e)
+            raise
+        finally:
+            record_phase("sql", waited)
+            if query_span is not None:
+                query_span.set_attribute("db.rows", rows)
+                query_span.set_attribute("db.wait_ms", round(waited * 1000, 3))
+                query_span.end()
 
     def analyze_query_complexity(self, query):
         """
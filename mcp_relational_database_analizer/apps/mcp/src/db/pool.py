@@ -0,0 +1,141 @@
+"""
+Connection pool.
+
+Keeps open connections per database and lends them to connectors, so a burst of
+short tool calls (the prompt catalog runner) does not open a connection per call.
+Connectors use the pool installed with use_pool(); without one every connect()
+opens and every disconnect() closes its own connection.
+"""
+from typing import Dict, List, Tuple, Any, Callable, Optional, Iterator
+from contextlib import contextmanager
+import threading
+
+from instrumentation import register_gauge
+
+PoolKey = Tuple[str, int, str, str, str]   # host, port, dbname, user, credentials digest
+
+DEFAULT_POOL_SIZE = 4
+
+class ConnectionPool:
+    """
+    At most max_size open connections per (host, port, dbname, user, credentials digest)
+
+    acquire() hands out an idle connection or opens a new one, waiting when max_size
+    are already lent; release() rolls the borrower's transaction back and keeps the
+    connection for the next caller.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_POOL_SIZE):
+        self.max_size = max_size
+        self.idle: Dict[PoolKey, List[Any]] = {}
+        self.open: Dict[PoolKey, int] = {}
+        self.condition = threading.Condition()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, key: PoolKey, connect: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Lend a connection of the database identified by key
+
+        Args:
+            key: (host, port, dbname, user, credentials digest): only callers that could
+                open the connection themselves get it
+            connect: Opens a new connection when none is idle
+            timeout: Seconds to wait for a free connection, None to wait forever
+
+        Raises:
+            TimeoutError: no connection became free within timeout
+        """
+        with self.condition:
+            while True:
+                idle = self.idle.get(key)
+                while idle:
+                    conn = idle.pop()
+                    if not conn.closed:
+                        self.reused += 1
+                        return conn
+                    self.open[key] -= 1
+                if self.open.get(key, 0) < self.max_size:
+                    self.open[key] = self.open.get(key, 0) + 1
+                    break
+                if not self.condition.wait(timeout):
+                    raise TimeoutError(f"No pooled connection free within {timeout}s")
+
+        try:
+            conn = connect()
+        except Exception:
+            with self.condition:
+                self.open[key] -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created += 1
+        return conn
+
+    def release(self, key: PoolKey, conn: Any) -> None:
+        """Return a lent connection; broken connections are dropped"""
+        try:
+            conn.rollback()
+            reusable = not conn.closed
+        except Exception:
+            reusable = False
+        if not reusable:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        with self.condition:
+            if reusable:
+                self.idle.setdefault(key, []).append(conn)
+            else:
+                self.open[key] -= 1
+            self.condition.notify()
+
+    def close_all(self) -> None:
+        """Close the idle connections (lent ones are closed when they come back broken or by their owner)"""
+        with self.condition:
+            for key, connections in self.idle.items():
+                for conn in connections:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                self.open[key] -= len(connections)
+            self.idle.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self.condition:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "open": sum(self.open.values()),
+                "idle": sum(len(connections) for connections in self.idle.values())
+            }
+
+_pool: Optional[ConnectionPool] = None
+
+def get_pool() -> Optional[ConnectionPool]:
+    """The pool installed with use_pool(), None when connectors open their own connections"""
+    return _pool
+
+def pool_samples() -> List[Tuple[Dict[str, str], float]]:
+    """Gauge samples of the installed pool: connections by state, and lifetime created/reused"""
+    pool = get_pool()
+    if pool is None:
+        return []
+    stats = pool.stats()
+    return [({"state": name}, value) for name, value in stats.items()]
+
+register_gauge("mcp_pool_connections", "Connection pool of the prompt catalog runner (open, idle, created, reused)",
+               pool_samples)
+
+@contextmanager
+def use_pool(pool: ConnectionPool) -> Iterator[ConnectionPool]:
+    """Make connectors borrow from pool while the block runs, then close its connections"""
+    global _pool
+    previous, _pool = _pool, pool
+    try:
+        yield pool
+    finally:
+        _pool = previous
+        pool.close_all()
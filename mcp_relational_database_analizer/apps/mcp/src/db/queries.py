@@ -50,20 +50,23 @@ COLUMNS_QUERY = """
 
 INDEXES_QUERY = """
     SELECT
-        schemaname as table_schema,
-        relname as table_name,
-        indexrelname as index_name,
-        pg_get_indexdef(indexrelid) as index_definition,
-        idx_scan as index_scans,
-        idx_tup_read as tuples_read,
-        idx_tup_fetch as tuples_fetched,
-        pg_relation_size(indexrelid) as index_size_bytes
+        s.schemaname as table_schema,
+        s.relname as table_name,
+        s.indexrelname as index_name,
+        pg_get_indexdef(s.indexrelid) as index_definition,
+        i.indisprimary as is_primary,
+        s.idx_scan as index_scans,
+        s.idx_tup_read as tuples_read,
+        s.idx_tup_fetch as tuples_fetched,
+        pg_relation_size(s.indexrelid) as index_size_bytes
     FROM
-        pg_stat_user_indexes
+        pg_stat_user_indexes s
+    JOIN
+        pg_index i ON i.indexrelid = s.indexrelid
     WHERE
-        schemaname NOT IN ('pg_catalog', 'information_schema')
+        s.schemaname NOT IN ('pg_catalog', 'information_schema')
     ORDER BY
-        schemaname, relname, indexrelname
+        s.schemaname, s.relname, s.indexrelname
 """
 
 FOREIGN_KEYS_QUERY = """
@@ -188,35 +191,44 @@ COLUMNS_FOR_INDEX_QUERY = """
 INDEXES_FOR_TABLE_QUERY = """
     SELECT
         i.relname as index_name,
-        array_agg(a.attname) as column_names,
+        ARRAY(
+            SELECT pg_get_indexdef(ix.indexrelid, k.ord + 1, true)
+            FROM generate_series(0, ix.indnkeyatts - 1) AS k(ord)
+            ORDER BY k.ord
+        ) as column_names,
+        ARRAY(
+            SELECT pg_get_indexdef(ix.indexrelid, k.ord + 1, true)
+            FROM generate_series(ix.indnkeyatts, ix.indnatts - 1) AS k(ord)
+            ORDER BY k.ord
+        ) as include_columns,
         ix.indisunique as is_unique,
         ix.indisprimary as is_primary,
         am.amname as index_type,
+        pg_get_expr(ix.indpred, ix.indrelid) as predicate,
         pg_get_indexdef(ix.indexrelid) as index_definition
-    FROM
-        pg_class t,
-        pg_class i,
-        pg_index ix,
-        pg_attribute a,
-        pg_am am
-    WHERE
-        t.oid = ix.indrelid
-        AND i.oid = ix.indexrelid
-        AND a.attrelid = t.oid
-        AND a.attnum = ANY(ix.indkey)
-        AND t.relkind = 'r'
+    FROM pg_index ix
+    JOIN pg_class t ON t.oid = ix.indrelid
+    JOIN pg_class i ON i.oid = ix.indexrelid
+    JOIN pg_am am ON am.oid = i.relam
+    WHERE t.relkind = 'r'
         AND t.relname = %s
-        AND i.relam = am.oid
-    GROUP BY
-        i.relname,
-        ix.indisunique,
-        ix.indisprimary,
-        am.amname,
-        ix.indexrelid
     ORDER BY
         i.relname
 """
 
+COLUMN_STATS_FOR_INDEX_QUERY = """
+    SELECT
+        attname as column_name,
+        n_distinct,
+        null_frac,
+        avg_width,
+        most_common_vals::text as most_common_vals,
+        most_common_freqs
+    FROM pg_stats
+    WHERE tablename = %s
+        AND schemaname NOT IN ('pg_catalog', 'information_schema')
+"""
+
 # PostgreSQL settings
 SETTINGS_QUERY = """
     SELECT name, setting, unit, category, short_desc, context, source
@@ -229,4 +241,609 @@ SETTINGS_FILTERED_QUERY = """
     FROM pg_settings
     WHERE name ILIKE %s
     ORDER BY category, name
-"""
\ No newline at end of file
+"""
+
+# Extension checks
+CHECK_PG_STAT_STATEMENTS_QUERY = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'
+    ) as has_pg_stat_statements
+"""
+
+# Hypothetical index evaluation (HypoPG)
+CHECK_HYPOPG_QUERY = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_extension WHERE extname = 'hypopg'
+    ) as has_hypopg
+"""
+
+HYPOPG_CREATE_INDEX_QUERY = """
+    SELECT indexrelid, indexname FROM hypopg_create_index(%s)
+"""
+
+HYPOPG_RESET_QUERY = """
+    SELECT hypopg_reset()
+"""
+
+# Workload index advisor
+WORKLOAD_STATEMENTS_QUERY = """
+    SELECT
+        query,
+        calls,
+        total_exec_time as total_time_ms,
+        mean_exec_time as mean_time_ms,
+        rows
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+        AND calls >= %s
+        AND query NOT ILIKE '%%pg_stat_statements%%'
+    ORDER BY total_exec_time DESC
+    LIMIT %s
+"""
+
+WORKLOAD_TABLE_STATS_QUERY = """
+    SELECT
+        s.schemaname as table_schema,
+        s.relname as table_name,
+        c.reltuples::bigint as reltuples,
+        c.relpages,
+        s.n_tup_ins,
+        s.n_tup_upd,
+        s.n_tup_del,
+        s.n_tup_hot_upd,
+        s.seq_scan,
+        s.idx_scan
+    FROM pg_stat_user_tables s
+    JOIN pg_class c ON c.oid = s.relid
+    WHERE s.relname = ANY(%s)
+"""
+
+WORKLOAD_COLUMN_STATS_QUERY = """
+    SELECT
+        n.nspname as table_schema,
+        c.relname as table_name,
+        a.attname as column_name,
+        COALESCE(st.avg_width, a.attlen, 32) as avg_width,
+        st.n_distinct,
+        COALESCE(st.null_frac, 0) as null_frac
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stats st ON st.schemaname = n.nspname AND st.tablename = c.relname AND st.attname = a.attname
+    WHERE c.relname = ANY(%s)
+        AND c.relkind IN ('r', 'p', 'm')
+        AND a.attnum > 0
+        AND NOT a.attisdropped
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+"""
+
+INDEX_KEYS_QUERY = """
+    SELECT
+        n.nspname as table_schema,
+        t.relname as table_name,
+        i.relname as index_name,
+        ix.indisunique as is_unique,
+        ix.indisprimary as is_primary,
+        ARRAY(
+            SELECT pg_get_indexdef(ix.indexrelid, k.ord + 1, true)
+            FROM generate_series(0, ix.indnkeyatts - 1) AS k(ord)
+            ORDER BY k.ord
+        ) as key_columns,
+        ARRAY(
+            SELECT pg_get_indexdef(ix.indexrelid, k.ord + 1, true)
+            FROM generate_series(ix.indnkeyatts, ix.indnatts - 1) AS k(ord)
+            ORDER BY k.ord
+        ) as include_columns,
+        pg_get_expr(ix.indpred, ix.indrelid) as predicate,
+        am.amname as index_type,
+        pg_relation_size(ix.indexrelid) as index_size_bytes
+    FROM pg_index ix
+    JOIN pg_class t ON t.oid = ix.indrelid
+    JOIN pg_class i ON i.oid = ix.indexrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_am am ON am.oid = i.relam
+    WHERE t.relname = ANY(%s)
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+"""
+
+# Catalog snapshot (one set-based query per catalog, shared by the hygiene analyzers)
+CATALOG_TABLES_QUERY = """
+    SELECT
+        c.oid as table_oid,
+        n.nspname as table_schema,
+        c.relname as table_name,
+        c.reltuples::bigint as reltuples,
+        c.relpages,
+        pg_table_size(c.oid) as size_bytes,
+        COALESCE(s.seq_scan, 0) as seq_scan,
+        COALESCE(s.idx_scan, 0) as idx_scan,
+        COALESCE(s.n_tup_ins, 0) as n_tup_ins,
+        COALESCE(s.n_tup_upd, 0) as n_tup_upd,
+        COALESCE(s.n_tup_del, 0) as n_tup_del,
+        COALESCE(s.n_tup_hot_upd, 0) as n_tup_hot_upd,
+        COALESCE(s.n_live_tup, 0) as n_live_tup,
+        COALESCE(s.n_dead_tup, 0) as n_dead_tup
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.relkind IN ('r', 'p', 'm')
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+CATALOG_INDEXES_QUERY = """
+    SELECT
+        ix.indexrelid as index_oid,
+        ix.indrelid as table_oid,
+        n.nspname as table_schema,
+        t.relname as table_name,
+        i.relname as index_name,
+        am.amname as index_type,
+        ix.indisunique as is_unique,
+        ix.indisprimary as is_primary,
+        ix.indisvalid as is_valid,
+        ix.indnkeyatts as key_count,
+        ix.indkey::int2[] as attnums,
+        ix.indclass::oid[] as opclasses,
+        ARRAY(
+            SELECT a.attname
+            FROM unnest(ix.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+            LEFT JOIN pg_attribute a ON a.attrelid = ix.indrelid AND a.attnum = k.attnum
+            ORDER BY k.ord
+        ) as column_names,
+        pg_get_expr(ix.indexprs, ix.indrelid) as expressions,
+        pg_get_expr(ix.indpred, ix.indrelid) as predicate,
+        con.conname as constraint_name,
+        pg_relation_size(ix.indexrelid) as size_bytes,
+        COALESCE(s.idx_scan, 0) as idx_scan
+    FROM pg_index ix
+    JOIN pg_class i ON i.oid = ix.indexrelid
+    JOIN pg_class t ON t.oid = ix.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_am am ON am.oid = i.relam
+    LEFT JOIN pg_constraint con ON con.conindid = ix.indexrelid AND con.contype IN ('p', 'u', 'x')
+    LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = ix.indexrelid
+    WHERE n.nspname NOT IN ('pg_catalog', 'information_schema')
+        AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+CATALOG_FOREIGN_KEYS_QUERY = """
+    SELECT
+        con.oid as constraint_oid,
+        con.conname as constraint_name,
+        con.conrelid as table_oid,
+        n.nspname as table_schema,
+        t.relname as table_name,
+        con.confrelid as referenced_table_oid,
+        rn.nspname as referenced_schema,
+        rt.relname as referenced_table,
+        con.conkey::int2[] as attnums,
+        ARRAY(
+            SELECT a.attname
+            FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+            ORDER BY k.ord
+        ) as column_names,
+        con.confdeltype as on_delete,
+        con.confupdtype as on_update
+    FROM pg_constraint con
+    JOIN pg_class t ON t.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_class rt ON rt.oid = con.confrelid
+    JOIN pg_namespace rn ON rn.oid = rt.relnamespace
+    WHERE con.contype = 'f'
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+"""
+
+CATALOG_CONTEXT_QUERY = """
+    SELECT
+        now() as captured_at,
+        (SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()) as stats_reset,
+        pg_is_in_recovery() as is_replica,
+        (SELECT count(*) FROM pg_stat_replication) as replica_count
+"""
+
+# Bloat estimation (all relations in one pass)
+BLOAT_TABLES_QUERY = """
+    SELECT
+        c.oid as table_oid,
+        n.nspname as table_schema,
+        c.relname as table_name,
+        c.relpages,
+        c.reltuples::bigint as reltuples,
+        COALESCE(
+            (SELECT option_value::int FROM pg_options_to_table(c.reloptions) WHERE option_name = 'fillfactor'),
+            100
+        ) as fillfactor,
+        pg_relation_size(c.oid) as size_bytes
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'm')
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+BLOAT_INDEXES_QUERY = """
+    SELECT
+        i.oid as index_oid,
+        ix.indrelid as table_oid,
+        n.nspname as table_schema,
+        t.relname as table_name,
+        i.relname as index_name,
+        i.relpages,
+        i.reltuples::bigint as reltuples,
+        COALESCE(
+            (SELECT option_value::int FROM pg_options_to_table(i.reloptions) WHERE option_name = 'fillfactor'),
+            90
+        ) as fillfactor,
+        ix.indnkeyatts as key_count,
+        ix.indkey::int2[] as attnums,
+        pg_relation_size(i.oid) as size_bytes
+    FROM pg_index ix
+    JOIN pg_class i ON i.oid = ix.indexrelid
+    JOIN pg_class t ON t.oid = ix.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_am am ON am.oid = i.relam
+    WHERE am.amname = 'btree'
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+BLOAT_COLUMNS_QUERY = """
+    SELECT
+        a.attrelid as table_oid,
+        a.attnum,
+        a.attlen,
+        a.attalign,
+        NOT a.attnotnull as nullable,
+        s.avg_width,
+        s.null_frac
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stats s ON s.schemaname = n.nspname AND s.tablename = c.relname AND s.attname = a.attname
+    WHERE a.attnum > 0
+        AND NOT a.attisdropped
+        AND c.relkind IN ('r', 'm')
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+CHECK_PGSTATTUPLE_QUERY = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_extension WHERE extname = 'pgstattuple'
+    ) as has_pgstattuple
+"""
+
+PGSTATTUPLE_APPROX_QUERY = """
+    SELECT table_len, approx_free_space, approx_free_percent, dead_tuple_len, dead_tuple_percent
+    FROM pgstattuple_approx(%s::regclass)
+"""
+
+PGSTATINDEX_QUERY = """
+    SELECT index_size, avg_leaf_density, leaf_fragmentation
+    FROM pgstatindex(%s::regclass)
+"""
+
+# Autovacuum forecasting
+VACUUM_SETTINGS_QUERY = """
+    SELECT name, setting
+    FROM pg_settings
+    WHERE name LIKE 'autovacuum%'
+        OR name IN ('vacuum_failsafe_age', 'vacuum_multixact_failsafe_age', 'track_counts')
+"""
+
+CLEAR_STATS_SNAPSHOT_QUERY = """
+    SELECT pg_stat_clear_snapshot()
+"""
+
+VACUUM_TABLES_QUERY = """
+    SELECT
+        c.oid as table_oid,
+        n.nspname as table_schema,
+        c.relname as table_name,
+        c.reltuples::bigint as reltuples,
+        c.reloptions,
+        age(c.relfrozenxid) as xid_age,
+        mxid_age(c.relminmxid) as mxid_age,
+        s.n_live_tup,
+        s.n_dead_tup,
+        s.n_mod_since_analyze,
+        (to_jsonb(s) ->> 'n_ins_since_vacuum')::bigint as n_ins_since_vacuum,
+        s.vacuum_count + s.autovacuum_count as vacuum_count,
+        s.analyze_count + s.autoanalyze_count as analyze_count,
+        s.last_autovacuum,
+        s.last_autoanalyze,
+        p.relid IS NOT NULL as vacuum_running,
+        extract(epoch from clock_timestamp()) as sampled_at
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_stat_user_tables s ON s.relid = c.oid
+    LEFT JOIN (SELECT DISTINCT relid FROM pg_stat_progress_vacuum) p ON p.relid = c.oid
+    WHERE c.relkind IN ('r', 'm')
+"""
+
+# Lock / blocking analysis
+LOCK_SNAPSHOT_QUERY = """
+    SELECT
+        a.pid,
+        a.datname,
+        a.usename,
+        a.application_name,
+        a.client_addr::text as client_addr,
+        a.backend_type,
+        a.state,
+        a.wait_event_type,
+        a.wait_event,
+        extract(epoch from clock_timestamp() - a.xact_start) as xact_seconds,
+        extract(epoch from clock_timestamp() - a.state_change) as state_seconds,
+        left(a.query, 300) as query,
+        CASE WHEN a.wait_event_type = 'Lock' THEN pg_blocking_pids(a.pid) ELSE '{}'::int[] END as blocked_by,
+        CASE WHEN a.wait_event_type = 'Lock' THEN (
+            SELECT string_agg(DISTINCT l.mode || ' on ' || COALESCE(l.relation::regclass::text, l.locktype), ', ')
+            FROM pg_locks l
+            WHERE l.pid = a.pid AND NOT l.granted
+        ) END as waiting_for,
+        extract(epoch from clock_timestamp()) as sampled_at
+    FROM pg_stat_activity a
+    WHERE a.pid <> pg_backend_pid()
+        AND a.backend_type IN ('client backend', 'autovacuum worker')
+"""
+
+# Active session history sampling
+# query_id exists from PostgreSQL 14 (compute_query_id); older servers and sessions
+# without one fall back to a hash of the statement text
+ACTIVE_SESSION_SAMPLE_QUERY = """
+    SELECT
+        COALESCE((to_jsonb(a)->>'query_id')::bigint, hashtext(a.query)::bigint, 0) as query_id,
+        a.wait_event_type,
+        a.wait_event,
+        a.state,
+        a.backend_type,
+        left(a.query, 200) as query
+    FROM pg_stat_activity a
+    WHERE a.pid <> pg_backend_pid()
+        AND ((a.state IS NOT NULL AND a.state <> 'idle')
+             OR (a.state IS NULL AND a.wait_event_type IS DISTINCT FROM 'Activity'))
+"""
+
+ACTIVE_SESSION_SETUP_QUERY = """
+    SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY;
+    SET statement_timeout = '5s';
+"""
+
+# Persistent catalog cache
+# Any DDL rewrites the affected pg_class / pg_attribute / pg_index / pg_constraint rows
+# (new xmin); a configuration reload moves pg_conf_load_time()
+CATALOG_FINGERPRINT_QUERY = """
+    SELECT md5(concat_ws('|',
+        (SELECT string_agg(c.oid::text || ':' || c.xmin::text, ',' ORDER BY c.oid)
+         FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+         WHERE n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'),
+        (SELECT string_agg(a.attrelid::text || '.' || a.attnum::text || ':' || a.xmin::text, ',' ORDER BY a.attrelid, a.attnum)
+         FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+         WHERE a.attnum > 0 AND c.relkind IN ('r', 'p')
+             AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'),
+        (SELECT string_agg(i.indexrelid::text || ':' || i.xmin::text, ',' ORDER BY i.indexrelid)
+         FROM pg_index i JOIN pg_class c ON c.oid = i.indrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+         WHERE n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'),
+        (SELECT string_agg(con.oid::text || ':' || con.xmin::text, ',' ORDER BY con.oid)
+         FROM pg_constraint con JOIN pg_namespace n ON n.oid = con.connamespace
+         WHERE n.nspname NOT IN ('pg_catalog', 'information_schema')),
+        (SELECT string_agg(d.objoid::text || '.' || d.objsubid::text || ':' || d.xmin::text, ',' ORDER BY d.objoid, d.objsubid)
+         FROM pg_description d WHERE d.classoid = 'pg_class'::regclass),
+        pg_conf_load_time()::text
+    )) as fingerprint
+"""
+
+# Sizes and usage statistics of every user table and index, read on each call: they are
+# not part of the persisted snapshot
+CATALOG_STATISTICS_QUERY = """
+    SELECT
+        n.nspname as schema_name,
+        c.relname as relation_name,
+        pg_relation_size(c.oid) as size_bytes,
+        CASE WHEN c.relkind IN ('r', 'p') THEN pg_total_relation_size(c.oid) END as total_size_bytes,
+        st.n_live_tup as live_rows,
+        si.idx_scan as index_scans,
+        si.idx_tup_read as tuples_read,
+        si.idx_tup_fetch as tuples_fetched
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables st ON st.relid = c.oid
+    LEFT JOIN pg_stat_user_indexes si ON si.indexrelid = c.oid
+    WHERE c.relkind IN ('r', 'p', 'i', 'I')
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema') AND n.nspname NOT LIKE 'pg_toast%'
+"""
+
+CATALOG_SETTINGS_QUERY = """
+    SELECT name, setting, unit, context, category
+    FROM pg_settings
+    ORDER BY name
+"""
+
+# Paginated structure analysis
+# {sort_value}, {cursor_condition} and {order_by} are filled from a fixed whitelist in
+# analysis.structure. The page is chosen on pg_class alone (the sort value is a catalog
+# column or a cheap catalog lookup); sizes and descriptions are computed for its rows only.
+STRUCTURE_PAGE_TABLES_QUERY = """
+    SELECT
+        p.table_oid,
+        p.table_schema,
+        p.table_name,
+        p.sort_value,
+        pg_relation_size(p.table_oid) as table_size_bytes,
+        pg_total_relation_size(p.table_oid) as total_size_bytes,
+        COALESCE(s.n_live_tup, GREATEST(p.reltuples, 0)::bigint) as estimated_row_count,
+        COALESCE(s.seq_scan, 0) as seq_scan,
+        (SELECT count(*) FROM pg_index i WHERE i.indrelid = p.table_oid) as index_count,
+        EXISTS (SELECT 1 FROM pg_index i WHERE i.indrelid = p.table_oid AND i.indisprimary) as has_primary_key,
+        COALESCE(obj_description(p.table_oid, 'pg_class'), '') as table_description
+    FROM (
+        SELECT
+            c.oid as table_oid,
+            n.nspname as table_schema,
+            c.relname as table_name,
+            c.reltuples,
+            {sort_value} as sort_value
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p')
+            AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+            AND n.nspname NOT LIKE 'pg\\_toast%%'
+            AND n.nspname LIKE %(schema_pattern)s
+            AND c.relname LIKE %(table_pattern)s
+            AND {cursor_condition}
+        ORDER BY {order_by}
+        LIMIT %(limit)s
+    ) p
+    LEFT JOIN pg_stat_user_tables s ON s.relid = p.table_oid
+    ORDER BY {order_by}
+"""
+
+# Tables matched by the filters of a structure page, counted once for the first page
+STRUCTURE_PAGE_COUNT_QUERY = """
+    SELECT count(*) as matching_tables
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p')
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        AND n.nspname NOT LIKE 'pg\\_toast%%'
+        AND n.nspname LIKE %(schema_pattern)s
+        AND c.relname LIKE %(table_pattern)s
+"""
+
+STRUCTURE_PAGE_COLUMNS_QUERY = """
+    SELECT
+        n.nspname as table_schema,
+        c.relname as table_name,
+        a.attname as column_name,
+        format_type(a.atttypid, a.atttypmod) as data_type,
+        NULL::int as character_maximum_length,
+        CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END as is_nullable,
+        pg_get_expr(d.adbin, d.adrelid) as column_default,
+        COALESCE(col_description(c.oid, a.attnum), '') as column_description
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE a.attrelid = ANY(%s::oid[])
+        AND a.attnum > 0
+        AND NOT a.attisdropped
+    ORDER BY n.nspname, c.relname, a.attnum
+"""
+
+STRUCTURE_PAGE_INDEXES_QUERY = """
+    SELECT
+        n.nspname as table_schema,
+        c.relname as table_name,
+        ic.relname as index_name,
+        pg_get_indexdef(i.indexrelid) as index_definition,
+        i.indisprimary as is_primary,
+        COALESCE(s.idx_scan, 0) as index_scans,
+        COALESCE(s.idx_tup_read, 0) as tuples_read,
+        COALESCE(s.idx_tup_fetch, 0) as tuples_fetched,
+        pg_relation_size(i.indexrelid) as index_size_bytes
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+    WHERE i.indrelid = ANY(%s::oid[])
+    ORDER BY n.nspname, c.relname, ic.relname
+"""
+
+STRUCTURE_PAGE_FOREIGN_KEYS_QUERY = """
+    SELECT
+        n.nspname as table_schema,
+        c.relname as table_name,
+        a.attname as column_name,
+        rn.nspname as foreign_table_schema,
+        rc.relname as foreign_table_name,
+        ra.attname as foreign_column_name
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_class rc ON rc.oid = con.confrelid
+    JOIN pg_namespace rn ON rn.oid = rc.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(attnum, ref_attnum)
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    JOIN pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.ref_attnum
+    WHERE con.contype = 'f'
+        AND con.conrelid = ANY(%s::oid[])
+    ORDER BY n.nspname, c.relname, con.conname
+"""
+
+APPROXIMATE_TABLE_ESTIMATES_QUERY = """
+    SELECT
+        t.reference as table_reference,
+        c.oid::regclass::text as table_name,
+        c.relkind as relation_kind,
+        c.relpages as pages,
+        CASE WHEN c.relpages > 0
+             THEN c.reltuples / c.relpages * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+             ELSE GREATEST(c.reltuples, 0)
+        END as estimated_rows
+    FROM unnest(%s::text[]) AS t(reference)
+    JOIN pg_class c ON c.oid = to_regclass(t.reference)
+"""
+
+# Planner-style row count of one table: reltuples scaled to the current number of pages.
+# {table} is a quoted string literal naming the table.
+RELTUPLES_COUNT_EXPRESSION = """(SELECT (CASE WHEN c.relpages > 0
+             THEN round(c.reltuples / c.relpages * (pg_relation_size(c.oid) / current_setting('block_size')::int))
+             ELSE GREATEST(c.reltuples, 0) END)::bigint
+        FROM pg_class c WHERE c.oid = {table}::regclass)"""
+
+# One row per table (all user tables, or the names in %(tables)s) with its planner
+# estimate, the statistics collector's live tuple count and their freshness
+ROW_COUNT_ESTIMATES_QUERY = """
+    SELECT
+        n.nspname as table_schema,
+        c.relname as table_name,
+        c.oid::regclass::text as qualified_name,
+        c.relkind as relation_kind,
+        c.relpages as pages,
+        c.reltuples >= 0 as analyzed,
+        (CASE WHEN c.relpages > 0
+              THEN round(c.reltuples / c.relpages * (pg_relation_size(c.oid) / current_setting('block_size')::int))
+              ELSE GREATEST(c.reltuples, 0) END)::bigint as reltuples_estimate,
+        s.n_live_tup as live_tuples,
+        s.n_dead_tup as dead_tuples,
+        s.n_mod_since_analyze as modified_since_analyze,
+        GREATEST(s.last_analyze, s.last_autoanalyze) as last_analyzed,
+        GREATEST(s.last_vacuum, s.last_autovacuum) as last_vacuumed
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.relkind IN ('r', 'p', 'm')
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        AND n.nspname NOT LIKE 'pg_toast%%'
+        AND (%(tables)s::text[] IS NULL
+             OR c.oid = ANY(ARRAY(SELECT to_regclass(t) FROM unnest(%(tables)s::text[]) AS t)))
+        AND (%(tables)s::text[] IS NOT NULL OR NOT c.relispartition)
+    ORDER BY reltuples_estimate DESC, n.nspname, c.relname
+"""
+
+PARALLEL_WORKERS_SETTING_QUERY = """
+    SELECT current_setting('max_parallel_workers_per_gather') as workers
+"""
+
+# Transaction-local, so it also ends with a rollback
+SET_PARALLEL_WORKERS_QUERY = """
+    SELECT set_config('max_parallel_workers_per_gather', %s, true) as workers
+"""
+
+# Write counters of the tables a cached prompt reads: any insert, update, delete or
+# TRUNCATE (new relfilenode) changes the token. A statistics reset changes it too.
+PROMPT_FRESHNESS_QUERY = """
+    SELECT md5(concat_ws('|',
+        (SELECT string_agg(s.relid::text || ':' || (s.n_tup_ins + s.n_tup_upd + s.n_tup_del)::text
+                           || ':' || c.relfilenode::text, ',' ORDER BY s.relid)
+         FROM pg_stat_user_tables s
+         JOIN pg_class c ON c.oid = s.relid
+         WHERE %(tables)s::text[] IS NULL
+             OR s.relid = ANY(ARRAY(SELECT to_regclass(t) FROM unnest(%(tables)s::text[]) AS t))),
+        (SELECT stats_reset::text FROM pg_stat_database WHERE datname = current_database())
+    )) as token
+"""
@@ -6,10 +6,26 @@ import json
 sys.path.append('/app/src')
 
 from tools.mcp_tools import get_database_connector
-from prompts.prompts import get_model_by_id
+from prompts.prompts import get_model_by_id, MODELS
+from prompts.runner import run_catalog, format_catalog_report, DEFAULT_WORKERS
+from analysis.approximate import run_approximate_query
+from analysis.row_counts import count_rows
+from config import Config, configure_tracing
 
-def execute_prompt(prompt_id):
-    """Executa um prompt pelo ID"""
+DB_CREDENTIALS = {
+    'host': 'postgres',
+    'port': 5432,
+    'dbname': 'petclinic',
+    'username': 'petclinic',
+    'password': 'petclinic'
+}
+
+def execute_prompt(prompt_id, approximate=None):
+    """
+    Executa um prompt pelo ID
+
+    approximate: True/False força o modo; None segue o prompt ("approximate": True) ou APPROXIMATE_QUERIES
+    """
     model = get_model_by_id(prompt_id)
     if not model:
         print(f"Prompt {prompt_id} não encontrado")
@@ -21,13 +37,7 @@ def execute_prompt(prompt_id):
     print(f"{'='*70}\n")
     
     # Conectar ao banco
-    connector = get_database_connector(
-        host='postgres',
-        port=5432,
-        dbname='petclinic',
-        username='petclinic',
-        password='petclinic'
-    )
+    connector = get_database_connector(**DB_CREDENTIALS)
     
     if not connector or not connector.connect():
         print("❌ Falha na conexão com o banco")
@@ -36,15 +46,39 @@ def execute_prompt(prompt_id):
     try:
         if model['tool'] == 'execute_read_only_query':
             query = model['query'].strip()
-            result = connector.execute_query(query)
+            if approximate is None:
+                approximate = model.get('approximate', False) or Config.APPROXIMATE_QUERIES
+            intervals = []
+            if approximate:
+                approximation = run_approximate_query(connector, query.rstrip(';'), Config.APPROXIMATE_SAMPLE_ROWS)
+                result, intervals = approximation['rows'], approximation['intervals']
+                if approximation['mode'] == 'sampled':
+                    print(f"≈ Amostra de {approximation['sample_percent']:g}% de {approximation['sampled_table']} "
+                          f"({approximation['sample_method']}), contagens escaladas ×{approximation['scale']:,.6g}")
+                for note in approximation['notes']:
+                    print(f"ℹ️  {note}")
+                print()
+            else:
+                result = connector.execute_query(query)
             
             if result:
                 print("📊 RESULTADOS:\n")
                 for i, row in enumerate(result, 1):
                     print(f"{i}. {row}")
+                    if intervals and any(intervals[i - 1].values()):
+                        print(f"   IC 95%: {intervals[i - 1]}")
                 print(f"\n✅ Total: {len(result)} registros")
             else:
                 print("ℹ️  Nenhum resultado encontrado")
+        elif model['tool'] == 'count_table_rows':
+            method = 'exact' if approximate is False else 'estimate'
+            counts = count_rows(connector, method=method, max_age=Config.ROW_COUNT_CACHE_SECONDS,
+                                parallel_workers=Config.ROW_COUNT_PARALLEL_WORKERS)
+            print("📊 RESULTADOS:\n")
+            for i, count in enumerate(counts, 1):
+                print(f"{i}. {count['table']}: {count['count']:,} registros "
+                      f"({count['method']}, estatísticas: {count['freshness']})")
+            print(f"\n✅ Total: {sum(count['count'] for count in counts):,} registros em {len(counts)} tabelas")
         else:
             print(f"🔧 Tool: {model['tool']}")
             print(f"⚠️  Este prompt requer execução via cliente MCP")
@@ -54,8 +88,37 @@ def execute_prompt(prompt_id):
     finally:
         connector.disconnect()
 
+def execute_catalog(category=None, workers=DEFAULT_WORKERS, refresh=False):
+    """
+    Executa o catálogo inteiro (ou uma categoria) em paralelo e imprime o relatório consolidado
+
+    refresh: reexecuta também os prompts com resultado em cache
+    """
+    prompts = {k: v for k, v in MODELS.items() if not category or v.get('category') == category}
+    if not prompts:
+        print(f"Nenhum prompt na categoria {category}")
+        return
+    print(format_catalog_report(run_catalog(prompts, DB_CREDENTIALS, workers, refresh=refresh)))
+
+def option(name, default=None):
+    """Valor de uma opção --name=valor da linha de comando"""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f'--{name}='):
+            return arg.split('=', 1)[1]
+    return default
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        execute_prompt(sys.argv[1])
+    configure_tracing()
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    mode = None
+    if '--exact' in sys.argv:
+        mode = False
+    elif '--approximate' in sys.argv:
+        mode = True
+    if '--all' in sys.argv or option('category'):
+        execute_catalog(option('category'), int(option('workers', DEFAULT_WORKERS)), '--refresh' in sys.argv)
+    elif args:
+        execute_prompt(args[0], mode)
     else:
-        print("Uso: python execute_prompt.py <prompt_id>")
\ No newline at end of file
+        print("Uso: python execute_prompt.py <prompt_id> [--approximate | --exact]")
+        print("     python execute_prompt.py --all [--category=<categoria>] [--workers=N] [--refresh]")
\ No newline at end of file
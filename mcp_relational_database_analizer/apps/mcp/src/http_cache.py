@@ -0,0 +1,302 @@
+"""
+HTTP caching and compression for the server's routes.
+
+HttpCacheMiddleware wraps the ASGI app built by FastMCP:
+- GET/HEAD responses of the prompt catalog routes (static for the life of the
+  process) are rendered once and replayed from memory with a strong ETag and a
+  Last-Modified date; If-None-Match / If-Modified-Since are answered with 304.
+  Each cached body is compressed once per encoding (brotli when the optional
+  brotli package is installed, gzip otherwise) and every encoding has its own ETag.
+- Every other response (tool calls over /mcp, including SSE streams) is compressed
+  on the fly when the client accepts it. Chunks are flushed as they are sent, so
+  streamed events still reach the client one by one.
+"""
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+from email.utils import formatdate, parsedate_to_datetime
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:   # optional: gzip is used when brotli is missing
+    brotli = None
+
+from instrumentation import record_cache
+
+CACHED_PATH_PREFIXES = ("/prompts", "/api/prompts")
+MAX_CACHED_RESPONSES = 256
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5          # streaming: fast; cached bodies use BROTLI_STATIC_QUALITY
+BROTLI_STATIC_QUALITY = 11
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Send = Callable[[Message], Awaitable[None]]
+Receive = Callable[[], Awaitable[Message]]
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Content codings this server can produce, most preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Best supported coding allowed by an Accept-Encoding header
+
+    Args:
+        accept_encoding: Header value, e.g. 'gzip, deflate, br;q=0.9'
+
+    Returns:
+        'br', 'gzip' or None for identity
+    """
+    allowed = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            allowed[name.strip().lower()] = quality
+    for encoding in supported_encodings():
+        quality = allowed.get(encoding, allowed.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body once, at the best ratio (cached responses)"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_STATIC_QUALITY)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+class StreamCompressor:
+    """Incremental compressor whose output can be decoded up to every flushed chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes, final: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self.compressor.process(data) if data else b""
+            return out + (self.compressor.finish() if final else self.compressor.flush())
+        out = self.compressor.compress(data) if data else b""
+        return out + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+def header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    """Value of a raw ASGI header (name in lower case), None if absent"""
+    for key, value in headers:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def without_headers(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(key, value) for key, value in headers if key not in names]
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def etag_matches(if_none_match: str, etags: List[str]) -> bool:
+    """Whether an If-None-Match header names one of etags (weak comparison, as RFC 9110 asks for GET)"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) in etags:
+            return True
+    return False
+
+class CachedResponse:
+    """A 200 response kept in memory, with its compressed variants built on demand"""
+
+    def __init__(self, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.headers = without_headers(headers, b"content-length", b"etag", b"last-modified",
+                                       b"content-encoding", b"vary")
+        self.body = body
+        existing = header(headers, b"etag")
+        # keep a strong ETag set by the route (the prompt registry's content hash)
+        self.etag = existing if existing and not existing.startswith("W/") else \
+            '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.modified = time.time()
+        self.last_modified = formatdate(self.modified, usegmt=True)
+        self.compressible = is_compressible(header(headers, b"content-type")) and len(body) >= MIN_COMPRESS_BYTES
+        self.variants: Dict[str, bytes] = {}
+        self.lock = threading.Lock()
+
+    def variant_etag(self, encoding: Optional[str]) -> str:
+        """Strong ETags differ per encoding: the bytes differ"""
+        return self.etag if encoding is None else self.etag[:-1] + "-" + encoding + '"'
+
+    def all_etags(self) -> List[str]:
+        return [self.variant_etag(None)] + [self.variant_etag(encoding) for encoding in supported_encodings()]
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        with self.lock:
+            if encoding not in self.variants:
+                self.variants[encoding] = compress(self.body, encoding)
+            return self.variants[encoding]
+
+    def not_modified(self, request_headers: List[Tuple[bytes, bytes]]) -> bool:
+        if_none_match = header(request_headers, b"if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, self.all_etags())
+        if_modified_since = header(request_headers, b"if-modified-since")
+        if if_modified_since:
+            try:
+                return int(self.modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+class HttpCacheMiddleware:
+    """
+    ASGI middleware: response cache for the catalog routes and compression for everything
+
+    Args:
+        app: ASGI application (mcp.streamable_http_app())
+        cached_prefixes: Path prefixes whose GET responses never change while the process runs
+        compression: Compress responses for clients that accept it
+        min_size: Smallest body, in bytes, worth compressing when its length is known
+    """
+
+    def __init__(self, app: Any, cached_prefixes: Tuple[str, ...] = CACHED_PATH_PREFIXES,
+                 compression: bool = True, min_size: int = MIN_COMPRESS_BYTES):
+        self.app = app
+        self.cached_prefixes = cached_prefixes
+        self.compression = compression
+        self.min_size = min_size
+        self.responses: Dict[Tuple[str, bytes], CachedResponse] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if scope["method"] in ("GET", "HEAD") and any(path == prefix or path.startswith(prefix + "/")
+                                                      for prefix in self.cached_prefixes):
+            await self.serve_cached(scope, receive, send)
+            return
+        encoding = choose_encoding(header(scope["headers"], b"accept-encoding") or "") if self.compression else None
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, self.compressing_send(send, encoding))
+
+    async def serve_cached(self, scope: Scope, receive: Receive, send: Send) -> None:
+        key = (scope["path"], scope.get("query_string", b""))
+        cached = self.responses.get(key)
+        record_cache("http_responses", cached is not None)
+        if cached is None:
+            self.misses += 1
+            cached = await self.render(scope, receive, send)
+            if cached is None:      # not a 200: already sent as is
+                return
+        else:
+            self.hits += 1
+
+        encoding = None
+        if self.compression and cached.compressible:
+            encoding = choose_encoding(header(scope["headers"], b"accept-encoding") or "")
+        headers = cached.headers + [
+            (b"etag", cached.variant_etag(encoding).encode()),
+            (b"last-modified", cached.last_modified.encode()),
+        ]
+        if header(headers, b"cache-control") is None:
+            headers.append((b"cache-control", b"no-cache"))
+        if cached.compressible:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if cached.not_modified(scope["headers"]):
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": without_headers(headers, b"content-type")})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = cached.variant(encoding)
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def render(self, scope: Scope, receive: Receive, send: Send) -> Optional[CachedResponse]:
+        """
+        Run the route without conditional headers and keep its 200 response
+
+        Returns:
+            The cached response, or None when the route answered something else
+            (that answer is forwarded to the client unchanged)
+        """
+        inner_scope = dict(scope)
+        inner_scope["method"] = "GET"
+        inner_scope["headers"] = without_headers(scope["headers"], b"if-none-match", b"if-modified-since",
+                                                 b"accept-encoding")
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def collect(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(inner_scope, receive, collect)
+        body = b"".join(chunks)
+        if start.get("status") != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+            return None
+
+        cached = CachedResponse(list(start.get("headers", [])), body)
+        with self.lock:
+            if len(self.responses) >= MAX_CACHED_RESPONSES:
+                self.responses.pop(next(iter(self.responses)))
+            self.responses[(scope["path"], scope.get("query_string", b""))] = cached
+        return cached
+
+    def compressing_send(self, send: Send, encoding: str) -> Send:
+        """Wrap send so the response body is compressed chunk by chunk, when it is worth it"""
+        state: Dict[str, Any] = {"compressor": None, "passthrough": False}
+
+        async def compressed(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                length = header(headers, b"content-length")
+                if (message["status"] in (204, 304) or header(headers, b"content-encoding") is not None
+                        or not is_compressible(header(headers, b"content-type"))
+                        or (length is not None and int(length) < self.min_size)):
+                    state["passthrough"] = True
+                    await send(message)
+                    return
+                state["compressor"] = StreamCompressor(encoding)
+                headers = without_headers(headers, b"content-length")
+                headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                await send({**message, "headers": headers})
+                return
+
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+            more = message.get("more_body", False)
+            body = state["compressor"].chunk(message.get("body", b""), final=not more)
+            await send({"type": "http.response.body", "body": body, "more_body": more})
+
+        return compressed
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self.responses), "hits": self.hits, "misses": self.misses}
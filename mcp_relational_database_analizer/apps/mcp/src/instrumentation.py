@@ -0,0 +1,290 @@
+"""
+Tool call instrumentation.
+
+Every tool call is timed by phase into latency histograms labelled by tool, target
+database and phase (the first MAX_TARGETS databases seen get their own label, later
+ones share "other", so callers naming new hosts cannot grow the metrics without bound):
+    credentials  resolving credentials (AWS Secrets Manager)
+    connect      opening a connection or checking one out of the pool
+    sql          each SQL statement, one observation per statement
+    format       rendering the result (render_output)
+    analysis     the rest of the call: Python-side analysis between the phases above
+    total        the whole call
+Caches count hits and misses, and pools and caches report gauges. Everything is
+exposed in the Prometheus text format by render_prometheus() (the /metrics route).
+
+Each tool call is also a span (tracing), so a slow call can be followed down to
+its statements.
+
+Histograms are HDR-style: log-linear buckets with 32 sub-buckets per power of two
+over microseconds, so any recorded latency is kept within about 3% and recording is
+an index computation and an increment. Outside a tool call, phase() costs one
+context variable lookup.
+"""
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from array import array
+import functools
+import threading
+import time
+
+from tracing import span, STATUS_ERROR
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS          # per power of two
+MAX_SHIFT = 32                              # values up to 2^38 µs (about 3 days)
+BUCKET_COUNT = 2 * SUB_BUCKETS + MAX_SHIFT * SUB_BUCKETS
+# Prometheus `le` boundaries (seconds), derived from the fine buckets at export time
+EXPORT_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+EXPORT_QUANTILES = (0.5, 0.9, 0.99)
+MAX_TARGETS = 32                            # distinct target labels; later databases are "other"
+OTHER_TARGET = "other"
+
+def bucket_index(micros: int) -> int:
+    """Index of the bucket holding a value in microseconds"""
+    if micros < 2 * SUB_BUCKETS:
+        return max(micros, 0)
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    if shift > MAX_SHIFT:
+        return BUCKET_COUNT - 1
+    return 2 * SUB_BUCKETS + (shift - 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """[lower, upper) in microseconds of a bucket"""
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = (index - 2 * SUB_BUCKETS) // SUB_BUCKETS + 1
+    mantissa = (index - 2 * SUB_BUCKETS) % SUB_BUCKETS + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+class Histogram:
+    """Log-linear latency histogram over microseconds"""
+
+    def __init__(self):
+        self.counts = array("q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        index = bucket_index(int(seconds * 1_000_000))
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Value (seconds) at quantile q, the midpoint of its bucket"""
+        with self.lock:
+            rank, seen = q * self.count, 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= rank:
+                    lower, upper = bucket_bounds(index)
+                    return (lower + upper) / 2 / 1_000_000
+        return 0.0
+
+    def cumulative(self, bounds: Tuple[float, ...]) -> List[int]:
+        """Observations at or below each bound (seconds); a bucket counts where its lower end falls"""
+        with self.lock:
+            counts = list(self.counts)
+        result, seen, index = [], 0, 0
+        for bound in bounds:
+            limit = bound * 1_000_000
+            while index < BUCKET_COUNT and bucket_bounds(index)[0] <= limit:
+                seen += counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+class ToolCall:
+    """Timings of one running tool call"""
+
+    __slots__ = ("tool", "target", "phases")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.target = "-"
+        self.phases: List[Tuple[str, float]] = []
+
+class Instruments:
+    """Histograms, counters and gauges of the process"""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self.calls: Dict[Tuple[str, str, str], int] = {}            # (tool, target, status) -> count
+        self.cache_requests: Dict[Tuple[str, str], int] = {}        # (cache, 'hit'|'miss') -> count
+        self.gauges: List[Tuple[str, str, Callable[[], List[Tuple[Dict[str, str], float]]]]] = []
+        self.targets = set()                                         # target labels in use
+        self.lock = threading.Lock()
+
+    def target_label(self, target: str) -> str:
+        """Metric label of a target database: itself while fewer than MAX_TARGETS are labelled, else 'other'"""
+        if target in self.targets or target == "-":
+            return target
+        with self.lock:
+            if len(self.targets) < MAX_TARGETS:
+                self.targets.add(target)
+                return target
+        return OTHER_TARGET
+
+    def histogram(self, tool: str, target: str, phase: str) -> Histogram:
+        key = (tool, target, phase)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def count(self, counter: Dict[Tuple[str, ...], int], key: Tuple[str, ...]) -> None:
+        with self.lock:
+            counter[key] = counter.get(key, 0) + 1
+
+instruments = Instruments()
+_current: ContextVar[Optional[ToolCall]] = ContextVar("tool_call", default=None)
+
+def timed_tool(function: Callable) -> Callable:
+    """
+    Decorator for async tool functions: times the call and each phase inside it,
+    within a 'tool <name>' span
+
+    The signature is preserved (functools.wraps), so FastMCP still builds the tool
+    schema from the original parameters.
+    """
+    tool = function.__name__
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        call = ToolCall(tool)
+        token = _current.set(call)
+        started = time.perf_counter()
+        status = "error"
+        with span(f"tool {tool}", {"mcp.tool.name": tool}) as tool_span:
+            try:
+                result = await function(*args, **kwargs)
+                if not (isinstance(result, str) and result.startswith(("Error", "Failed"))):
+                    status = "ok"
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                _current.reset(token)
+                finish_call(call, elapsed, status)
+                if tool_span is not None:
+                    tool_span.set_attribute("mcp.target", call.target)
+                    tool_span.set_attribute("mcp.tool.status", status)
+                    if status == "error":
+                        tool_span.status = STATUS_ERROR
+
+    return wrapper
+
+def finish_call(call: ToolCall, elapsed: float, status: str) -> None:
+    """Record the phases of a finished call; analysis is the time outside the measured phases"""
+    target = instruments.target_label(call.target)
+    measured = 0.0
+    for name, seconds in call.phases:
+        instruments.histogram(call.tool, target, name).record(seconds)
+        measured += seconds
+    instruments.histogram(call.tool, target, "analysis").record(max(elapsed - measured, 0.0))
+    instruments.histogram(call.tool, target, "total").record(elapsed)
+    instruments.count(instruments.calls, (call.tool, target, status))
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as one observation of a phase of the current tool call (no-op outside calls)"""
+    call = _current.get()
+    if call is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        call.phases.append((name, time.perf_counter() - started))
+
+def record_phase(name: str, seconds: float) -> None:
+    """Add an observation measured by the caller (e.g. the fetches of a streamed query)"""
+    call = _current.get()
+    if call is not None:
+        call.phases.append((name, seconds))
+
+def set_target(target: str) -> None:
+    """Label the current tool call with the database it works on ('dbname@host')"""
+    call = _current.get()
+    if call is not None:
+        call.target = target
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count one lookup of a cache"""
+    instruments.count(instruments.cache_requests, (cache, "hit" if hit else "miss"))
+
+def register_gauge(name: str, help_text: str, collect: Callable[[], List[Tuple[Dict[str, str], float]]]) -> None:
+    """
+    Add a gauge whose samples are read when /metrics is scraped
+
+    Args:
+        name: Metric name, e.g. 'mcp_pool_connections'
+        help_text: HELP line
+        collect: Returns (labels, value) samples; exceptions drop the gauge from that scrape
+
+    Registering a name again replaces the earlier gauge.
+    """
+    with instruments.lock:
+        instruments.gauges = [gauge for gauge in instruments.gauges if gauge[0] != name]
+        instruments.gauges.append((name, help_text, collect))
+
+def label_text(labels: Dict[str, str]) -> str:
+    """{key="value",...} with backslashes, quotes and newlines escaped"""
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    histograms = sorted(instruments.histograms.items())
+
+    lines.append("# HELP mcp_tool_phase_seconds Tool call latency by phase")
+    lines.append("# TYPE mcp_tool_phase_seconds histogram")
+    for (tool, target, name), histogram in histograms:
+        labels = {"tool": tool, "target": target, "phase": name}
+        for bound, count in zip(EXPORT_BOUNDS, histogram.cumulative(EXPORT_BOUNDS)):
+            lines.append(f"mcp_tool_phase_seconds_bucket{label_text({**labels, 'le': f'{bound:g}'})} {count}")
+        lines.append(f"mcp_tool_phase_seconds_bucket{label_text({**labels, 'le': '+Inf'})} {histogram.count}")
+        lines.append(f"mcp_tool_phase_seconds_sum{label_text(labels)} {histogram.total:.6f}")
+        lines.append(f"mcp_tool_phase_seconds_count{label_text(labels)} {histogram.count}")
+
+    lines.append("# HELP mcp_tool_phase_quantile_seconds Tool call latency quantiles by phase (within 3%)")
+    lines.append("# TYPE mcp_tool_phase_quantile_seconds gauge")
+    for (tool, target, name), histogram in histograms:
+        for q in EXPORT_QUANTILES:
+            labels = {"tool": tool, "target": target, "phase": name, "quantile": f"{q:g}"}
+            lines.append(f"mcp_tool_phase_quantile_seconds{label_text(labels)} {histogram.quantile(q):.6f}")
+
+    lines.append("# HELP mcp_tool_calls_total Tool calls by result")
+    lines.append("# TYPE mcp_tool_calls_total counter")
+    for (tool, target, status), count in sorted(instruments.calls.items()):
+        lines.append(f"mcp_tool_calls_total{label_text({'tool': tool, 'target': target, 'status': status})} {count}")
+
+    lines.append("# HELP mcp_cache_requests_total Cache lookups by result")
+    lines.append("# TYPE mcp_cache_requests_total counter")
+    requests = sorted(instruments.cache_requests.items())
+    for (cache, result), count in requests:
+        lines.append(f"mcp_cache_requests_total{label_text({'cache': cache, 'result': result})} {count}")
+    lines.append("# HELP mcp_cache_hit_ratio Share of cache lookups answered from the cache")
+    lines.append("# TYPE mcp_cache_hit_ratio gauge")
+    for cache in sorted({cache for (cache, _), _ in requests}):
+        hits = instruments.cache_requests.get((cache, "hit"), 0)
+        total = hits + instruments.cache_requests.get((cache, "miss"), 0)
+        lines.append(f"mcp_cache_hit_ratio{label_text({'cache': cache})} {hits / total if total else 0:.4f}")
+
+    for name, help_text, collect in instruments.gauges:
+        try:
+            samples = collect()
+        except Exception:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{label_text(labels) if labels else ''} {value}")
+
+    return "\n".join(lines) + "\n"
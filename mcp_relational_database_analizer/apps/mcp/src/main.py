@@ -3,6 +3,7 @@ import logging
 import os
 import sys
 import json
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Add src directory to Python path
@@ -13,9 +14,13 @@ from starlette.responses import Response, JSONResponse, FileResponse
 from starlette.requests import Request
 from mcp.server.fastmcp import FastMCP
 
-from config import configure_logging, server_lifespan, session_handler
+from config import Config, configure_logging, configure_tracing, process_lifespan, server_lifespan, session_handler
+from http_cache import HttpCacheMiddleware, etag_matches
+from instrumentation import render_prometheus, register_gauge
+from tracing import TraceContextMiddleware
 from tools.mcp_tools import register_all_tools
-from prompts.prompts import MODELS, get_model_list, get_model_by_id, get_model_curl_command, get_models_by_category, get_execution_sequence
+from prompts import registry, build_model_list
+from prompts.prompts import MODELS, get_model_by_id, get_model_curl_command, get_models_by_category, get_execution_sequence, build_simple_list
 
 # Configure logging
 logger = configure_logging()
@@ -73,17 +78,46 @@ async def session_status(request):
         media_type="text/plain"
     )
 
+def listing_response(request, listing):
+    """
+    Resposta de uma listagem memoizada do catálogo, com ETag
+
+    Retorna 304 sem corpo quando o If-None-Match do cliente já tem a versão atual.
+    """
+    headers = {"ETag": listing["etag"], "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), [listing["etag"]]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=listing["body"], status_code=200, media_type=listing["media_type"], headers=headers)
+
+def prompt_not_found(prompt_id):
+    return JSONResponse(
+        {"error": f"Prompt '{prompt_id}' não encontrado. Use o ID (01_complete_structure), "
+                  f"o código (EST-001) ou a ordem de execução (1-{len(MODELS)})."},
+        status_code=404
+    )
+
+# Add a Prometheus metrics endpoint
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request):
+    """
+    Tool latency histograms by phase, cache hit ratios and gauges in the Prometheus text format
+    """
+    return Response(
+        content=render_prometheus(),
+        status_code=200,
+        media_type="text/plain; version=0.0.4"
+    )
+
+register_gauge("mcp_active_sessions", "Active MCP sessions",
+               lambda: [({}, len(session_handler.sessions))])
+
 # Add prompts list endpoint
 @mcp.custom_route("/prompts", methods=["GET"])
 async def list_prompts(request):
     """
     Lista todos os prompts organizados por categoria
     """
-    return Response(
-        content=get_model_list(),
-        status_code=200,
-        media_type="text/plain"
-    )
+    return listing_response(request, registry.listing("list", build_model_list))
 
 # Add simple prompts list for quick reference
 @mcp.custom_route("/prompts/simple", methods=["GET"])
@@ -91,20 +125,7 @@ async def list_prompts_simple(request):
     """
     Lista simples de prompts para referência rápida
     """
-    simple_list = "\n>> PROMPTS DISPONÍVEIS - REFERÊNCIA RÁPIDA\n"
-    simple_list += "=" * 50 + "\n\n"
-    
-    for key, model in sorted(MODELS.items(), key=lambda x: x[1].get('execution_order', 999)):
-        priority_icon = "🔴" if model.get('priority') == 'Alta' else "🟡" if model.get('priority') == 'Média' else "🟢"
-        simple_list += f"{key}. {model['name']} {priority_icon}\n"
-    
-    simple_list += "\n💡 Use: curl http://localhost:8000/api/prompts/{ID} para detalhes\n"
-    
-    return Response(
-        content=simple_list,
-        status_code=200,
-        media_type="text/plain"
-    )
+    return listing_response(request, registry.listing("simple", build_simple_list))
 
 # Add prompts JSON endpoint
 @mcp.custom_route("/api/prompts", methods=["GET"])
@@ -112,64 +133,63 @@ async def list_prompts_json(request):
     """
     Lista todos os prompts em formato JSON
     """
-    return JSONResponse({"prompts": MODELS})
+    return listing_response(request, registry.listing("prompts.json", lambda: {"prompts": MODELS}, "application/json"))
+
+# Add organized prompts by category endpoint
+# (antes de /api/prompts/{prompt_id}, que também casaria com "categories")
+@mcp.custom_route("/api/prompts/categories", methods=["GET"])
+async def list_prompts_by_category(request):
+    """
+    Retorna prompts organizados por categoria
+    """
+    return listing_response(request, registry.listing(
+        "categories.json", lambda: {"categories": get_models_by_category()}, "application/json"))
+
+# Add execution sequence endpoint
+@mcp.custom_route("/api/prompts/sequence", methods=["GET"])
+async def list_execution_sequence(request):
+    """
+    Retorna sequência recomendada de execução
+    """
+    return listing_response(request, registry.listing(
+        "sequence.json", lambda: {"execution_sequence": get_execution_sequence()}, "application/json"))
 
 # Add specific prompt endpoint
 @mcp.custom_route("/api/prompts/{prompt_id}", methods=["GET"])
 async def get_prompt(request):
     """
-    Retorna detalhes de um prompt específico (suporta formato 01, 1, etc.)
+    Retorna detalhes de um prompt específico (aceita ID, código EST-001 ou ordem 1, 01, ...)
     """
     prompt_id = request.path_params.get("prompt_id")
-    model = get_model_by_id(prompt_id)
-    
-    if not model:
-        return JSONResponse({"error": f"Prompt '{prompt_id}' não encontrado. Use formato 01-10."}, status_code=404)
-    
-    return JSONResponse(model)
+    key = registry.resolve(prompt_id)
+
+    if key is None:
+        return prompt_not_found(prompt_id)
+
+    return listing_response(request, registry.listing(f"prompt:{key}", lambda: MODELS[key], "application/json"))
 
 # Add prompt command generator
 @mcp.custom_route("/api/prompts/{prompt_id}/command", methods=["GET"])
 async def get_prompt_command(request):
     """
-    Gera comando curl para executar o prompt (suporta formato 01, 1, etc.)
+    Gera comando curl para executar o prompt (aceita ID, código EST-001 ou ordem 1, 01, ...)
     """
     prompt_id = request.path_params.get("prompt_id")
-    model = get_model_by_id(prompt_id)
-    
-    if not model:
-        return JSONResponse({"error": f"Prompt '{prompt_id}' não encontrado. Use formato 01-10."}, status_code=404)
-    
+    key = registry.resolve(prompt_id)
+
+    if key is None:
+        return prompt_not_found(prompt_id)
+
     # Pegar parâmetros de conexão da query string ou usar defaults
     host = request.query_params.get("host", "localhost")
     port = int(request.query_params.get("port", "5432"))
     dbname = request.query_params.get("dbname", "petclinic")
     username = request.query_params.get("username", "petclinic")
     password = request.query_params.get("password", "petclinic")
-    
-    command_data = get_model_curl_command(
-        prompt_id, host, port, dbname, username, password
-    )
-    
-    return JSONResponse(command_data)
 
-# Add organized prompts by category endpoint
-@mcp.custom_route("/api/prompts/categories", methods=["GET"])
-async def get_prompts_by_category(request):
-    """
-    Retorna prompts organizados por categoria
-    """
-    categories = get_models_by_category()
-    return JSONResponse({"categories": categories})
+    command = get_model_curl_command(key, host, port, dbname, username, password)
 
-# Add execution sequence endpoint
-@mcp.custom_route("/api/prompts/sequence", methods=["GET"])
-async def get_execution_sequence(request):
-    """
-    Retorna sequência recomendada de execução
-    """
-    sequence = get_execution_sequence()
-    return JSONResponse({"execution_sequence": sequence})
+    return JSONResponse({"prompt_id": key, "command": command})
 
 # Add batch execution endpoint
 @mcp.custom_route("/api/prompts/batch", methods=["POST"])
@@ -215,6 +235,26 @@ async def execute_batch_prompts(request):
 # Register all tools with the MCP server
 register_all_tools(mcp)
 
+def serve():
+    """Run the streamable HTTP app behind the tracing and HTTP cache/compression middleware"""
+    import uvicorn
+    http_app = mcp.streamable_http_app()
+    session_manager_lifespan = http_app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # process-wide background tasks, around the session manager's own lifespan
+        async with process_lifespan(app), session_manager_lifespan(app):
+            yield
+
+    http_app.router.lifespan_context = lifespan
+    cache = HttpCacheMiddleware(http_app, compression=Config.HTTP_COMPRESSION,
+                                min_size=Config.HTTP_COMPRESSION_MIN_BYTES)
+    register_gauge("mcp_http_cached_responses", "Catalog route responses held by the HTTP cache",
+                   lambda: [({}, len(cache.responses))])
+    app = TraceContextMiddleware(cache)
+    uvicorn.run(app, host=mcp.settings.host, port=mcp.settings.port, log_level=mcp.settings.log_level.lower())
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='PostgreSQL Performance Analyzer Remote MCP Server')
     parser.add_argument('--port', type=int, default=8000, help='Port to run the server on')
@@ -245,15 +285,18 @@ if __name__ == "__main__":
     logger.info(f"Starting PostgreSQL Performance Analyzer Remote MCP server on {args.host}:{args.port}")
     logger.info(f"Health check endpoint available at http://{args.host}:{args.port}/health")
     logger.info(f"Session status endpoint available at http://{args.host}:{args.port}/sessions")
+    logger.info(f"Prometheus metrics endpoint available at http://{args.host}:{args.port}/metrics")
+    if configure_tracing():
+        logger.info(f"Tracing enabled, exporting spans with the '{Config.TRACE_EXPORTER}' exporter")
     logger.info(f"Session timeout: {args.session_timeout} seconds")
     logger.info(f"Request timeout: {args.request_timeout} seconds")
     
     try:
-        mcp.run(transport='streamable-http')
+        serve()
     except Exception as e:
         logger.error(f"Server error: {str(e)}")
         # If the server crashes, try to restart it
         import time
         time.sleep(5)  # Wait 5 seconds before restarting
         logger.info("Attempting to restart server...")
-        mcp.run(transport='streamable-http')
\ No newline at end of file
+        serve()
\ No newline at end of file
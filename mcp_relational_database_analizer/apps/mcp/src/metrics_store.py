@@ -0,0 +1,496 @@
+"""
+Embedded columnar store for metrics collected by the server.
+
+Each metric table keeps one typed array per column (floats, integers, or strings
+dictionary-encoded to integer codes) plus a timestamp column, split into
+time-partitioned chunks. Old chunks are evicted by age (retention) and by row count
+(memory cap). With a directory configured, sealed chunks are written to disk and
+read back through mmap, so history survives restarts without being loaded eagerly.
+
+Query API: aggregate() for group-by + top-N over a time range, window() for
+fixed-step time buckets.
+"""
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+logger = logging.getLogger("postgres-analyzer")
+
+FLOAT = "float"
+INT = "int"
+STRING = "str"
+TYPECODES = {FLOAT: "d", INT: "q", STRING: "I"}
+AGGREGATES = ("count", "sum", "avg", "min", "max", "last")
+
+CHUNK_MAGIC = b"MCH1"
+CHUNK_HEADER = struct.Struct("<4sI")   # magic, length of the JSON header that follows
+
+class StringDictionary:
+    """Dictionary encoding for low-cardinality strings; code 0 is always None"""
+
+    def __init__(self, values: Optional[List[Optional[str]]] = None):
+        self.values = values or [None]
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code]
+
+class Chunk:
+    """
+    Rows of one time partition, one array (or memoryview over an mmap) per column
+
+    A chunk is open while rows are appended and sealed once time moves past its end.
+    Sealed chunks loaded from disk are mapped lazily, on first access.
+    """
+
+    def __init__(self, start: float, end: float, columns: Dict[str, str]):
+        self.start = start
+        self.end = end
+        self.columns = {"ts": array("d")}
+        self.columns.update({name: array(TYPECODES[kind]) for name, kind in columns.items()})
+        self.rows = 0
+        self.last_ts = start
+        self.path = None
+        self.mapped = None
+        self.data_start = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "Chunk":
+        """Read only the header of a chunk file; the data is mapped on first access"""
+        with open(path, "rb") as f:
+            magic, header_length = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+            if magic != CHUNK_MAGIC:
+                raise ValueError(f"not a metrics chunk: {path}")
+            header = json.loads(f.read(header_length))
+        chunk = cls.__new__(cls)
+        chunk.start = header["start"]
+        chunk.end = header["end"]
+        chunk.rows = header["rows"]
+        chunk.last_ts = header["last_ts"]
+        chunk.path = path
+        chunk.layout = header["columns"]
+        chunk.data_start = CHUNK_HEADER.size + header_length
+        chunk.columns = None
+        chunk.mapped = None
+        return chunk
+
+    def column(self, name: str):
+        """Typed values of a column (array, or memoryview for mapped chunks)"""
+        if self.columns is None:
+            self._map()
+        return self.columns[name]
+
+    def _map(self) -> None:
+        with open(self.path, "rb") as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mapped)
+        base = self.data_start
+        self.columns = {
+            name: view[base + offset:base + offset + length].cast(typecode)
+            for name, typecode, offset, length in self.layout
+        }
+
+    def write(self, path: str) -> None:
+        """Write the chunk to disk (8-byte aligned column blocks after a JSON header; offsets count from the end of the header)"""
+        layout, offset = [], 0
+        for name, values in self.columns.items():
+            length = len(values) * values.itemsize
+            layout.append([name, values.typecode, offset, length])
+            offset += length + (-length % 8)
+        header = json.dumps({"start": self.start, "end": self.end, "rows": self.rows,
+                             "last_ts": self.last_ts, "columns": layout}).encode()
+        header += b" " * (-(CHUNK_HEADER.size + len(header)) % 8)
+
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(header)))
+            f.write(header)
+            for values in self.columns.values():
+                values.tofile(f)
+                f.write(b"\0" * (-(len(values) * values.itemsize) % 8))
+        os.replace(temporary, path)
+
+        self.path = path
+        self.layout = layout
+        self.data_start = CHUNK_HEADER.size + len(header)
+
+    def release(self) -> None:
+        """Drop the in-memory arrays of a chunk already on disk; it is remapped when read"""
+        if self.path:
+            self.columns = None  # the views must go before the map can close
+            if self.mapped is not None:
+                try:
+                    self.mapped.close()
+                except BufferError:
+                    pass  # a reader still holds a slice; the map closes when it is collected
+                self.mapped = None
+
+    def row_range(self, start: float, end: float) -> Tuple[int, int]:
+        """Positions [first, last) of the rows with start <= ts <= end"""
+        ts = self.column("ts")
+        return bisect_left(ts, start), bisect_right(ts, end)
+
+class MetricTable:
+    """
+    One time series table: a timestamp plus typed columns
+
+    Args:
+        name: Table name (also the directory name when persisted)
+        columns: Column name -> FLOAT, INT or STRING
+        chunk_seconds: Time span of each chunk
+        retention_seconds: Chunks ending before now - retention are evicted
+        max_rows: Oldest chunks are evicted while the table holds more rows than this
+        directory: Base directory for persistence, or None for memory only
+    """
+
+    def __init__(self, name: str, columns: Dict[str, str], chunk_seconds: float = 3600,
+                 retention_seconds: float = 86400, max_rows: Optional[int] = None,
+                 directory: Optional[str] = None):
+        self.name = name
+        self.schema = dict(columns)
+        self.chunk_seconds = chunk_seconds
+        self.retention_seconds = retention_seconds
+        self.max_rows = max_rows
+        self.directory = os.path.join(directory, name) if directory else None
+        self.dictionaries = {column: StringDictionary() for column, kind in columns.items() if kind == STRING}
+        self.chunks: List[Chunk] = []
+        self.open_chunk: Optional[Chunk] = None
+        self.lock = threading.Lock()
+        if self.directory:
+            self._load()
+
+    # ----- writing -----
+
+    def append(self, ts: float, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append rows sharing one timestamp
+
+        Missing values are stored as 0 (numbers) or None (strings). A timestamp older
+        than the last one appended is clamped, keeping every chunk sorted by time.
+
+        Returns:
+            Number of rows appended
+        """
+        with self.lock:
+            chunk = self._chunk_for(ts)
+            ts = max(ts, chunk.last_ts)
+            columns = chunk.columns
+            encoders = [(name, self.dictionaries[name].encode) for name in self.dictionaries]
+            numbers = [name for name, kind in self.schema.items() if kind != STRING]
+            count = 0
+            for row in rows:
+                columns["ts"].append(ts)
+                for name in numbers:
+                    columns[name].append(row.get(name) or 0)
+                for name, encode in encoders:
+                    columns[name].append(encode(row.get(name)))
+                count += 1
+            chunk.rows += count
+            chunk.last_ts = ts
+            self._evict(ts)
+            return count
+
+    def _chunk_for(self, ts: float) -> Chunk:
+        chunk = self.open_chunk
+        if chunk is not None and ts < chunk.end:
+            return chunk
+        if chunk is not None:
+            self._seal(chunk)
+        if self.chunks:
+            ts = max(ts, self.chunks[-1].last_ts)
+        start = ts - ts % self.chunk_seconds
+        chunk = Chunk(start, start + self.chunk_seconds, self.schema)
+        chunk.last_ts = ts
+        self.chunks.append(chunk)
+        self.open_chunk = chunk
+        return chunk
+
+    def _seal(self, chunk: Chunk) -> None:
+        self.open_chunk = None
+        if self.directory and chunk.rows:
+            self._write_chunk(chunk)
+            chunk.release()
+
+    def _write_chunk(self, chunk: Chunk) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        chunk.write(os.path.join(self.directory, f"{chunk.start:.3f}-{chunk.last_ts:.6f}.chunk"))
+        with open(os.path.join(self.directory, "dictionaries.json.tmp"), "w") as f:
+            json.dump({name: dictionary.values for name, dictionary in self.dictionaries.items()}, f)
+        os.replace(os.path.join(self.directory, "dictionaries.json.tmp"), os.path.join(self.directory, "dictionaries.json"))
+
+    def _evict(self, now: float) -> None:
+        """Drop chunks past retention, then the oldest chunks while over max_rows"""
+        horizon = now - self.retention_seconds
+        total = sum(chunk.rows for chunk in self.chunks)
+        while self.chunks and self.chunks[0] is not self.open_chunk and (
+                self.chunks[0].end <= horizon or (self.max_rows and total > self.max_rows)):
+            chunk = self.chunks.pop(0)
+            total -= chunk.rows
+            chunk.release()
+            if chunk.path and os.path.exists(chunk.path):
+                os.remove(chunk.path)
+
+    def flush(self) -> None:
+        """Persist the open chunk too (on shutdown); later rows start a new chunk"""
+        with self.lock:
+            if self.open_chunk is not None:
+                self._seal(self.open_chunk)
+
+    def _load(self) -> None:
+        """Pick up the chunks and dictionaries of a previous run"""
+        if not os.path.isdir(self.directory):
+            return
+        try:
+            with open(os.path.join(self.directory, "dictionaries.json")) as f:
+                for name, values in json.load(f).items():
+                    if name in self.dictionaries:
+                        self.dictionaries[name] = StringDictionary(values)
+        except (OSError, ValueError):
+            pass
+        for file_name in sorted(os.listdir(self.directory), key=lambda x: float(x.split("-")[0]) if x.endswith(".chunk") else 0):
+            if not file_name.endswith(".chunk"):
+                continue
+            try:
+                self.chunks.append(Chunk.from_file(os.path.join(self.directory, file_name)))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics chunk {file_name}: {str(e)}")
+        self._evict(time.time())
+
+    # ----- reading -----
+
+    def _slices(self, start: float, end: float, names: List[str]) -> List[List[Any]]:
+        """Per chunk overlapping [start, end], the slices of the requested columns"""
+        result = []
+        for chunk in self.chunks:
+            if chunk.rows == 0 or chunk.last_ts < start or chunk.start > end:
+                continue
+            first, last = chunk.row_range(start, end)
+            if first < last:
+                result.append([chunk.column(name)[first:last] for name in names])
+        return result
+
+    def oldest(self) -> Optional[float]:
+        """Timestamp of the oldest row kept"""
+        with self.lock:
+            for chunk in self.chunks:
+                if chunk.rows:
+                    return chunk.column("ts")[0]
+        return None
+
+    def count(self, start: float, end: float) -> int:
+        """Number of rows in [start, end]"""
+        with self.lock:
+            return sum(len(columns[0]) for columns in self._slices(start, end, ["ts"]))
+
+    def aggregate(
+        self,
+        start: float,
+        end: float,
+        group_by: Iterable[str] = (),
+        metrics: Optional[Dict[str, Tuple[str, Optional[str]]]] = None,
+        top: Optional[int] = None,
+        order_by: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate rows in [start, end], optionally grouped, optionally keeping the top N groups
+
+        Count-only group-bys run through Counter over the column slices (no per-row
+        Python work); other aggregates accumulate per group. Group keys are decoded
+        back to strings only once per distinct group.
+
+        Args:
+            start: Range start (epoch seconds)
+            end: Range end (epoch seconds)
+            group_by: Columns to group by
+            metrics: Output name -> (aggregate, column); aggregate is one of AGGREGATES,
+                     column is ignored for count (default: {"count": ("count", None)})
+            top: Keep only the N groups with the largest order_by value
+            order_by: Metric to rank by (default: the first metric)
+
+        Returns:
+            List of rows (group columns + metrics), ordered by order_by descending
+        """
+        group_by = list(group_by)
+        metrics = metrics or {"count": ("count", None)}
+        for function, column in metrics.values():
+            if function not in AGGREGATES:
+                raise ValueError(f"unknown aggregate '{function}', expected one of {', '.join(AGGREGATES)}")
+            if function != "count" and column not in self.schema:
+                raise ValueError(f"unknown column '{column}' in table '{self.name}'")
+        for column in group_by:
+            if column not in self.schema:
+                raise ValueError(f"unknown group-by column '{column}' in table '{self.name}'")
+
+        value_columns = sorted({column for function, column in metrics.values() if function != "count"})
+        with self.lock:
+            parts = self._slices(start, end, group_by + value_columns or ["ts"])
+            groups = self._accumulate(parts, len(group_by), value_columns, metrics)
+
+        rows = []
+        for key, state in groups.items():
+            row = {column: self._decode(column, value) for column, value in zip(group_by, key)}
+            for output, (function, column) in metrics.items():
+                if function == "count":
+                    row[output] = state["count"]
+                elif function == "avg":
+                    row[output] = state[("sum", column)] / state["count"] if state["count"] else None
+                else:
+                    row[output] = state.get((function, column))
+            rows.append(row)
+
+        order_by = order_by or next(iter(metrics))
+        rank = lambda row: row[order_by] if row[order_by] is not None else float("-inf")
+        if top:
+            return heapq.nlargest(top, rows, key=rank)
+        return sorted(rows, key=rank, reverse=True)
+
+    def _accumulate(self, parts, key_count: int, value_columns: List[str], metrics) -> Dict[Tuple, Dict]:
+        """Accumulate count/sum/min/max/last per group key over the chunk slices"""
+        functions = {(function, column) for function, column in metrics.values() if function != "count"}
+        if "avg" in {function for function, _ in functions}:
+            functions |= {("sum", column) for function, column in functions if function == "avg"}
+        functions = {item for item in functions if item[0] != "avg"}
+
+        groups = {}
+        if not functions:
+            counts = Counter()
+            for columns in parts:
+                if key_count == 0:
+                    counts[()] += len(columns[0])
+                elif key_count == 1:
+                    counts.update(columns[0])  # plain values count faster than 1-tuples
+                else:
+                    counts.update(zip(*columns[:key_count]))
+            if key_count == 1:
+                return {(key,): {"count": count} for key, count in counts.items()}
+            return {key: {"count": count} for key, count in counts.items()}
+
+        for columns in parts:
+            keys = columns[:key_count]
+            values = dict(zip(value_columns, columns[key_count:]))
+            if not keys:
+                # no grouping: whole-slice builtins
+                state = groups.setdefault((), {"count": 0})
+                state["count"] += len(values[value_columns[0]])
+                for function, column in functions:
+                    data = values[column]
+                    if function == "sum":
+                        state[(function, column)] = state.get((function, column), 0) + sum(data)
+                    elif function == "min":
+                        state[(function, column)] = min(state.get((function, column), data[0]), min(data))
+                    elif function == "max":
+                        state[(function, column)] = max(state.get((function, column), data[0]), max(data))
+                    elif function == "last":
+                        state[(function, column)] = data[-1]
+                continue
+
+            key_rows = zip(*keys)
+            value_rows = zip(*(values[column] for column in value_columns))
+            positions = {column: i for i, column in enumerate(value_columns)}
+            for key, row in zip(key_rows, value_rows):
+                state = groups.get(key)
+                if state is None:
+                    state = groups[key] = {"count": 0}
+                state["count"] += 1
+                for function, column in functions:
+                    value = row[positions[column]]
+                    current = state.get((function, column))
+                    if function == "sum":
+                        state[(function, column)] = (current or 0) + value
+                    elif function == "min":
+                        state[(function, column)] = value if current is None else min(current, value)
+                    elif function == "max":
+                        state[(function, column)] = value if current is None else max(current, value)
+                    else:
+                        state[(function, column)] = value
+        return groups
+
+    def window(
+        self,
+        start: float,
+        end: float,
+        step: float,
+        metrics: Optional[Dict[str, Tuple[str, Optional[str]]]] = None,
+        group_by: Iterable[str] = ()
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate rows into fixed time buckets of `step` seconds
+
+        Args:
+            start: Range start (epoch seconds); buckets are aligned to it
+            end: Range end (epoch seconds)
+            step: Bucket width in seconds
+            metrics: Same as aggregate()
+            group_by: Additional group-by columns within each bucket
+
+        Returns:
+            List of rows with 'bucket_start' plus group columns and metrics, in time order
+        """
+        rows = []
+        bucket_start = start
+        while bucket_start <= end:
+            bucket_end = min(bucket_start + step, end)
+            # half-open buckets except the last one
+            upper = bucket_end if bucket_end == end else bucket_end - 1e-9
+            for row in self.aggregate(bucket_start, upper, group_by, metrics):
+                row["bucket_start"] = bucket_start
+                rows.append(row)
+            bucket_start += step
+        return rows
+
+    def _decode(self, column: str, value: Any) -> Any:
+        dictionary = self.dictionaries.get(column)
+        return dictionary.decode(value) if dictionary else value
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory by open (not mapped) chunks"""
+        with self.lock:
+            return sum(len(values) * values.itemsize
+                       for chunk in self.chunks if isinstance(chunk.columns, dict) and not chunk.mapped
+                       for values in chunk.columns.values())
+
+class MetricsStore:
+    """
+    Collection of metric tables sharing a persistence directory
+
+    Args:
+        directory: Where sealed chunks are written, or None to keep everything in memory
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or None
+        self.tables: Dict[str, MetricTable] = {}
+        self.lock = threading.Lock()
+
+    def table(self, name: str, columns: Dict[str, str], **options) -> MetricTable:
+        """Get a table, creating it (and loading its persisted chunks) on first use"""
+        with self.lock:
+            table = self.tables.get(name)
+            if table is None:
+                table = MetricTable(name, columns, directory=self.directory, **options)
+                self.tables[name] = table
+            elif table.schema != columns:
+                raise ValueError(f"metrics table '{name}' already exists with a different schema")
+            return table
+
+    def flush(self) -> None:
+        """Persist every open chunk"""
+        for table in list(self.tables.values()):
+            table.flush()
@@ -0,0 +1,229 @@
+"""
+Output formats of the tools.
+
+Every tool answers in one of three formats:
+    markdown  prose and tables for people (default)
+    json      typed results for programs: row lists become {"columns": [...], "rows": [[...]]},
+              execution plans become a table of plan nodes
+    compact   the json result rendered with as few tokens as possible for LLM consumption:
+              "key: value" lines and pipe-separated tables, no markup or padding
+
+JSON is encoded with orjson when it is installed and with the standard library otherwise.
+json and compact responses are held to MAX_RESPONSE_BYTES like markdown ones: json
+keeps the leading rows of every table that fit (and says how many were left out),
+compact is cut at the last complete line.
+"""
+from typing import Dict, List, Any, Optional, Callable, Union, Tuple
+from array import array
+from datetime import date, datetime, time as time_of_day, timedelta
+from decimal import Decimal
+import json
+
+from instrumentation import phase
+from response_builder import ResponseBuilder, text_size
+
+try:
+    import orjson
+except ImportError:   # optional: only speeds up encoding
+    orjson = None
+
+OUTPUT_FORMATS = ("markdown", "json", "compact")
+PLAN_NODE_COLUMNS = ["node", "parent", "depth", "node_type", "relation", "index", "join_type",
+                     "startup_cost", "total_cost", "plan_rows", "actual_rows", "actual_total_time", "loops", "filter"]
+
+def check_output_format(output_format: str) -> Optional[str]:
+    """Error message for an unknown output format, None if it is valid"""
+    if output_format in OUTPUT_FORMATS:
+        return None
+    return f"Error: invalid output_format '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}"
+
+def to_plain(value: Any) -> Any:
+    """
+    Convert a tool result to JSON types
+
+    Lists of dictionaries sharing the same keys become {"columns": [...], "rows": [[...]]};
+    Decimal becomes int or float, dates and times ISO strings, sets and arrays lists.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset, array)):
+        items = list(value)
+        if items and all(isinstance(item, dict) for item in items):
+            columns = list(items[0].keys())
+            if all(item.keys() == items[0].keys() for item in items):
+                return {"columns": columns, "rows": [[to_plain(item[column]) for column in columns] for item in items]}
+        return [to_plain(item) for item in items]
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date, time_of_day)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+def table(columns: List[str], rows: List[List[Any]]) -> Dict[str, Any]:
+    """Typed table in the shape to_plain() produces"""
+    return {"columns": columns, "rows": rows}
+
+def plan_nodes(plan_json: Union[Dict[str, Any], List[Any]]) -> Dict[str, Any]:
+    """
+    Flatten an EXPLAIN (FORMAT JSON) plan into a table of nodes, depth first
+
+    Each node row holds its position, its parent's position (None for the root) and
+    the cost, row and timing fields of the node.
+    """
+    if isinstance(plan_json, list):
+        plan_json = plan_json[0] if plan_json else {}
+    rows = []
+    stack = [(plan_json.get("Plan", {}), None, 0)] if plan_json.get("Plan") else []
+    while stack:
+        node, parent, depth = stack.pop()
+        position = len(rows)
+        rows.append([
+            position, parent, depth, node.get("Node Type"), node.get("Relation Name"), node.get("Index Name"),
+            node.get("Join Type"), node.get("Startup Cost"), node.get("Total Cost"), node.get("Plan Rows"),
+            node.get("Actual Rows"), node.get("Actual Total Time"), node.get("Actual Loops"),
+            node.get("Filter") or node.get("Index Cond") or node.get("Hash Cond") or node.get("Join Filter")
+        ])
+        for child in reversed(node.get("Plans", [])):
+            stack.append((child, position, depth + 1))
+    return table(PLAN_NODE_COLUMNS, rows)
+
+def plan_summary(plan_json: Union[Dict[str, Any], List[Any]]) -> Dict[str, Any]:
+    """Top-level timings and the node table of a plan"""
+    if isinstance(plan_json, list):
+        plan_json = plan_json[0] if plan_json else {}
+    return {
+        "planning_time_ms": plan_json.get("Planning Time"),
+        "execution_time_ms": plan_json.get("Execution Time"),
+        "nodes": plan_nodes(plan_json)
+    }
+
+def dumps(value: Any) -> str:
+    """Serialize a plain result to compact JSON"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str).decode()
+        except TypeError:   # integers beyond 64 bits (numeric columns, sums over bigint)
+            pass
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def compact_value(value: Any, separator: str = "|") -> str:
+    """Terse text of a value; backslashes and the separator of the enclosing line are escaped"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.15g}"      # every digit a float carries; no exponent below 1e15
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    text = dumps(value) if isinstance(value, (list, dict)) else str(value).replace("\n", " ")
+    if "\\" in text or separator in text:
+        text = text.replace("\\", "\\\\").replace(separator, "\\" + separator)
+    return text
+
+def render_compact(value: Any, name: str = "", lines: Optional[List[str]] = None) -> List[str]:
+    """
+    Render a plain result as terse lines
+
+    Scalars are 'name: value', tables 'name[col|col|...]' followed by one
+    pipe-separated line per row (columns that are always empty are dropped),
+    nested dictionaries prefix their keys with 'name.'. Pipes inside cells (and
+    semicolons inside list items) are escaped with a backslash.
+    """
+    lines = [] if lines is None else lines
+    if isinstance(value, dict) and set(value) == {"columns", "rows"}:
+        # columns empty in every row are left out
+        keep = [i for i in range(len(value["columns"])) if any(row[i] is not None for row in value["rows"])]
+        lines.append(f"{name}[{'|'.join(value['columns'][i] for i in keep)}]")
+        lines.extend("|".join(compact_value(row[i]) for i in keep) for row in value["rows"])
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            render_compact(item, f"{name}.{key}" if name else key, lines)
+    elif isinstance(value, list) and not any(isinstance(item, (dict, list)) for item in value):
+        lines.append(f"{name}: " + "; ".join(compact_value(item, ";") for item in value))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            render_compact(item, f"{name}.{i}", lines)
+    else:
+        lines.append(f"{name}: {compact_value(value)}")
+    return lines
+
+def cap_rows(value: Any, limit: int) -> Tuple[Any, int]:
+    """Copy of a plain result keeping at most limit rows per table, and the number of rows left out"""
+    if isinstance(value, dict) and set(value) == {"columns", "rows"}:
+        return {"columns": value["columns"], "rows": value["rows"][:limit]}, max(len(value["rows"]) - limit, 0)
+    if isinstance(value, dict):
+        capped, omitted = {}, 0
+        for key, item in value.items():
+            capped[key], count = cap_rows(item, limit)
+            omitted += count
+        return capped, omitted
+    if isinstance(value, list):
+        capped, omitted = [], 0
+        for item in value:
+            item, count = cap_rows(item, limit)
+            capped.append(item)
+            omitted += count
+        return capped, omitted
+    return value, 0
+
+def fit_json(plain: Any, max_bytes: int) -> str:
+    """
+    JSON of a plain result within max_bytes
+
+    Every table keeps the same number of leading rows, the largest number that fits
+    (binary search); a 'truncated' entry reports the budget and the rows left out.
+    """
+    text = dumps(plain)
+    if text_size(text) <= max_bytes:
+        return text
+    marker = lambda omitted: {"max_bytes": max_bytes, "rows_omitted": omitted}
+    wrap = lambda capped, omitted: ({**capped, "truncated": marker(omitted)} if isinstance(capped, dict)
+                                    else {"result": capped, "truncated": marker(omitted)})
+    low, high, best = 0, max_bytes, None
+    while low <= high:
+        limit = (low + high) // 2
+        capped, omitted = cap_rows(plain, limit)
+        candidate = dumps(wrap(capped, omitted))
+        if text_size(candidate) <= max_bytes:
+            best, low = candidate, limit + 1
+        else:
+            high = limit - 1
+    if best is None:
+        return dumps({"error": f"Result exceeds MAX_RESPONSE_BYTES ({max_bytes:,} bytes) even without table rows",
+                      "truncated": marker(None)})
+    return best
+
+def render_output(output_format: str, result: Any, markdown: Optional[Callable[[], str]] = None,
+                  max_bytes: Optional[int] = None) -> str:
+    """
+    Render a tool result in the requested format
+
+    Args:
+        output_format: One of OUTPUT_FORMATS
+        result: Typed result (dictionaries, lists, scalars)
+        markdown: Builds the markdown response; only called for output_format='markdown'
+        max_bytes: Budget of json and compact responses (default: MAX_RESPONSE_BYTES, 0 = unlimited);
+            markdown builders apply their own
+
+    Returns:
+        The response text
+    """
+    with phase("format"):
+        if output_format == "markdown" and markdown is not None:
+            return markdown()
+        if max_bytes is None:
+            from config import Config
+            max_bytes = Config.MAX_RESPONSE_BYTES
+        plain = to_plain(result)
+        if output_format == "json":
+            return fit_json(plain, max_bytes) if max_bytes else dumps(plain)
+        response = ResponseBuilder(max_bytes)
+        for line in render_compact(plain):
+            if not response.line(line):
+                break
+        return response.build()
@@ -5,29 +5,13 @@ Prompts para análise de manutenção do banco de dados
 MAINTENANCE_PROMPTS = {
     "01_vacuum_analysis": {
         "name": "MAINT-001: Análise de Vacuum",
-        "description": "Analisa necessidade de vacuum e estatísticas",
+        "description": "Prevê quando cada tabela dispara autovacuum/autoanalyze e sinaliza risco de wraparound",
         "category": "Manutenção",
         "priority": "Média",
-        "tool": "execute_read_only_query",
-        "query": """
-            SELECT 
-                schemaname,
-                tablename,
-                last_vacuum,
-                last_autovacuum,
-                vacuum_count,
-                autovacuum_count,
-                n_dead_tup,
-                n_live_tup,
-                CASE 
-                    WHEN n_live_tup > 0 THEN 
-                        ROUND((n_dead_tup::numeric / n_live_tup) * 100, 2)
-                    ELSE 0
-                END as dead_tuple_percent
-            FROM pg_stat_user_tables
-            ORDER BY dead_tuple_percent DESC, n_dead_tup DESC;
-        """,
-        "example_result": "Estatísticas de vacuum com percentual de tuplas mortas",
+        "tool": "forecast_autovacuum",
+        "query": None,
+        "example_result": "Tabelas por urgência com limites efetivos, taxas, ETAs e alertas",
+        "note": "As taxas exigem pelo menos dois snapshots; execute novamente ou use sample_seconds",
         "execution_order": 33
     },
 
@@ -60,28 +44,13 @@ MAINTENANCE_PROMPTS = {
 
     "03_bloat_analysis": {
         "name": "MAINT-003: Análise de Bloat",
-        "description": "Estima bloat em tabelas e índices",
+        "description": "Estima o espaço desperdiçado em tabelas e índices (páginas reais vs. esperadas)",
         "category": "Manutenção",
         "priority": "Baixa",
-        "tool": "execute_read_only_query",
-        "query": """
-            SELECT 
-                schemaname,
-                tablename,
-                pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as total_size,
-                pg_size_pretty(pg_relation_size(schemaname||'.'||tablename)) as table_size,
-                n_live_tup,
-                n_dead_tup,
-                CASE 
-                    WHEN n_live_tup + n_dead_tup > 0 THEN
-                        ROUND((n_dead_tup::numeric / (n_live_tup + n_dead_tup)) * 100, 2)
-                    ELSE 0
-                END as estimated_bloat_percent
-            FROM pg_stat_user_tables
-            WHERE n_live_tup + n_dead_tup > 0
-            ORDER BY estimated_bloat_percent DESC;
-        """,
-        "example_result": "Estimativa de bloat por tabela",
+        "tool": "estimate_bloat",
+        "query": None,
+        "example_result": "Tabelas e índices ordenados por bytes recuperáveis",
+        "note": "Tuplas mortas (n_dead_tup) medem a dívida de vacuum, não o bloat; veja MAINT-001",
         "execution_order": 35
     },
 
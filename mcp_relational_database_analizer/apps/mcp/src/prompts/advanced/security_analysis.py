@@ -23,6 +23,7 @@ SECURITY_PROMPTS = {
             ORDER BY r.rolsuper DESC, r.rolname;
         """,
         "example_result": "Lista de usuários com análise de permissões",
+        "cache": {"ttl": 3600},
         "execution_order": 30
     },
 
@@ -51,6 +52,7 @@ SECURITY_PROMPTS = {
             ORDER BY name;
         """,
         "example_result": "Configurações de segurança de conexão",
+        "cache": {"ttl": 86400, "source": "ddl"},
         "execution_order": 31
     },
 
@@ -80,6 +82,7 @@ SECURITY_PROMPTS = {
             ORDER BY query_start DESC;
         """,
         "example_result": "Atividades atuais com informações de auditoria",
+        "cache": {"ttl": 300},
         "execution_order": 32
     }
 }
\ No newline at end of file
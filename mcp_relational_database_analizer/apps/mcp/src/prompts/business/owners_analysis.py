@@ -21,6 +21,7 @@ OWNERS_PROMPTS = {
             ORDER BY total_owners DESC;
         """,
         "example_result": "Distribuição geográfica com estatísticas detalhadas",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["owners"]},
         "execution_order": 6
     },
 
@@ -43,6 +44,7 @@ OWNERS_PROMPTS = {
             ORDER BY total_owners DESC;
         """,
         "example_result": "Análise demográfica com padrões de endereço",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["owners"]},
         "execution_order": 7
     },
 
@@ -71,6 +73,7 @@ OWNERS_PROMPTS = {
             ORDER BY count DESC;
         """,
         "example_result": "Estatísticas de qualidade dos dados de contato",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["owners"]},
         "execution_order": 8
     }
 }
\ No newline at end of file
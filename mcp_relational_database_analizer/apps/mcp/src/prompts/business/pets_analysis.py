@@ -27,6 +27,7 @@ PETS_PROMPTS = {
             ORDER BY o.last_name, p.name;
         """,
         "example_result": "Cadastro completo com idade e histórico de visitas",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["pets", "types", "owners", "visits"]},
         "execution_order": 9
     },
 
@@ -50,6 +51,7 @@ PETS_PROMPTS = {
             ORDER BY total_pets DESC;
         """,
         "example_result": "Estatísticas detalhadas por tipo de pet",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["pets", "types"]},
         "execution_order": 10
     },
 
@@ -89,6 +91,7 @@ PETS_PROMPTS = {
                 END;
         """,
         "example_result": "Distribuição etária categorizada dos pets",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["pets"]},
         "execution_order": 11
     }
 }
\ No newline at end of file
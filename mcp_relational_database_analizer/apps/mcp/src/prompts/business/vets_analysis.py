@@ -23,6 +23,7 @@ VETS_PROMPTS = {
             ORDER BY specialty_count DESC, v.last_name;
         """,
         "example_result": "Lista de veterinários com análise de especialidades",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["vets", "vet_specialties", "specialties"]},
         "execution_order": 12
     },
 
@@ -45,6 +46,7 @@ VETS_PROMPTS = {
             ORDER BY vet_count DESC;
         """,
         "example_result": "Distribuição de especialidades com cobertura",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["specialties", "vet_specialties", "vets"]},
         "execution_order": 13
     },
 
@@ -71,6 +73,7 @@ VETS_PROMPTS = {
             ORDER BY specialties_count DESC, v.last_name;
         """,
         "example_result": "Classificação dos veterinários por tipo de especialização",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["vets", "vet_specialties", "specialties"]},
         "execution_order": 14
     }
 }
\ No newline at end of file
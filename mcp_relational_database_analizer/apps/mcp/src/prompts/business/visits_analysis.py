@@ -22,7 +22,9 @@ VISITS_PROMPTS = {
             ORDER BY visit_month DESC;
         """,
         "example_result": "Tendências mensais de visitas com métricas",
-        "execution_order": 15
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["visits", "pets"]},
+        "execution_order": 15,
+        "approximate": True
     },
 
     "02_visit_types": {
@@ -57,7 +59,9 @@ VISITS_PROMPTS = {
             ORDER BY visit_count DESC;
         """,
         "example_result": "Distribuição de visitas por categoria de procedimento",
-        "execution_order": 16
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["visits"]},
+        "execution_order": 16,
+        "approximate": True
     },
 
     "03_visit_frequency": {
@@ -104,7 +108,9 @@ VISITS_PROMPTS = {
                 END;
         """,
         "example_result": "Distribuição de pets por frequência de visitas",
-        "execution_order": 17
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["pets", "visits"]},
+        "execution_order": 17,
+        "approximate": True
     },
 
     "04_recent_visits": {
@@ -131,6 +137,7 @@ VISITS_PROMPTS = {
             LIMIT 20;
         """,
         "example_result": "Lista das 20 visitas mais recentes (últimos 90 dias)",
+        "cache": {"ttl": 3600, "source": "tables", "tables": ["visits", "pets", "types", "owners"]},
         "execution_order": 18
     }
 }
\ No newline at end of file
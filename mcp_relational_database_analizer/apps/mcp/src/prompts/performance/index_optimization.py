@@ -17,23 +17,12 @@ INDEX_OPTIMIZATION_PROMPTS = {
 
     "02_unused_indexes": {
         "name": "🗑️ PERF-005: Índices Não Utilizados",
-        "description": "Identifica índices que podem ser removidos",
+        "description": "Identifica índices não utilizados, considerando o reset das estatísticas, réplicas e índices que só atendem FKs",
         "category": "Performance",
         "priority": "Média",
-        "tool": "execute_read_only_query",
-        "query": """
-            SELECT 
-                schemaname,
-                tablename,
-                indexname,
-                idx_tup_read,
-                idx_tup_fetch,
-                pg_size_pretty(pg_relation_size(indexname::regclass)) as index_size
-            FROM pg_stat_user_indexes
-            WHERE idx_tup_read = 0 AND idx_tup_fetch = 0
-            ORDER BY pg_relation_size(indexname::regclass) DESC;
-        """,
-        "example_result": "Lista de índices não utilizados com tamanho",
+        "tool": "analyze_index_hygiene",
+        "query": None,
+        "example_result": "Índices não utilizados ordenados por espaço recuperável e escritas evitadas",
         "execution_order": 23
     },
 
@@ -65,33 +54,12 @@ INDEX_OPTIMIZATION_PROMPTS = {
 
     "04_duplicate_indexes": {
         "name": "🔄 PERF-007: Índices Duplicados",
-        "description": "Identifica possíveis índices duplicados ou redundantes",
+        "description": "Identifica índices duplicados e redundantes (prefixo de outro índice)",
         "category": "Performance",
         "priority": "Baixa",
-        "tool": "execute_read_only_query",
-        "query": """
-            SELECT 
-                t.tablename,
-                array_agg(t.indexname) as similar_indexes,
-                t.column_names
-            FROM (
-                SELECT 
-                    schemaname,
-                    tablename,
-                    indexname,
-                    string_agg(attname, ',' ORDER BY attnum) as column_names
-                FROM pg_index i
-                JOIN pg_class c ON c.oid = i.indexrelid
-                JOIN pg_namespace n ON n.oid = c.relnamespace
-                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
-                WHERE n.nspname = 'public'
-                GROUP BY schemaname, tablename, indexname
-            ) t
-            GROUP BY t.tablename, t.column_names
-            HAVING COUNT(*) > 1
-            ORDER BY t.tablename;
-        """,
-        "example_result": "Grupos de índices com colunas similares",
+        "tool": "analyze_index_hygiene",
+        "query": None,
+        "example_result": "Índices duplicados/redundantes com comandos DROP INDEX",
         "execution_order": 25
     }
-}
\ No newline at end of file
+}
@@ -58,6 +58,7 @@ SYSTEM_CONFIG_PROMPTS = {
             ORDER BY connection_count DESC;
         """,
         "example_result": "Estatísticas de conexões por estado",
+        "note": "Mostra só o instante atual; para o histórico de esperas por query use get_active_session_history (ASH_PRESETS)",
         "execution_order": 28
     },
 
@@ -1,55 +1,58 @@
 """
 Compatibilidade com o sistema antigo - redireciona para a nova estrutura organizada
 """
+import json
 
 # Importar da nova estrutura organizada
-from . import ALL_PROMPTS, get_model_list, get_prompt_by_id, get_prompts_by_category
+from . import registry, get_model_list, get_prompt_by_id, get_prompts_by_category, PRIORITY_ICONS
 
-# Manter compatibilidade com código existente
-MODELS = ALL_PROMPTS
+def __getattr__(name):
+    # MODELS carrega o catálogo no primeiro acesso (ver prompts.registry)
+    if name in ('ALL_PROMPTS', 'MODELS'):
+        return registry.all
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_model_by_id(model_id):
-    """Retorna modelo específico por ID (suporta formato 01, 1, etc.)"""
-    # Normalizar ID para formato com zero à esquerda
-    if model_id.isdigit():
-        normalized_id = f"{int(model_id):02d}"
-        return ALL_PROMPTS.get(normalized_id)
-    return ALL_PROMPTS.get(model_id)
-
-def get_model_curl_command(model_id):
+    """Retorna modelo específico por ID completo, código (EST-001) ou ordem de execução (1, 01, ...)"""
+    return registry.get(model_id)
+
+def get_model_curl_command(model_id, host="localhost", port=5432, dbname="petclinic",
+                           username="petclinic", password="petclinic"):
     """Retorna comando curl para execução do modelo específico."""
-    model = get_model_by_id(model_id)
-    if not model:
+    key = registry.resolve(model_id)
+    if key is None:
         return None
-    
-    return f"""curl -X POST http://localhost:8000/execute \\
+
+    payload = json.dumps({
+        "prompt_ids": [key],
+        "database": {"host": host, "port": port, "dbname": dbname, "username": username, "password": password}
+    }, ensure_ascii=False)
+    return f"""curl -X POST http://localhost:8000/api/prompts/batch \\
   -H "Content-Type: application/json" \\
-  -d '{{"prompt_id": "{model_id}"}}'"""
+  -d '{payload}'"""
 
 def get_models_by_category():
-    """Retorna modelos organizados por categoria"""
-    categories = {}
-    for key, model in MODELS.items():
-        category = model.get('category', 'Outros')
-        if category not in categories:
-            categories[category] = []
-        categories[category].append((key, model))
-    
-    # Ordenar por ordem de execução
-    for category in categories:
-        categories[category].sort(key=lambda x: x[1].get('execution_order', 999))
-    
-    return categories
+    """Retorna modelos organizados por categoria, em ordem de execução"""
+    return registry.categories()
 
 def get_execution_sequence():
     """Retorna sequência recomendada de execução"""
-    sequence = []
-    for key, model in sorted(MODELS.items(), key=lambda x: x[1].get('execution_order', 999)):
-        sequence.append({
+    return [
+        {
             'id': key,
             'name': model['name'],
             'category': model.get('category', 'Outros'),
             'priority': model.get('priority', 'Baixa'),
             'order': model.get('execution_order', 999)
-        })
-    return sequence
\ No newline at end of file
+        }
+        for key, model in registry.ordered()
+    ]
+
+def build_simple_list():
+    """Renderiza a lista simples de prompts, em ordem de execução"""
+    simple_list = "\n>> PROMPTS DISPONÍVEIS - REFERÊNCIA RÁPIDA\n"
+    simple_list += "=" * 50 + "\n\n"
+    for key, model in registry.ordered():
+        simple_list += f"{key}. {model['name']} {PRIORITY_ICONS.get(model.get('priority'), '🟢')}\n"
+    simple_list += "\n💡 Use: curl http://localhost:8000/api/prompts/{ID} para detalhes\n"
+    return simple_list
@@ -0,0 +1,172 @@
+"""
+Registro do catálogo de prompts
+
+Carrega os módulos do catálogo no primeiro acesso e pré-calcula os índices usados
+pelas rotas e CLIs: ordem de execução, prompts por categoria e por prioridade e um
+mapa de aliases para os IDs. Um prompt pode ser pedido por:
+- ID completo: '01_complete_structure'
+- código do nome, sem diferenciar maiúsculas: 'EST-001', 'est-001', 'est001'
+- ordem de execução: '1' ou '01'
+Aliases que apontariam para mais de um prompt não são registrados.
+
+O catálogo não muda depois de carregado, então as listagens renderizadas (texto e
+JSON) também são calculadas uma vez, junto com um ETag do conteúdo.
+"""
+from typing import Dict, List, Any, Optional, Tuple, Callable
+import hashlib
+import importlib
+import json
+import re
+import threading
+
+CATEGORY_ICONS = {
+    'Estrutura': '🏗️',
+    'Negócio': '💼',
+    'Performance': '⚡',
+    'Segurança': '🔐',
+    'Manutenção': '🔧'
+}
+
+PRIORITY_ICONS = {
+    'Alta': '🔴',
+    'Média': '🟡',
+    'Baixa': '🟢'
+}
+
+PROMPT_CODE = re.compile(r"\b([A-Z]+)-(\d+)\b")
+
+class PromptRegistry:
+    """Catálogo de prompts carregado sob demanda, com índices e listagens pré-calculados"""
+
+    def __init__(self, sources: List[Tuple[str, str]], package: Optional[str] = None):
+        """
+        Args:
+            sources: (módulo, nome do dicionário de prompts) de cada parte do catálogo
+            package: Pacote para módulos relativos ('.structure.database_structure')
+        """
+        self.sources = sources
+        self.package = package
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.listings: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> None:
+        """
+        Importa o catálogo e monta os índices (uma vez)
+
+        Raises:
+            ValueError: se dois módulos definirem o mesmo ID de prompt
+        """
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            prompts: Dict[str, Dict[str, Any]] = {}
+            for module, attribute in self.sources:
+                for key, model in getattr(importlib.import_module(module, self.package), attribute).items():
+                    if key in prompts:
+                        raise ValueError(f"Prompt '{key}' definido mais de uma vez ({module})")
+                    prompts[key] = model
+
+            order = sorted(prompts, key=lambda key: prompts[key].get('execution_order', 999))
+            by_category: Dict[str, List[str]] = {}
+            by_priority: Dict[str, List[str]] = {}
+            for key in order:
+                by_category.setdefault(prompts[key].get('category', 'Outros'), []).append(key)
+                by_priority.setdefault(prompts[key].get('priority', 'Média'), []).append(key)
+
+            self.prompts = prompts
+            self.order = order
+            self.by_category = by_category
+            self.by_priority = by_priority
+            self.aliases = self._build_aliases(prompts)
+            self.loaded = True
+
+    @staticmethod
+    def _build_aliases(prompts: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """Alias normalizado -> ID; aliases ambíguos ficam de fora"""
+        candidates: Dict[str, set] = {}
+        for key, model in prompts.items():
+            names = {key.lower()}
+            code = PROMPT_CODE.search(model.get('name', ''))
+            if code:
+                names.update({f"{code.group(1)}-{code.group(2)}".lower(), f"{code.group(1)}{code.group(2)}".lower()})
+            if 'execution_order' in model:
+                names.add(str(model['execution_order']))
+            for name in names:
+                candidates.setdefault(name, set()).add(key)
+        return {name: keys.pop() for name, keys in candidates.items() if len(keys) == 1}
+
+    @property
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """ID -> prompt, na ordem dos módulos do catálogo"""
+        self.load()
+        return self.prompts
+
+    def resolve(self, prompt_id: str) -> Optional[str]:
+        """ID completo do prompt pedido por ID, código ou ordem de execução; None se não existir"""
+        self.load()
+        if prompt_id in self.prompts:
+            return prompt_id
+        alias = prompt_id.strip().lower()
+        if alias.isdigit():
+            alias = str(int(alias))
+        return self.aliases.get(alias)
+
+    def get(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """Prompt pedido por ID, código ou ordem de execução"""
+        key = self.resolve(prompt_id)
+        return self.prompts[key] if key is not None else None
+
+    def category(self, category: str) -> Dict[str, Dict[str, Any]]:
+        """Prompts de uma categoria, em ordem de execução"""
+        self.load()
+        return {key: self.prompts[key] for key in self.by_category.get(category, [])}
+
+    def priority(self, priority: str) -> Dict[str, Dict[str, Any]]:
+        """Prompts de uma prioridade, em ordem de execução"""
+        self.load()
+        return {key: self.prompts[key] for key in self.by_priority.get(priority, [])}
+
+    def ordered(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(ID, prompt) em ordem de execução"""
+        self.load()
+        return [(key, self.prompts[key]) for key in self.order]
+
+    def categories(self) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        """Categoria -> [(ID, prompt)] em ordem de execução"""
+        self.load()
+        return {category: [(key, self.prompts[key]) for key in keys] for category, keys in self.by_category.items()}
+
+    def listing(self, name: str, build: Callable[[], Any], media_type: str = "text/plain") -> Dict[str, Any]:
+        """
+        Listagem renderizada uma única vez
+
+        Args:
+            name: Nome da listagem no cache
+            build: Gera o conteúdo: texto, ou um objeto serializado como JSON se media_type for JSON
+            media_type: Tipo do conteúdo da resposta
+
+        Returns:
+            Dicionário com text, body (bytes), etag e media_type
+        """
+        listing = self.listings.get(name)
+        if listing is not None:
+            return listing
+        with self.lock:
+            listing = self.listings.get(name)
+            if listing is None:
+                content = build()
+                if media_type == "application/json":
+                    # mesma serialização do JSONResponse do Starlette
+                    content = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+                body = content.encode("utf-8")
+                listing = {
+                    "text": content,
+                    "body": body,
+                    "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+                    "media_type": media_type
+                }
+                self.listings[name] = listing
+        return listing
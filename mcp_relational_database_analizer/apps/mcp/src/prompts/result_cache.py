@@ -0,0 +1,196 @@
+"""
+Cache de resultados dos prompts do catálogo
+
+Prompts cujos dados mudam pouco declaram uma política "cache" no catálogo:
+    "cache": {"ttl": 3600}                                        vale por idade
+    "cache": {"ttl": 86400, "source": "tables", "tables": [...]}   vale enquanto as tabelas não recebem escrita
+    "cache": {"ttl": 86400, "source": "ddl"}                      vale enquanto DDL e configuração não mudam
+Com "source", o banco calcula um token de atualização (contadores de escrita de
+pg_stat_user_tables ou o fingerprint do catálogo) e o resultado só é servido se o
+token for o mesmo de quando foi guardado; o ttl continua sendo o limite de idade.
+
+A chave é banco (host, porta, banco, usuário) + ID do prompt + hash da consulta e
+dos argumentos. Com um diretório, os resultados também vão para disco e valem entre
+execuções dos CLIs.
+"""
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+
+from db.catalog_store import catalog_fingerprint, snapshot_cache_key
+from db.queries import PROMPT_FRESHNESS_QUERY
+from instrumentation import record_cache
+
+FRESHNESS_SOURCES = ("tables", "ddl")
+DEFAULT_TTL_SECONDS = 3600
+
+CacheKey = Tuple[str, int, str, str, str, str]
+
+class PromptResultCache:
+    """Resultados de prompts em memória e, opcionalmente, um arquivo JSON por chave em directory"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.entries: Dict[CacheKey, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def path(self, key: CacheKey) -> str:
+        digest = hashlib.md5("|".join(str(part) for part in key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Entrada guardada (output, stored_at, token, seconds) ou None"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None and self.directory:
+            try:
+                with open(self.path(key)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            with self.lock:
+                self.entries[key] = entry
+        return entry
+
+    def put(self, key: CacheKey, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[key] = entry
+        if self.directory:
+            path = self.path(key)
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(path + ".tmp", "w") as f:
+                    json.dump(entry, f)
+                os.replace(path + ".tmp", path)
+            except OSError:
+                pass    # o cache em disco é só uma otimização
+
+    def clear(self) -> None:
+        """Esquece os resultados em memória (os arquivos em disco ficam, validados pelo token)"""
+        with self.lock:
+            self.entries.clear()
+
+_default_cache: Optional[PromptResultCache] = None
+
+def default_result_cache() -> PromptResultCache:
+    """Cache compartilhado pelo processo, em disco quando PROMPT_CACHE_DIR está definido"""
+    global _default_cache
+    if _default_cache is None:
+        from config import Config
+        _default_cache = PromptResultCache(Config.PROMPT_CACHE_DIR or None)
+    return _default_cache
+
+def cache_policy(model: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Política de cache de um prompt, com ttl, source e tables preenchidos
+
+    Returns:
+        None para prompts sem a chave "cache" (sempre executados)
+
+    Raises:
+        ValueError: se "source" não for um dos FRESHNESS_SOURCES
+    """
+    declared = model.get("cache")
+    if not declared:
+        return None
+    source = declared.get("source")
+    if source is not None and source not in FRESHNESS_SOURCES:
+        raise ValueError(f"Fonte de atualização desconhecida '{source}' (use {', '.join(FRESHNESS_SOURCES)})")
+    return {
+        "ttl": declared.get("ttl", DEFAULT_TTL_SECONDS),
+        "source": source,
+        "tables": declared.get("tables")
+    }
+
+def prompt_fingerprint(model: Dict[str, Any], output_format: str) -> str:
+    """Hash do que determina o resultado: ferramenta, consulta, padrão, parâmetros e formato"""
+    parts = {name: model.get(name) for name in ("tool", "query", "pattern", "approximate", "params")}
+    parts["output_format"] = output_format
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def freshness_token(connector: Any, policy: Dict[str, Any]) -> Optional[str]:
+    """
+    Token que muda quando os dados lidos pelo prompt mudam
+
+    Os contadores de pg_stat_user_tables são atualizados quando a transação que
+    escreve termina (com até ~1s de atraso), o que basta para dados que mudam por hora.
+
+    Returns:
+        None sem "source" ou se o token não puder ser calculado
+    """
+    if policy["source"] == "ddl":
+        return catalog_fingerprint(connector)
+    if policy["source"] == "tables":
+        rows = connector.execute_query(PROMPT_FRESHNESS_QUERY, {"tables": policy["tables"] or None})
+        return rows[0]["token"] if rows else None
+    return None
+
+def open_connector(credentials: Dict[str, Any]) -> Any:
+    """Conector das credenciais do catálogo (preset, secret_name ou credenciais diretas), já conectado, ou None"""
+    from tools.mcp_tools import get_database_connector
+    accepted = inspect.signature(get_database_connector).parameters
+    connector = get_database_connector(**{key: value for key, value in credentials.items()
+                                          if key in accepted and value is not None})
+    if connector is None or not connector.connect():
+        return None
+    return connector
+
+def lookup(
+    cache: PromptResultCache,
+    prompt_id: str,
+    model: Dict[str, Any],
+    credentials: Dict[str, Any],
+    output_format: str = "markdown",
+    refresh: bool = False
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Procura o resultado de um prompt no cache
+
+    Args:
+        refresh: Ignora o que estiver guardado (o novo resultado ainda é guardado)
+
+    Returns:
+        (entrada válida ou None, pendência para store() ou None quando o prompt não é cacheável
+        ou o banco não respondeu)
+    """
+    policy = cache_policy(model)
+    if policy is None:
+        return None, None
+    connector = open_connector(credentials)
+    if connector is None:
+        return None, None
+    try:
+        key = snapshot_cache_key(connector) + (prompt_id, prompt_fingerprint(model, output_format))
+        token = freshness_token(connector, policy)
+    finally:
+        connector.disconnect()
+    if policy["source"] and token is None:
+        return None, None
+
+    pending = {"cache": cache, "key": key, "token": token}
+    if refresh:
+        return None, pending
+    entry = cache.get(key)
+    if entry is not None and time.time() - entry["stored_at"] <= policy["ttl"] and entry.get("token") == token:
+        record_cache("prompt_results", True)
+        return entry, pending
+    record_cache("prompt_results", False)
+    return None, pending
+
+def store(pending: Optional[Dict[str, Any]], output: str, seconds: float) -> None:
+    """Guarda o resultado de uma execução pendente de lookup()"""
+    if pending is not None:
+        pending["cache"].put(pending["key"], {"output": output, "stored_at": time.time(),
+                                              "token": pending["token"], "seconds": seconds})
+
+def describe_age(seconds: float) -> str:
+    """Idade legível: 45s, 12 min, 3.5 h"""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
@@ -0,0 +1,281 @@
+"""
+Executor do catálogo de prompts
+
+Executa os prompts do catálogo como um grafo de dependências (DAG):
+- um prompt roda depois dos prompts listados na sua chave "depends_on"; sem a chave,
+  depois de todos os prompts da categoria anterior em CATEGORY_ORDER
+- prompts com as dependências concluídas rodam em paralelo, em threads que
+  compartilham um pool de conexões (db.pool)
+- cada prompt é despachado para a função real da sua ferramenta ("tool"), com os
+  campos do prompt que a ferramenta aceita como argumentos (query, pattern, ...)
+- prompts com política "cache" são servidos do cache de resultados (prompts.result_cache)
+  enquanto o resultado guardado estiver atualizado, a menos que refresh=True
+O resultado é um relatório consolidado com o tempo de cada prompt, sem interação.
+"""
+from typing import Dict, List, Any, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import asyncio
+import inspect
+import threading
+import time
+
+from db.pool import ConnectionPool, use_pool
+from prompts.result_cache import PromptResultCache, default_result_cache, cache_policy, lookup, store, describe_age
+from response_builder import ResponseBuilder
+
+CATEGORY_ORDER = ["Estrutura", "Negócio", "Performance", "Segurança", "Manutenção"]
+DEFAULT_WORKERS = 4
+
+# Campos descritivos do prompt, nunca repassados para a ferramenta
+PROMPT_METADATA = {"name", "description", "category", "priority", "tool", "example_result",
+                   "execution_order", "note", "depends_on", "params", "cache"}
+
+class ToolCollector:
+    """Substitui o FastMCP em register_all_tools() para obter as próprias funções das ferramentas"""
+
+    def __init__(self):
+        self.tools: Dict[str, Callable] = {}
+
+    def tool(self, *args, **kwargs):
+        def register(function):
+            self.tools[function.__name__] = function
+            return function
+        return register
+
+def collect_tools() -> Dict[str, Callable]:
+    """Funções das ferramentas MCP por nome"""
+    from tools.mcp_tools import register_all_tools
+    collector = ToolCollector()
+    register_all_tools(collector)
+    return collector.tools
+
+def build_dag(prompts: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Dependências de cada prompt
+
+    Dependências declaradas fora da seleção são ignoradas (não serão executadas).
+
+    Returns:
+        ID do prompt -> IDs dos prompts que precisam terminar antes
+
+    Raises:
+        ValueError: se as dependências formarem um ciclo ou uma política de cache for inválida
+    """
+    by_category: Dict[str, List[str]] = {}
+    for key, model in sorted(prompts.items(), key=lambda item: item[1].get("execution_order", 999)):
+        by_category.setdefault(model.get("category", "Outros"), []).append(key)
+    categories = [c for c in CATEGORY_ORDER if c in by_category] + sorted(c for c in by_category if c not in CATEGORY_ORDER)
+
+    dependencies = {}
+    for position, category in enumerate(categories):
+        previous = by_category[categories[position - 1]] if position else []
+        for key in by_category[category]:
+            declared = prompts[key].get("depends_on")
+            dependencies[key] = list(previous) if declared is None else [d for d in declared if d in prompts]
+            cache_policy(prompts[key])
+
+    topological_order(dependencies, prompts)
+    return dependencies
+
+def topological_order(dependencies: Dict[str, List[str]], prompts: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Ordem de execução compatível com as dependências (desempate por execution_order)"""
+    remaining = {key: len(deps) for key, deps in dependencies.items()}
+    dependents: Dict[str, List[str]] = {key: [] for key in dependencies}
+    for key, deps in dependencies.items():
+        for dependency in deps:
+            dependents[dependency].append(key)
+
+    order_key = lambda key: prompts[key].get("execution_order", 999)
+    ready = sorted((key for key, count in remaining.items() if count == 0), key=order_key)
+    order = []
+    while ready:
+        key = ready.pop(0)
+        order.append(key)
+        for dependent in dependents[key]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+        ready.sort(key=order_key)
+
+    if len(order) < len(dependencies):
+        cycle = sorted(key for key, count in remaining.items() if count)
+        raise ValueError(f"Dependências cíclicas entre os prompts: {', '.join(cycle)}")
+    return order
+
+def resolve_credentials(credentials: Dict[str, Any], parameters: Any) -> Dict[str, Any]:
+    """Credenciais aceitas pela ferramenta; presets viram credenciais diretas para ferramentas sem 'preset'"""
+    credentials = {key: value for key, value in credentials.items() if value is not None}
+    if "preset" in credentials and "preset" not in parameters:
+        from database_config import get_database_config
+        config = get_database_config(credentials.pop("preset"))
+        credentials.update({key: value for key, value in config.items() if key != "description"})
+    return {key: value for key, value in credentials.items() if key in parameters}
+
+def tool_arguments(function: Callable, model: Dict[str, Any], credentials: Dict[str, Any],
+                   output_format: str) -> Dict[str, Any]:
+    """Argumentos da chamada: campos do prompt e "params" que a ferramenta aceita, credenciais e formato"""
+    parameters = inspect.signature(function).parameters
+    arguments = {}
+    for name, value in list(model.items()) + list(model.get("params", {}).items()):
+        if name in parameters and (name not in PROMPT_METADATA) and value is not None:
+            arguments[name] = value.strip() if isinstance(value, str) else value
+    arguments.update(resolve_credentials(credentials, parameters))
+    if "output_format" in parameters:
+        arguments["output_format"] = output_format
+    return arguments
+
+def run_prompt(key: str, model: Dict[str, Any], tools: Dict[str, Callable], credentials: Dict[str, Any],
+               output_format: str = "markdown", cache: Optional[PromptResultCache] = None,
+               refresh: bool = False) -> Dict[str, Any]:
+    """Executa um prompt pela sua ferramenta (ou o serve do cache) e mede o tempo"""
+    started = time.perf_counter()
+    function = tools.get(model["tool"])
+    cached, pending = None, None
+    try:
+        if cache is not None and model.get("cache"):
+            try:
+                cached, pending = lookup(cache, key, model, credentials, output_format, refresh)
+            except Exception:
+                cached, pending = None, None    # sem cache o prompt ainda é executado
+        if cached is not None:
+            output = cached["output"]
+        elif function is None:
+            output = f"Error: tool '{model['tool']}' not found"
+        else:
+            # cada thread tem o seu próprio event loop; as ferramentas bloqueiam no banco
+            output = asyncio.run(function(**tool_arguments(function, model, credentials, output_format)))
+    except Exception as e:
+        output = f"Error: {str(e)}"
+    finished = time.perf_counter()
+    status = "error" if output.startswith(("Error", "Failed")) else "ok"
+    if cached is None and status == "ok":
+        store(pending, output, finished - started)
+    return {
+        "id": key,
+        "name": model["name"],
+        "category": model.get("category", "Outros"),
+        "tool": model["tool"],
+        "status": status,
+        "started": started,
+        "seconds": finished - started,
+        "worker": threading.current_thread().name,
+        "output": output,
+        "cached": cached is not None,
+        "cache_age": time.time() - cached["stored_at"] if cached is not None else None,
+        "original_seconds": cached["seconds"] if cached is not None else None
+    }
+
+def run_catalog(
+    prompts: Dict[str, Dict[str, Any]],
+    credentials: Dict[str, Any],
+    workers: int = DEFAULT_WORKERS,
+    output_format: str = "markdown",
+    tools: Optional[Dict[str, Callable]] = None,
+    cache: Optional[PromptResultCache] = None,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Executa prompts respeitando as dependências, em paralelo
+
+    Args:
+        prompts: ID -> prompt (ALL_PROMPTS ou uma seleção)
+        credentials: Argumentos de conexão das ferramentas (preset, secret_name ou host/dbname/username/password)
+        workers: Prompts executados ao mesmo tempo (e conexões por banco no pool)
+        output_format: Formato pedido às ferramentas
+        tools: Funções das ferramentas por nome (padrão: collect_tools())
+        cache: Cache de resultados dos prompts com política "cache" (padrão: default_result_cache())
+        refresh: Reexecuta todos os prompts, ignorando o cache (os novos resultados são guardados)
+
+    Returns:
+        Dicionário com results (um por prompt, em ordem topológica), order, wall_seconds,
+        workers e pool (conexões criadas e reutilizadas)
+    """
+    dependencies = build_dag(prompts)
+    order = topological_order(dependencies, prompts)
+    dependents: Dict[str, List[str]] = {key: [] for key in dependencies}
+    for key, deps in dependencies.items():
+        for dependency in deps:
+            dependents[dependency].append(key)
+    remaining = {key: len(deps) for key, deps in dependencies.items()}
+    tools = tools if tools is not None else collect_tools()
+    cache = cache if cache is not None else default_result_cache()
+
+    results = {}
+    run_started = time.perf_counter()
+    with use_pool(ConnectionPool(workers)) as pool, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prompt") as executor:
+        running = {}
+
+        def submit(key):
+            running[executor.submit(run_prompt, key, prompts[key], tools, credentials, output_format,
+                                    cache, refresh)] = key
+
+        for key in order:
+            if remaining[key] == 0:
+                submit(key)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                results[key] = future.result()
+                for dependent in dependents[key]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        submit(dependent)
+        pool_stats = pool.stats()
+
+    for result in results.values():
+        result["started"] -= run_started
+    return {
+        "results": [results[key] for key in order],
+        "order": order,
+        "dependencies": dependencies,
+        "wall_seconds": time.perf_counter() - run_started,
+        "workers": workers,
+        "pool": pool_stats
+    }
+
+def format_catalog_report(run: Dict[str, Any]) -> str:
+    """
+    Relatório consolidado em markdown: resumo, tempos por prompt e a saída de cada um
+
+    Args:
+        run: Resultado de run_catalog()
+    """
+    results = run["results"]
+    failed = [result for result in results if result["status"] != "ok"]
+    busy = sum(result["seconds"] for result in results)
+    cached = [result for result in results if result["cached"]]
+
+    report = ResponseBuilder()
+    report.line("# Relatório Consolidado do Catálogo de Prompts")
+    report.line()
+    report.line(f"- **Prompts**: {len(results)} ({len(results) - len(failed)} ok, {len(failed)} com erro)")
+    report.line(f"- **Tempo total**: {run['wall_seconds']:.2f}s com {run['workers']} workers "
+                f"(soma dos prompts: {busy:.2f}s, paralelismo ×{busy / max(run['wall_seconds'], 1e-9):.1f})")
+    report.line(f"- **Conexões**: {run['pool']['created']} abertas, {run['pool']['reused']} reutilizadas do pool")
+    if cached:
+        saved = sum(result["original_seconds"] - result["seconds"] for result in cached)
+        report.line(f"- **Cache**: {len(cached)} prompts servidos do cache (≈{max(saved, 0):.2f}s economizados)")
+    report.line()
+    report.table(
+        ["#", "ID", "Prompt", "Ferramenta", "Status", "Início (s)", "Duração (s)", "Cache", "Depende de"],
+        ([i, result["id"], result["name"], result["tool"], "✅" if result["status"] == "ok" else "❌",
+          f"{result['started']:.2f}", f"{result['seconds']:.2f}",
+          f"♻️ {describe_age(result['cache_age'])}" if result["cached"] else "-",
+          ", ".join(run["dependencies"][result["id"]]) if len(run["dependencies"][result["id"]]) <= 3
+          else f"{len(run['dependencies'][result['id']])} prompts"]
+         for i, result in enumerate(results, 1))
+    )
+    report.line()
+
+    for result in results:
+        report.line(f"## {result['name']} (`{result['id']}`)")
+        report.line()
+        if result["cached"]:
+            report.line(f"> ♻️ Resultado em cache, guardado há {describe_age(result['cache_age'])} "
+                        f"(execução original: {result['original_seconds']:.2f}s). Use refresh para reexecutar.")
+            report.line()
+        report.line(result["output"].rstrip())
+        report.line()
+    return report.build()
@@ -33,6 +33,7 @@ STRUCTURE_PROMPTS = {
             ORDER BY table_name;
         """,
         "example_result": "Lista com nomes, tipos, colunas e tamanho das tabelas",
+        "cache": {"ttl": 3600, "source": "ddl"},
         "execution_order": 2
     },
     
@@ -41,20 +42,11 @@ STRUCTURE_PROMPTS = {
         "description": "Conta registros em todas as tabelas para análise de volume",
         "category": "Estrutura",
         "priority": "Alta",
-        "tool": "execute_read_only_query",
-        "query": """
-            SELECT 
-                schemaname,
-                tablename,
-                n_tup_ins as total_inserts,
-                n_tup_upd as total_updates,
-                n_tup_del as total_deletes,
-                n_live_tup as live_tuples,
-                n_dead_tup as dead_tuples
-            FROM pg_stat_user_tables
-            ORDER BY n_live_tup DESC;
-        """,
-        "example_result": "Estatísticas detalhadas de registros por tabela",
+        "tool": "count_table_rows",
+        "query": None,
+        "example_result": "Contagem estimada por tabela com atualidade das estatísticas",
+        "note": "Estimativas instantâneas (reltuples/n_live_tup); use method='sample' ou 'exact' para escalar",
+        "cache": {"ttl": 3600, "source": "tables"},
         "execution_order": 3
     },
 
@@ -77,6 +69,7 @@ STRUCTURE_PROMPTS = {
             ORDER BY idx_tup_read DESC;
         """,
         "example_result": "Lista de índices com estatísticas de uso",
+        "cache": {"ttl": 3600, "source": "ddl"},
         "execution_order": 4
     },
 
@@ -102,6 +95,7 @@ STRUCTURE_PROMPTS = {
             ORDER BY tc.table_name, kcu.column_name;
         """,
         "example_result": "Mapeamento completo de relacionamentos",
+        "cache": {"ttl": 86400, "source": "ddl"},
         "execution_order": 5
     }
 }
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Response builder for tool outputs.
+
+Responses are written into a list of parts and joined once at the end instead of
+being grown with repeated string concatenation. A byte budget caps the size of a
+response: when it is reached the builder cuts the output at the last complete line,
+ignores further writes and ends the response with a truncation note. Over the
+streamable-HTTP transport a tool can also emit the response in chunks while it is
+being built, as log notifications of the request (see stream()); the final tool
+result still carries the whole response.
+"""
+from typing import List, Optional, Any, Sequence, Iterable
+import json
+
+DEFAULT_CHUNK_BYTES = 64 * 1024
+JSON_WRITE_BYTES = 8192   # encoder pieces are batched into writes of about this size
+
+def text_size(text: str) -> int:
+    """UTF-8 size of text"""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+def markdown_cell(value: Any) -> str:
+    """Table cell text: pipes escaped, line breaks flattened"""
+    text = "" if value is None else str(value)
+    if "|" in text or "\n" in text:
+        text = text.replace("|", "\\|").replace("\r", "").replace("\n", " ")
+    return text
+
+class ResponseBuilder:
+    """
+    Accumulates a tool response within an optional byte budget
+
+    Args:
+        max_bytes: Budget of the response in bytes, None or 0 for no limit
+        stream: Emit chunks through stream() while building
+        chunk_bytes: Minimum size of a streamed chunk
+        truncation_hint: Advice appended to the truncation note (e.g. which argument narrows the output)
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, stream: bool = False,
+                 chunk_bytes: int = DEFAULT_CHUNK_BYTES, truncation_hint: str = ""):
+        self.parts: List[str] = []
+        self.size = 0
+        self.max_bytes = max_bytes or None
+        self.streaming = stream
+        self.chunk_bytes = chunk_bytes
+        self.truncation_hint = truncation_hint
+        self.truncated = False
+        self.in_code_block = False
+        self.emitted = 0     # parts already streamed
+        self.pending = 0     # bytes written since the last streamed chunk
+
+    def write(self, text: str) -> bool:
+        """
+        Append text
+
+        Returns:
+            False once the budget is exhausted: the text was cut at its last line
+            break (or dropped) and every later write is ignored
+        """
+        if self.truncated:
+            return False
+        size = text_size(text)
+        if self.max_bytes is not None and self.size + size > self.max_bytes:
+            cut = text.encode("utf-8")[:self.max_bytes - self.size].decode("utf-8", "ignore")
+            cut = cut[:cut.rfind("\n") + 1]
+            if cut:
+                self._append(cut, text_size(cut))
+            self.truncated = True
+            return False
+        self._append(text, size)
+        return True
+
+    def line(self, text: str = "") -> bool:
+        """Append text and a line break"""
+        return self.write(text + "\n")
+
+    def table(self, headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+        """
+        Append a markdown table
+
+        Returns:
+            Number of rows written before the budget ran out
+        """
+        self.write("| " + " | ".join(markdown_cell(header) for header in headers) + " |\n")
+        self.write("|" + "|".join("---" for _ in headers) + "|\n")
+        written = 0
+        for row in rows:
+            if not self.write("| " + " | ".join(markdown_cell(value) for value in row) + " |\n"):
+                break
+            written += 1
+        return written
+
+    def json_block(self, value: Any, indent: int = 2) -> bool:
+        """
+        Append value as a fenced JSON block, encoding it incrementally
+
+        Encoding stops as soon as the budget is exhausted, so a large plan is never
+        rendered in full only to be cut; the fence is closed by build().
+        """
+        if not self.write("```json\n"):
+            return False
+        self.in_code_block = True
+        batch, batch_size = [], 0
+        for piece in json.JSONEncoder(indent=indent, default=str).iterencode(value):
+            batch.append(piece)
+            batch_size += len(piece)
+            if batch_size >= JSON_WRITE_BYTES:
+                if not self.write("".join(batch)):
+                    return False
+                batch, batch_size = [], 0
+        if not self.write("".join(batch) + "\n```\n"):
+            return False
+        self.in_code_block = False
+        return True
+
+    def build(self) -> str:
+        """The response, with a closing fence and a truncation note when the budget was hit"""
+        if not self.truncated:
+            return "".join(self.parts)
+        ending = "\n```\n" if self.in_code_block else ""
+        note = f"\n*Output truncated at {self.max_bytes:,} bytes (MAX_RESPONSE_BYTES).*"
+        if self.truncation_hint:
+            note = note[:-1] + f" {self.truncation_hint}*"
+        return "".join(self.parts) + ending + note + "\n"
+
+    def take_chunk(self, final: bool = False) -> Optional[str]:
+        """Text written since the last chunk, once chunk_bytes accumulated (or whatever is left when final)"""
+        if not self.pending or (self.pending < self.chunk_bytes and not final):
+            return None
+        chunk = "".join(self.parts[self.emitted:])
+        self.emitted = len(self.parts)
+        self.pending = 0
+        return chunk
+
+    async def stream(self, ctx: Any, final: bool = False) -> None:
+        """
+        Send the next chunk as a log notification of the current request
+
+        Does nothing unless the builder was created with stream=True and the tool
+        received a context. A failed notification turns streaming off for the rest
+        of the response; the tool result is unaffected.
+        """
+        if not self.streaming or ctx is None:
+            return
+        chunk = self.take_chunk(final)
+        if chunk:
+            try:
+                await ctx.info(chunk)
+            except Exception:
+                self.streaming = False
+
+    def _append(self, text: str, size: int) -> None:
+        self.parts.append(text)
+        self.size += size
+        self.pending += size
@@ -2,19 +2,22 @@
 MCP tool definitions for PostgreSQL Performance Analyzer.
 This file contains all the tool functions that are registered with the MCP server.
 """
-import json
+import asyncio
 import time
 from typing import List, Dict, Any, Optional
 from mcp.server.fastmcp import Context, FastMCP
 
 from db.connector import PostgresConnector
 from analysis.structure import (
-    get_database_structure, 
-    organize_db_structure_by_table,
-    analyze_database_structure_for_response
+    get_cached_database_structure,
+    analyze_database_structure_for_response,
+    get_database_structure_page,
+    format_structure_page_response,
+    summarize_database_structure
 )
 from analysis.query import (
     extract_tables_from_query, 
+    get_execution_plan,
     get_table_statistics, 
     get_schema_information, 
     get_index_information,
@@ -26,11 +29,56 @@ from analysis.patterns import (
     validate_read_only_query
 )
 from analysis.indexes import (
-    extract_potential_indexes,
+    synthesize_index_candidates,
     get_table_structure_for_index,
     check_existing_indexes,
-    format_index_recommendations_response
+    build_index_ddl,
+    format_index_recommendations_response,
+    index_recommendations_result
 )
+from analysis.hypothetical import is_hypopg_available, evaluate_hypothetical_indexes
+from analysis.sql_parser import parse_query
+from analysis.workload import (
+    get_workload_statements,
+    load_statements_from_log,
+    resolve_workload_file,
+    advise_workload_indexes as advise_workload_indexes_for,
+    format_workload_advice_response
+)
+from analysis.index_hygiene import (
+    analyze_index_hygiene as analyze_index_hygiene_for,
+    format_index_hygiene_response
+)
+from analysis.foreign_keys import (
+    find_unindexed_foreign_keys as find_unindexed_foreign_keys_for,
+    format_unindexed_foreign_keys_response
+)
+from analysis.bloat import (
+    estimate_bloat as estimate_relation_bloat,
+    confirm_with_pgstattuple as confirm_with_pgstattuple_for,
+    format_bloat_response
+)
+from analysis.vacuum import (
+    forecast_autovacuum as forecast_autovacuum_for,
+    format_autovacuum_forecast_response
+)
+from analysis.locks import (
+    take_lock_snapshot,
+    analyze_blocking,
+    summarize_samples,
+    format_blocking_response
+)
+from analysis.active_sessions import resolve_window, format_active_session_history_response
+from analysis.result_summary import summarize_rows, format_result_summary_response
+from analysis.approximate import run_approximate_query, format_approximate_response
+from analysis.row_counts import COUNT_METHODS, count_rows, format_row_counts_response
+from activity_sampler import GROUP_COLUMNS
+from config import Config, activity_sampler
+from db.queries import CHECK_PG_STAT_STATEMENTS_QUERY
+from db.catalog import get_catalog_snapshot
+from response_builder import ResponseBuilder, markdown_cell
+from output_formats import check_output_format, render_output, plan_summary, table
+from instrumentation import timed_tool
 
 def get_database_connector(preset=None, secret_name=None, region_name="us-west-2", 
                           host=None, port=None, dbname=None, username=None, password=None):
@@ -102,6 +150,7 @@ def register_all_tools(mcp: FastMCP):
     """Register all tools with the MCP server"""
     
     @mcp.tool()
+    @timed_tool
     async def analyze_database_structure(
         preset: str = None,
         secret_name: str = None, 
@@ -111,11 +160,25 @@ def register_all_tools(mcp: FastMCP):
         dbname: str = None,
         username: str = None,
         password: str = None,
+        refresh: bool = False,
+        schema_pattern: str = None,
+        table_pattern: str = None,
+        sort_by: str = None,
+        page_size: int = None,
+        cursor: str = None,
+        output_format: str = "markdown",
         ctx: Context = None
     ) -> str:
         """
         Analyze the database structure and provide insights on schema design, indexes, and potential optimizations.
         
+        The structure is served from the catalog cache (kept on disk when CATALOG_CACHE_DIR is set)
+        as long as no DDL ran since it was captured.
+        
+        With any of schema_pattern, table_pattern, sort_by, page_size or cursor the tool returns one
+        page of tables instead: filtering, sorting and paging run in the catalog query, and only the
+        columns, indexes and foreign keys of the tables on the page are read. Use this on large schemas.
+        
         Args:
             preset: Database preset name (e.g., 'local', 'production') - easiest option
             secret_name: AWS Secrets Manager secret name containing database credentials
@@ -125,6 +188,13 @@ def register_all_tools(mcp: FastMCP):
             dbname: Database name (alternative to preset/secret_name) 
             username: Database username (alternative to preset/secret_name)
             password: Database password (alternative to preset/secret_name)
+            refresh: Rescan the catalog even if the cached structure is still valid (default: False)
+            schema_pattern: Glob on schema names, e.g. 'sales_*' (paginated mode)
+            table_pattern: Glob on table names, e.g. '*order*' (paginated mode)
+            sort_by: 'size', 'rows', 'seq_scan', 'index_count' (largest first) or 'name' (default: size)
+            page_size: Tables per page, at most 500 (default: 50)
+            cursor: Cursor printed at the end of the previous page
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
         
         Returns:
             A comprehensive analysis of the database structure with optimization recommendations
@@ -138,7 +208,15 @@ def register_all_tools(mcp: FastMCP):
             
             # Using AWS Secrets Manager:
             analyze_database_structure(secret_name="my-db-credentials", region_name="us-west-2")
+        
+            # The 20 largest tables of the sales schemas, then the next 20:
+            analyze_database_structure(preset="local", schema_pattern="sales*", page_size=20)
+            analyze_database_structure(preset="local", schema_pattern="sales*", page_size=20, cursor="...")
         """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
         # Create connector using helper function
         connector = get_database_connector(
             preset=preset,
@@ -159,12 +237,28 @@ def register_all_tools(mcp: FastMCP):
                 cred_type = "direct credentials" if host else f"secret '{secret_name}'"
                 return f"Failed to connect to database using {cred_type}. Please check your credentials."
             
-            # Get comprehensive database structure
-            db_structure = get_database_structure(connector)
+            if any(value is not None for value in (schema_pattern, table_pattern, sort_by, page_size, cursor)):
+                page = get_database_structure_page(connector, schema_pattern, table_pattern,
+                                                   sort_by or "size", page_size or 50, cursor)
+                return render_output(output_format, page,
+                                     lambda: format_structure_page_response(page, schema_pattern, table_pattern))
+            
+            # Get comprehensive database structure (cached until the DDL changes)
+            db_structure, source = get_cached_database_structure(connector, Config.CATALOG_CACHE_DIR or None, refresh)
+            
+            if output_format != "markdown":
+                summary = summarize_database_structure(db_structure)
+                summary["source"] = source
+                return render_output(output_format, summary)
             
-            # Organize and analyze the structure
-            organized_structure = organize_db_structure_by_table(db_structure)
-            analysis_response = analyze_database_structure_for_response(organized_structure)
+            # Analyze the structure (organizes it by table itself)
+            analysis_response = analyze_database_structure_for_response(db_structure)
+            
+            if source != "database":
+                captured_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(db_structure.captured_at))
+                analysis_response += (f"*Structure served from the catalog cache ({source}), captured at {captured_at}; "
+                                      "no DDL since. Sizes, row counts and index usage are current; "
+                                      "use refresh=True to rescan.*\n")
             
             return analysis_response
             
@@ -174,6 +268,7 @@ def register_all_tools(mcp: FastMCP):
             connector.disconnect()
     
     @mcp.tool()
+    @timed_tool
     async def get_slow_queries(
         secret_name: str = None, 
         region_name: str = "us-west-2",
@@ -184,6 +279,7 @@ def register_all_tools(mcp: FastMCP):
         password: str = None,
         min_execution_time: int = 100, 
         limit: int = 10, 
+        output_format: str = "markdown",
         ctx: Context = None
     ) -> str:
         """
@@ -199,6 +295,7 @@ def register_all_tools(mcp: FastMCP):
             password: Database password (alternative to secret_name)
             min_execution_time: Minimum execution time in milliseconds (default: 100ms)
             limit: Maximum number of queries to return (default: 10)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
         
         Returns:
             A list of slow queries with their execution statistics and analysis
@@ -210,6 +307,10 @@ def register_all_tools(mcp: FastMCP):
             # Using AWS Secrets Manager:
             get_slow_queries(secret_name="my-db-credentials", min_execution_time=200)
         """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
         # Create connector using helper function
         connector = get_database_connector(
             secret_name=secret_name,
@@ -261,6 +362,9 @@ def register_all_tools(mcp: FastMCP):
             if not result:
                 return f"No queries found with execution time >= {min_execution_time}ms."
             
+            if output_format != "markdown":
+                return render_output(output_format, {"min_execution_time_ms": min_execution_time, "queries": result})
+            
             # Format the response
             response = f"Found {len(result)} slow queries (execution time >= {min_execution_time}ms):\n\n"
             
@@ -280,6 +384,7 @@ def register_all_tools(mcp: FastMCP):
             connector.disconnect()
     
     @mcp.tool()
+    @timed_tool
     async def analyze_query(
         query: str, 
         secret_name: str = None, 
@@ -289,6 +394,7 @@ def register_all_tools(mcp: FastMCP):
         dbname: str = None,
         username: str = None,
         password: str = None,
+        output_format: str = "markdown",
         ctx: Context = None
     ) -> str:
         """
@@ -303,6 +409,7 @@ def register_all_tools(mcp: FastMCP):
             dbname: Database name (alternative to secret_name)
             username: Database username (alternative to secret_name)
             password: Database password (alternative to secret_name)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
         
         Returns:
             Analysis of the query execution plan and optimization suggestions
@@ -314,6 +421,10 @@ def register_all_tools(mcp: FastMCP):
             # Using AWS Secrets Manager:
             analyze_query("SELECT * FROM users WHERE age > 25", secret_name="my-db-credentials")
         """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
         # Create connector using helper function
         connector = get_database_connector(
             secret_name=secret_name,
@@ -342,34 +453,40 @@ def register_all_tools(mcp: FastMCP):
             explain_query = f"EXPLAIN (FORMAT JSON, ANALYZE) {query}"
             
             try:
-                result = connector.execute_query(explain_query)
-                if not result:
+                execution_plan = get_execution_plan(connector, query, analyze=True)
+                if not execution_plan:
                     return "Error: Could not generate execution plan for the query."
                 
-                execution_plan = result[0]['QUERY PLAN']
-                
                 # Extract tables involved in the query
-                tables_involved = extract_tables_from_query(query)
-                
-                # Get additional context about the tables
-                table_stats = {}
-                schema_info = {}
-                index_info = {}
+                tables_involved = [table for table in extract_tables_from_query(query) if table]
                 
-                for table in tables_involved:
-                    if table:
-                        table_stats[table] = get_table_statistics(connector, table)
-                        schema_info[table] = get_schema_information(connector, table)
-                        index_info[table] = get_index_information(connector, table)
+                # Get additional context about the tables (one query each for all tables)
+                table_stats = get_table_statistics(connector, tables_involved)
+                schema_info = get_schema_information(connector, tables_involved)
+                index_info = get_index_information(connector, tables_involved)
                 
                 # Analyze query patterns
-                patterns = detect_query_patterns(query)
+                patterns = detect_query_patterns(execution_plan)
                 anti_patterns = detect_query_anti_patterns(query)
+                complexity = connector.analyze_query_complexity(query)
+                
+                if output_format != "markdown":
+                    return render_output(output_format, {
+                        "query": query,
+                        "complexity": complexity,
+                        "plan": plan_summary(execution_plan),
+                        "table_statistics": table_stats,
+                        "columns": schema_info,
+                        "indexes": index_info,
+                        "patterns": patterns,
+                        "anti_patterns": anti_patterns
+                    })
                 
                 # Format the response
                 response = format_query_analysis_response(
-                    query, execution_plan, table_stats, schema_info, 
-                    index_info, patterns, anti_patterns
+                    query, execution_plan, tables_involved, table_stats, schema_info,
+                    index_info, patterns, anti_patterns, complexity,
+                    max_bytes=Config.MAX_RESPONSE_BYTES
                 )
                 
                 return response
@@ -381,7 +498,14 @@ def register_all_tools(mcp: FastMCP):
                     result = connector.execute_query(explain_query)
                     if result:
                         execution_plan = result[0]['QUERY PLAN']
-                        return f"Query Analysis (without execution):\n\n**Query**: {query}\n\n**Execution Plan**:\n```json\n{json.dumps(execution_plan, indent=2)}\n```\n\nNote: Could not analyze actual execution time. Consider running the query first to populate statistics."
+                        if output_format != "markdown":
+                            return render_output(output_format, {"query": query, "executed": False,
+                                                                 "plan": plan_summary(execution_plan)})
+                        response = ResponseBuilder(Config.MAX_RESPONSE_BYTES)
+                        response.write(f"Query Analysis (without execution):\n\n**Query**: {query}\n\n**Execution Plan**:\n")
+                        response.json_block(execution_plan)
+                        response.write("\nNote: Could not analyze actual execution time. Consider running the query first to populate statistics.")
+                        return response.build()
                     else:
                         return f"Error: Could not generate execution plan for the query: {str(e)}"
                 except Exception as e2:
@@ -393,6 +517,7 @@ def register_all_tools(mcp: FastMCP):
             connector.disconnect()
     
     @mcp.tool()
+    @timed_tool
     async def recommend_indexes(
         query: str, 
         secret_name: str = None, 
@@ -402,11 +527,18 @@ def register_all_tools(mcp: FastMCP):
         dbname: str = None,
         username: str = None,
         password: str = None,
+        what_if: bool = True,
+        output_format: str = "markdown",
         ctx: Context = None
     ) -> str:
         """
         Recommend indexes for a given SQL query.
         
+        When the HypoPG extension is installed and what_if is enabled, every candidate is
+        created as a hypothetical index and the query is re-planned. Only candidates the
+        planner would use are recommended, ranked by estimated cost reduction. Without
+        HypoPG the heuristic recommendations are returned.
+        
         Args:
             query: The SQL query to analyze for index recommendations
             secret_name: AWS Secrets Manager secret name containing database credentials
@@ -416,6 +548,8 @@ def register_all_tools(mcp: FastMCP):
             dbname: Database name (alternative to secret_name)
             username: Database username (alternative to secret_name)
             password: Database password (alternative to secret_name)
+            what_if: Evaluate candidates with HypoPG hypothetical indexes when available (default: True)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
         
         Returns:
             Recommended indexes to improve query performance
@@ -426,7 +560,14 @@ def register_all_tools(mcp: FastMCP):
             
             # Using AWS Secrets Manager:
             recommend_indexes("SELECT * FROM users WHERE email = 'user@example.com'", secret_name="my-db-credentials")
+            
+            # Heuristics only (skip HypoPG evaluation):
+            recommend_indexes("SELECT * FROM users WHERE email = 'user@example.com'", secret_name="my-db-credentials", what_if=False)
         """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
         # Create connector using helper function
         connector = get_database_connector(
             secret_name=secret_name,
@@ -447,34 +588,40 @@ def register_all_tools(mcp: FastMCP):
                 return f"Failed to connect to database using {cred_type}. Please check your credentials."
             
             # First, analyze the database structure to understand the context
-            tables_involved = extract_tables_from_query(query)
+            tables_involved = sorted(set(parse_query(query)["tables"].values()))
             
             if not tables_involved:
                 return "Error: Could not identify tables in the query."
             
-            # Get potential indexes for each table
-            recommendations = []
-            
-            for table in tables_involved:
-                if table:
-                    # Get table structure
-                    table_structure = get_table_structure_for_index(connector, table)
-                    
-                    # Check existing indexes
-                    existing_indexes = check_existing_indexes(connector, table)
-                    
-                    # Extract potential indexes from the query
-                    potential_indexes = extract_potential_indexes(query, table, table_structure)
-                    
-                    if potential_indexes:
-                        recommendations.append({
-                            'table': table,
-                            'potential_indexes': potential_indexes,
-                            'existing_indexes': existing_indexes
-                        })
+            # Get table structure, statistics and existing indexes
+            db_structure = get_table_structure_for_index(connector, tables_involved)
+            
+            # Synthesize composite/covering/partial index candidates from the query
+            candidates = synthesize_index_candidates(query, db_structure)
+            
+            # Check which candidates are already served by an existing index
+            existing_indexes, missing_indexes = check_existing_indexes(candidates, db_structure)
+            
+            plan_json = get_execution_plan(connector, query)
+            
+            # Evaluate the remaining candidates with hypothetical indexes when possible
+            hypothetical_results = None
+            if what_if and missing_indexes and is_hypopg_available(connector):
+                candidates = [
+                    {**idx, "ddl": build_index_ddl(idx['table'], idx['columns'], include=idx['include'], predicate=idx['predicate'])}
+                    for idx in missing_indexes
+                ]
+                hypothetical_results = evaluate_hypothetical_indexes(connector, query, candidates)
+            
+            if output_format != "markdown":
+                return render_output(output_format, index_recommendations_result(
+                    query, plan_json, db_structure, existing_indexes, missing_indexes, hypothetical_results
+                ))
             
             # Format the response
-            response = format_index_recommendations_response(recommendations)
+            response = format_index_recommendations_response(
+                query, plan_json, db_structure, existing_indexes, missing_indexes, hypothetical_results
+            )
             
             return response
             
@@ -482,8 +629,728 @@ def register_all_tools(mcp: FastMCP):
             return f"Error recommending indexes: {str(e)}"
         finally:
             connector.disconnect()
-    
+
     @mcp.tool()
+    @timed_tool
+    async def advise_workload_indexes(
+        secret_name: str = None,
+        region_name: str = "us-west-2",
+        host: str = None,
+        port: int = None,
+        dbname: str = None,
+        username: str = None,
+        password: str = None,
+        top_n: int = 500,
+        min_calls: int = 1,
+        log_file: str = None,
+        max_indexes: int = 5,
+        storage_budget_mb: int = 1024,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Recommend a set of indexes for the whole workload instead of a single query.
+
+        The top-N statements by total time are taken from pg_stat_statements (or from a
+        PostgreSQL log file with log_min_duration_statement output), parsed into per-table
+        access patterns and merged into composite index candidates. Candidates are picked
+        greedily by estimated read benefit minus write amplification, per byte of index,
+        until max_indexes or the storage budget is reached.
+
+        Args:
+            secret_name: AWS Secrets Manager secret name containing database credentials
+            region_name: AWS region where the secret is stored (default: us-west-2)
+            host: Database host (alternative to secret_name)
+            port: Database port (alternative to secret_name, default: 5432)
+            dbname: Database name (alternative to secret_name)
+            username: Database username (alternative to secret_name)
+            password: Database password (alternative to secret_name)
+            top_n: Number of statements to analyze, by total execution time (default: 500)
+            min_calls: Ignore statements called fewer times than this (default: 1)
+            log_file: Name of a PostgreSQL log or SQL file in the server's WORKLOAD_LOG_DIR, to use instead of pg_stat_statements
+            max_indexes: Maximum number of indexes to recommend (default: 5)
+            storage_budget_mb: Maximum total size of the recommended indexes in MB (default: 1024)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            The recommended index set with estimated benefit, write cost, size and DDL
+
+        Examples:
+            # Using pg_stat_statements:
+            advise_workload_indexes(secret_name="my-db-credentials", top_n=200, max_indexes=3)
+
+            # Using a server log file:
+            advise_workload_indexes(host="localhost", dbname="mydb", username="postgres", password="password", log_file="postgresql.log")
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        log_path = None
+        if log_file:
+            if not Config.WORKLOAD_LOG_DIR:
+                return "Error: log_file is disabled on this server (WORKLOAD_LOG_DIR is not set)."
+            log_path = resolve_workload_file(log_file, Config.WORKLOAD_LOG_DIR)
+            if log_path is None:
+                return f"Error: workload file '{log_file}' not found in the server's workload directory."
+
+        # Create connector using helper function
+        connector = get_database_connector(
+            secret_name=secret_name,
+            region_name=region_name,
+            host=host,
+            port=port,
+            dbname=dbname,
+            username=username,
+            password=password
+        )
+
+        if not connector:
+            return "Error: Please provide either AWS Secrets Manager credentials (secret_name) or direct database credentials (host, dbname, username, password)."
+
+        try:
+            if not connector.connect():
+                cred_type = "direct credentials" if host else f"secret '{secret_name}'"
+                return f"Failed to connect to database using {cred_type}. Please check your credentials."
+
+            if log_path:
+                try:
+                    statements = load_statements_from_log(log_path, top_n)
+                except OSError:
+                    return f"Error: workload file '{log_file}' could not be read."
+                source = f"log file {log_file}"
+            else:
+                result = connector.execute_query(CHECK_PG_STAT_STATEMENTS_QUERY)
+                if not result or not result[0]['has_pg_stat_statements']:
+                    return "Error: pg_stat_statements extension is not installed. This extension is required for workload analysis (or pass log_file). Please install it first:\n\nCREATE EXTENSION pg_stat_statements;"
+                statements = get_workload_statements(connector, top_n, min_calls)
+                source = f"pg_stat_statements (top {top_n} by total time)"
+
+            if not statements:
+                return "No statements found to analyze."
+
+            advice = advise_workload_indexes_for(
+                connector, statements, max_indexes, storage_budget_mb * 1024 * 1024
+            )
+
+            return render_output(output_format, {"source": source, **advice},
+                                 lambda: format_workload_advice_response(advice, source))
+
+        except Exception as e:
+            return f"Error advising workload indexes: {str(e)}"
+        finally:
+            connector.disconnect()
+
+    @mcp.tool()
+    @timed_tool
+    async def analyze_index_hygiene(
+        preset: str = None,
+        secret_name: str = None,
+        region_name: str = "us-west-2",
+        host: str = None,
+        port: int = None,
+        dbname: str = None,
+        username: str = None,
+        password: str = None,
+        min_stats_age_days: int = 7,
+        limit: int = 50,
+        refresh_catalog: bool = False,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Find duplicate, redundant (left-prefix), unused and FK-only indexes.
+
+        Runs entirely off a cached catalog snapshot (refreshed every few minutes), so it
+        stays cheap on schemas with tens of thousands of indexes. Findings are ranked by
+        bytes reclaimable and index writes saved. Unused-index findings take the
+        statistics reset time and attached replicas into account.
+
+        Args:
+            preset: Database preset name (e.g., 'local', 'production') - easiest option
+            secret_name: AWS Secrets Manager secret name containing database credentials
+            region_name: AWS region where the secret is stored (default: us-west-2)
+            host: Database host (alternative to preset/secret_name)
+            port: Database port (alternative to preset/secret_name, default: 5432)
+            dbname: Database name (alternative to preset/secret_name)
+            username: Database username (alternative to preset/secret_name)
+            password: Database password (alternative to preset/secret_name)
+            min_stats_age_days: Statistics younger than this make unused findings low-confidence (default: 7)
+            limit: Maximum number of findings to list (default: 50)
+            refresh_catalog: Reload the catalog snapshot instead of using the cached one (default: False)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            Ranked index hygiene findings with DROP INDEX commands
+
+        Examples:
+            # Using database preset:
+            analyze_index_hygiene(preset="local")
+
+            # Using AWS Secrets Manager, forcing a fresh catalog snapshot:
+            analyze_index_hygiene(secret_name="my-db-credentials", refresh_catalog=True)
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        # Create connector using helper function
+        connector = get_database_connector(
+            preset=preset,
+            secret_name=secret_name,
+            region_name=region_name,
+            host=host,
+            port=port,
+            dbname=dbname,
+            username=username,
+            password=password
+        )
+
+        if not connector:
+            return "Error: Please provide database credentials using one of these methods:\n1. preset='local' (or other preset name)\n2. AWS Secrets Manager (secret_name)\n3. Direct credentials (host, dbname, username, password)"
+
+        try:
+            if not connector.connect():
+                cred_type = "direct credentials" if host else f"secret '{secret_name}'"
+                return f"Failed to connect to database using {cred_type}. Please check your credentials."
+
+            snapshot = get_catalog_snapshot(connector, refresh=refresh_catalog)
+            result = analyze_index_hygiene_for(snapshot, min_stats_age_days)
+
+            return render_output(output_format, result, lambda: format_index_hygiene_response(result, limit))
+
+        except Exception as e:
+            return f"Error analyzing index hygiene: {str(e)}"
+        finally:
+            connector.disconnect()
+
+    @mcp.tool()
+    @timed_tool
+    async def find_unindexed_foreign_keys(
+        preset: str = None,
+        secret_name: str = None,
+        region_name: str = "us-west-2",
+        host: str = None,
+        port: int = None,
+        dbname: str = None,
+        username: str = None,
+        password: str = None,
+        limit: int = 50,
+        refresh_catalog: bool = False,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Find foreign keys without an index whose leading columns match the FK columns.
+
+        Without such an index, every delete (or key update) on the parent table scans the
+        child table sequentially. Findings are ranked by child table size times parent
+        write rate, with the CREATE INDEX command for each.
+
+        Args:
+            preset: Database preset name (e.g., 'local', 'production') - easiest option
+            secret_name: AWS Secrets Manager secret name containing database credentials
+            region_name: AWS region where the secret is stored (default: us-west-2)
+            host: Database host (alternative to preset/secret_name)
+            port: Database port (alternative to preset/secret_name, default: 5432)
+            dbname: Database name (alternative to preset/secret_name)
+            username: Database username (alternative to preset/secret_name)
+            password: Database password (alternative to preset/secret_name)
+            limit: Maximum number of foreign keys to list (default: 50)
+            refresh_catalog: Reload the catalog snapshot instead of using the cached one (default: False)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            Unindexed foreign keys ranked by estimated cost, with DDL
+
+        Examples:
+            # Using database preset:
+            find_unindexed_foreign_keys(preset="local")
+
+            # Using AWS Secrets Manager:
+            find_unindexed_foreign_keys(secret_name="my-db-credentials", limit=20)
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        # Create connector using helper function
+        connector = get_database_connector(
+            preset=preset,
+            secret_name=secret_name,
+            region_name=region_name,
+            host=host,
+            port=port,
+            dbname=dbname,
+            username=username,
+            password=password
+        )
+
+        if not connector:
+            return "Error: Please provide database credentials using one of these methods:\n1. preset='local' (or other preset name)\n2. AWS Secrets Manager (secret_name)\n3. Direct credentials (host, dbname, username, password)"
+
+        try:
+            if not connector.connect():
+                cred_type = "direct credentials" if host else f"secret '{secret_name}'"
+                return f"Failed to connect to database using {cred_type}. Please check your credentials."
+
+            snapshot = get_catalog_snapshot(connector, refresh=refresh_catalog)
+            findings = find_unindexed_foreign_keys_for(snapshot)
+
+            return render_output(
+                output_format,
+                {"foreign_keys": len(snapshot["foreign_keys"]), "unindexed": len(findings), "findings": findings[:limit]},
+                lambda: format_unindexed_foreign_keys_response(findings, len(snapshot["foreign_keys"]), limit)
+            )
+
+        except Exception as e:
+            return f"Error finding unindexed foreign keys: {str(e)}"
+        finally:
+            connector.disconnect()
+
+    @mcp.tool()
+    @timed_tool
+    async def estimate_bloat(
+        preset: str = None,
+        secret_name: str = None,
+        region_name: str = "us-west-2",
+        host: str = None,
+        port: int = None,
+        dbname: str = None,
+        username: str = None,
+        password: str = None,
+        min_size_mb: float = 1,
+        limit: int = 30,
+        confirm_with_pgstattuple: bool = False,
+        confirm_top: int = 5,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Estimate wasted space (bloat) in tables and btree indexes.
+
+        Expected pages are computed from pg_stats average widths, alignment padding,
+        tuple header overhead and fillfactor, and compared with the actual relation
+        size. All relations are estimated in one catalog pass. Optionally the largest
+        findings are measured with pgstattuple_approx/pgstatindex when the pgstattuple
+        extension is installed.
+
+        Args:
+            preset: Database preset name (e.g., 'local', 'production') - easiest option
+            secret_name: AWS Secrets Manager secret name containing database credentials
+            region_name: AWS region where the secret is stored (default: us-west-2)
+            host: Database host (alternative to preset/secret_name)
+            port: Database port (alternative to preset/secret_name, default: 5432)
+            dbname: Database name (alternative to preset/secret_name)
+            username: Database username (alternative to preset/secret_name)
+            password: Database password (alternative to preset/secret_name)
+            min_size_mb: Skip relations smaller than this (default: 1 MB)
+            limit: Maximum number of relations to list (default: 30)
+            confirm_with_pgstattuple: Measure the top findings with pgstattuple (default: False)
+            confirm_top: Number of findings to measure when confirming (default: 5)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            Relations ranked by estimated reclaimable bytes
+
+        Examples:
+            # Using database preset:
+            estimate_bloat(preset="local")
+
+            # Confirm the 3 largest findings with pgstattuple:
+            estimate_bloat(secret_name="my-db-credentials", confirm_with_pgstattuple=True, confirm_top=3)
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        # Create connector using helper function
+        connector = get_database_connector(
+            preset=preset,
+            secret_name=secret_name,
+            region_name=region_name,
+            host=host,
+            port=port,
+            dbname=dbname,
+            username=username,
+            password=password
+        )
+
+        if not connector:
+            return "Error: Please provide database credentials using one of these methods:\n1. preset='local' (or other preset name)\n2. AWS Secrets Manager (secret_name)\n3. Direct credentials (host, dbname, username, password)"
+
+        try:
+            if not connector.connect():
+                cred_type = "direct credentials" if host else f"secret '{secret_name}'"
+                return f"Failed to connect to database using {cred_type}. Please check your credentials."
+
+            estimates = estimate_relation_bloat(connector, int(min_size_mb * 1024 * 1024))
+
+            confirmed = None
+            if confirm_with_pgstattuple:
+                confirmed = confirm_with_pgstattuple_for(connector, estimates, confirm_top)
+
+            return render_output(output_format, {"confirmed_with_pgstattuple": confirmed, "estimates": estimates[:limit]},
+                                 lambda: format_bloat_response(estimates, limit, confirmed))
+
+        except Exception as e:
+            return f"Error estimating bloat: {str(e)}"
+        finally:
+            connector.disconnect()
+
+    @mcp.tool()
+    @timed_tool
+    async def count_table_rows(
+        tables: str = None,
+        method: str = "estimate",
+        preset: str = None,
+        secret_name: str = None,
+        region_name: str = "us-west-2",
+        host: str = None,
+        port: int = None,
+        dbname: str = None,
+        username: str = None,
+        password: str = None,
+        limit: int = 50,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Count table rows without scanning the tables.
+
+        By default counts are planner statistics (reltuples scaled to the current table
+        size, or n_live_tup when the table changed a lot since its last ANALYZE), returned
+        instantly with their freshness. method='sample' counts a TABLESAMPLE of each table
+        and reports a 95% confidence interval; method='exact' runs a parallel count(*) and
+        caches the result for ROW_COUNT_CACHE_SECONDS.
+
+        Args:
+            tables: Comma-separated table names, optionally schema-qualified (default: all tables)
+            method: 'estimate' (default), 'sample' or 'exact'
+            preset: Database preset name (e.g., 'local', 'production') - easiest option
+            secret_name: AWS Secrets Manager secret name containing database credentials
+            region_name: AWS region where the secret is stored (default: us-west-2)
+            host: Database host (alternative to preset/secret_name)
+            port: Database port (alternative to preset/secret_name, default: 5432)
+            dbname: Database name (alternative to preset/secret_name)
+            username: Database username (alternative to preset/secret_name)
+            password: Database password (alternative to preset/secret_name)
+            limit: Maximum number of tables, largest first (default: 50)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            Row count, method and freshness per table
+
+        Examples:
+            # Instant estimates for every table:
+            count_table_rows(preset="local")
+
+            # Exact count of one table:
+            count_table_rows(tables="public.visits", method="exact", secret_name="my-db-credentials")
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+        if method not in COUNT_METHODS:
+            return f"Error: invalid method '{method}'. Use one of: {', '.join(COUNT_METHODS)}"
+
+        # Create connector using helper function
+        connector = get_database_connector(
+            preset=preset,
+            secret_name=secret_name,
+            region_name=region_name,
+            host=host,
+            port=port,
+            dbname=dbname,
+            username=username,
+            password=password
+        )
+
+        if not connector:
+            return "Error: Please provide database credentials using one of these methods:\n1. preset='local' (or other preset name)\n2. AWS Secrets Manager (secret_name)\n3. Direct credentials (host, dbname, username, password)"
+
+        try:
+            if not connector.connect():
+                cred_type = "direct credentials" if host else f"secret '{secret_name}'"
+                return f"Failed to connect to database using {cred_type}. Please check your credentials."
+
+            table_list = [name.strip() for name in tables.split(",") if name.strip()] if tables else None
+            counts = count_rows(connector, table_list, method, limit, Config.ROW_COUNT_CACHE_SECONDS,
+                                Config.APPROXIMATE_SAMPLE_ROWS, Config.ROW_COUNT_PARALLEL_WORKERS)
+            return render_output(output_format, counts, lambda: format_row_counts_response(counts))
+
+        except Exception as e:
+            return f"Error counting rows: {str(e)}"
+        finally:
+            connector.disconnect()
+
+    @mcp.tool()
+    @timed_tool
+    async def forecast_autovacuum(
+        preset: str = None,
+        secret_name: str = None,
+        region_name: str = "us-west-2",
+        host: str = None,
+        port: int = None,
+        dbname: str = None,
+        username: str = None,
+        password: str = None,
+        sample_seconds: int = 0,
+        limit: int = 30,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Predict when each table will trigger autovacuum/autoanalyze and flag vacuum problems.
+
+        Effective thresholds (global settings plus per-table reloptions) are combined with
+        the current dead/modified/inserted tuple counts and their rate of change between
+        snapshots. Every call records a snapshot, so rates improve with repeated calls. Tables
+        where vacuum cannot keep up or that approach transaction ID wraparound
+        (age(relfrozenxid)) are flagged.
+
+        Args:
+            preset: Database preset name (e.g., 'local', 'production') - easiest option
+            secret_name: AWS Secrets Manager secret name containing database credentials
+            region_name: AWS region where the secret is stored (default: us-west-2)
+            host: Database host (alternative to preset/secret_name)
+            port: Database port (alternative to preset/secret_name, default: 5432)
+            dbname: Database name (alternative to preset/secret_name)
+            username: Database username (alternative to preset/secret_name)
+            password: Database password (alternative to preset/secret_name)
+            sample_seconds: When there is no previous snapshot, wait this long and take a second one (default: 0)
+            limit: Maximum number of tables to list (default: 30)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            Tables ordered by urgency with thresholds, rates, ETAs and flags
+
+        Examples:
+            # Using database preset:
+            forecast_autovacuum(preset="local")
+
+            # Measure rates over 30 seconds on the first call:
+            forecast_autovacuum(secret_name="my-db-credentials", sample_seconds=30)
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        # Create connector using helper function
+        connector = get_database_connector(
+            preset=preset,
+            secret_name=secret_name,
+            region_name=region_name,
+            host=host,
+            port=port,
+            dbname=dbname,
+            username=username,
+            password=password
+        )
+
+        if not connector:
+            return "Error: Please provide database credentials using one of these methods:\n1. preset='local' (or other preset name)\n2. AWS Secrets Manager (secret_name)\n3. Direct credentials (host, dbname, username, password)"
+
+        try:
+            if not connector.connect():
+                cred_type = "direct credentials" if host else f"secret '{secret_name}'"
+                return f"Failed to connect to database using {cred_type}. Please check your credentials."
+
+            result = forecast_autovacuum_for(connector)
+
+            if sample_seconds > 0 and result["snapshots"] < 2:
+                await asyncio.sleep(sample_seconds)
+                # now(), the statistics and the xid ages are fixed for a transaction; start a new one
+                connector.new_transaction()
+                result = forecast_autovacuum_for(connector)
+
+            return render_output(output_format, result, lambda: format_autovacuum_forecast_response(result, limit))
+
+        except Exception as e:
+            return f"Error forecasting autovacuum: {str(e)}"
+        finally:
+            connector.disconnect()
+
+    @mcp.tool()
+    @timed_tool
+    async def analyze_locks(
+        preset: str = None,
+        secret_name: str = None,
+        region_name: str = "us-west-2",
+        host: str = None,
+        port: int = None,
+        dbname: str = None,
+        username: str = None,
+        password: str = None,
+        samples: int = 1,
+        duration_seconds: float = 10,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Analyze blocked sessions: blocking chains, root blockers and wait events.
+
+        Takes a snapshot of pg_stat_activity with pg_blocking_pids (evaluated only for
+        sessions waiting on a lock), builds the blocking graph, finds the root blockers and
+        chain depth, and groups sessions by wait event. With samples > 1 the snapshot is
+        repeated over duration_seconds to tell transient blocking from persistent blocking.
+
+        Args:
+            preset: Database preset name (e.g., 'local', 'production') - easiest option
+            secret_name: AWS Secrets Manager secret name containing database credentials
+            region_name: AWS region where the secret is stored (default: us-west-2)
+            host: Database host (alternative to preset/secret_name)
+            port: Database port (alternative to preset/secret_name, default: 5432)
+            dbname: Database name (alternative to preset/secret_name)
+            username: Database username (alternative to preset/secret_name)
+            password: Database password (alternative to preset/secret_name)
+            samples: Number of snapshots to take (default: 1, max: 100)
+            duration_seconds: Time to spread the samples over (default: 10)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            Root blockers with their chains, persistence across samples and wait event breakdown
+
+        Examples:
+            # Single snapshot using database preset:
+            analyze_locks(preset="local")
+
+            # 20 samples over 10 seconds:
+            analyze_locks(secret_name="my-db-credentials", samples=20, duration_seconds=10)
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        # Create connector using helper function
+        connector = get_database_connector(
+            preset=preset,
+            secret_name=secret_name,
+            region_name=region_name,
+            host=host,
+            port=port,
+            dbname=dbname,
+            username=username,
+            password=password
+        )
+
+        if not connector:
+            return "Error: Please provide database credentials using one of these methods:\n1. preset='local' (or other preset name)\n2. AWS Secrets Manager (secret_name)\n3. Direct credentials (host, dbname, username, password)"
+
+        try:
+            if not connector.connect():
+                cred_type = "direct credentials" if host else f"secret '{secret_name}'"
+                return f"Failed to connect to database using {cred_type}. Please check your credentials."
+
+            samples = max(1, min(samples, 100))
+            interval = max(duration_seconds / samples, 0.1) if samples > 1 else 0
+
+            results = []
+            for i in range(samples):
+                if i:
+                    await asyncio.sleep(interval)
+                sessions = take_lock_snapshot(connector)
+                results.append(analyze_blocking(sessions))
+
+            summary = summarize_samples(results) if samples > 1 else None
+
+            return render_output(output_format, {"blocking": results[-1], "sessions": sessions, "summary": summary},
+                                 lambda: format_blocking_response(results[-1], sessions, summary))
+
+        except Exception as e:
+            return f"Error analyzing locks: {str(e)}"
+        finally:
+            connector.disconnect()
+
+    @mcp.tool()
+    @timed_tool
+    async def get_active_session_history(
+        preset: str = "local",
+        start_time: str = None,
+        end_time: str = None,
+        minutes: float = 5,
+        group_by: str = "query,wait_class",
+        limit: int = 20,
+        output_format: str = "markdown",
+        ctx: Context = None
+    ) -> str:
+        """
+        Show what sessions were doing during a past time window, from the background session history.
+
+        pg_stat_activity is sampled in the background (ASH_PRESETS, ASH_INTERVAL_SECONDS) for the
+        configured presets; this tool only reads the history kept in the metrics store and does not query the database.
+
+        Args:
+            preset: Sampled database preset (must be listed in ASH_PRESETS)
+            start_time: Window start as 'HH:MM[:SS]' (server local time, today) or ISO datetime (default: end_time - minutes)
+            end_time: Window end, same formats (default: now)
+            minutes: Window length when start_time or end_time is omitted (default: 5)
+            group_by: Comma-separated columns: query, wait_class, wait_event, state, backend_type (default: query,wait_class)
+            limit: Maximum number of groups to list (default: 20)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
+
+        Returns:
+            Average active sessions per group and per wait class over the window
+
+        Examples:
+            # What were sessions waiting on between 14:02 and 14:05:
+            get_active_session_history(preset="production", start_time="14:02", end_time="14:05")
+
+            # Last 30 minutes by wait event:
+            get_active_session_history(preset="local", minutes=30, group_by="wait_event")
+        """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
+        if not activity_sampler.is_sampling(preset):
+            sampled = ", ".join(activity_sampler.presets) or "none"
+            return (f"Error: preset '{preset}' is not being sampled (sampled presets: {sampled}). "
+                    "Set ASH_PRESETS (and optionally ASH_INTERVAL_SECONDS) and restart the server.")
+
+        columns = [column.strip() for column in group_by.split(",") if column.strip()]
+        invalid = [column for column in columns if column not in GROUP_COLUMNS]
+        if not columns or invalid:
+            return f"Error: invalid group_by '{group_by}'. Valid columns: {', '.join(GROUP_COLUMNS)}"
+
+        try:
+            start, end = resolve_window(start_time, end_time, minutes)
+            result = activity_sampler.aggregate(preset, start.timestamp(), end.timestamp(), tuple(columns))
+            wait_classes = activity_sampler.aggregate(preset, start.timestamp(), end.timestamp(), ("wait_class",))
+
+            query_texts = {}
+            if "query" in columns:
+                position = columns.index("query")
+                query_texts = activity_sampler.lookup_query_texts(preset, [key[position] for key, _ in result["groups"][:limit]])
+
+            if output_format != "markdown":
+                return render_output(output_format, {
+                    "preset": preset,
+                    "start": result["start"],
+                    "end": result["end"],
+                    "samples": result["ticks"],
+                    "session_samples": result["rows"],
+                    "average_active_sessions": result["rows"] / result["ticks"] if result["ticks"] else 0,
+                    "wait_classes": table(["wait_class", "session_samples"],
+                                          [[key[0], samples] for key, samples in wait_classes["groups"]]),
+                    "groups": table(columns + ["session_samples"],
+                                    [list(key) + [samples] for key, samples in result["groups"][:limit]]),
+                    "query_texts": query_texts,
+                    "sampling_error": activity_sampler.errors.get(preset)
+                })
+            
+            response = format_active_session_history_response(preset, result, wait_classes, columns, query_texts, limit)
+            if preset in activity_sampler.errors:
+                response += f"\n⚠️ Last sampling attempt failed: {activity_sampler.errors[preset]}\n"
+            return response
+
+        except ValueError as e:
+            return f"Error: invalid time window: {str(e)}"
+        except Exception as e:
+            return f"Error reading active session history: {str(e)}"
+
+    @mcp.tool()
+    @timed_tool
     async def suggest_query_rewrite(
         query: str, 
         secret_name: str = None, 
@@ -493,6 +1360,7 @@ def register_all_tools(mcp: FastMCP):
         dbname: str = None,
         username: str = None,
         password: str = None,
+        output_format: str = "markdown",
         ctx: Context = None
     ) -> str:
         """
@@ -507,6 +1375,7 @@ def register_all_tools(mcp: FastMCP):
             dbname: Database name (alternative to secret_name)
             username: Database username (alternative to secret_name)
             password: Database password (alternative to secret_name)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
         
         Returns:
             Suggestions for query rewrites to improve performance
@@ -518,6 +1387,10 @@ def register_all_tools(mcp: FastMCP):
             # Using AWS Secrets Manager:
             suggest_query_rewrite("SELECT * FROM users JOIN orders ON users.id = orders.user_id", secret_name="my-db-credentials")
         """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
         # Create connector using helper function
         connector = get_database_connector(
             secret_name=secret_name,
@@ -571,19 +1444,27 @@ def register_all_tools(mcp: FastMCP):
                 suggestions.append("Ensure WHERE clauses use indexed columns when possible.")
                 suggestions.append("Consider using LIMIT to restrict result sets if you don't need all rows.")
                 
-                # Format the response
-                response = f"Query Optimization Suggestions for: {query}\n\n"
-                response += "**Execution Plan Analysis**:\n"
-                response += f"```json\n{json.dumps(execution_plan, indent=2)}\n```\n\n"
+                if output_format != "markdown":
+                    return render_output(output_format, {"query": query, "suggestions": suggestions,
+                                                         "plan": plan_summary(execution_plan)})
+                
+                # Format the response (suggestions first: the plan is what gets cut at the byte budget)
+                response = ResponseBuilder(Config.MAX_RESPONSE_BYTES)
+                response.line(f"Query Optimization Suggestions for: {query}")
+                response.line()
                 
                 if suggestions:
-                    response += "**Optimization Suggestions**:\n"
+                    response.line("**Optimization Suggestions**:")
                     for i, suggestion in enumerate(suggestions, 1):
-                        response += f"{i}. {suggestion}\n"
+                        response.line(f"{i}. {suggestion}")
                 else:
-                    response += "**No specific optimization suggestions found.**\n"
+                    response.line("**No specific optimization suggestions found.**")
+                response.line()
                 
-                return response
+                response.line("**Execution Plan Analysis**:")
+                response.json_block(execution_plan)
+                
+                return response.build()
                 
             except Exception as e:
                 return f"Error analyzing query for optimization: {str(e)}"
@@ -594,6 +1475,7 @@ def register_all_tools(mcp: FastMCP):
             connector.disconnect()
             
     @mcp.tool()
+    @timed_tool
     async def show_postgresql_settings(
         pattern: str = None, 
         secret_name: str = None, 
@@ -603,6 +1485,7 @@ def register_all_tools(mcp: FastMCP):
         dbname: str = None,
         username: str = None,
         password: str = None,
+        output_format: str = "markdown",
         ctx: Context = None
     ) -> str:
         """
@@ -617,6 +1500,7 @@ def register_all_tools(mcp: FastMCP):
             dbname: Database name (alternative to secret_name)
             username: Database username (alternative to secret_name)
             password: Database password (alternative to secret_name)
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
         
         Returns:
             Current PostgreSQL configuration settings in a formatted table
@@ -628,6 +1512,10 @@ def register_all_tools(mcp: FastMCP):
             # Using AWS Secrets Manager:
             show_postgresql_settings(pattern="wal", secret_name="my-db-secret")
         """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
         # Create connector using helper function
         connector = get_database_connector(
             secret_name=secret_name,
@@ -672,25 +1560,27 @@ def register_all_tools(mcp: FastMCP):
                 else:
                     return "No PostgreSQL settings found."
             
+            if output_format != "markdown":
+                return render_output(output_format, {"pattern": pattern, "settings": result})
+            
             # Format the response
+            response = ResponseBuilder(Config.MAX_RESPONSE_BYTES, stream=Config.STREAM_RESPONSES,
+                                       chunk_bytes=Config.RESPONSE_CHUNK_BYTES,
+                                       truncation_hint="Use pattern to narrow the settings shown.")
             if pattern:
-                response = f"PostgreSQL Settings matching '{pattern}':\n\n"
+                response.line(f"PostgreSQL Settings matching '{pattern}':")
             else:
-                response = "PostgreSQL Configuration Settings:\n\n"
+                response.line("PostgreSQL Configuration Settings:")
+            response.line()
             
-            response += "| Setting | Value | Unit | Context | Category |\n"
-            response += "|---------|-------|------|---------|----------|\n"
+            response.table(
+                ["Setting", "Value", "Unit", "Context", "Category"],
+                ((setting['name'], setting['setting'], setting['unit'] or '', setting['context'], setting['category'])
+                 for setting in result)
+            )
+            await response.stream(ctx, final=True)
             
-            for setting in result:
-                name = setting['name']
-                value = setting['setting']
-                unit = setting['unit'] or ''
-                context = setting['context']
-                category = setting['category']
-                
-                response += f"| {name} | {value} | {unit} | {context} | {category} |\n"
-            
-            return response
+            return response.build()
             
         except Exception as e:
             return f"Error showing PostgreSQL settings: {str(e)}"
@@ -698,6 +1588,7 @@ def register_all_tools(mcp: FastMCP):
             connector.disconnect()
     
     @mcp.tool()
+    @timed_tool
     async def execute_read_only_query(
         query: str, 
         secret_name: str = None, 
@@ -708,11 +1599,29 @@ def register_all_tools(mcp: FastMCP):
         username: str = None, 
         password: str = None,
         max_rows: int = 100, 
+        summarize: bool = False,
+        token_budget: int = 2000,
+        sample_rows: int = 5,
+        approximate: bool = False,
+        exact: bool = False,
+        output_format: str = "markdown",
         ctx: Context = None
     ) -> str:
         """
         Execute a read-only SQL query and return the results.
         
+        With summarize=True the whole result is streamed through a server-side cursor and
+        summarized in constant memory instead of returned: per column the null %, a distinct
+        estimate (HyperLogLog), min/max, frequent values (count-min sketch) and numeric
+        quantiles, plus a few random sample rows, all within about token_budget tokens.
+        Use it for large results or wide text columns.
+        
+        With approximate=True (or APPROXIMATE_QUERIES=true) aggregate queries over large tables
+        read a TABLESAMPLE sample of their largest table instead of scanning it: COUNT and SUM
+        are scaled up, counts come with a 95% confidence interval, and plain COUNT(*) of a
+        whole table uses the planner estimate (reltuples). Queries that cannot be sampled,
+        and queries over small tables, run exactly. exact=True always runs the full query.
+        
         Args:
             query: The SQL query to execute (must be SELECT, EXPLAIN, or SHOW only)
             secret_name: AWS Secrets Manager secret name containing database credentials
@@ -722,7 +1631,13 @@ def register_all_tools(mcp: FastMCP):
             dbname: Database name (alternative to secret_name)
             username: Database username (alternative to secret_name)
             password: Database password (alternative to secret_name)
-            max_rows: Maximum number of rows to return (default: 100)
+            max_rows: Maximum number of rows to return (default: 100; ignored when summarizing)
+            summarize: Summarize the full result instead of listing rows (SELECT/WITH/VALUES/TABLE only)
+            token_budget: Approximate size of a summary in tokens (default: 2000)
+            sample_rows: Random rows included in a summary (default: 5)
+            approximate: Answer aggregates from a sample of large tables (SELECT only)
+            exact: Run the full query even when approximate mode is on
+            output_format: 'markdown' (default), 'json' (typed result) or 'compact' (fewest tokens)
         
         Returns:
             Query results in a formatted table
@@ -733,7 +1648,17 @@ def register_all_tools(mcp: FastMCP):
             
             # Using AWS Secrets Manager:
             execute_read_only_query("SELECT * FROM pg_stat_activity LIMIT 10", secret_name="my-db-secret")
+            
+            # Profile a whole table without pulling it into the context:
+            execute_read_only_query("SELECT * FROM visits", secret_name="my-db-secret", summarize=True)
+            
+            # Monthly counts over a huge table from a sample, with confidence intervals:
+            execute_read_only_query("SELECT date_trunc('month', visit_date), count(*) FROM visits GROUP BY 1", secret_name="my-db-secret", approximate=True)
         """
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+
         # Create connector using helper function
         connector = get_database_connector(
             secret_name=secret_name,
@@ -757,33 +1682,64 @@ def register_all_tools(mcp: FastMCP):
             if not connector.connect():
                 return f"Failed to connect to database using secret '{secret_name}'. Please check your credentials."
             
+            if summarize:
+                # Named cursors only accept plain queries, not EXPLAIN or SHOW
+                if query.strip().split(None, 1)[0].lower() not in ("select", "with", "values", "table"):
+                    return "Error: summarize=True needs a SELECT, WITH, VALUES or TABLE query."
+                summary = summarize_rows(connector.stream_query(query.strip().rstrip(";")), max(sample_rows, 0))
+                return render_output(output_format, summary, lambda: format_result_summary_response(summary, token_budget))
+            
+            if (approximate or Config.APPROXIMATE_QUERIES) and not exact and \
+                    query.strip().split(None, 1)[0].lower() == "select":
+                approximation = run_approximate_query(connector, query.strip().rstrip(";"), Config.APPROXIMATE_SAMPLE_ROWS)
+                if output_format != "markdown" and max_rows:
+                    approximation["row_count"] = len(approximation["rows"])
+                    approximation["rows"] = approximation["rows"][:max_rows]
+                    approximation["intervals"] = approximation["intervals"][:max_rows]
+                return render_output(output_format, approximation, lambda: format_approximate_response(
+                    approximation, max_rows, Config.MAX_RESPONSE_BYTES))
+            
             # Execute the query
             result = connector.execute_query(query)
             
             if not result:
                 return "Query executed successfully but returned no results."
             
+            if output_format != "markdown":
+                total_rows = len(result)
+                result = result[:max_rows] if max_rows else result
+                columns = list(result[0].keys())
+                return render_output(output_format, {
+                    "row_count": total_rows,
+                    "returned_rows": len(result),
+                    "result": table(columns, [[row.get(column) for column in columns] for row in result])
+                })
+            
+            response = ResponseBuilder(Config.MAX_RESPONSE_BYTES, stream=Config.STREAM_RESPONSES,
+                                       chunk_bytes=Config.RESPONSE_CHUNK_BYTES,
+                                       truncation_hint="Lower max_rows or select fewer columns.")
+            
             # Limit the number of rows if specified
-            if max_rows and len(result) > max_rows:
+            total_rows = len(result)
+            if max_rows and total_rows > max_rows:
                 result = result[:max_rows]
-                response = f"Query returned {len(result)} rows (showing first {max_rows}):\n\n"
+                response.line(f"Query returned {total_rows} rows (showing first {max_rows}):")
             else:
-                response = f"Query returned {len(result)} rows:\n\n"
+                response.line(f"Query returned {total_rows} rows:")
+            response.line()
             
-            # Format the results
-            if result:
-                # Get column names from the first row
-                columns = list(result[0].keys())
-                
-                # Create header
-                response += "| " + " | ".join(columns) + " |\n"
-                response += "|" + "|".join(["---"] * len(columns)) + "|\n"
-                
-                # Add data rows
-                for row in result:
-                    response += "| " + " | ".join(str(row.get(col, '')) for col in columns) + " |\n"
+            # Format the results, streaming completed chunks while the table grows
+            columns = list(result[0].keys())
+            response.table(columns, [])
+            for i, row in enumerate(result, 1):
+                if not response.write("| " + " | ".join(markdown_cell(row.get(col, '')) for col in columns) + " |\n"):
+                    response.truncation_hint = f"Showing {i - 1} of those rows. " + response.truncation_hint
+                    break
+                if i % 1000 == 0:
+                    await response.stream(ctx)
+            await response.stream(ctx, final=True)
             
-            return response
+            return response.build()
             
         except Exception as e:
             return f"Error executing query: {str(e)}"
@@ -791,6 +1747,11 @@ def register_all_tools(mcp: FastMCP):
             connector.disconnect()
     
     @mcp.tool()
-    async def health_check(ctx: Context = None) -> str:
+    @timed_tool
+    async def health_check(output_format: str = "markdown", ctx: Context = None) -> str:
         """Check if the server is running and responsive."""
-        return "✅ PostgreSQL Analyzer MCP server is healthy and running!"
\ No newline at end of file
+        format_error = check_output_format(output_format)
+        if format_error:
+            return format_error
+        return render_output(output_format, {"status": "healthy"},
+                             lambda: "✅ PostgreSQL Analyzer MCP server is healthy and running!")
\ No newline at end of file
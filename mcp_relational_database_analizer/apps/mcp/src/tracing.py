@@ -0,0 +1,389 @@
+"""
+Span-based tracing, compatible with OpenTelemetry.
+
+Spans are opened around:
+    <METHOD> <path>                 each HTTP request (server span)
+    tool <name>                     each MCP tool call (timed_tool)
+    secretsmanager.GetSecretValue   fetching credentials from AWS Secrets Manager
+    db.connect                      opening a connection or checking one out of the pool
+    db.query                        each statement run by execute_query / stream_query
+Statements are recorded by fingerprint only: the text with every literal and
+parameter replaced by '?' (db.statement) and a hash of it (db.query.fingerprint).
+Parameters, passwords, usernames and secret names are never attached to spans.
+
+Trace context follows W3C Trace Context: TraceContextMiddleware continues the
+trace of an incoming `traceparent` header, so the spans of a tool call join the
+caller's trace. Finished spans are queued and exported in batches by a background
+thread through the exporter installed with install_exporter():
+    console   one JSON line per span on stderr
+    file      one JSON line per span appended to a file
+    otlp      OTLP/HTTP with the JSON encoding (e.g. http://collector:4318/v1/traces)
+Other exporters can be added with register_exporter(). With no exporter installed
+span() costs one attribute lookup.
+"""
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator, Union, NamedTuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import atexit
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+
+from analysis.sql_parser import normalize_query
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+MAX_QUEUED_SPANS = 2048
+MAX_EXPORT_BATCH = 512
+EXPORT_INTERVAL_SECONDS = 2.0
+MAX_STATEMENT_LENGTH = 2048
+# version-trace id-span id-flags, lowercase hex; versions after 00 may add fields
+TRACEPARENT_RE = re.compile(r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?\Z")
+
+Attributes = Union[Dict[str, Any], Callable[[], Dict[str, Any]]]
+
+class SpanContext(NamedTuple):
+    """Identity of a span, local or received in a traceparent header"""
+    trace_id: str       # 32 hex digits
+    span_id: str        # 16 hex digits
+    sampled: bool
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ("name", "kind", "context", "parent_id", "attributes", "start_ns", "started",
+                 "end_ns", "status", "status_message")
+
+    def __init__(self, name: str, kind: int, parent: Optional[SpanContext], sampled: bool):
+        self.name = name
+        self.kind = kind
+        trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.context = SpanContext(trace_id, os.urandom(8).hex(), sampled)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes: Dict[str, Any] = {}
+        self.start_ns = time.time_ns()
+        self.started = time.perf_counter()
+        self.end_ns = None
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        """Mark the span failed; only the exception type (and SQLSTATE) is kept, messages can hold literals"""
+        self.status = STATUS_ERROR
+        self.status_message = type(error).__name__
+        self.set_attribute("exception.type", type(error).__name__)
+        self.set_attribute("db.sqlstate", getattr(error, "pgcode", None))
+
+    def end(self) -> None:
+        """Close the span and queue it for export (once)"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = self.start_ns + int((time.perf_counter() - self.started) * 1_000_000_000)
+        if self.context.sampled and tracer.processor is not None:
+            tracer.processor.submit(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in the OTLP JSON encoding"""
+        span = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": otlp_attributes(self.attributes),
+            "status": {"code": self.status, "message": self.status_message} if self.status else {}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+def otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Attributes as OTLP key/value pairs (bool, int, float or string values)"""
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        result.append({"key": key, "value": encoded})
+    return result
+
+class SpanExporter:
+    """Receives batches of finished spans from the export thread"""
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+class ConsoleExporter(SpanExporter):
+    """One JSON line per span on stderr (stdout may carry the MCP stdio transport)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def export(self, spans: List[Span]) -> None:
+        for span in spans:
+            self.stream.write(json.dumps(span.to_otlp(), ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+class FileExporter(SpanExporter):
+    """One JSON line per span appended to a file, for offline inspection"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            for span in spans:
+                file.write(json.dumps(span.to_otlp(), ensure_ascii=False) + "\n")
+
+class OtlpHttpExporter(SpanExporter):
+    """
+    OTLP/HTTP exporter with the JSON encoding, accepted by the OpenTelemetry Collector,
+    Jaeger and Tempo on port 4318
+
+    Args:
+        endpoint: Traces URL, e.g. 'http://localhost:4318/v1/traces'
+        headers: Extra request headers (authentication for hosted collectors)
+        service_name: service.name resource attribute
+        timeout: Seconds to wait for the collector
+    """
+
+    def __init__(self, endpoint: str, headers: Optional[Dict[str, str]] = None,
+                 service_name: str = "postgres-analyzer", timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.resource = {"attributes": otlp_attributes({"service.name": service_name})}
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {"resourceSpans": [{
+            "resource": self.resource,
+            "scopeSpans": [{"scope": {"name": "postgres-analyzer"}, "spans": [span.to_otlp() for span in spans]}]
+        }]}
+        request = urllib.request.Request(self.endpoint, data=json.dumps(payload).encode("utf-8"),
+                                         headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class BatchSpanProcessor:
+    """Queue of finished spans drained by a daemon thread; spans are dropped when the queue is full"""
+
+    def __init__(self, exporter: SpanExporter, interval: float = EXPORT_INTERVAL_SECONDS):
+        self.exporter = exporter
+        self.interval = interval
+        self.queue: "queue.Queue[Optional[Span]]" = queue.Queue(MAX_QUEUED_SPANS)
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self.run, name="span-exporter", daemon=True)
+        self.thread.start()
+
+    def submit(self, span: Span) -> None:
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < MAX_EXPORT_BATCH:
+                try:
+                    span = self.queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+                except queue.Empty:
+                    break
+                if span is None:
+                    running = False
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    print(f"Error exporting {len(batch)} spans: {str(e)}", file=sys.stderr)
+
+    def shutdown(self) -> None:
+        """Export what is queued and stop the thread"""
+        self.queue.put(None)
+        self.thread.join(timeout=self.interval + 10)
+        self.exporter.shutdown()
+
+class Tracer:
+    """Process-wide tracing settings"""
+
+    def __init__(self):
+        self.processor: Optional[BatchSpanProcessor] = None
+        self.sample_ratio = 1.0
+
+tracer = Tracer()
+_current: ContextVar[Optional[SpanContext]] = ContextVar("span", default=None)
+
+EXPORTERS: Dict[str, Callable[..., SpanExporter]] = {
+    "console": lambda **options: ConsoleExporter(),
+    "file": lambda file_path="traces.jsonl", **options: FileExporter(file_path),
+    "otlp": lambda endpoint="http://localhost:4318/v1/traces", headers=None, service_name="postgres-analyzer",
+                   **options: OtlpHttpExporter(endpoint, headers, service_name),
+}
+
+def register_exporter(name: str, factory: Callable[..., SpanExporter]) -> None:
+    """Make an exporter selectable by name; factory receives install_exporter()'s options as keywords"""
+    EXPORTERS[name] = factory
+
+def install_exporter(name: str, sample_ratio: float = 1.0, **options: Any) -> bool:
+    """
+    Start exporting spans (replaces the current exporter)
+
+    Args:
+        name: 'console', 'file', 'otlp', a registered exporter, or 'none'/'' to stop tracing
+        sample_ratio: Share of new traces recorded; traces continued from a traceparent
+            header follow the caller's sampled flag
+        **options: Passed to the exporter factory (file_path, endpoint, headers, service_name)
+
+    Returns:
+        True if tracing is on
+    """
+    if tracer.processor is not None:
+        processor, tracer.processor = tracer.processor, None
+        processor.shutdown()
+    name = (name or "none").lower()
+    if name == "none":
+        return False
+    if name not in EXPORTERS:
+        print(f"Error: unknown trace exporter '{name}' (available: {', '.join(sorted(EXPORTERS))})")
+        return False
+    tracer.sample_ratio = sample_ratio
+    tracer.processor = BatchSpanProcessor(EXPORTERS[name](**options))
+    return True
+
+def shutdown() -> None:
+    """Flush queued spans; registered at exit"""
+    if tracer.processor is not None:
+        processor, tracer.processor = tracer.processor, None
+        processor.shutdown()
+
+atexit.register(shutdown)
+
+def start_span(name: str, attributes: Optional[Attributes] = None, kind: int = SPAN_KIND_INTERNAL) -> Optional[Span]:
+    """
+    Open a span under the current one without making it current; call end() on it
+
+    For work that cannot hold a context manager open (generators). attributes may be
+    a callable, evaluated only when the span is recorded. Returns None when tracing is off.
+    """
+    if tracer.processor is None:
+        return None
+    parent = _current.get()
+    sampled = parent.sampled if parent is not None else random.random() < tracer.sample_ratio
+    span = Span(name, kind, parent, sampled)
+    if sampled and attributes:
+        for key, value in (attributes() if callable(attributes) else attributes).items():
+            span.set_attribute(key, value)
+    return span
+
+@contextmanager
+def span(name: str, attributes: Optional[Attributes] = None, kind: int = SPAN_KIND_INTERNAL) -> Iterator[Optional[Span]]:
+    """Span around a block, current inside it; an exception marks it failed (yields None when tracing is off)"""
+    current = start_span(name, attributes, kind)
+    if current is None:
+        yield None
+        return
+    token = _current.set(current.context)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+def statement_attributes(query: str) -> Dict[str, Any]:
+    """db.* attributes of a statement: fingerprint and literal-free text, never its parameters"""
+    try:
+        statement = normalize_query(query)
+    except Exception:
+        return {"db.system": "postgresql"}
+    return {
+        "db.system": "postgresql",
+        "db.operation": statement.split(" ", 1)[0].upper(),
+        "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        "db.query.fingerprint": hashlib.md5(statement.encode("utf-8")).hexdigest()[:16]
+    }
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """SpanContext of a W3C traceparent header ('00-<trace id>-<span id>-<flags>'), None if invalid"""
+    match = TRACEPARENT_RE.match(value.strip()) if value else None
+    if match is None:
+        return None
+    version, trace_id, span_id, flags, rest = match.groups()
+    # Version 00 has exactly four fields; later versions may append more
+    if version == "ff" or (version == "00" and rest):
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+def current_traceparent() -> Optional[str]:
+    """traceparent header value for the current span, to propagate the trace to outgoing calls"""
+    context = _current.get()
+    if context is None:
+        return None
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+class TraceContextMiddleware:
+    """
+    ASGI middleware: a server span per HTTP request, continuing the caller's trace
+
+    The MCP server runs stateless, so a tool call executes inside the request that
+    carries it and its spans become children of the request span.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or tracer.processor is None:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        remote = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        token = _current.set(remote)
+        try:
+            attributes = {"http.method": scope["method"], "http.target": scope["path"]}
+            with span(f"{scope['method']} {scope['path']}", attributes, SPAN_KIND_SERVER) as server_span:
+
+                async def traced_send(message: Dict[str, Any]) -> None:
+                    if message["type"] == "http.response.start" and server_span is not None:
+                        server_span.set_attribute("http.status_code", message["status"])
+                        if message["status"] >= 500:
+                            server_span.status = STATUS_ERROR
+                    await send(message)
+
+                await self.app(scope, receive, traced_send)
+        finally:
+            _current.reset(token)
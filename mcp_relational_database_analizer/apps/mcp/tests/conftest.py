@@ -0,0 +1,13 @@
+"""
+Test configuration: the modules under test are imported from src/, as the server does.
+
+Tests marked `hypopg` need a PostgreSQL database with the HypoPG extension,
+given as a libpq connection string in HYPOPG_TEST_DSN; they are skipped otherwise.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "hypopg: needs PostgreSQL with HypoPG (HYPOPG_TEST_DSN)")
@@ -0,0 +1,75 @@
+import asyncio
+
+from activity_sampler import ActiveSessionSampler
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.connection.error:
+            raise RuntimeError(self.connection.error)
+        self.description = [("state",), ("backend_type",)]
+
+    def fetchall(self):
+        return [("active", "client backend")]
+
+class FakeConnection:
+    def __init__(self):
+        self.error = None
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+class FakeConnector:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    def disconnect(self):
+        self.conn = None
+
+def sampler_with(connector):
+    sampler = ActiveSessionSampler(["db"])
+    sampler.connectors["db"] = connector
+    return sampler
+
+def test_sample_is_recorded():
+    connector = FakeConnector()
+    sampler = sampler_with(connector)
+    sampler._sample("db")
+    result = sampler.aggregate("db", 0, float("inf"), ("state",))
+    assert (result["ticks"], result["rows"]) == (1, 1)
+    assert connector.conn.rollbacks == 1
+    assert "db" not in sampler.errors
+
+def test_failed_sample_is_an_error_not_an_idle_tick():
+    connector = FakeConnector()
+    connector.conn.error = "canceling statement due to statement timeout"
+    sampler = sampler_with(connector)
+    sampler._sample("db")
+    assert sampler.errors["db"] == "canceling statement due to statement timeout"
+    assert sampler.aggregate("db", 0, float("inf"), ("state",))["ticks"] == 0
+    assert "db" not in sampler.connectors
+
+def test_start_is_idempotent():
+    async def run():
+        sampler = ActiveSessionSampler(["db"], interval=60)
+        sampler._sample = lambda preset: None
+        await sampler.start()
+        task = sampler.task
+        await sampler.start()
+        assert sampler.task is task
+        await sampler.stop()
+        assert task.cancelled() and sampler.task is None
+    asyncio.run(run())
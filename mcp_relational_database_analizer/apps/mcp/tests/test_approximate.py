@@ -0,0 +1,45 @@
+from analysis.approximate import plan_approximate_query, run_approximate_query
+
+class FakeConnector:
+    """Reports every table as large; returns the given rows for the rewritten query"""
+
+    def __init__(self, rows=None, estimated_rows=10_000_000):
+        self.rows = rows or []
+        self.estimated_rows = estimated_rows
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        if params is not None:      # table estimates
+            return [{"table_reference": reference, "table_name": reference.strip('"'), "relation_kind": "r",
+                     "pages": self.estimated_rows // 100, "estimated_rows": self.estimated_rows}
+                    for reference in params[0]]
+        self.queries.append(query)
+        return self.rows
+
+def test_rewritten_aggregates_keep_their_names():
+    query = ("SELECT date_trunc('day', created_at), count(*), sum(total) FROM orders "
+             "GROUP BY 1 HAVING count(*) > 10 ORDER BY count(*) DESC")
+    plan = plan_approximate_query(FakeConnector(), query)
+
+    assert plan["mode"] == "sampled"
+    assert plan["columns"] == {"date_trunc": "group", "count": "count", "sum": "sum"}
+    select_list, rest = plan["query"].split(" FROM ", 1)
+    assert select_list.endswith('::bigint) AS "count", (sum(total) * 100) AS "sum"')
+    assert 'AS "' not in rest      # HAVING and ORDER BY take no alias
+    assert "HAVING (round(count(*) * 100)::bigint) > 10" in rest
+
+def test_aliased_items_are_left_alone():
+    plan = plan_approximate_query(FakeConnector(), "SELECT status, count(*) AS n FROM orders GROUP BY status")
+    assert plan["query"].startswith("SELECT status, (round(count(*) * 100)::bigint) AS n FROM orders TABLESAMPLE")
+
+def test_sampled_count_gets_a_confidence_interval():
+    connector = FakeConnector(rows=[{"date_trunc": "2024-01-01", "count": 120000}])
+    result = run_approximate_query(connector, "SELECT date_trunc('day', created_at), count(*) FROM orders GROUP BY 1")
+    low, high = result["intervals"][0]["count"]
+    assert low < 120000 < high
+
+def test_estimated_scalar_count_keeps_its_name():
+    plan = plan_approximate_query(FakeConnector(), "SELECT (SELECT count(*) FROM orders), (SELECT count(*) FROM items) n")
+    assert plan["mode"] == "estimated"
+    assert plan["query"].count('AS "count"') == 1
+    assert plan["query"].rstrip().endswith("::regclass) n")
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from analysis.hypothetical import evaluate_hypothetical_indexes, collect_plan_index_names
+from analysis.indexes import build_index_ddl
+
+class FakeConnector:
+    """Answers the HypoPG and EXPLAIN statements with a plan cost chosen per hypothetical index"""
+
+    def __init__(self, baseline_cost, costs):
+        self.conn = None
+        self.baseline_cost = baseline_cost
+        self.costs = costs          # ddl -> estimated cost, None when HypoPG refuses it
+        self.current = None
+
+    def execute_query(self, query, params=None):
+        if "hypopg_reset" in query:
+            self.current = None
+            return [{"hypopg_reset": None}]
+        if "hypopg_create_index" in query:
+            ddl = params[0]
+            if self.costs.get(ddl) is None:
+                return []
+            self.current = ddl
+            return [{"indexrelid": 1, "indexname": f"<1>btree_{len(ddl)}"}]
+        if query.startswith("EXPLAIN"):
+            if self.current is None:
+                plan = {"Node Type": "Seq Scan", "Total Cost": self.baseline_cost}
+            else:
+                plan = {"Node Type": "Index Scan", "Total Cost": self.costs[self.current],
+                        "Index Name": f"<1>btree_{len(self.current)}"}
+            return [{"QUERY PLAN": [{"Plan": plan}]}]
+        raise AssertionError(f"unexpected query: {query}")
+
+def candidate(table, columns, **options):
+    return {"table": table, "columns": columns,
+            "ddl": build_index_ddl(table, columns, include=options.get("include"), predicate=options.get("predicate"))}
+
+def test_build_index_ddl_plain():
+    assert build_index_ddl("orders", ["customer_id"]) == "CREATE INDEX ON orders(customer_id)"
+
+def test_build_index_ddl_named_covering_partial():
+    ddl = build_index_ddl("orders", ["customer_id", "created_at"], "idx_orders_customer",
+                          include=["total"], predicate="status = 'open'")
+    assert ddl == ("CREATE INDEX idx_orders_customer ON orders(customer_id, created_at) "
+                   "INCLUDE (total) WHERE status = 'open'")
+
+def test_candidates_ranked_by_cost_reduction():
+    small = candidate("orders", ["status"])
+    large = candidate("orders", ["customer_id", "created_at"])
+    medium = candidate("orders", ["customer_id"])
+    connector = FakeConnector(1000.0, {small["ddl"]: 900.0, large["ddl"]: 50.0, medium["ddl"]: 400.0})
+
+    result = evaluate_hypothetical_indexes(connector, "SELECT * FROM orders", [small, large, medium])
+
+    assert result["baseline_cost"] == 1000.0
+    assert [idx["columns"] for idx in result["recommended"]] == [["customer_id", "created_at"], ["customer_id"], ["status"]]
+    assert result["recommended"][0]["cost_reduction_percent"] == pytest.approx(95.0)
+    assert result["dropped"] == []
+
+def test_candidates_without_benefit_are_dropped():
+    refused = candidate("orders", ["note"])
+    useless = candidate("orders", ["id"])
+    connector = FakeConnector(100.0, {refused["ddl"]: None, useless["ddl"]: 120.0})
+
+    result = evaluate_hypothetical_indexes(connector, "SELECT * FROM orders", [refused, useless])
+
+    assert result["recommended"] == []
+    assert {idx["ddl"]: idx["reason"] for idx in result["dropped"]} == {
+        refused["ddl"]: "HypoPG could not create the index",
+        useless["ddl"]: "No cost reduction"
+    }
+
+def test_collect_plan_index_names_walks_children():
+    plan = {"Node Type": "Nested Loop", "Plans": [
+        {"Node Type": "Index Scan", "Index Name": "a_idx"},
+        {"Node Type": "Hash", "Plans": [{"Node Type": "Index Only Scan", "Index Name": "b_idx"}]}
+    ]}
+    assert collect_plan_index_names(plan) == {"a_idx", "b_idx"}
+
+@pytest.mark.hypopg
+def test_hypopg_recommends_selective_index():
+    dsn = os.getenv("HYPOPG_TEST_DSN")
+    if not dsn:
+        pytest.skip("HYPOPG_TEST_DSN is not set")
+    from psycopg2.extensions import parse_dsn
+    from db.connector import PostgresConnector
+    from analysis.hypothetical import is_hypopg_available
+
+    options = parse_dsn(dsn)
+    connector = PostgresConnector(host=options.get("host", "localhost"), port=options.get("port", 5432),
+                                  dbname=options.get("dbname"), user=options.get("user"),
+                                  password=options.get("password"))
+    connector.read_only = False     # the test table is a temporary table of this session
+    assert connector.connect()
+    try:
+        if not is_hypopg_available(connector):
+            pytest.skip("HypoPG is not installed in the test database")
+        connector.execute_query("CREATE TEMP TABLE hypo_orders AS "
+                                "SELECT g AS id, g % 1000 AS customer_id FROM generate_series(1, 100000) g")
+        connector.execute_query("ANALYZE hypo_orders")
+        selective = candidate("hypo_orders", ["customer_id"])
+        unused = candidate("hypo_orders", ["id"])
+
+        result = evaluate_hypothetical_indexes(connector, "SELECT * FROM hypo_orders WHERE customer_id = 42",
+                                               [unused, selective])
+
+        assert [idx["ddl"] for idx in result["recommended"]] == [selective["ddl"]]
+        assert [idx["ddl"] for idx in result["dropped"]] == [unused["ddl"]]
+        # nothing was created for real
+        assert connector.execute_query("SELECT count(*) AS n FROM pg_indexes WHERE tablename = 'hypo_orders'")[0]["n"] == 0
+    finally:
+        connector.disconnect()
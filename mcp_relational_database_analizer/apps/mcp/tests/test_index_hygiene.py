@@ -0,0 +1,33 @@
+from analysis.index_hygiene import find_duplicate_indexes, find_redundant_indexes
+
+def index(oid, name, **options):
+    return {"index_oid": oid, "index_name": name, "table_oid": 100, "index_type": "btree",
+            "attnums": [2], "key_count": 1, "opclasses": [3126], "expressions": None, "predicate": None,
+            "constraint_name": None, "is_primary": False, "is_unique": False, "is_valid": True, **options}
+
+def reported(*indexes):
+    return [finding["index"]["index_name"] for finding in find_duplicate_indexes({"indexes": list(indexes)})]
+
+def test_newer_plain_duplicate_is_reported():
+    assert reported(index(1, "users_email_idx"), index(2, "users_email_idx2")) == ["users_email_idx2"]
+
+def test_unique_index_is_kept_over_older_plain_index():
+    # CREATE UNIQUE INDEX has no pg_constraint row, but dropping it loses uniqueness
+    assert reported(index(1, "users_email_idx"), index(2, "users_email_key", is_unique=True)) == ["users_email_idx"]
+
+def test_constraint_indexes_are_never_reported():
+    assert reported(index(1, "users_email_key", is_unique=True), index(2, "users_email_uq", is_unique=True)) == []
+    assert reported(index(1, "users_pkey", is_primary=True, is_unique=True, constraint_name="users_pkey"),
+                    index(2, "users_id_key", is_unique=True, constraint_name="users_id_key")) == []
+
+def test_invalid_indexes_are_skipped():
+    assert reported(index(1, "users_email_idx"), index(2, "users_email_ccnew", is_valid=False)) == []
+
+def test_invalid_index_is_not_reported_as_redundant():
+    wide = index(1, "users_email_name_idx", attnums=[2, 3], key_attnums=[2, 3], key_count=2, opclasses=[3126, 3126],
+                 column_names=["email", "name"])
+    narrow = index(2, "users_email_ccnew", key_attnums=[2])
+    findings = find_redundant_indexes({"indexes": [wide, narrow]})
+    assert [finding["index"]["index_name"] for finding in findings] == ["users_email_ccnew"]
+    narrow["is_valid"] = False
+    assert find_redundant_indexes({"indexes": [wide, narrow]}) == []
@@ -0,0 +1,24 @@
+import asyncio
+
+import instrumentation
+from instrumentation import Instruments, MAX_TARGETS, OTHER_TARGET, phase, set_target, timed_tool
+
+@timed_tool
+async def probe(host):
+    set_target(f"shop@{host}")
+    with phase("sql"):
+        pass
+    return "ok"
+
+def test_target_labels_are_capped(monkeypatch):
+    monkeypatch.setattr(instrumentation, "instruments", Instruments())
+    for i in range(MAX_TARGETS + 10):
+        asyncio.run(probe(f"db{i}.example"))
+    asyncio.run(probe("db0.example"))
+
+    targets = {target for _, target, _ in instrumentation.instruments.histograms}
+    assert len(targets) == MAX_TARGETS + 1
+    assert OTHER_TARGET in targets and "shop@db0.example" in targets
+    calls = instrumentation.instruments.calls
+    assert calls[("probe", OTHER_TARGET, "ok")] == 10
+    assert calls[("probe", "shop@db0.example", "ok")] == 2
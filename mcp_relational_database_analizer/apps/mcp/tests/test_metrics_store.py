@@ -0,0 +1,38 @@
+from metrics_store import MetricsStore, INT, STRING, FLOAT
+
+COLUMNS = {"wait_class": STRING, "query_id": INT, "seconds": FLOAT}
+
+def fill(store):
+    table = store.table("sessions", COLUMNS, chunk_seconds=60, retention_seconds=10 ** 10)
+    for i in range(300):
+        table.append(1_000_000.0 + i, [
+            {"wait_class": "IO", "query_id": 7, "seconds": 0.5},
+            {"wait_class": "Lock" if i % 2 else None, "query_id": 8, "seconds": 1.5},
+        ])
+    return table
+
+def summary(table):
+    return {
+        "count": table.count(0, 2_000_000),
+        "oldest": table.oldest(),
+        "by_class": {row["wait_class"]: row["count"] for row in table.aggregate(0, 2_000_000, ["wait_class"])},
+        "totals": table.aggregate(0, 2_000_000, ["query_id"], {"n": ("count", None), "s": ("sum", "seconds")}),
+    }
+
+def test_chunks_survive_a_restart(tmp_path):
+    store = MetricsStore(str(tmp_path))
+    expected = summary(fill(store))
+    store.flush()
+
+    reopened = MetricsStore(str(tmp_path)).table("sessions", COLUMNS, chunk_seconds=60, retention_seconds=10 ** 10)
+
+    assert len(reopened.chunks) > 1
+    assert summary(reopened) == expected
+    assert expected["count"] == 600
+    assert expected["oldest"] == 1_000_000.0
+    assert expected["by_class"] == {"IO": 300, "Lock": 150, None: 150}
+
+def test_sealed_chunks_are_read_back_from_disk_in_process(tmp_path):
+    table = fill(MetricsStore(str(tmp_path)))
+    assert all(chunk.columns is None for chunk in table.chunks[:-1])     # released after sealing
+    assert table.count(1_000_000, 1_000_059) == 120
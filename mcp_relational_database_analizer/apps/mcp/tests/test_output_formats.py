@@ -0,0 +1,39 @@
+import json
+from decimal import Decimal
+
+from output_formats import compact_value, render_output, table
+
+ROWS = table(["id", "name"], [[i, "n" * 20] for i in range(1000)])
+
+def test_compact_escapes_separators():
+    text = render_output("compact", {"t": table(["a", "b"], [["x|y", "c\\d"]]), "l": ["p;q", "r"]}, max_bytes=0)
+    assert text.splitlines() == ["t[a|b]", "x\\|y|c\\\\d", "l: p\\;q; r"]
+
+def test_compact_floats_keep_their_precision():
+    assert compact_value(12345.678) == "12345.678"
+    assert compact_value(0.000123456789) == "0.000123456789"
+    assert float(compact_value(987654.321012)) == 987654.321012
+
+def test_json_keeps_leading_rows_within_budget():
+    text = render_output("json", {"row_count": 1000, "result": ROWS}, max_bytes=2000)
+    assert len(text.encode()) <= 2000
+    result = json.loads(text)
+    kept = len(result["result"]["rows"])
+    assert 0 < kept < 1000
+    assert result["result"]["rows"][0] == [0, "n" * 20]
+    assert result["truncated"] == {"max_bytes": 2000, "rows_omitted": 1000 - kept}
+
+def test_json_without_budget_is_complete():
+    assert len(json.loads(render_output("json", {"result": ROWS}, max_bytes=0))["result"]["rows"]) == 1000
+
+def test_compact_is_cut_at_a_line_within_budget():
+    text = render_output("compact", {"result": ROWS}, max_bytes=500)
+    body, note = text.split("\n\n*Output truncated")
+    assert len(body.encode()) <= 500
+    assert all(line == "result[id|name]" or line.endswith("n" * 20) for line in body.splitlines())
+
+def test_integers_beyond_64_bits_are_encoded():
+    value = Decimal("123456789012345678901234567890")
+    result = {"rows": [{"s": value}, {"s": Decimal(-2 ** 63)}]}
+    assert json.loads(render_output("json", result, max_bytes=0))["rows"]["rows"] == [[int(value)], [-2 ** 63]]
+    assert "123456789012345678901234567890" in render_output("compact", result, max_bytes=0)
@@ -0,0 +1,50 @@
+import psycopg2
+
+from db.connector import PostgresConnector
+from db.pool import ConnectionPool, use_pool
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self, password):
+        self.password = password
+
+    def cursor(self):
+        return FakeCursor()
+
+    def rollback(self):
+        pass
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+def fake_connect(**options):
+    if options["password"] != "right":
+        raise psycopg2.OperationalError("password authentication failed")
+    return FakeConnection(options["password"])
+
+def connector(password):
+    return PostgresConnector(host="db.example", dbname="shop", user="reader", password=password)
+
+def test_wrong_password_does_not_borrow_an_authenticated_connection(monkeypatch):
+    monkeypatch.setattr(psycopg2, "connect", fake_connect)
+    with use_pool(ConnectionPool()) as pool:
+        first = connector("right")
+        assert first.connect()
+        first.disconnect()
+        assert pool.stats()["idle"] == 1
+
+        assert not connector("wrong").connect()
+        assert pool.stats()["reused"] == 0
+
+        again = connector("right")
+        assert again.connect()
+        assert pool.stats()["reused"] == 1
+        again.disconnect()
@@ -0,0 +1,74 @@
+from db import catalog_store
+from db.queries import (
+    TABLES_QUERY, COLUMNS_QUERY, INDEXES_QUERY, FOREIGN_KEYS_QUERY, CATALOG_FINGERPRINT_QUERY,
+    CATALOG_SETTINGS_QUERY, CATALOG_STATISTICS_QUERY
+)
+from analysis.structure import (
+    get_cached_database_structure, summarize_database_structure, analyze_database_structure_for_response
+)
+
+class FakeConnector:
+    host, port, dbname, user = "db.example", 5432, "shop", "reader"
+
+    def __init__(self):
+        self.rows = 100
+        self.scans = 1
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append(query)
+        if query == CATALOG_FINGERPRINT_QUERY:
+            return [{"fingerprint": "ddl-1"}]
+        if query == TABLES_QUERY:
+            return [{"table_schema": "public", "table_name": "orders", "table_size_bytes": 8192,
+                     "total_size_bytes": 16384, "column_count": 1, "table_description": "",
+                     "estimated_row_count": self.rows}]
+        if query == COLUMNS_QUERY:
+            return [{"table_schema": "public", "table_name": "orders", "column_name": "id",
+                     "data_type": "integer", "character_maximum_length": None, "is_nullable": "NO",
+                     "column_default": None, "column_description": ""}]
+        if query == INDEXES_QUERY:
+            return [{"table_schema": "public", "table_name": "orders", "index_name": "orders_pkey",
+                     "index_definition": "CREATE UNIQUE INDEX orders_pkey ON public.orders USING btree (id)",
+                     "is_primary": True, "index_scans": self.scans, "tuples_read": 0, "tuples_fetched": 0,
+                     "index_size_bytes": 8192}]
+        if query in (FOREIGN_KEYS_QUERY, CATALOG_SETTINGS_QUERY):
+            return []
+        if query == CATALOG_STATISTICS_QUERY:
+            return [
+                {"schema_name": "public", "relation_name": "orders", "size_bytes": self.rows * 100,
+                 "total_size_bytes": self.rows * 200, "live_rows": self.rows, "index_scans": None,
+                 "tuples_read": None, "tuples_fetched": None},
+                {"schema_name": "public", "relation_name": "orders_pkey", "size_bytes": 8192,
+                 "total_size_bytes": None, "live_rows": None, "index_scans": self.scans,
+                 "tuples_read": 5, "tuples_fetched": 4}
+            ]
+        raise AssertionError(query)
+
+def test_statistics_are_read_on_every_call(tmp_path):
+    catalog_store._persisted.clear()
+    connector = FakeConnector()
+    structure, source = get_cached_database_structure(connector, str(tmp_path))
+    assert source == "database"
+    assert summarize_database_structure(structure)["tables"]["rows"][0][2:4] == [100, 20000]
+
+    connector.rows, connector.scans = 50000, 7
+    structure, source = get_cached_database_structure(connector, str(tmp_path))
+    assert source == "memory"
+    summary = summarize_database_structure(structure)
+    assert summary["tables"]["rows"][0][2:4] == [50000, 10000000]
+    assert summary["large_tables"] == [{"name": "public.orders", "rows": 50000, "size": 10000000}]
+    assert structure.schema_model.index_scans[0] == 7
+    assert structure["tables"][0]["estimated_row_count"] == 50000
+    assert structure["indexes"][0]["index_scans"] == 7
+    assert "**Estimated Rows**: 50,000" in analyze_database_structure_for_response(structure)
+
+    # a restarted server reads the DDL from disk, and still live statistics
+    catalog_store._persisted.clear()
+    connector.rows = 7
+    structure, source = get_cached_database_structure(connector, str(tmp_path))
+    assert source == "disk"
+    assert "estimated_row_count" not in structure.snapshot["tables"][0]
+    assert "index_scans" not in structure.snapshot["indexes"][0]
+    assert summarize_database_structure(structure)["tables"]["rows"][0][2] == 7
+    catalog_store._persisted.clear()
@@ -0,0 +1,56 @@
+import pytest
+
+from db.queries import STRUCTURE_PAGE_COUNT_QUERY
+from analysis.structure import get_database_structure_page
+
+TABLES = [("public", f"t{i:02d}", 1000 - i) for i in range(7)]
+
+class FakeConnector:
+    def __init__(self):
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append((query, params))
+        if query == STRUCTURE_PAGE_COUNT_QUERY:
+            return [{"matching_tables": len(TABLES)}]
+        if "sort_value" not in query:
+            return []
+        rows = TABLES
+        if "cursor_value" in params:
+            after = (params["cursor_value"], params["cursor_schema"], params["cursor_table"])
+            rows = [row for row in rows if (row[2], row[0], row[1]) < after]
+        return [{"table_oid": 16384 + int(name[1:]), "table_schema": schema, "table_name": name,
+                 "sort_value": pages, "table_size_bytes": pages * 8192, "total_size_bytes": pages * 8192,
+                 "estimated_row_count": pages * 10, "seq_scan": 0, "index_count": 1,
+                 "has_primary_key": True, "table_description": ""}
+                for schema, name, pages in rows[:params["limit"]]]
+
+def page_query(connector):
+    return next(query for query, _ in connector.queries if "sort_value" in query)
+
+def test_page_is_chosen_before_tables_are_measured():
+    connector = FakeConnector()
+    page = get_database_structure_page(connector, sort_by="size", page_size=3)
+    query = page_query(connector)
+    inner = query[query.index("FROM ("):query.index(") p")]
+    assert "pg_relation_size" not in inner and "pg_total_relation_size" not in inner
+    assert "obj_description" not in inner and "pg_index" not in inner and "OVER" not in query
+    assert "LIMIT %(limit)s" in inner and "c.relpages::bigint <" not in inner
+    assert [table["table_name"] for table in page["tables"]] == ["t00", "t01", "t02"]
+    assert (page["matching_tables"], page["position"]) == (7, 0)
+
+def test_matching_tables_is_counted_once():
+    connector = FakeConnector()
+    first = get_database_structure_page(connector, sort_by="size", page_size=3)
+    connector.queries.clear()
+    second = get_database_structure_page(connector, sort_by="size", page_size=3, cursor=first["next_cursor"])
+    assert STRUCTURE_PAGE_COUNT_QUERY not in [query for query, _ in connector.queries]
+    assert "c.relpages::bigint < %(cursor_value)s" in page_query(connector)
+    assert [table["table_name"] for table in second["tables"]] == ["t03", "t04", "t05"]
+    assert (second["matching_tables"], second["position"]) == (7, 3)
+
+def test_cursor_is_tied_to_its_sort_key():
+    connector = FakeConnector()
+    first = get_database_structure_page(connector, sort_by="size", page_size=3)
+    with pytest.raises(ValueError):
+        get_database_structure_page(connector, sort_by="rows", page_size=3, cursor=first["next_cursor"])
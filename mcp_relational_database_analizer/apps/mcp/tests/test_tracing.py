@@ -0,0 +1,49 @@
+import pytest
+
+from tracing import parse_traceparent, statement_attributes
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+SPAN_ID = "00f067aa0ba902b7"
+
+@pytest.mark.parametrize("query, statement", [
+    ("SELECT * FROM users WHERE email = 'alice@example.com'", "select * from users where email = ?"),
+    ("SELECT 'it''s', E'a\\'secret', e'x\\\\'", "select ? , ? , ?"),
+    ("SELECT U&'d\\0061t\\+000061', u&'x'", "select ? , ?"),
+    ("SELECT $$secret$$", "select ?"),
+    ("DO $fn$ BEGIN PERFORM set_password('password'); END $fn$", "do ?"),
+    ("SELECT $a$ $$nested$$ $a$, $1 FROM t WHERE id = $2", "select ? , ? from t where id = ?"),
+    ("SELECT 42, 1.5, 2e10, 3.25E-4 FROM t LIMIT 10", "select ? , ? , ? , ? from t limit ?"),
+])
+def test_statement_attributes_drop_literals(query, statement):
+    attributes = statement_attributes(query)
+    assert attributes["db.statement"] == statement
+    assert attributes["db.operation"] == statement.split(" ", 1)[0].upper()
+
+def test_statements_differing_in_literals_share_a_fingerprint():
+    first = statement_attributes("SELECT * FROM t WHERE a = $$x$$ AND b = 1")
+    second = statement_attributes("SELECT * FROM t WHERE a = 'y' AND b = 22")
+    assert first["db.query.fingerprint"] == second["db.query.fingerprint"]
+
+def test_parse_traceparent():
+    context = parse_traceparent(f" 00-{TRACE_ID}-{SPAN_ID}-01 ")
+    assert (context.trace_id, context.span_id, context.sampled) == (TRACE_ID, SPAN_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{SPAN_ID}-00").sampled is False
+    # a later version may carry more fields
+    assert parse_traceparent(f"01-{TRACE_ID}-{SPAN_ID}-01-extra").trace_id == TRACE_ID
+
+@pytest.mark.parametrize("value", [
+    None,
+    "",
+    f"00-+{TRACE_ID[1:]}-{SPAN_ID}-01",
+    f"00-{TRACE_ID}-+{SPAN_ID[1:]}-01",
+    f"00-{TRACE_ID}-{SPAN_ID}-+1",
+    f"00-{TRACE_ID.upper()}-{SPAN_ID}-01",
+    f"00-{TRACE_ID}-{SPAN_ID}-01-extra",
+    f"00-{TRACE_ID}-{SPAN_ID}-011",
+    f"ff-{TRACE_ID}-{SPAN_ID}-01",
+    f"00-{'0' * 32}-{SPAN_ID}-01",
+    f"00-{TRACE_ID}-{'0' * 16}-01",
+    f"00-{TRACE_ID}-{SPAN_ID}",
+])
+def test_parse_traceparent_rejects_invalid_headers(value):
+    assert parse_traceparent(value) is None
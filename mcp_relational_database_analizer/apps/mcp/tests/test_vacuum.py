@@ -0,0 +1,47 @@
+from analysis.vacuum import record_snapshot, counter_rate
+from db.connector import PostgresConnector
+
+def row(sampled_at, dead, vacuums=3):
+    return {"table_oid": 16384, "sampled_at": sampled_at, "n_dead_tup": dead, "n_mod_since_analyze": 0,
+            "n_ins_since_vacuum": 0, "xid_age": 1000, "vacuum_count": vacuums, "analyze_count": 1}
+
+def test_dead_tuple_rate_between_snapshots():
+    key = ("test-rate", 5432, "db")
+    record_snapshot(key, [row(1000.0, 100)])
+    history = record_snapshot(key, [row(1010.0, 200)])
+    assert counter_rate(history, 16384, 0, 4) == 10.0
+
+def test_no_rate_across_a_vacuum_or_without_elapsed_time():
+    key = ("test-reset", 5432, "db")
+    record_snapshot(key, [row(1000.0, 500, vacuums=3)])
+    assert counter_rate(record_snapshot(key, [row(1010.0, 20, vacuums=4)]), 16384, 0, 4) is None
+    key = ("test-same-time", 5432, "db")
+    record_snapshot(key, [row(1000.0, 100)])
+    assert counter_rate(record_snapshot(key, [row(1000.0, 200)]), 16384, 0, 4) is None
+
+class FakeConnection:
+    def __init__(self):
+        self.calls = []
+
+    def rollback(self):
+        self.calls.append("ROLLBACK")
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, params=None):
+                connection.calls.append(query)
+        return Cursor()
+
+def test_new_transaction_stays_read_only():
+    connector = PostgresConnector(host="localhost", dbname="db", user="u", password="p")
+    connector.conn = FakeConnection()
+    connector.new_transaction()
+    assert connector.conn.calls == ["ROLLBACK", "SET TRANSACTION READ ONLY"]
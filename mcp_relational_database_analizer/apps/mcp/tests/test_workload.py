@@ -0,0 +1,28 @@
+import pytest
+
+from analysis.sql_parser import parse_query
+from analysis.workload import resolve_workload_file
+
+@pytest.mark.parametrize("query, select_star", [
+    ("SELECT * FROM orders", True),
+    ("SELECT o.* FROM orders o", True),
+    ("SELECT DISTINCT * FROM orders", True),
+    ("SELECT id, * FROM orders", True),
+    ("SELECT count(*) FROM orders WHERE customer_id = 1", False),
+    ("SELECT count(o.*) FROM orders o", False),
+    ("SELECT price * quantity FROM orders", False),
+])
+def test_select_star_only_for_whole_select_items(query, select_star):
+    assert parse_query(query)["select_star"] is select_star
+
+def test_workload_file_confined_to_directory(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    (logs / "postgresql.log").write_text("SELECT 1;")
+    (tmp_path / "secret.txt").write_text("x")
+
+    assert resolve_workload_file("postgresql.log", str(logs)) == str((logs / "postgresql.log").resolve())
+    assert resolve_workload_file("../secret.txt", str(logs)) is None
+    assert resolve_workload_file(str(tmp_path / "secret.txt"), str(logs)) is None
+    assert resolve_workload_file("missing.log", str(logs)) is None
+    assert resolve_workload_file("postgresql.log", "") is None